@@ -0,0 +1,295 @@
+"""
+Micro-benchmarks of the framework's own overhead, using synthetic data and stub models (nothing is downloaded).
+
+Usage (from the repository root, with vanpy installed):
+
+    python benchmarks/run_benchmarks.py                       # all benchmarks, 1k to 1M rows
+    python benchmarks/run_benchmarks.py --quick               # up to 10k rows
+    python benchmarks/run_benchmarks.py -b payload_merge --sizes 1000 100000
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/baseline.json
+
+Results are saved as JSON (see --output). With --compare, benchmarks slower than the baseline by more than
+--threshold are reported and the exit code is 1.
+"""
+import argparse
+import gc
+import importlib
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+os.environ.setdefault('TQDM_DISABLE', '1')
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from stubs import StubClassifierComponent, StubEmbeddingComponent, StubSegmenter  # noqa: E402
+from synthetic import (create_empty_files, generate_audio_corpus, generate_embeddings_payload,  # noqa: E402
+                       generate_paths, generate_segment_paths)
+from vanpy.core.ComponentPayload import ComponentPayload  # noqa: E402
+from vanpy.utils.row_ids import ROW_ID_COLUMN, attach_results, ensure_row_ids  # noqa: E402
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+QUICK_SIZES = [1_000, 10_000]
+
+
+@dataclass
+class Benchmark:
+    """
+    :ivar name: benchmark name
+    :ivar setup: creates the benchmark's input for a given rows count and parameters (not measured)
+    :ivar run: the measured function, receives the setup result
+    :ivar params: parameter sets the benchmark is executed with
+    :ivar max_rows: the benchmark is skipped for larger sizes (e.g. quadratic algorithms, files creation)
+    :ivar requires: optional modules the benchmark needs, it is skipped if they are not installed
+    """
+    name: str
+    setup: Callable
+    run: Callable
+    params: List[Dict] = field(default_factory=lambda: [{}])
+    max_rows: int = 1_000_000
+    requires: Tuple[str, ...] = ()
+
+
+def payload_of_paths(rows_count: int) -> ComponentPayload:
+    return ComponentPayload(metadata={'input_path': 'corpus', 'paths_column': 'path'},
+                            df=pd.DataFrame({'path': generate_paths(rows_count)}))
+
+
+# process_with_progress: scheduling and result collection of a near-zero-cost process_item
+def setup_process_with_progress(rows_count: int, executor: str, work_dir: str):
+    component = StubClassifierComponent({'executor': executor, 'max_workers': 4, 'performance_measurement': True})
+    return component, generate_paths(rows_count)
+
+
+def run_process_with_progress(inputs):
+    component, paths = inputs
+    component.process_with_progress(paths, {'meta_columns': []}, 'path')
+
+
+# a whole embedding component: items, 192 feature columns per row and the merge back into the payload
+def setup_embedding_component(rows_count: int, work_dir: str):
+    component = StubEmbeddingComponent({'executor': 'thread', 'max_workers': 4})
+    component.load_model()
+    return component, payload_of_paths(rows_count)
+
+
+def run_embedding_component(inputs):
+    component, payload = inputs
+    component.process(payload)
+
+
+# segmenters' scan of their output directory for already processed files (overwrite: False)
+def setup_segmenter_existing_files(rows_count: int, segments_per_file: int, work_dir: str):
+    output_dir = f'{work_dir}/segments_{rows_count}'
+    files = generate_paths(max(rows_count // segments_per_file, 1), directory=f'{work_dir}/input')
+    create_empty_files(generate_segment_paths(files, output_dir, segments_per_file))
+    return StubSegmenter({'overwrite': False}), files, output_dir
+
+
+def run_segmenter_existing_files(inputs):
+    component, files, output_dir = inputs
+    component.get_file_paths_and_processed_df_if_not_overwriting(files, 'processed_path', 'path', output_dir)
+
+
+# CosineDistanceClusterer.process on clustered synthetic embeddings
+def setup_cosine_distance_clusterer(rows_count: int, work_dir: str):
+    from vanpy.core.model_inference_components.CosineDistanceClusterer import CosineDistanceClusterer
+    component = CosineDistanceClusterer({'segment_classifier': {'cosine_distance_diarization': {
+        'features_list': [{'speechbrain_embedding': {'start_index': 0, 'stop_index': 192}}]}}})
+    return component, generate_embeddings_payload(rows_count)
+
+
+def run_cosine_distance_clusterer(inputs):
+    component, payload = inputs
+    component.process(payload)
+
+
+# LibrosaFeaturesExtractor.process_item on synthetic speech-like audio
+def setup_librosa_features(rows_count: int, work_dir: str):
+    from vanpy.core.feature_extraction_components.LibrosaFeaturesExtractor import LibrosaFeaturesExtractor
+    component = LibrosaFeaturesExtractor({'feature_extraction': {'librosa_features_extractor': {
+        'features': ['mfcc', 'delta_mfcc', 'zero_crossing_rate', 'spectral_centroid']}}})
+    corpus_dir = f'{work_dir}/audio'
+    audio_files = sorted(os.listdir(corpus_dir)) if os.path.isdir(corpus_dir) else []
+    if len(audio_files) < 100:
+        audio_files = generate_audio_corpus(corpus_dir, 100, duration_range=(1.0, 5.0))
+    else:
+        audio_files = [f'{corpus_dir}/{f}' for f in audio_files]
+    return component, [audio_files[i % len(audio_files)] for i in range(rows_count)]
+
+
+def run_librosa_features(inputs):
+    component, paths = inputs
+    for f in paths:
+        component.process_item(f, 'path')
+
+
+# the row-id join every component does to attach its results to the payload, and the payload's column selections
+def setup_payload_merge(rows_count: int, result_columns: int, work_dir: str):
+    payload = generate_embeddings_payload(rows_count, dimensions=16)
+    ensure_row_ids(payload.df)
+    rng = np.random.default_rng(0)
+    results = pd.DataFrame(rng.standard_normal((rows_count, result_columns)),
+                           columns=[f'result_{i}' for i in range(result_columns)])
+    shuffled = payload.df[['path', ROW_ID_COLUMN]].sample(frac=1, random_state=0)
+    results.insert(0, 'path', shuffled['path'].to_numpy())
+    results[ROW_ID_COLUMN] = shuffled[ROW_ID_COLUMN].to_numpy()
+    return payload, results
+
+
+def run_payload_merge(inputs):
+    payload, results = inputs
+    merged = ComponentPayload(metadata=payload.metadata, df=attach_results(payload.df.copy(), results, 'path'))
+    merged.get_features_df()
+    merged.get_full_df(all_paths_columns=True, meta_columns=True)
+
+
+BENCHMARKS = [
+    Benchmark('process_with_progress', setup_process_with_progress, run_process_with_progress,
+              params=[{'executor': 'sequential'}, {'executor': 'thread'}]),
+    Benchmark('embedding_component', setup_embedding_component, run_embedding_component, max_rows=100_000),
+    Benchmark('segmenter_existing_files', setup_segmenter_existing_files, run_segmenter_existing_files,
+              params=[{'segments_per_file': 4}], max_rows=100_000),
+    Benchmark('cosine_distance_clusterer', setup_cosine_distance_clusterer, run_cosine_distance_clusterer,
+              max_rows=10_000, requires=('torch',)),
+    Benchmark('librosa_features', setup_librosa_features, run_librosa_features, max_rows=1_000,
+              requires=('librosa',)),
+    Benchmark('payload_merge', setup_payload_merge, run_payload_merge, params=[{'result_columns': 4}]),
+]
+
+
+def measure(function: Callable, inputs, trace_memory: bool) -> Tuple[float, Optional[float]]:
+    """
+    :return: the run time in seconds and the peak traced memory in MB (None if not traced)
+    """
+    gc.collect()
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    function(inputs)
+    elapsed = time.perf_counter() - start
+    peak_memory = None
+    if trace_memory:
+        peak_memory = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    return elapsed, peak_memory
+
+
+def get_environment() -> Dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {'timestamp': datetime.now().isoformat(timespec='seconds'), 'commit': commit,
+            'python': platform.python_version(), 'platform': platform.platform(), 'cpu_count': os.cpu_count(),
+            'numpy': np.__version__, 'pandas': pd.__version__}
+
+
+def run_benchmarks(names: List[str], sizes: List[int], repeat: int, trace_memory: bool) -> Dict:
+    logger = logging.getLogger('vanpy benchmarks')
+    results, skipped = [], []
+    work_dir = tempfile.mkdtemp(prefix='vanpy_benchmarks_')
+    try:
+        for benchmark in BENCHMARKS:
+            if names and benchmark.name not in names:
+                continue
+            missing = [m for m in benchmark.requires if importlib.util.find_spec(m) is None]
+            if missing:
+                skipped.append({'benchmark': benchmark.name, 'reason': f'missing modules: {", ".join(missing)}'})
+                logger.warning(f'Skipping {benchmark.name}, missing modules: {", ".join(missing)}')
+                continue
+            for params in benchmark.params:
+                for rows_count in sizes:
+                    if rows_count > benchmark.max_rows:
+                        skipped.append({'benchmark': benchmark.name, 'params': params, 'rows': rows_count,
+                                        'reason': f'above max_rows={benchmark.max_rows}'})
+                        continue
+                    inputs = benchmark.setup(rows_count, work_dir=work_dir, **params)
+                    timings, peak_memory = [], None
+                    for _ in range(repeat):
+                        elapsed, peak = measure(benchmark.run, inputs, trace_memory)
+                        timings.append(elapsed)
+                        if peak is not None:
+                            peak_memory = max(peak_memory or 0.0, peak)
+                    del inputs
+                    seconds = min(timings)
+                    results.append({'benchmark': benchmark.name, 'params': params, 'rows': rows_count,
+                                    'seconds': seconds, 'rows_per_second': rows_count / seconds if seconds else None,
+                                    'all_seconds': timings, 'peak_memory_mb': peak_memory})
+                    logger.warning(f'{benchmark.name} {params} rows={rows_count}: {seconds:.3f}s'
+                                   + (f', peak {peak_memory:.1f}MB' if peak_memory is not None else ''))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return {'environment': get_environment(), 'results': results, 'skipped': skipped}
+
+
+def compare(report: Dict, baseline: Dict, threshold: float) -> List[Dict]:
+    """
+    Compares the results with a baseline report.
+
+    :return: the results slower than the baseline by more than the threshold ratio
+    """
+    def key(result):
+        return result['benchmark'], json.dumps(result['params'], sort_keys=True), result['rows']
+
+    baseline_results = {key(r): r for r in baseline['results']}
+    regressions = []
+    for result in report['results']:
+        base = baseline_results.get(key(result))
+        if base is None or not base['seconds']:
+            continue
+        ratio = result['seconds'] / base['seconds']
+        print(f'{result["benchmark"]:28} {json.dumps(result["params"]):28} {result["rows"]:>9}: '
+              f'{base["seconds"]:9.3f}s -> {result["seconds"]:9.3f}s ({ratio:.2f}x)')
+        if ratio > threshold:
+            regressions.append({**result, 'baseline_seconds': base['seconds'], 'ratio': ratio})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='VANPY framework micro-benchmarks')
+    parser.add_argument('-b', '--benchmarks', nargs='*', default=[],
+                        help=f'benchmarks to run (default: all): {", ".join(b.name for b in BENCHMARKS)}')
+    parser.add_argument('--sizes', nargs='*', type=int, default=None, help='rows counts (default: 1k to 1M)')
+    parser.add_argument('--quick', action='store_true', help=f'use the sizes {QUICK_SIZES}')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement, the fastest is reported')
+    parser.add_argument('--memory', action='store_true', help='trace peak memory (slows the measured code down)')
+    parser.add_argument('--output', default=None, help='JSON output path (default: benchmarks/results/<ts>.json)')
+    parser.add_argument('--compare', default=None, help='baseline JSON report to compare with')
+    parser.add_argument('--threshold', type=float, default=1.2, help='slowdown ratio reported as a regression')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+    sizes = args.sizes or (QUICK_SIZES if args.quick else DEFAULT_SIZES)
+    report = run_benchmarks(args.benchmarks, sizes, args.repeat, args.memory)
+
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results',
+                                         f'benchmark_{datetime.now().strftime("%Y%m%d%H%M%S")}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'Saved results to {output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f'{len(regressions)} regressions above {args.threshold}x')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
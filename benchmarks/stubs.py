@@ -0,0 +1,117 @@
+"""
+Stub models and components for the benchmarks. They replace the heavy models, so the benchmarks measure the
+framework's own overhead (scheduling, result collection, merges, file bookkeeping) without downloading any model.
+"""
+import time
+import zlib
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from vanpy.core.ComponentPayload import ComponentPayload
+from vanpy.core.PipelineComponent import PipelineComponent
+from vanpy.core.preprocess_components.BaseSegmenterComponent import BaseSegmenterComponent
+from vanpy.utils.row_ids import ROW_ID_COLUMN, attach_results
+
+
+class StubEmbeddingModel:
+    """
+    Deterministic stand-in for an embedding model (e.g. SpeechBrain's EncoderClassifier): maps each input to a
+    pseudo-random vector seeded by the input, optionally sleeping to emulate inference latency.
+    Mimics encode_batch, so it can be assigned to the model attribute of an embedding component.
+    """
+
+    def __init__(self, dimensions: int = 192, latency: float = 0.0):
+        self.dimensions = dimensions
+        self.latency = latency
+
+    def embed(self, key: str) -> np.ndarray:
+        if self.latency:
+            time.sleep(self.latency)
+        return np.random.default_rng(zlib.crc32(str(key).encode())).standard_normal(self.dimensions).astype(np.float32)
+
+    def encode_batch(self, signals, wav_lens=None) -> np.ndarray:
+        signals = np.asarray(signals)
+        if self.latency:
+            time.sleep(self.latency)
+        rng = np.random.default_rng(len(signals))
+        return rng.standard_normal((len(signals), 1, self.dimensions)).astype(np.float32)
+
+
+class StubEmbeddingComponent(PipelineComponent):
+    """
+    A feature extraction component with the same structure as the embedding components
+    (process_with_progress over the paths, results attached by row id, embeddings kept as a feature block),
+    backed by a StubEmbeddingModel.
+    """
+    model: Optional[StubEmbeddingModel] = None
+
+    def __init__(self, yaml_config: Dict, dimensions: int = 192, latency: float = 0.0):
+        super().__init__(component_type='feature_extraction', component_name='stub_embedding',
+                         yaml_config=yaml_config)
+        self.dimensions = dimensions
+        self.latency = latency
+        self.feature_columns = [f'{i}_{self.get_name()}' for i in range(dimensions)]
+
+    def load_model(self):
+        self.model = StubEmbeddingModel(self.dimensions, self.latency)
+
+    def process_item(self, f, input_column):
+        record = dict(zip(self.feature_columns, self.model.embed(f)))
+        record[input_column] = f
+        return record
+
+    def process(self, input_payload: ComponentPayload) -> ComponentPayload:
+        if not self.model:
+            self.load_model()
+        metadata, df = input_payload.unpack()
+        input_column = metadata['paths_column']
+        paths_list, row_ids = self.get_input_rows(df, input_column)
+        metadata = self.add_performance_column_to_metadata(metadata)
+        p_df = self.process_with_progress(paths_list, metadata, input_column, row_ids=row_ids)
+        df = attach_results(df, p_df.drop(columns=self.feature_columns), input_column)
+        metadata['feature_columns'].extend(self.feature_columns)
+        payload = ComponentPayload(metadata=metadata, df=df)
+        payload.add_feature_block(self.get_name(), p_df, self.feature_columns, ROW_ID_COLUMN)
+        return payload
+
+
+class StubClassifierComponent(PipelineComponent):
+    """
+    A classification component returning a cheap label per path, for benchmarking process_with_progress.
+    """
+
+    def __init__(self, yaml_config: Dict, latency: float = 0.0):
+        super().__init__(component_type='segment_classifier', component_name='stub_classifier',
+                         yaml_config=yaml_config)
+        self.latency = latency
+
+    def process_item(self, f, input_column):
+        if self.latency:
+            time.sleep(self.latency)
+        return {input_column: f, 'stub_label': len(f) % 2}
+
+    def process(self, input_payload: ComponentPayload) -> ComponentPayload:
+        metadata, df = input_payload.unpack()
+        input_column = metadata['paths_column']
+        p_df = self.process_with_progress(df[input_column].dropna().tolist(), metadata, input_column)
+        df = pd.merge(left=df, right=p_df, how='left', on=input_column)
+        metadata['classification_columns'].append('stub_label')
+        return ComponentPayload(metadata=metadata, df=df)
+
+
+class StubSegmenter(BaseSegmenterComponent):
+    """
+    A segmenter without a model, used to benchmark the segmenters' shared bookkeeping
+    (e.g. get_file_paths_and_processed_df_if_not_overwriting).
+    """
+
+    def __init__(self, yaml_config: Dict):
+        super().__init__(component_type='preprocessing', component_name='stub_segmenter', yaml_config=yaml_config)
+
+    def process_item(self, f, processed_path, input_column, output_dir) -> List[Dict]:
+        return [{processed_path: f'{output_dir}/{i}.wav', input_column: f} for i in range(2)]
+
+    def process(self, input_payload: ComponentPayload) -> ComponentPayload:
+        raise NotImplementedError
@@ -0,0 +1,140 @@
+"""
+Synthetic audio and corpus generators for the benchmarks. Nothing is downloaded: the audio is generated noise/tones
+and the corpora are generated file lists, embeddings and payloads of any size.
+"""
+import os
+import wave
+from typing import List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from vanpy.core.ComponentPayload import ComponentPayload
+from vanpy.utils.utils import create_dirs_if_not_exist
+
+
+def generate_speech_like_signal(duration: float, sampling_rate: int = 16000, seed: int = 0) -> np.ndarray:
+    """
+    Generates a float32 signal in [-1, 1] alternating voiced-like bursts (harmonic tones with a varying pitch)
+    and low-level noise pauses, so VAD-like and spectral code paths do non-trivial work.
+
+    :param duration: duration in seconds
+    :param sampling_rate: sampling rate of the signal
+    :param seed: random seed
+    :return: the signal
+    """
+    rng = np.random.default_rng(seed)
+    samples = int(duration * sampling_rate)
+    t = np.arange(samples) / sampling_rate
+    pitch = 120 + 40 * np.sin(2 * np.pi * 0.5 * t + rng.uniform(0, np.pi))
+    phase = 2 * np.pi * np.cumsum(pitch) / sampling_rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = (np.sin(2 * np.pi * rng.uniform(0.3, 0.8) * t) > -0.2).astype(np.float32)
+    signal = 0.3 * voiced * envelope + 0.01 * rng.standard_normal(samples)
+    return np.clip(signal, -1, 1).astype(np.float32)
+
+
+def write_wav(path: str, signal: np.ndarray, sampling_rate: int = 16000) -> str:
+    """
+    Writes a float signal as a 16-bit PCM mono WAV file.
+
+    :param path: output path
+    :param signal: float signal in [-1, 1]
+    :param sampling_rate: sampling rate of the signal
+    :return: the path
+    """
+    with wave.open(path, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sampling_rate)
+        w.writeframes((signal * 32767).astype('<i2').tobytes())
+    return path
+
+
+def generate_audio_corpus(output_dir: str, files_count: int, duration_range: Tuple[float, float] = (1.0, 5.0),
+                          sampling_rate: int = 16000, seed: int = 0) -> List[str]:
+    """
+    Generates a directory of synthetic WAV files with random durations.
+
+    :param output_dir: directory to write the files to
+    :param files_count: number of files
+    :param duration_range: minimal and maximal duration in seconds
+    :param sampling_rate: sampling rate of the files
+    :param seed: random seed
+    :return: the paths of the generated files
+    """
+    create_dirs_if_not_exist(output_dir)
+    rng = np.random.default_rng(seed)
+    paths = []
+    for i in range(files_count):
+        duration = rng.uniform(*duration_range)
+        paths.append(write_wav(f'{output_dir}/synthetic_{i}.wav',
+                               generate_speech_like_signal(duration, sampling_rate, seed + i), sampling_rate))
+    return paths
+
+
+def generate_paths(rows_count: int, directory: str = 'corpus', extension: str = 'wav') -> List[str]:
+    """
+    Generates file paths without creating the files, for benchmarks of the framework's own overhead.
+
+    :param rows_count: number of paths
+    :param directory: directory prefix of the paths
+    :param extension: file extension
+    :return: list of paths
+    """
+    return [f'{directory}/file_{i}.{extension}' for i in range(rows_count)]
+
+
+def create_empty_files(paths: Sequence[str]) -> None:
+    """
+    Creates empty files, e.g. to emulate the output directory of a segmenter which already processed a corpus.
+
+    :param paths: paths of the files
+    """
+    for directory in {os.path.dirname(p) for p in paths}:
+        create_dirs_if_not_exist(directory)
+    for p in paths:
+        open(p, 'wb').close()
+
+
+def generate_segment_paths(files: Sequence[str], output_dir: str, segments_per_file: int,
+                           separator: str = '_') -> List[str]:
+    """
+    Generates the paths a segmenter would write for the given files (see vanpy.utils.utils.cut_segment).
+
+    :param files: input file paths
+    :param output_dir: the segmenter's output directory
+    :param segments_per_file: number of segments of every file
+    :param separator: segment name separator
+    :return: list of segment paths
+    """
+    segments = []
+    for f in files:
+        name = ''.join(f.split('/')[-1].split('.')[:-1])
+        segments.extend(f'{output_dir}/{name}{separator}{i}.wav' for i in range(segments_per_file))
+    return segments
+
+
+def generate_embeddings_payload(rows_count: int, dimensions: int = 192, speakers_count: int = 10,
+                                feature_suffix: str = 'speechbrain_embedding', seed: int = 0) -> ComponentPayload:
+    """
+    Generates a payload of speaker-embedding-like features: gaussian clusters around one center per speaker,
+    with the columns and metadata an embedding component produces.
+
+    :param rows_count: number of rows (segments)
+    :param dimensions: embedding dimensions
+    :param speakers_count: number of clusters
+    :param feature_suffix: suffix of the feature column names (f'{i}_{suffix}')
+    :param seed: random seed
+    :return: the payload
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((speakers_count, dimensions)).astype(np.float32)
+    speakers = rng.integers(0, speakers_count, rows_count)
+    values = centers[speakers] + 0.1 * rng.standard_normal((rows_count, dimensions)).astype(np.float32)
+    feature_columns = [f'{i}_{feature_suffix}' for i in range(dimensions)]
+    df = pd.DataFrame(values, columns=feature_columns)
+    df.insert(0, 'path', generate_paths(rows_count))
+    metadata = {'input_path': 'corpus', 'paths_column': 'path', 'all_paths_columns': ['path'],
+                'meta_columns': [], 'feature_columns': feature_columns, 'classification_columns': []}
+    return ComponentPayload(metadata=metadata, df=df)
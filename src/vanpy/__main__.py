@@ -0,0 +1,5 @@
+import sys
+
+from vanpy.cli import main
+
+sys.exit(main())
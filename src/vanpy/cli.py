@@ -0,0 +1,116 @@
+import argparse
+import logging
+import sys
+from typing import Dict, List, Optional
+
+from vanpy.core.ModelStore import ModelArtifact, ModelStore
+from vanpy.utils.utils import load_config
+
+logger = logging.getLogger('vanpy cli')
+
+
+def get_config_model_artifacts(config: Dict, components: Optional[List[str]] = None) -> Dict[str, List[ModelArtifact]]:
+    """
+    Returns the model artifacts of the components configured in a pipeline configuration (the components of the
+    'preprocessing', 'feature_extraction' and 'segment_classifier' sections, see PipelineComponent.import_config).
+
+    :param config: the pipeline configuration
+    :param components: names of the components to consider, all the configured components if None
+    :return: dictionary of component name to its artifacts, components which could not be created are logged and
+        mapped to None
+    """
+    from vanpy.core.PreprocessPipeline import PreprocessPipeline
+    from vanpy.core.FeatureExtractionPipeline import FeatureExtractionPipeline
+    from vanpy.core.ModelInferencePipeline import ModelInferencePipeline
+
+    configured = {name for section in config.values() if isinstance(section, dict) for name in section}
+    artifacts = {}
+    for pipeline_class in (PreprocessPipeline, FeatureExtractionPipeline, ModelInferencePipeline):
+        for name in pipeline_class.components_mapper.names():
+            if name not in configured or (components is not None and name not in components):
+                continue
+            try:
+                artifacts[name] = pipeline_class.components_mapper[name](config).get_model_artifacts()
+            except Exception as e:
+                logger.error(f'Failed to get the model artifacts of {name}: {e!r}')
+                artifacts[name] = None
+    return artifacts
+
+
+def prefetch_models(args: argparse.Namespace) -> int:
+    config = load_config(args.config)
+    store_config = config.get('model_store') or {}
+    store = ModelStore.open(args.store or store_config.get('path'))
+    component_artifacts = get_config_model_artifacts(config, args.components)
+    results = store.prefetch([a for artifacts in component_artifacts.values() if artifacts for a in artifacts],
+                             max_workers=args.workers)
+    failed = 0
+    for name, artifacts in component_artifacts.items():
+        if artifacts is None:
+            failed += 1
+            print(f'{name}: FAILED to create the component')
+            continue
+        for artifact in artifacts:
+            ok, detail = results[artifact]
+            failed += not ok
+            print(f'{name}: {artifact.source} -> {detail if ok else "FAILED: " + detail}')
+    print(f'Model store {store.path}: {len(results) - sum(not ok for ok, _ in results.values())}/{len(results)} '
+          f'artifacts available')
+    return 1 if failed else 0
+
+
+def list_models(args: argparse.Namespace) -> int:
+    config = load_config(args.config)
+    store_config = config.get('model_store') or {}
+    store = ModelStore.open(args.store or store_config.get('path'))
+    missing = 0
+    for name, artifacts in get_config_model_artifacts(config, args.components).items():
+        if artifacts is None:
+            missing += 1
+            print(f'{name}: FAILED to create the component')
+            continue
+        for artifact in artifacts:
+            if artifact.kind == 'url':
+                path = store.find_file(artifact)
+            elif artifact.kind == 'huggingface':
+                path = store.find_huggingface_snapshot(artifact)
+            else:
+                path = store.get_torch_hub_dir(artifact)
+            missing += path is None
+            print(f'{name}: {artifact.source} -> {path or "missing"}')
+    return 1 if missing else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Entry point of the `vanpy` command:
+    vanpy models prefetch --config pipeline.yaml - downloads the model artifacts the configured components need to
+    the model store, in parallel, verifying their checksums, so the pipeline can run with model_store.offline.
+    vanpy models list --config pipeline.yaml - lists the artifacts and where they are stored.
+
+    :param argv: the command line arguments, sys.argv[1:] if None
+    :return: the exit code, 1 if an artifact could not be fetched (or is missing)
+    """
+    parser = argparse.ArgumentParser(prog='vanpy', description='VANPY - Voice Analysis framework in Python')
+    commands = parser.add_subparsers(dest='command', required=True)
+    models = commands.add_parser('models', help='manage the model store').add_subparsers(dest='models_command',
+                                                                                          required=True)
+    for command, function, help_text in (('prefetch', prefetch_models, 'download the models a configuration needs'),
+                                         ('list', list_models, 'list the models a configuration needs')):
+        subparser = models.add_parser(command, help=help_text)
+        subparser.add_argument('--config', default='pipeline.yaml', help='the pipeline configuration file')
+        subparser.add_argument('--store', default=None,
+                               help='the model store directory (default: model_store.path, $VANPY_MODEL_STORE or '
+                                    '~/.cache/vanpy/models)')
+        subparser.add_argument('--components', nargs='+', default=None,
+                               help='only these components (default: all the configured components)')
+        subparser.set_defaults(function=function)
+        if command == 'prefetch':
+            subparser.add_argument('--workers', type=int, default=4, help='the number of parallel downloads')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(levelname)s: %(message)s')
+    return args.function(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,15 @@
+import asyncio
+import inspect
 import logging
 from abc import ABC
 from dataclasses import dataclass
 from logging import Logger
-from typing import Dict, List
+from typing import Dict, List, Optional
 from yaml import YAMLObject
 
 from vanpy.core.ComponentPayload import ComponentPayload
+from vanpy.core.ComponentScheduler import ComponentScheduler
+from vanpy.core.ModelPreloader import ModelPreloader
 from vanpy.core.PipelineComponent import PipelineComponent
 
 
@@ -47,21 +51,61 @@ class BasePipeline(ABC):
         """
         return self.components
 
-    def process(self, input_payload: ComponentPayload) -> ComponentPayload:
+    def process(self, input_payload: ComponentPayload,
+                model_preloader: Optional[ModelPreloader] = None) -> ComponentPayload:
         """
-        Process input data through all pipeline components sequentially.
+        Process input data through all pipeline components sequentially. With `max_parallel_components` above 1,
+        components which do not depend on each other run concurrently instead (see ComponentScheduler).
 
         :param input_payload: Data to be processed through the pipeline.
+        :param model_preloader: Preloader loading the models of the next components in the background, notified
+            when each component starts.
         :return: Processed data after passing through all components.
         """
+        if self.get_max_parallel_components() > 1:
+            return self.get_scheduler().process(input_payload, model_preloader)
+
         payload_object = input_payload
         for component in self.components:
+            if model_preloader is not None:
+                model_preloader.start_stage(component)
             self.logger.info(f'Processing with {component.get_name()}')
-            # if inspect.iscoroutinefunction(component.process):
-            #     payload_object = await component.process(payload_object)
-            # else:
-            payload_object = component.process(payload_object)
+            payload_object = component.profiled_process(payload_object)
             # payload_object.remove_redundant_index_columns()  # get rid of "Unnamed XX" columns
             component.save_component_payload(payload_object)  # save intermediate results, if enabled
 
         return payload_object
+
+    def get_scheduler(self) -> ComponentScheduler:
+        """
+        :return: the scheduler of the pipeline's components, configured by the 'max_parallel_components' option
+        """
+        return ComponentScheduler(self.components, self.get_max_parallel_components(), self.logger)
+
+    def get_max_parallel_components(self) -> int:
+        """
+        :return: the 'max_parallel_components' option of the components (default 1, the smallest one if components
+            override it)
+        """
+        return min((c.config.get('max_parallel_components', 1) for c in self.components), default=1)
+
+    async def aprocess(self, input_payload: ComponentPayload) -> ComponentPayload:
+        """
+        Asynchronous version of process. Components with a native coroutine process are awaited directly,
+        the rest are run through their aprocess, which offloads the blocking work to an executor.
+        Several payloads can be processed concurrently by the same pipeline (the models are loaded once).
+
+        :param input_payload: Data to be processed through the pipeline.
+        :return: Processed data after passing through all components.
+        """
+        loop = asyncio.get_running_loop()
+        payload_object = input_payload
+        for component in self.components:
+            self.logger.info(f'Processing with {component.get_name()}')
+            if inspect.iscoroutinefunction(component.process):
+                payload_object = await component.process(payload_object)
+            else:
+                payload_object = await component.aprocess(payload_object)
+            await loop.run_in_executor(None, component.save_component_payload, payload_object)
+
+        return payload_object
@@ -0,0 +1,120 @@
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+from vanpy.utils.utils import create_dirs_if_not_exist
+
+
+class CompletionLedger:
+    """
+    SQLite-backed ledger of completed items, used to resume an interrupted run.
+
+    Every item processed by a component is recorded once it finishes, keyed by (component, config hash, item),
+    together with the rows it produced. When the pipeline is restarted, the components read the rows of the items
+    completed by a previous run (with the same configuration) and process only the remaining items.
+
+    Records are committed every commit_every items (and on flush), so a crash loses at most the last
+    commit_every completed items, which are processed again on restart. The database uses write-ahead logging,
+    so the commits are cheap and an interrupted commit does not corrupt it.
+
+    Ledgers are shared per database path (see CompletionLedger.open) and are thread-safe.
+    """
+    _instances: Dict[str, 'CompletionLedger'] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path: str, commit_every: int = 50):
+        """
+        :param path: path of the SQLite database file, created if it does not exist
+        :param commit_every: number of recorded items between commits
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            create_dirs_if_not_exist(directory)
+        self.path = path
+        self.commit_every = max(commit_every, 1)
+        self.logger = logging.getLogger('CompletionLedger')
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[str, str, str, bytes, float]] = []
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS completed_items ('
+                                 'component TEXT NOT NULL, config_hash TEXT NOT NULL, item TEXT NOT NULL, '
+                                 'rows BLOB, completed_at REAL, PRIMARY KEY (component, config_hash, item))')
+        self._connection.commit()
+
+    @classmethod
+    def open(cls, path: str, commit_every: int = 50) -> 'CompletionLedger':
+        """
+        Returns the ledger of the given database path, shared by all the components of the process.
+
+        :param path: path of the SQLite database file
+        :param commit_every: number of recorded items between commits, used when the ledger is first opened
+        :return: the ledger
+        """
+        key = os.path.abspath(path)
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(path, commit_every)
+            return cls._instances[key]
+
+    def get_completed(self, component: str, config_hash: str) -> Dict[str, Any]:
+        """
+        Returns the items completed by the component with the given configuration, and their rows.
+
+        :param component: the component name
+        :param config_hash: hash of the component's configuration
+        :return: dictionary of item to the rows recorded for it
+        """
+        with self._lock:
+            self._commit_pending()
+            cursor = self._connection.execute('SELECT item, rows FROM completed_items '
+                                              'WHERE component = ? AND config_hash = ?', (component, config_hash))
+            return {item: pickle.loads(rows) for item, rows in cursor}
+
+    def record(self, component: str, config_hash: str, item: str, rows: Any) -> None:
+        """
+        Records a completed item.
+
+        :param component: the component name
+        :param config_hash: hash of the component's configuration
+        :param item: the completed item (e.g. the input file path)
+        :param rows: the rows the item produced (any picklable value)
+        """
+        with self._lock:
+            self._pending.append((component, config_hash, str(item),
+                                  pickle.dumps(rows, protocol=pickle.HIGHEST_PROTOCOL), time.time()))
+            if len(self._pending) >= self.commit_every:
+                self._commit_pending()
+
+    def flush(self) -> None:
+        """
+        Commits the pending records.
+        """
+        with self._lock:
+            self._commit_pending()
+
+    def clear(self, component: str = None) -> None:
+        """
+        Removes the records of a component, or all the records.
+
+        :param component: the component name, None for all components
+        """
+        with self._lock:
+            self._commit_pending()
+            if component is None:
+                self._connection.execute('DELETE FROM completed_items')
+            else:
+                self._connection.execute('DELETE FROM completed_items WHERE component = ?', (component,))
+            self._connection.commit()
+
+    def _commit_pending(self) -> None:
+        if not self._pending:
+            return
+        self._connection.executemany('INSERT OR REPLACE INTO completed_items VALUES (?, ?, ?, ?, ?)', self._pending)
+        self._connection.commit()
+        self._pending = []
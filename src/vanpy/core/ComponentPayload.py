@@ -1,8 +1,13 @@
 from dataclasses import dataclass
 from typing import Dict, Tuple, List
+import copy
+import numpy as np
 import pandas as pd
 import pickle
 
+from vanpy.core.FeatureBlock import FEATURE_BLOCKS_KEY, FeatureBlock
+from vanpy.utils.payload_io import read_payload, write_payload
+
 
 @dataclass
 class ComponentPayload:
@@ -11,6 +16,8 @@ class ComponentPayload:
 
     Manages a DataFrame containing the actual data along with metadata describing
     columns, paths, features, and classifications.
+    Dense features (e.g. embeddings) may be held as named float32 feature blocks (see FeatureBlock) instead of
+    DataFrame columns, get_feature_matrix reads features from both, get_wide_df builds the wide DataFrame for export.
 
     :ivar metadata: Dictionary containing metadata about the payload contents.
     :ivar df: DataFrame containing the actual data being processed.
@@ -83,8 +90,9 @@ class ComponentPayload:
         columns = self.get_columns(all_paths_columns, meta_columns)
         for cols in ext_columns:
             columns.extend(self.metadata[cols])
-        columns = [c for c in columns if c in self.df.columns]
-        return self.df[columns]
+        df = self.get_wide_df() if self.feature_blocks else self.df
+        columns = [c for c in columns if c in df.columns]
+        return df[columns]
 
     def get_features_df(self, all_paths_columns=False, meta_columns=False):
         """
@@ -124,15 +132,159 @@ class ComponentPayload:
             if c.startswith('Unnamed') or c == '':
                 self.df.drop([c], axis=1, inplace=True)
 
-    def save(self, output_dir: str, name: str = 'payload', index=False):
+    @property
+    def feature_blocks(self) -> Dict[str, FeatureBlock]:
+        """
+        :return: the payload's feature blocks by name, kept in the metadata so they pass through the components
+        """
+        return self.metadata.get(FEATURE_BLOCKS_KEY, {})
+
+    def add_feature_block(self, name: str, results: pd.DataFrame, columns: List[str], key_column: str) -> FeatureBlock:
+        """
+        Adds a feature block with the features of a component's results, aligned to the rows of the payload's
+        DataFrame by the key column (see FeatureBlock.from_results).
+
+        :param name: the block name (e.g. the component name)
+        :param results: the component's results, with the key_column and the feature columns
+        :param columns: the feature columns
+        :param key_column: the column identifying the rows in the DataFrame and the results
+        :return: the added block
+        """
+        block = FeatureBlock.from_results(self.df, results, columns, key_column)
+        self.metadata.setdefault(FEATURE_BLOCKS_KEY, {})[name] = block
+        return block
+
+    def has_features(self, columns: List[str]) -> bool:
+        """
+        :param columns: feature names
+        :return: True if every feature is a DataFrame column or a feature block column
+        """
+        available = set(self.df.columns)
+        for block in self.feature_blocks.values():
+            available.update(block.columns)
+        return set(columns) <= available
+
+    def get_feature_matrix(self, columns: List[str]) -> np.ndarray:
+        """
+        Returns the given features as a float32 matrix with a row per DataFrame row (NaN for missing values).
+        Features held in a single feature block are returned as a view of the block when possible (no copy),
+        features spread over blocks and DataFrame columns are gathered into a new matrix.
+
+        :param columns: feature names, DataFrame columns or feature block columns
+        :return: float32 matrix of shape (rows, len(columns))
+        """
+        columns = list(columns)
+        if not columns:
+            return np.empty((len(self.df), 0), dtype=np.float32)
+        parts, remaining = [], list(columns)
+        for block in self.feature_blocks.values():
+            in_block = set(block.columns)
+            block_columns = [c for c in remaining if c in in_block]
+            if block_columns:
+                parts.append((block_columns, block.align(self.df[block.key_column].to_numpy(dtype=object),
+                                                         block_columns)))
+                remaining = [c for c in remaining if c not in in_block]
+        if remaining:
+            missing = set(remaining) - set(self.df.columns)
+            if missing:
+                raise KeyError(f'Features {sorted(missing)} are not in the payload')
+            parts.append((remaining, self.df[remaining].to_numpy(dtype=np.float32, na_value=np.nan)))
+        if len(parts) == 1 and parts[0][0] == columns:
+            return parts[0][1]
+        gathered = np.hstack([values for _, values in parts])
+        order = pd.Index([c for part_columns, _ in parts for c in part_columns]).get_indexer(columns)
+        return np.ascontiguousarray(gathered[:, order])
+
+    def get_wide_df(self) -> pd.DataFrame:
+        """
+        Returns the DataFrame with the feature blocks expanded into a column per feature (e.g. for export).
+
+        :return: the wide DataFrame, the DataFrame itself if the payload has no feature blocks
         """
-        Saves the payload's dataframe to a csv file and metadata as pickle in the given output directory.
+        if not self.feature_blocks:
+            return self.df
+        frames = [self.df]
+        for block in self.feature_blocks.values():
+            columns = [c for c in block.columns if c not in self.df.columns]
+            frames.append(pd.DataFrame(self.get_feature_matrix(columns), columns=columns, index=self.df.index))
+        return pd.concat(frames, axis=1)
+
+    def get_serializable_metadata(self) -> Dict:
+        """
+        :return: the metadata without the feature blocks, whose features are saved as DataFrame columns
+        """
+        return {k: v for k, v in self.metadata.items() if k != FEATURE_BLOCKS_KEY}
+
+    def split(self, chunk_size: int) -> List['ComponentPayload']:
+        """
+        Splits the payload into payloads of at most chunk_size rows, each with its own copy of the metadata.
+        The feature blocks are shared by the chunks, not copied.
+
+        :param chunk_size: the maximal number of rows in a chunk
+        :return: list of chunk payloads
+        """
+        chunks = []
+        for start in range(0, len(self.df), chunk_size):
+            metadata = copy.deepcopy(self.get_serializable_metadata())
+            if self.feature_blocks:
+                metadata[FEATURE_BLOCKS_KEY] = dict(self.feature_blocks)
+            chunks.append(ComponentPayload(metadata=metadata,
+                                           df=self.df.iloc[start:start + chunk_size].reset_index(drop=True)))
+        return chunks
+
+    @staticmethod
+    def concat(payloads: List['ComponentPayload']) -> 'ComponentPayload':
+        """
+        Concatenates payloads that were processed by the same components (e.g. chunks created by split).
+        A copy of the metadata of the first payload is used, the payloads are not modified.
+
+        :param payloads: list of payloads to concatenate
+        :return: a payload containing the rows of all the payloads
+        """
+        if not payloads:
+            raise ValueError('At least one payload is required for concatenation')
+        df = pd.concat([p.df for p in payloads], ignore_index=True)
+        metadata = copy.deepcopy(payloads[0].get_serializable_metadata())
+        blocks = {}
+        for p in payloads:
+            for name, block in p.feature_blocks.items():
+                blocks.setdefault(name, []).append(block)
+        if blocks:
+            metadata[FEATURE_BLOCKS_KEY] = {name: FeatureBlock.concat(name_blocks) for name, name_blocks in blocks.items()}
+        return ComponentPayload(metadata=metadata, df=df)
+
+    def save(self, output_dir: str, name: str = 'payload', index=False, payload_format: str = 'csv'):
+        """
+        Saves the payload in the given output directory. With the 'csv' format the dataframe is saved to a csv file
+        (feature blocks as columns) and the metadata as pickle. With the 'parquet' or 'arrow' formats the dataframe,
+        feature blocks and metadata are saved to a single typed file (see load).
 
         :param output_dir: the output directory
         :param name: the name of the output file
-        :param index: whether to include the index in the output file
+        :param index: whether to include the index in the output csv file
+        :param payload_format: 'csv', 'parquet' or 'arrow'
+        """
+        if payload_format != 'csv':
+            write_payload(f'{output_dir}/{name}.{payload_format}', self.get_serializable_metadata(), self.df,
+                          self.feature_blocks, payload_format)
+            return
+        self.get_wide_df().to_csv(f'{output_dir}/{name}.csv', index=index)
+        pickle.dump(self.get_serializable_metadata(), open(f'{output_dir}/{name}.pkl', 'wb'))
+
+    @staticmethod
+    def load(path: str, columns: List[str] = None, memory_map: bool = True) -> 'ComponentPayload':
+        """
+        Loads a payload saved in the 'parquet' or 'arrow' format (.parquet, .arrow or .feather file).
+        Arrow files are memory-mapped, so the feature blocks are read from disk lazily, as they are used.
+
+        :param path: the payload file path
+        :param columns: the DataFrame columns to load, all of them if None
+        :param memory_map: whether to memory-map the file
+        :return: the payload
         """
-        self.df.to_csv(f'{output_dir}/{name}.csv', index=index)
-        pickle.dump(self.metadata, open(f'{output_dir}/{name}.pkl', 'wb'))
+        metadata, df, feature_blocks = read_payload(path, columns, memory_map)
+        if feature_blocks:
+            metadata[FEATURE_BLOCKS_KEY] = feature_blocks
+        return ComponentPayload(input_path=metadata.get('input_path', '') or path, metadata=metadata, df=df)
 
 
@@ -0,0 +1,121 @@
+import importlib
+import logging
+import threading
+from importlib import metadata
+from typing import Dict, Iterator, List, Type, Union
+
+PREPROCESS_COMPONENTS_GROUP = 'vanpy.preprocess_components'
+FEATURE_EXTRACTION_COMPONENTS_GROUP = 'vanpy.feature_extraction_components'
+MODEL_INFERENCE_COMPONENTS_GROUP = 'vanpy.model_inference_components'
+
+
+def get_entry_points(group: str) -> List[metadata.EntryPoint]:
+    """
+    :param group: the entry-point group
+    :return: the entry points of the installed distributions in the group
+    """
+    try:
+        entry_points = metadata.entry_points()
+    except Exception:  # a broken distribution metadata must not break the pipelines
+        logging.getLogger('ComponentRegistry').exception('Failed to read the installed entry points')
+        return []
+    if hasattr(entry_points, 'select'):
+        return list(entry_points.select(group=group))
+    return list(entry_points.get(group, []))  # python < 3.10
+
+
+class ComponentRegistry:
+    """
+    Lazy mapping of component names to PipelineComponent classes.
+
+    A component is registered by a 'module:Class' target, and its module is imported only when the component is
+    first used (see get), so listing the available components or validating a configuration imports none of the
+    components' dependencies (torch, speechbrain, pyannote, tensorflow...).
+
+    The components are the built-in ones, the ones registered by installed distributions in the registry's entry-point
+    group (e.g. a plugin's pyproject.toml declaring
+    `[project.entry-points."vanpy.model_inference_components"] my_classifier = "my_plugin.module:MyClassifier"`),
+    and the ones registered at run time (see register). Components registered at run time override the others, an
+    entry point does not override a built-in component of the same name.
+    """
+
+    def __init__(self, group: str, package: str, builtins: Dict[str, str]):
+        """
+        :param group: the entry-point group of the components
+        :param package: the package of the built-in components, relative targets ('.module:Class') are resolved in it
+        :param builtins: dictionary of the built-in component names to their 'module:Class' targets
+        """
+        self.group = group
+        self.package = package
+        self.logger = logging.getLogger(f'ComponentRegistry {group}')
+        self._targets: Dict[str, Union[str, type]] = dict(builtins)
+        self._classes: Dict[str, type] = {}
+        self._entry_points_loaded = False
+        self._lock = threading.Lock()
+
+    def _load_entry_points(self) -> None:
+        if self._entry_points_loaded:
+            return
+        with self._lock:
+            if not self._entry_points_loaded:
+                for entry_point in get_entry_points(self.group):
+                    self._targets.setdefault(entry_point.name, entry_point.value)
+                self._entry_points_loaded = True
+
+    def names(self) -> List[str]:
+        """
+        :return: the names of the available components, without importing them
+        """
+        self._load_entry_points()
+        return list(self._targets)
+
+    def register(self, name: str, target: Union[str, type]) -> None:
+        """
+        :param name: the component name, as used in the configuration
+        :param target: the component class, or its 'module:Class' path (see ComponentRegistry.__init__)
+        """
+        self._load_entry_points()
+        with self._lock:
+            self._targets[name] = target
+            self._classes.pop(name, None)
+
+    def get(self, name: str) -> Type:
+        """
+        Returns the class of a component, importing its module on first use.
+
+        :param name: the component name
+        :return: the component class
+        :raises KeyError: if no component of that name is registered
+        """
+        if name in self._classes:
+            return self._classes[name]
+        self._load_entry_points()
+        if name not in self._targets:
+            raise KeyError(f"Unknown component '{name}', available components: {', '.join(self._targets)}")
+        target = self._targets[name]
+        if isinstance(target, str):
+            module_name, _, attribute = target.partition(':')
+            self.logger.debug(f'Importing {target}')
+            component_class = importlib.import_module(module_name, self.package)
+            for part in attribute.split('.'):
+                component_class = getattr(component_class, part)
+        else:
+            component_class = target
+        self._classes[name] = component_class
+        return component_class
+
+    def __getitem__(self, name: str) -> Type:
+        return self.get(name)
+
+    def __contains__(self, name: object) -> bool:
+        self._load_entry_points()
+        return name in self._targets
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names())
+
+    def __len__(self) -> int:
+        return len(self.names())
+
+    def keys(self) -> List[str]:
+        return self.names()
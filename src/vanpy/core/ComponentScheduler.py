@@ -0,0 +1,162 @@
+import copy
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from logging import Logger
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from vanpy.core.ComponentPayload import ComponentPayload
+from vanpy.core.FeatureBlock import FEATURE_BLOCKS_KEY
+from vanpy.core.ModelPreloader import ModelPreloader
+from vanpy.core.PipelineComponent import PipelineComponent
+from vanpy.utils.row_ids import ROW_ID_COLUMN, ensure_row_ids
+
+
+class ComponentScheduler:
+    """
+    Runs a sequence of components as a dependency graph built from the metadata column groups they read and write
+    (see PipelineComponent.reads_column_groups and writes_column_groups):
+    - a component reading a group written by an earlier component runs after it;
+    - a component writing a group read or written by an earlier component does not run before it;
+    - a component which does not declare its groups (or uses a process-pool executor) runs alone, after all the
+      earlier components and before all the later ones.
+
+    The components are assigned to levels accordingly. The components of a level (e.g. vanpy_gender, vanpy_age,
+    vanpy_height and wav2vec2adv) run concurrently, each on its own copy of the same payload snapshot, and their
+    outputs are joined by row id, in the order of the components, into the payload of the next level. The result is
+    the one of running the components one after another. A level of a single component runs on the payload itself.
+    """
+
+    def __init__(self, components: List[PipelineComponent], max_parallel_components: int = 4,
+                 logger: Optional[Logger] = None):
+        """
+        :param components: the components, in execution order
+        :param max_parallel_components: the maximal number of components running concurrently, 1 to run them one
+            after another
+        :param logger: the logger of the pipeline
+        """
+        self.components = components
+        self.max_parallel_components = max(max_parallel_components, 1)
+        self.logger = logger or logging.getLogger('ComponentScheduler')
+
+    @staticmethod
+    def is_exclusive(component: PipelineComponent) -> bool:
+        """
+        :param component: a component
+        :return: whether the component has to run alone
+        """
+        return component.reads_column_groups is None or component.writes_column_groups is None or \
+            component.executor_type == 'process'  # forking while other components' threads run may deadlock
+
+    def get_levels(self) -> List[List[PipelineComponent]]:
+        """
+        Assigns the components to levels of the dependency graph.
+
+        :return: the components of each level, in execution order
+        """
+        levels = []
+        for j, component in enumerate(self.components):
+            level = 0
+            for i in range(j):
+                earlier = self.components[i]
+                if self.is_exclusive(earlier) or self.is_exclusive(component) or \
+                        set(earlier.writes_column_groups) & set(component.reads_column_groups):
+                    level = max(level, levels[i] + 1)
+                elif (set(earlier.reads_column_groups) | set(earlier.writes_column_groups)) & \
+                        set(component.writes_column_groups):
+                    level = max(level, levels[i])
+            levels.append(level)
+        return [[c for c, level in zip(self.components, levels) if level == n]
+                for n in range(max(levels, default=-1) + 1)]
+
+    def process(self, payload: ComponentPayload, model_preloader: Optional[ModelPreloader] = None) -> ComponentPayload:
+        """
+        Processes the payload through the components.
+
+        :param payload: the input payload
+        :param model_preloader: preloader of the components' models, notified when each component starts
+        :return: the processed payload
+        """
+        for level in self.get_levels():
+            if len(level) == 1 or self.max_parallel_components == 1:
+                for component in level:
+                    payload = self._process_component(component, payload, model_preloader)
+                continue
+            self.logger.info(f'Processing concurrently with {", ".join(c.get_name() for c in level)}')
+            ensure_row_ids(payload.df)  # the outputs are joined by row id
+            with ThreadPoolExecutor(max_workers=min(self.max_parallel_components, len(level)),
+                                    thread_name_prefix='component') as executor:
+                futures = [executor.submit(self._process_component, component, self.copy_payload(payload),
+                                           model_preloader) for component in level]
+                outputs = [future.result() for future in futures]
+            payload = self.join_outputs(payload, level, outputs)
+        return payload
+
+    def _process_component(self, component: PipelineComponent, payload: ComponentPayload,
+                           model_preloader: Optional[ModelPreloader] = None) -> ComponentPayload:
+        if model_preloader is not None:
+            model_preloader.start_stage(component)
+        self.logger.info(f'Processing with {component.get_name()}')
+        payload = component.profiled_process(payload)
+        component.save_component_payload(payload)  # save intermediate results, if enabled
+        return payload
+
+    @staticmethod
+    def copy_payload(payload: ComponentPayload) -> ComponentPayload:
+        """
+        :param payload: a payload
+        :return: a copy of the payload a component can modify, the feature blocks are shared (they are read-only)
+        """
+        metadata = copy.deepcopy(payload.get_serializable_metadata())
+        if payload.feature_blocks:
+            metadata[FEATURE_BLOCKS_KEY] = dict(payload.feature_blocks)
+        return ComponentPayload(metadata=metadata, df=payload.df.copy())
+
+    @staticmethod
+    def join_outputs(snapshot: ComponentPayload, components: List[PipelineComponent],
+                     outputs: List[ComponentPayload]) -> ComponentPayload:
+        """
+        Joins the outputs of components which processed copies of the same snapshot: the columns each component added
+        (or rewrote, for the column groups it writes) are added to the snapshot by row id, the metadata lists are
+        extended with the new entries and the feature blocks are merged, in the order of the components.
+
+        :param snapshot: the payload the components processed
+        :param components: the components
+        :param outputs: the payloads they returned
+        :return: the joined payload
+        :raises RuntimeError: if a component changed the rows of the payload
+        """
+        df = snapshot.df
+        metadata = copy.deepcopy(snapshot.get_serializable_metadata())
+        feature_blocks = dict(snapshot.feature_blocks)
+        for component, output in zip(components, outputs):
+            output_df = output.df
+            positions = pd.Index(output_df[ROW_ID_COLUMN]).get_indexer(df[ROW_ID_COLUMN]) \
+                if ROW_ID_COLUMN in output_df.columns and len(output_df) == len(df) else None
+            if positions is None or (positions < 0).any():
+                raise RuntimeError(f'{component.get_name()} changed the payload rows, so it cannot run concurrently '
+                                   f'with other components (it should not declare its column groups)')
+            written = {column for group in component.writes_column_groups
+                       for column in ComponentScheduler._get_group_columns(output.metadata, group)}
+            columns = [c for c in output_df.columns if c not in snapshot.df.columns or
+                       (c in written and c != ROW_ID_COLUMN)]
+            if columns:
+                aligned = output_df[columns].iloc[positions].set_axis(df.index)
+                df = pd.concat([df.drop(columns=[c for c in columns if c in df.columns]), aligned], axis=1)
+            for key, value in output.get_serializable_metadata().items():
+                if isinstance(value, list):
+                    entries = metadata.setdefault(key, [])
+                    entries.extend(v for v in value if v not in entries)
+                elif key not in snapshot.metadata or value != snapshot.metadata[key]:
+                    metadata[key] = copy.deepcopy(value)
+            feature_blocks.update({name: block for name, block in output.feature_blocks.items()
+                                   if name not in snapshot.feature_blocks})
+        if feature_blocks:
+            metadata[FEATURE_BLOCKS_KEY] = feature_blocks
+        return ComponentPayload(metadata=metadata, df=df)
+
+    @staticmethod
+    def _get_group_columns(metadata: Dict, group: str) -> List[str]:
+        columns = metadata.get(group, [])
+        return [columns] if isinstance(columns, str) else list(columns)
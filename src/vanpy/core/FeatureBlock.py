@@ -0,0 +1,107 @@
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+FEATURE_BLOCKS_KEY = 'feature_blocks'  # the metadata key holding the payload's feature blocks
+
+
+@dataclass
+class FeatureBlock:
+    """
+    A dense block of features (e.g. a speaker embedding) kept as a contiguous float32 matrix instead of one
+    DataFrame column per dimension.
+
+    The rows of the block are identified by keys, the values of the key_column of the payload's DataFrame
+    (e.g. the paths column of the component that produced the features). A block created for a DataFrame
+    holds one row per DataFrame row, in the same order, so the matrix can be used as is while the DataFrame
+    is not reordered; otherwise the rows are looked up by their keys (see align).
+
+    :ivar columns: names of the features (the wide-DataFrame column names, e.g. '0_speechbrain_embedding')
+    :ivar values: float32 matrix of shape (rows, len(columns)), C-contiguous
+    :ivar key_column: the DataFrame column identifying the rows
+    :ivar keys: the key of every row of the block
+    """
+    columns: List[str]
+    values: np.ndarray
+    key_column: str
+    keys: np.ndarray
+
+    def __post_init__(self):
+        self.columns = list(self.columns)
+        self.values = np.ascontiguousarray(self.values, dtype=np.float32)
+        self.keys = np.asarray(self.keys, dtype=object)
+        if self.values.ndim != 2 or self.values.shape != (len(self.keys), len(self.columns)):
+            raise ValueError(f'Feature block values of shape {self.values.shape} do not match '
+                             f'{len(self.keys)} keys and {len(self.columns)} columns')
+
+    @classmethod
+    def from_results(cls, df: pd.DataFrame, results: pd.DataFrame, columns: List[str],
+                     key_column: str) -> 'FeatureBlock':
+        """
+        Creates a block aligned to the rows of df from a component's results, which hold a row per processed key.
+
+        :param df: the payload's DataFrame
+        :param results: the component's results, with the key_column and the feature columns
+        :param columns: the feature columns
+        :param key_column: the column identifying the rows in df and results
+        :return: the block, with a row per df row (NaN rows for keys without results)
+        """
+        block = cls(columns, results[columns].to_numpy(dtype=np.float32, na_value=np.nan), key_column,
+                    results[key_column].to_numpy(dtype=object))
+        keys = df[key_column].to_numpy(dtype=object)
+        return cls(columns, block.align(keys), key_column, keys)
+
+    def align(self, keys: np.ndarray, columns: Optional[List[str]] = None) -> np.ndarray:
+        """
+        Returns the block's rows for the given keys. When the keys are the block's keys and all the columns are
+        requested, the block's own matrix is returned (no copy), otherwise the rows are looked up by key
+        (the first row of duplicated keys is used) and missing keys get NaN rows.
+
+        :param keys: the keys of the requested rows (e.g. the key column of a DataFrame)
+        :param columns: requested columns (a subset of the block's columns), all of them if None
+        :return: float32 matrix of shape (len(keys), len(columns))
+        """
+        values = self.values
+        if columns is not None and list(columns) != self.columns:
+            positions = pd.Index(self.columns).get_indexer(columns)
+            if (positions < 0).any():
+                raise KeyError(f'Columns {[c for c, p in zip(columns, positions) if p < 0]} are not in the block')
+            values = values[:, positions]
+        if len(keys) == len(self.keys) and np.array_equal(keys, self.keys):
+            return values
+        index = pd.Index(self.keys)
+        if not index.is_unique:
+            unique = ~index.duplicated()
+            index, values = index[unique], values[unique]
+        rows = index.get_indexer(keys)
+        aligned = values[np.maximum(rows, 0)]
+        aligned[rows < 0] = np.nan
+        return aligned
+
+    def select(self, keys: np.ndarray) -> 'FeatureBlock':
+        """
+        :param keys: the keys of the requested rows
+        :return: a block with the rows of the given keys
+        """
+        return FeatureBlock(self.columns, self.align(keys), self.key_column, keys)
+
+    @staticmethod
+    def concat(blocks: List['FeatureBlock']) -> 'FeatureBlock':
+        """
+        Concatenates the rows of blocks with the same columns (e.g. blocks produced for the chunks of a payload).
+        Blocks appearing more than once (e.g. shared by the chunks of a split payload) are used once.
+
+        :param blocks: the blocks to concatenate
+        :return: the concatenated block
+        """
+        unique_blocks = list({id(b): b for b in blocks}.values())
+        if len(unique_blocks) == 1:
+            return unique_blocks[0]
+        first = unique_blocks[0]
+        for block in unique_blocks[1:]:
+            if block.columns != first.columns or block.key_column != first.key_column:
+                raise ValueError('Only feature blocks with the same columns and key column can be concatenated')
+        return FeatureBlock(first.columns, np.concatenate([b.values for b in unique_blocks]), first.key_column,
+                            np.concatenate([b.keys for b in unique_blocks]))
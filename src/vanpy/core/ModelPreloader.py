@@ -0,0 +1,149 @@
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+from vanpy.core.PipelineComponent import PipelineComponent
+
+
+class ModelPreloader:
+    """
+    Loads the models of a pipeline's components in background threads, in execution order, while the earlier
+    components are running, so a component's model is already loaded when its stage starts instead of the pipeline
+    waiting for the weights after the previous stage finished.
+
+    The models which were preloaded but whose stage did not start yet are kept under a memory budget: the next model
+    is loaded only while their total (estimated) size is below the budget, so at most one model exceeds it. A stage
+    starting (see start_stage) removes its model from the total. A component whose stage starts while its model is
+    being preloaded waits for that load (see PipelineComponent.ensure_model_loaded) instead of loading it again.
+
+    Errors are only logged: the component loads its model again when its stage starts, and the error is raised then.
+
+    Usage::
+
+        with ModelPreloader(components, memory_budget_bytes) as preloader:
+            for component in components:
+                preloader.start_stage(component)
+                payload = component.process(payload)
+    """
+    DEFAULT_MEMORY_BUDGET_MB = 2048  # of the 'model_preloading' option, so preloading can not exhaust the memory
+
+    def __init__(self, components: List[PipelineComponent], memory_budget_bytes: Optional[int] = None,
+                 max_workers: int = 1):
+        """
+        :param components: the components, in execution order
+        :param memory_budget_bytes: the maximal total size of the preloaded models waiting for their stage,
+            unbounded if None
+        :param max_workers: the number of models loaded in parallel
+        """
+        self.memory_budget_bytes = memory_budget_bytes
+        self.max_workers = max(max_workers, 1)
+        self.logger = logging.getLogger('ModelPreloader')
+        self._pending = deque(c for c in components if hasattr(c, 'load_model'))
+        self._started = set()  # ids of the components whose stage started
+        self._waiting_bytes: Dict[int, int] = {}  # sizes of the preloaded models whose stage did not start yet
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._threads: List[threading.Thread] = []
+
+    @classmethod
+    def from_config(cls, components: List[PipelineComponent], config: Dict) -> Optional['ModelPreloader']:
+        """
+        Creates a preloader configured by the 'model_preloading' option:
+        enabled - whether to preload the models (default False),
+        memory_budget_mb - the maximal total size of the preloaded models waiting for their stage
+        (default DEFAULT_MEMORY_BUDGET_MB, null for unbounded),
+        max_workers - the number of models loaded in parallel (default 1).
+
+        :param components: the components, in execution order
+        :param config: the pipeline configuration
+        :return: the preloader, None if preloading is disabled
+        """
+        preloading_config = config.get('model_preloading') or {}
+        if not preloading_config.get('enabled', False):
+            return None
+        memory_budget_mb = preloading_config.get('memory_budget_mb', cls.DEFAULT_MEMORY_BUDGET_MB)
+        return cls(components, None if memory_budget_mb is None else int(memory_budget_mb * 2 ** 20),
+                   preloading_config.get('max_workers', 1))
+
+    @property
+    def waiting_bytes(self) -> int:
+        """
+        :return: the estimated total size of the preloaded models whose stage did not start yet
+        """
+        with self._condition:
+            return sum(self._waiting_bytes.values())
+
+    def start(self) -> 'ModelPreloader':
+        """
+        Starts the background loading threads.
+
+        :return: the preloader
+        """
+        for i in range(min(self.max_workers, len(self._pending))):
+            thread = threading.Thread(target=self._preload, name=f'model-preload-{i}', daemon=True)
+            self._threads.append(thread)
+            thread.start()
+        return self
+
+    def start_stage(self, component: PipelineComponent) -> None:
+        """
+        Marks the stage of the component as started: its model is not preloaded anymore (the component loads it
+        itself, or waits for the running preload) and no longer counts against the memory budget.
+
+        :param component: the component whose stage starts
+        """
+        with self._condition:
+            self._started.add(id(component))
+            self._waiting_bytes.pop(id(component), None)
+            self._condition.notify_all()
+
+    def stop(self, wait: bool = True) -> None:
+        """
+        Stops preloading, models already being loaded are not interrupted.
+
+        :param wait: whether to wait for the models being loaded
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def __enter__(self) -> 'ModelPreloader':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        # after a failure the models being loaded are not needed, so the pipeline does not wait for them
+        self.stop(wait=exc_type is None)
+
+    def _next_component(self) -> Optional[PipelineComponent]:
+        with self._condition:
+            while True:
+                if self._stopped:
+                    return None
+                while self._pending and id(self._pending[0]) in self._started:
+                    self._pending.popleft()
+                if not self._pending:
+                    return None
+                if self.memory_budget_bytes is None or sum(self._waiting_bytes.values()) < self.memory_budget_bytes:
+                    return self._pending.popleft()
+                self._condition.wait()
+
+    def _preload(self) -> None:
+        while True:
+            component = self._next_component()
+            if component is None:
+                return
+            self.logger.info(f'Preloading the model of {component.get_name()}')
+            try:
+                component.ensure_model_loaded()
+            except Exception as e:
+                self.logger.warning(f'Failed to preload the model of {component.get_name()}, it will be loaded when '
+                                    f'its stage starts: {e!r}')
+                continue
+            size_bytes = component.get_model_size()
+            with self._condition:
+                if id(component) not in self._started:
+                    self._waiting_bytes[id(component)] = size_bytes
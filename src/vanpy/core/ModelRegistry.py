@@ -0,0 +1,204 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+from vanpy.utils.batching import release_cached_memory
+
+
+def estimate_model_size(model: Any) -> int:
+    """
+    Estimates the memory held by a loaded model: the parameters and buffers of torch modules (including the modules
+    wrapped by SpeechBrain and pyannote interfaces), the bytes of numpy arrays, 0 if unknown.
+
+    :param model: a loaded model, or a tuple of models (e.g. a processor and a model)
+    :return: the estimated size in bytes
+    """
+    if isinstance(model, (tuple, list)):
+        return sum(estimate_model_size(m) for m in model)
+    if isinstance(model, np.ndarray):
+        return model.nbytes
+    if callable(getattr(model, 'parameters', None)) and callable(getattr(model, 'buffers', None)):
+        try:
+            tensors = {id(t): t for t in list(model.parameters()) + list(model.buffers())}
+            return sum(t.numel() * t.element_size() for t in tensors.values())
+        except (TypeError, AttributeError, RuntimeError):
+            return 0
+    for attribute in ('model', 'mods'):
+        wrapped = getattr(model, attribute, None)
+        if wrapped is not None and wrapped is not model:
+            return estimate_model_size(wrapped)
+    return 0
+
+
+@dataclass
+class _RegistryEntry:
+    model: Any = None
+    size_bytes: int = 0
+    references: int = 0
+    last_released: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of loaded models, shared by all the components and pipelines of the process.
+
+    Models are keyed by (loader, checkpoint, device, options): a component acquiring a model which is already loaded
+    (e.g. by a component of another Pipeline using the same checkpoint) gets the same object instead of loading the
+    weights again. The shared models must be treated as read-only.
+
+    The registry counts the references to every model. Models which are no longer referenced stay loaded, so they
+    can be acquired again, until the total size of the loaded models exceeds the memory budget: then the least
+    recently released ones are evicted. Models in use are never evicted.
+    """
+    _instance: Optional['ModelRegistry'] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, memory_budget_bytes: Optional[int] = None):
+        """
+        :param memory_budget_bytes: the maximal total size of the loaded models, unbounded if None
+        """
+        self.memory_budget_bytes = memory_budget_bytes
+        self.logger = logging.getLogger('ModelRegistry')
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple, _RegistryEntry] = {}
+
+    @classmethod
+    def get_instance(cls) -> 'ModelRegistry':
+        """
+        :return: the registry of the process
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    @staticmethod
+    def get_key(loader: str, checkpoint: str, device: str = 'cpu', **options) -> Tuple:
+        """
+        :param loader: the name of the loading function (e.g. 'speechbrain.EncoderClassifier')
+        :param checkpoint: the checkpoint (e.g. 'speechbrain/spkrec-ecapa-voxceleb')
+        :param device: the device the model is loaded to
+        :param options: other loading options which change the loaded model
+        :return: the registry key
+        """
+        return loader, checkpoint, str(device), tuple(sorted((k, repr(v)) for k, v in options.items()))
+
+    @property
+    def size_bytes(self) -> int:
+        """
+        :return: the estimated total size of the loaded models
+        """
+        with self._lock:
+            return sum(entry.size_bytes for entry in self._entries.values() if entry.model is not None)
+
+    def acquire(self, key: Hashable, load: Callable[[], Any], size_bytes: Optional[int] = None) -> Any:
+        """
+        Returns the model of the key, loading it with load if it is not loaded yet (concurrent acquirers of the same
+        key wait for a single load), and adds a reference to it.
+
+        :param key: the registry key (see get_key)
+        :param load: function loading the model
+        :param size_bytes: the model size, estimated from the loaded model if None (see estimate_model_size)
+        :return: the shared model
+        """
+        with self._lock:
+            entry = self._entries.setdefault(key, _RegistryEntry())
+            entry.references += 1
+        try:
+            with entry.lock:
+                if entry.model is None:
+                    self.logger.debug(f'Loading {key}')
+                    entry.model = load()
+                    entry.size_bytes = estimate_model_size(entry.model) if size_bytes is None else size_bytes
+                    loaded = True
+                else:
+                    loaded = False
+        except BaseException:
+            self.release(key)
+            raise
+        if loaded:
+            self._evict_over_budget()
+        else:
+            self.logger.debug(f'Sharing the loaded {key}')
+        return entry.model
+
+    def release(self, key: Hashable) -> None:
+        """
+        Removes a reference to the model of the key. The model stays loaded until it is evicted.
+
+        :param key: the registry key
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.references == 0:
+                return
+            entry.references -= 1
+            if entry.references == 0:
+                entry.last_released = time.monotonic()
+        self._evict_over_budget()
+
+    def get_references(self, key: Hashable) -> int:
+        """
+        :param key: the registry key
+        :return: the number of references to the model of the key
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.references if entry is not None else 0
+
+    def is_loaded(self, key: Hashable) -> bool:
+        """
+        :param key: the registry key
+        :return: whether the model of the key is loaded
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry.model is not None
+
+    def set_memory_budget(self, memory_budget_bytes: Optional[int]) -> None:
+        """
+        :param memory_budget_bytes: the maximal total size of the loaded models, unbounded if None
+        """
+        self.memory_budget_bytes = memory_budget_bytes
+        self._evict_over_budget()
+
+    def clear(self) -> None:
+        """
+        Evicts all the models which are not in use.
+        """
+        with self._lock:
+            evicted = self._evict(lambda: True)
+        if evicted:
+            release_cached_memory()
+
+    def _evict_over_budget(self) -> None:
+        if self.memory_budget_bytes is None:
+            return
+        with self._lock:
+            evicted = self._evict(lambda: self._loaded_size() > self.memory_budget_bytes)
+            if self._loaded_size() > self.memory_budget_bytes:
+                self.logger.warning(f'The loaded models ({self._loaded_size() / 2 ** 20:.0f} MB) exceed the memory '
+                                    f'budget ({self.memory_budget_bytes / 2 ** 20:.0f} MB) and are all in use')
+        if evicted:
+            release_cached_memory()
+
+    def _loaded_size(self) -> int:
+        return sum(entry.size_bytes for entry in self._entries.values() if entry.model is not None)
+
+    def _evict(self, should_evict: Callable[[], bool]) -> int:
+        candidates = sorted(((key, entry) for key, entry in self._entries.items()
+                             if entry.references == 0 and entry.model is not None),
+                            key=lambda item: item[1].last_released)
+        evicted = 0
+        for key, entry in candidates:
+            if not should_evict():
+                break
+            self.logger.info(f'Evicting model {key} ({entry.size_bytes / 2 ** 20:.0f} MB)')
+            del self._entries[key]
+            evicted += 1
+        return evicted
@@ -0,0 +1,328 @@
+import hashlib
+import ipaddress
+import json
+import logging
+import os
+import shutil
+import socket
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from vanpy.utils.utils import create_dirs_if_not_exist
+
+ARTIFACT_KINDS = ('url', 'huggingface', 'torch_hub')
+OFFLINE_ENVIRONMENT_VARIABLE = 'VANPY_OFFLINE'
+MODEL_STORE_ENVIRONMENT_VARIABLE = 'VANPY_MODEL_STORE'
+
+
+@dataclass(frozen=True)
+class ModelArtifact:
+    """
+    A file or a repository a component loads its model from (see PipelineComponent.get_model_artifacts).
+
+    :ivar source: the URL of a file ('url'), a Hugging Face repository id ('huggingface') or a torch hub GitHub
+        repository, e.g. 'snakers4/silero-vad' ('torch_hub')
+    :ivar kind: 'url', 'huggingface' or 'torch_hub'
+    :ivar filename: the name of a downloaded file, kept in the store (loaders may depend on its extension)
+    :ivar sha256: the expected checksum of a downloaded file, recorded on the first download if None
+    :ivar revision: the revision of a Hugging Face repository (a branch, a tag or a commit), 'main' if None
+    :ivar token: the access token of a gated Hugging Face repository
+    """
+    source: str
+    kind: str = 'url'
+    filename: Optional[str] = None
+    sha256: Optional[str] = None
+    revision: Optional[str] = None
+    token: Optional[str] = field(default=None, compare=False, repr=False)
+
+    def __post_init__(self):
+        if self.kind not in ARTIFACT_KINDS:
+            raise ValueError(f"Unknown model artifact kind '{self.kind}', choose from {ARTIFACT_KINDS}")
+
+
+def get_sha256(path: str) -> str:
+    """
+    :param path: a file path
+    :return: the hex sha256 digest of the file's content
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+_original_connect = socket.socket.connect
+_original_connect_ex = socket.socket.connect_ex
+_original_getaddrinfo = socket.getaddrinfo
+
+
+def _is_local_address(address) -> bool:
+    if not isinstance(address, tuple):  # AF_UNIX sockets (e.g. multiprocessing) are not network access
+        return True
+    host = address[0]
+    if host in ('localhost', ''):
+        return True
+    try:
+        return ipaddress.ip_address(host.split('%')[0]).is_loopback
+    except ValueError:
+        return False
+
+
+def _check_address(address) -> None:
+    if not _is_local_address(address):
+        raise ConnectionRefusedError(f'vanpy offline mode: network access to {address} is blocked, prefetch the '
+                                     f'models with `vanpy models prefetch --config <pipeline.yaml>`')
+
+
+def _offline_connect(self, address):
+    _check_address(address)
+    return _original_connect(self, address)
+
+
+def _offline_connect_ex(self, address):
+    _check_address(address)
+    return _original_connect_ex(self, address)
+
+
+def _offline_getaddrinfo(host, *args, **kwargs):
+    _check_address((host.decode() if isinstance(host, bytes) else host or '',))
+    return _original_getaddrinfo(host, *args, **kwargs)
+
+
+def block_network() -> None:
+    """
+    Makes any connection to a non-loopback address fail, for the whole process (loopback and unix sockets, used by
+    multiprocessing and local services, are allowed).
+    """
+    socket.socket.connect = _offline_connect
+    socket.socket.connect_ex = _offline_connect_ex
+    socket.getaddrinfo = _offline_getaddrinfo
+
+
+class ModelStore:
+    """
+    Local store of the model artifacts (checkpoints, processors, repositories) of the components, filled by
+    `vanpy models prefetch --config pipeline.yaml` (see prefetch), so the workers load their models from the local
+    disk only.
+
+    Downloaded files are content-addressed: they are kept under files/<sha256>/<filename>, and an index maps their
+    source URL to their checksum, which is verified when they are prefetched. Hugging Face repositories are kept in
+    the Hugging Face cache layout under huggingface/ (its files are addressed by their checksums too), and torch hub
+    repositories under torch_hub/.
+
+    In offline mode (the 'model_store.offline' option or the VANPY_OFFLINE environment variable) the loaders
+    resolve their artifacts from the store only, a missing artifact raises FileNotFoundError, the Hugging Face
+    libraries are switched to their offline mode and any connection to a non-loopback address fails.
+
+    Stores are shared per directory (see ModelStore.open) and are thread-safe.
+    """
+    _instances: Dict[str, 'ModelStore'] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path: str, offline: bool = False):
+        """
+        :param path: the store directory, created if it does not exist
+        :param offline: whether to resolve the artifacts from the store only and block the network (see set_offline)
+        """
+        self.path = os.path.expanduser(path)
+        self.files_dir = os.path.join(self.path, 'files')
+        self.huggingface_dir = os.path.join(self.path, 'huggingface')
+        self.torch_hub_dir = os.path.join(self.path, 'torch_hub')
+        self.index_path = os.path.join(self.path, 'index.json')
+        self.logger = logging.getLogger('ModelStore')
+        self.offline = False
+        self._lock = threading.Lock()
+        create_dirs_if_not_exist(self.files_dir, self.huggingface_dir, self.torch_hub_dir)
+        if offline:
+            self.set_offline()
+
+    @classmethod
+    def open(cls, path: Optional[str] = None, offline: bool = False) -> 'ModelStore':
+        """
+        Returns the store of the given directory, shared by all the components of the process.
+
+        :param path: the store directory, $VANPY_MODEL_STORE or ~/.cache/vanpy/models if None
+        :param offline: whether to switch the store to offline mode, which is also enabled by VANPY_OFFLINE=1
+        :return: the store
+        """
+        if path is None:
+            path = os.environ.get(MODEL_STORE_ENVIRONMENT_VARIABLE,
+                                  os.path.join(os.path.expanduser('~'), '.cache', 'vanpy', 'models'))
+        key = os.path.abspath(os.path.expanduser(path))
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(path)
+            store = cls._instances[key]
+        if offline or os.environ.get(OFFLINE_ENVIRONMENT_VARIABLE, '').lower() in ('1', 'true', 'yes'):
+            store.set_offline()
+        return store
+
+    def set_offline(self) -> None:
+        """
+        Switches the store to offline mode: the artifacts are resolved from the store only, the Hugging Face
+        libraries are switched to their offline mode, and the network is blocked for the whole process
+        (see block_network). It cannot be switched back.
+        """
+        if self.offline:
+            return
+        self.offline = True
+        os.environ['HF_HUB_OFFLINE'] = '1'
+        os.environ['TRANSFORMERS_OFFLINE'] = '1'
+        os.environ['HF_DATASETS_OFFLINE'] = '1'
+        os.environ.setdefault('HF_HUB_CACHE', self.huggingface_dir)  # nested loads (e.g. pyannote's sub-models)
+        os.environ.setdefault('HUGGINGFACE_HUB_CACHE', self.huggingface_dir)
+        block_network()
+        self.logger.info(f'Offline mode, loading the models from {self.path} only')
+
+    def get_file(self, artifact: ModelArtifact) -> str:
+        """
+        Returns the local path of a downloaded file, downloading it to the store first unless the store is offline.
+
+        :param artifact: a 'url' artifact
+        :return: the path of the file in the store
+        :raises FileNotFoundError: in offline mode, if the file was not prefetched
+        """
+        path = self.find_file(artifact)
+        if path is not None:
+            return path
+        if self.offline:
+            raise FileNotFoundError(f'{artifact.source} is not in the model store {self.path} (offline mode), '
+                                    f'prefetch it with `vanpy models prefetch --config <pipeline.yaml>`')
+        return self._download_file(artifact)
+
+    def find_file(self, artifact: ModelArtifact) -> Optional[str]:
+        """
+        :param artifact: a 'url' artifact
+        :return: the path of the file in the store, None if it is not stored
+        """
+        entry = self._read_index().get(artifact.source)
+        if entry is None or (artifact.sha256 is not None and entry['sha256'] != artifact.sha256):
+            return None
+        path = os.path.join(self.files_dir, entry['sha256'], entry['filename'])
+        if not os.path.isfile(path) or os.path.getsize(path) != entry['size']:
+            return None
+        return path
+
+    def get_huggingface_source(self, artifact: ModelArtifact) -> str:
+        """
+        :param artifact: a 'huggingface' artifact
+        :return: the local directory of the repository if it is stored, otherwise its id (for the libraries to
+            download it) unless the store is offline
+        :raises FileNotFoundError: in offline mode, if the repository was not prefetched
+        """
+        snapshot = self.find_huggingface_snapshot(artifact)
+        if snapshot is not None:
+            return snapshot
+        if self.offline:
+            raise FileNotFoundError(f'{artifact.source} is not in the model store {self.path} (offline mode), '
+                                    f'prefetch it with `vanpy models prefetch --config <pipeline.yaml>`')
+        return artifact.source
+
+    def find_huggingface_snapshot(self, artifact: ModelArtifact) -> Optional[str]:
+        """
+        :param artifact: a 'huggingface' artifact
+        :return: the local directory of the repository's revision, None if it is not stored
+        """
+        repository_dir = os.path.join(self.huggingface_dir, 'models--' + artifact.source.replace('/', '--'))
+        revision = artifact.revision or 'main'
+        ref_path = os.path.join(repository_dir, 'refs', revision)
+        if os.path.isfile(ref_path):
+            with open(ref_path) as f:
+                revision = f.read().strip()
+        snapshot = os.path.join(repository_dir, 'snapshots', revision)
+        return snapshot if os.path.isdir(snapshot) else None
+
+    def get_torch_hub_dir(self, artifact: ModelArtifact) -> Optional[str]:
+        """
+        :param artifact: a 'torch_hub' artifact
+        :return: the local directory of the repository if it is stored, None otherwise (for torch hub to download
+            it) unless the store is offline
+        :raises FileNotFoundError: in offline mode, if the repository was not prefetched
+        """
+        owner, name = artifact.source.split('/')
+        repository_dir = os.path.join(self.torch_hub_dir, f'{owner}_{name}_{artifact.revision or "master"}')
+        if os.path.isdir(repository_dir):
+            return repository_dir
+        if self.offline:
+            raise FileNotFoundError(f'{artifact.source} is not in the model store {self.path} (offline mode), '
+                                    f'prefetch it with `vanpy models prefetch --config <pipeline.yaml>`')
+        return None
+
+    def prefetch(self, artifacts: List[ModelArtifact], max_workers: int = 4) -> Dict[ModelArtifact, Tuple[bool, str]]:
+        """
+        Downloads the artifacts which are not stored yet in parallel, and verifies the checksums of the stored files.
+
+        :param artifacts: the artifacts to fetch
+        :param max_workers: the number of parallel downloads
+        :return: dictionary of each artifact to (True, its local path), or to (False, the error message) if it could
+            not be fetched
+        """
+        if self.offline:
+            raise RuntimeError('The model store is offline, it cannot prefetch artifacts')
+        artifacts = list(dict.fromkeys(artifacts))
+        with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+            results = list(executor.map(self._prefetch_artifact, artifacts))
+        return dict(zip(artifacts, results))
+
+    def _prefetch_artifact(self, artifact: ModelArtifact) -> Tuple[bool, str]:
+        try:
+            if artifact.kind == 'url':
+                path = self.find_file(artifact)
+                if path is not None and get_sha256(path) != os.path.basename(os.path.dirname(path)):
+                    self.logger.warning(f'The checksum of {path} does not match, downloading it again')
+                    shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+                    path = None
+                return True, path or self._download_file(artifact)
+            if artifact.kind == 'huggingface':
+                from huggingface_hub import snapshot_download
+                return True, snapshot_download(artifact.source, revision=artifact.revision,
+                                               cache_dir=self.huggingface_dir, token=artifact.token)
+            import torch
+            torch.hub.set_dir(self.torch_hub_dir)
+            repository = artifact.source + (f':{artifact.revision}' if artifact.revision else '')
+            torch.hub.list(repository, trust_repo=True)
+            return True, self.get_torch_hub_dir(artifact)
+        except Exception as e:
+            self.logger.error(f'Failed to fetch {artifact.source}: {e}')
+            return False, str(e)
+
+    def _download_file(self, artifact: ModelArtifact) -> str:
+        import gdown
+        filename = artifact.filename or os.path.basename(artifact.source.split('?')[0]) or 'model'
+        tmp_dir = tempfile.mkdtemp(dir=self.path, prefix='.download-')
+        try:
+            tmp_path = os.path.join(tmp_dir, filename)
+            self.logger.info(f'Downloading {artifact.source}')
+            if gdown.download(artifact.source, tmp_path, quiet=True) is None or not os.path.isfile(tmp_path):
+                raise OSError(f'Failed to download {artifact.source}')
+            sha256 = get_sha256(tmp_path)
+            if artifact.sha256 is not None and sha256 != artifact.sha256:
+                raise OSError(f'Checksum mismatch for {artifact.source}: expected {artifact.sha256}, got {sha256}')
+            file_dir = os.path.join(self.files_dir, sha256)
+            create_dirs_if_not_exist(file_dir)
+            path = os.path.join(file_dir, filename)
+            os.replace(tmp_path, path)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        with self._lock:
+            index = self._read_index()
+            index[artifact.source] = {'sha256': sha256, 'filename': filename, 'size': os.path.getsize(path)}
+            self._write_index(index)
+        return path
+
+    def _read_index(self) -> Dict[str, Dict]:
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _write_index(self, index: Dict[str, Dict]) -> None:
+        tmp_path = f'{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.index_path)
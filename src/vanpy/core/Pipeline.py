@@ -2,10 +2,15 @@ from dataclasses import dataclass
 from logging import Logger
 import pandas as pd
 import logging
-from typing import List, Union
+import queue
+import threading
+from contextlib import nullcontext
+from typing import Iterator, List, Optional
 
 from vanpy.core.BasePipeline import BasePipeline
 from vanpy.core.ComponentPayload import ComponentPayload
+from vanpy.core.ComponentScheduler import ComponentScheduler
+from vanpy.core.ModelPreloader import ModelPreloader
 from yaml import YAMLObject
 
 from vanpy.core.PipelineComponent import PipelineComponent
@@ -13,6 +18,17 @@ from vanpy.core.PreprocessPipeline import PreprocessPipeline
 from vanpy.core.FeatureExtractionPipeline import FeatureExtractionPipeline
 from vanpy.core.ModelInferencePipeline import ModelInferencePipeline
 
+_END_OF_STREAM = object()
+
+
+class _StreamError:
+    """
+    Wraps an exception raised by a streaming stage, so it is forwarded through the queues to the consumer.
+    """
+    def __init__(self, component_name: str, exception: BaseException):
+        self.component_name = component_name
+        self.exception = exception
+
 
 @dataclass
 class Pipeline:
@@ -55,26 +71,221 @@ class Pipeline:
 
     def process(self, initial_payload: ComponentPayload = None) -> ComponentPayload:
         """
-        Processes the input data through all pipelines in the sequence.
+        Processes the input data through all pipelines in the sequence. With `max_parallel_components` above 1,
+        components which do not depend on each other, also across sub-pipelines (e.g. an embedding extractor and a
+        speech-to-text model both reading the audio files), run concurrently instead (see get_scheduler). The models
+        of the later components are loaded in the background while the earlier ones run (see get_model_preloader).
 
         :param initial_payload: Initial payload to be processed
         :return: Processed payload after all pipelines
         """
-        cp: Union[None, ComponentPayload] = None
+        cp = self.get_initial_payload(initial_payload)
 
-        if initial_payload is not None:
-            cp = initial_payload
-        elif self.input_dir is not None:
-            cp = ComponentPayload(input_path=self.input_dir)
-        else:
-            raise AttributeError("You have supplied both empty initial payload and input directory")
+        model_preloader = self.get_model_preloader()
+        with model_preloader or nullcontext():
+            if self.config.get('max_parallel_components', 1) > 1:
+                cp = self.get_scheduler().process(cp, model_preloader)
+            else:
+                for pipeline in self.pipelines:
+                    if pipeline is not None:
+                        cp = pipeline.process(cp, model_preloader)
+
+        return cp
+
+    async def aprocess(self, initial_payload: ComponentPayload = None) -> ComponentPayload:
+        """
+        Asynchronous version of process, which does not block the event loop. Blocking work (model inference,
+        file handling) is offloaded to executors and ffmpeg segment cuts run as asyncio subprocesses, so a single
+        warm pipeline can serve many concurrent requests, e.g. from an aiohttp service.
+
+        :param initial_payload: Initial payload to be processed
+        :return: Processed payload after all pipelines
+        """
+        cp = self.get_initial_payload(initial_payload)
 
         for pipeline in self.pipelines:
             if pipeline is not None:
-                cp = pipeline.process(cp)
+                cp = await pipeline.aprocess(cp)
 
         return cp
 
+    def get_initial_payload(self, initial_payload: ComponentPayload = None) -> ComponentPayload:
+        """
+        Returns the payload processing starts from: the given initial payload, or a payload of the input directory.
+
+        :param initial_payload: Initial payload to be processed
+        :return: the payload to process
+        """
+        if initial_payload is not None:
+            return initial_payload
+        if self.input_dir is not None:
+            return ComponentPayload(input_path=self.input_dir)
+        raise AttributeError("You have supplied both empty initial payload and input directory")
+
+    def get_components(self) -> List[PipelineComponent]:
+        """
+        Returns the components of all the sub-pipelines, in execution order.
+
+        :return: list of `PipelineComponent` objects
+        """
+        return [component for pipeline in self.pipelines if pipeline is not None
+                for component in pipeline.get_components()]
+
+    def get_scheduler(self) -> ComponentScheduler:
+        """
+        Returns a scheduler of the components of all the sub-pipelines, running up to `max_parallel_components`
+        (default 1, i.e. one after another) independent components at a time (see ComponentScheduler).
+
+        :return: the scheduler
+        """
+        return ComponentScheduler(self.get_components(), self.config.get('max_parallel_components', 1), self.logger)
+
+    def get_model_preloader(self) -> Optional[ModelPreloader]:
+        """
+        Returns a preloader of the components' models, configured by the 'model_preloading' option
+        (see ModelPreloader.from_config).
+
+        :return: the preloader, None if preloading is disabled
+        """
+        return ModelPreloader.from_config(self.get_components(), self.config)
+
+    def release_models(self) -> None:
+        """
+        Releases the models held by the pipeline's components. Models shared with other pipelines stay loaded,
+        the others are evicted by the ModelRegistry when its memory budget is exceeded.
+        """
+        for component in self.get_components():
+            component.release_models()
+
+    def process_stream(self, initial_payload: ComponentPayload = None) -> Iterator[ComponentPayload]:
+        """
+        Processes the input data in streaming mode. Instead of passing the whole dataset through each component
+        before moving to the next one, the dataset is split into chunks of `stream_chunk_size` rows (default 1, i.e.
+        file by file) that flow through the streamable components, each running in its own thread and connected
+        by queues bounded by `stream_queue_size` chunks. Results of the first chunks are yielded while the rest
+        of the dataset is still being processed, and stages of different kinds (I/O-heavy, CPU-heavy) overlap.
+
+        Non-streamable components (e.g. the file mapper) at the start of the pipeline are run on the full dataset
+        before streaming starts. Non-streamable components after the first streamable one (e.g. clusterers) form
+        a final barrier stage, executed on the concatenation of all the chunks; its result is yielded last.
+
+        Payloads are saved (if enabled) only for the barrier stages and for the concatenated streaming result.
+        The models of the streaming and barrier stages are preloaded while the leading components run.
+
+        :param initial_payload: Initial payload to be processed
+        :return: generator of processed chunk payloads, followed by the payload of the barrier stage (if any)
+        """
+        cp = self.get_initial_payload(initial_payload)
+
+        model_preloader = self.get_model_preloader()
+        with model_preloader or nullcontext():
+            components = self.get_components()
+            first_streamable = next((i for i, c in enumerate(components) if c.streamable), len(components))
+            last_streamable = first_streamable
+            while last_streamable < len(components) and components[last_streamable].streamable:
+                last_streamable += 1
+            leading = components[:first_streamable]
+            streaming = components[first_streamable:last_streamable]
+            trailing = components[last_streamable:]
+
+            for component in leading:
+                cp = self._process_component(component, cp, model_preloader)
+
+            if not streaming:
+                for component in trailing:
+                    cp = self._process_component(component, cp, model_preloader)
+                yield cp
+                return
+
+            chunk_size = max(self.config.get('stream_chunk_size', 1), 1)
+            queue_size = max(self.config.get('stream_queue_size', 2), 1)
+            stop_event = threading.Event()
+            queues = [queue.Queue(maxsize=queue_size) for _ in range(len(streaming) + 1)]
+            threads = [threading.Thread(target=self._feed_stream, args=(cp, chunk_size, queues[0], stop_event),
+                                        name='stream-feeder', daemon=True)]
+            for i, component in enumerate(streaming):
+                threads.append(threading.Thread(target=self._run_stream_stage,
+                                                args=(component, queues[i], queues[i + 1], stop_event),
+                                                name=f'stream-{component.get_name()}', daemon=True))
+            if model_preloader is not None:  # the streaming stages load their models concurrently
+                for component in streaming:
+                    model_preloader.start_stage(component)
+            for thread in threads:
+                thread.start()
+
+            processed_chunks = []
+            try:
+                while True:
+                    item = queues[-1].get()
+                    if item is _END_OF_STREAM:
+                        break
+                    if isinstance(item, _StreamError):
+                        self.logger.error(f'Streaming stage {item.component_name} failed: {item.exception}')
+                        raise item.exception
+                    processed_chunks.append(item)
+                    yield item
+            finally:
+                stop_event.set()
+                for thread in threads:
+                    thread.join()
+
+            if not processed_chunks:
+                return
+            streamed = ComponentPayload.concat(processed_chunks)
+            streaming[-1].save_component_payload(streamed)
+            if trailing:
+                for component in trailing:
+                    streamed = self._process_component(component, streamed, model_preloader)
+                yield streamed
+
+    def _process_component(self, component: PipelineComponent, payload: ComponentPayload,
+                           model_preloader: Optional[ModelPreloader] = None) -> ComponentPayload:
+        if model_preloader is not None:
+            model_preloader.start_stage(component)
+        self.logger.info(f'Processing with {component.get_name()}')
+        payload = component.profiled_process(payload)
+        component.save_component_payload(payload)
+        return payload
+
+    @staticmethod
+    def _put(q: queue.Queue, item, stop_event: threading.Event) -> bool:
+        """
+        Puts the item into a bounded queue, giving up if the stream was stopped (e.g. the consumer stopped iterating).
+
+        :return: True if the item was put into the queue
+        """
+        while not stop_event.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _feed_stream(self, payload: ComponentPayload, chunk_size: int, out_queue: queue.Queue,
+                     stop_event: threading.Event) -> None:
+        for chunk in payload.split(chunk_size):
+            if not self._put(out_queue, chunk, stop_event):
+                return
+        self._put(out_queue, _END_OF_STREAM, stop_event)
+
+    def _run_stream_stage(self, component: PipelineComponent, in_queue: queue.Queue, out_queue: queue.Queue,
+                          stop_event: threading.Event) -> None:
+        with component.profiled(), component.streaming():  # one executor and progress bar for all the chunks
+            while not stop_event.is_set():
+                try:
+                    item = in_queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is not _END_OF_STREAM and not isinstance(item, _StreamError):
+                    try:
+                        item = component.process(item)
+                    except Exception as e:
+                        item = _StreamError(component.get_name(), e)
+                if not self._put(out_queue, item, stop_event) or item is _END_OF_STREAM or \
+                        isinstance(item, _StreamError):
+                    return
+
     @staticmethod
     def generate_pipelines_from_components(components: List[PipelineComponent], config: YAMLObject = None):
         """
@@ -1,8 +1,17 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
+import hashlib
+import json
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Dict, Union, List
-# import os
+from typing import Callable, Dict, Union, List, Optional, Sequence, Tuple, Iterator, Any
+import os
+import itertools
+import multiprocessing
+import threading
+import weakref
 
 import pandas as pd
 from yaml import YAMLObject
@@ -12,9 +21,53 @@ import pickle
 from datetime import datetime
 import time
 from vanpy.core.ComponentPayload import ComponentPayload
-from vanpy.utils.utils import create_dirs_if_not_exist
+from vanpy.core.CompletionLedger import CompletionLedger
+from vanpy.core.FeatureBlock import FEATURE_BLOCKS_KEY
+from vanpy.core.ModelRegistry import ModelRegistry, estimate_model_size
+from vanpy.core.ModelStore import ModelArtifact, ModelStore
+from vanpy.core.ResultCache import ResultCache
+from vanpy.core.ResultCollector import ResultCollector
+from vanpy.utils.audio import DecodedAudioCache
+from vanpy.utils.payload_io import AppendOnlyDataFrameWriter, PAYLOAD_EXTENSIONS, validate_payload_format, write_df, \
+    write_payload
+from vanpy.utils.batching import get_audio_duration, is_out_of_memory_error, make_batches, release_cached_memory
+from vanpy.utils.profiling import ComponentProfiler
+from vanpy.utils.row_ids import ROW_ID_COLUMN, ensure_row_ids
+from vanpy.utils.timing import StageTimings, measure_item, span
+from vanpy.utils.utils import cached_download, create_dirs_if_not_exist
 from tqdm.auto import tqdm
-from queue import Queue
+
+EXECUTOR_TYPES = ('sequential', 'thread', 'process')
+
+_worker_component = None  # the component instance owned by a process-pool worker
+
+
+def _init_process_worker(component: 'PipelineComponent') -> None:
+    """
+    Initializer of process-pool workers. Keeps the component for the lifetime of the worker and makes sure its model
+    is loaded once. When the pool uses the (opt-in) 'fork' start method, a model that was loaded in the parent process
+    is inherited (copy-on-write) and is not loaded again.
+
+    :param component: the component whose process_item will be executed by the worker
+    """
+    global _worker_component
+    _worker_component = component
+    component.ensure_model_loaded()
+
+
+def _process_item_in_worker(*args, **kwargs):
+    """
+    Executes wrapper_process_item of the worker's component. Used as the submitted callable in process-pool mode.
+    """
+    return _worker_component.wrapper_process_item(*args, **kwargs)
+
+
+def _process_batch_in_worker(*args, **kwargs):
+    """
+    Executes wrapper_process_batch of the worker's component. Used as the submitted callable in process-pool mode.
+    """
+    return _worker_component.wrapper_process_batch(*args, **kwargs)
+
 
 @dataclass
 class PipelineComponent(ABC):
@@ -52,6 +105,301 @@ class PipelineComponent(ABC):
         self.file_performance_column_name = self.config.get('file_performance_column_name',
                                                             f'perf_{self.get_name()}_get_features')
         self.max_workers = self.config.get('max_workers', 4)
+        self.max_in_flight = max(self.config.get('max_in_flight', 4 * self.max_workers), 1)
+        self.executor_type = self.config.get('executor', 'thread')
+        if self.executor_type not in EXECUTOR_TYPES:
+            raise ValueError(f"Unknown executor '{self.executor_type}' for {self.component_name}, "
+                             f"choose from {EXECUTOR_TYPES}")
+        # forking copies the locks held by other threads (model preloading, progress bars), so it is opt-in
+        default_start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        self.process_start_method = self.config.get('process_start_method', default_start_method)
+        self.batch_size = max(self.config.get('batch_size', 1), 1)
+        self.max_batch_seconds = self.config.get('max_batch_seconds', None)
+        self.payload_format = validate_payload_format(self.config.get('payload_format', 'csv'))
+        self._model_lock = threading.RLock()
+        self._event_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.profiler = self.create_profiler()
+        self._ledger: Optional[CompletionLedger] = None
+        self._result_cache: Optional[ResultCache] = None
+        # the references to the models acquired from the ModelRegistry, released by release_models or when the
+        # component is garbage collected
+        self._model_references: List[weakref.finalize] = []
+        self._stream_executor: Optional[Executor] = None  # shared by the chunks of a stream, see streaming
+        self._stream_progress: Optional[tqdm] = None
+        self.configure_audio_cache()
+
+    # whether the component can process a part of the dataset independently of the rest of it
+    # (see Pipeline.process_stream).
+    # Corpus-level components (e.g. clusterers) and components creating the dataset set it to False
+    streamable: bool = True
+
+    # whether the results of process_item depend only on the input file and the configuration, so they can be served
+    # from the result cache (see get_result_cache)
+    cacheable: bool = False
+
+    # metadata column groups (keys of ComponentPayload.metadata, e.g. 'paths_column', 'feature_columns',
+    # 'classification_columns') whose columns the component reads and adds. Components declaring them, which neither
+    # change the rows of the payload nor depend on each other, run concurrently (see ComponentScheduler).
+    # None (unknown) makes the component run alone
+    reads_column_groups: Optional[Tuple[str, ...]] = None
+    writes_column_groups: Optional[Tuple[str, ...]] = None
+
+    # attributes holding loaded models, which are not sent to spawned process-pool workers (they reload them instead)
+    process_worker_reloaded_attributes = ('model', 'utils', 'processor', 'tokenizer')
+
+    # configuration keys which do not change the results of process_item, so results cached by a run with other values
+    # are served (see restore_cached_items)
+    result_cache_ignored_keys = ('output_dir', 'pretrained_models_dir', 'device', 'huggingface_ACCESS_TOKEN')
+
+    # root-level configuration keys which change the component's output, hashed by get_config_hash with its own section
+    config_hash_root_keys = ('sampling_rate', 'segment_name_separator', 'virtual_segments')
+
+    # configuration keys which do not affect the component's output, ignored by get_config_hash
+    config_hash_ignored_keys = ('max_workers', 'max_in_flight', 'executor', 'process_start_method', 'batch_size',
+                                'max_batch_seconds', 'stream_chunk_size', 'stream_queue_size', 'profiling', 'ledger',
+                                'result_cache', 'model_registry', 'model_store', 'model_preloading', 'audio_cache',
+                                'max_parallel_components', 'latent_logger', 'log_each_x_records', 'save_payload',
+                                'save_payload_periodicity', 'load_payload', 'payload_format',
+                                'intermediate_payload_path', 'performance_measurement', 'file_performance_column_name',
+                                'overwrite', 'dense_features')
+
+    def __getstate__(self) -> Dict:
+        state = self.__dict__.copy()
+        state.pop('_model_lock', None)
+        state['_event_loop'] = None
+        state['profiler'] = None  # items executed by process-pool workers are not profiled
+        state['_ledger'] = None  # completed items are recorded by the parent process only
+        state['_result_cache'] = None
+        state['_stream_executor'] = None
+        state['_stream_progress'] = None
+        state['_model_references'] = []  # workers acquire the models from the registry of their own process
+        for attribute in self.process_worker_reloaded_attributes:
+            state.pop(attribute, None)
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+        self._model_lock = threading.RLock()
+
+    def create_profiler(self) -> Optional[ComponentProfiler]:
+        """
+        Creates the component's profiler from the 'profiling' configuration (global or per component):
+        enabled - whether to profile the component (default False),
+        mode - 'sampling' (low overhead, safe for production, default) or 'deterministic' (cProfile),
+        sampling_interval - seconds between stack samples (default 0.01),
+        output_dir - where to write the profile files (default intermediate_payload_path).
+
+        :return: the profiler, or None if profiling is disabled
+        """
+        profiling = self.config.get('profiling') or {}
+        if not profiling.get('enabled', False):
+            return None
+        output_dir = profiling.get('output_dir', self.config.get('intermediate_payload_path', '.'))
+        return ComponentProfiler(f'{output_dir}/{self.component_type}_{self.component_name}_profile',
+                                 mode=profiling.get('mode', 'sampling'),
+                                 sampling_interval=profiling.get('sampling_interval', 0.01))
+
+    def profiled(self):
+        """
+        Context manager profiling the component for the duration of the with block, if profiling is enabled.
+        The profile files are written to the output directory at its end.
+        """
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.session()
+
+    @contextmanager
+    def streaming(self) -> Iterator['PipelineComponent']:
+        """
+        Context manager for processing a stream of chunks (see Pipeline.process_stream): the executor and the
+        progress bar of process_with_progress are created once and shared by the process calls of all the chunks,
+        instead of once per chunk.
+        """
+        self._stream_executor = self.create_executor()
+        self._stream_progress = tqdm(total=0, desc=self.get_name())
+        try:
+            yield self
+        finally:
+            self._stream_progress.close()
+            if self._stream_executor is not None:
+                self._stream_executor.shutdown()
+            self._stream_executor = None
+            self._stream_progress = None
+
+    def profiled_process(self, input_payload: ComponentPayload) -> ComponentPayload:
+        """
+        Calls process, profiling it if profiling is enabled. Used by the pipelines to execute the component.
+
+        :param input_payload: the input payload to process
+        :return: the output payload after processing
+        """
+        with self.profiled():
+            return self.process(input_payload)
+
+    def get_config_hash(self, ignored_keys: Tuple[str, ...] = ()) -> str:
+        """
+        Returns a hash of the component's own configuration section and of the root-level keys which change its
+        output (see config_hash_root_keys), ignoring the keys which do not affect its output
+        (see config_hash_ignored_keys). The input directory and the sections of the other components are not
+        hashed. Items completed with a different configuration are not resumed.
+
+        :param ignored_keys: more keys to ignore (e.g. result_cache_ignored_keys)
+        :return: hex digest of the configuration
+        """
+        config = {k: v for k, v in self.config.items()
+                  if (k in self._section_config_keys or k in self.config_hash_root_keys)
+                  and k not in self.config_hash_ignored_keys and k not in ignored_keys}
+        serialized = json.dumps(config, sort_keys=True, default=str)
+        return hashlib.sha1(f'{self.component_type}/{self.component_name}/{serialized}'.encode()).hexdigest()
+
+    def get_ledger(self) -> Optional[CompletionLedger]:
+        """
+        Returns the completion ledger configured by the 'ledger' option (global or per component):
+        enabled - whether to record completed items and skip them when the pipeline is restarted (default False),
+        path - the SQLite database file (default <intermediate_payload_path>/completion_ledger.sqlite),
+        commit_every - number of completed items between commits (default 50).
+
+        :return: the ledger, or None if it is disabled
+        """
+        ledger_config = self.config.get('ledger') or {}
+        if not ledger_config.get('enabled', False):
+            return None
+        if self._ledger is None:
+            path = ledger_config.get('path', f'{self.config.get("intermediate_payload_path", ".")}/'
+                                             f'completion_ledger.sqlite')
+            self._ledger = CompletionLedger.open(path, ledger_config.get('commit_every', 50))
+        return self._ledger
+
+    def get_result_cache(self) -> Optional[ResultCache]:
+        """
+        Returns the result cache configured by the 'result_cache' option (global or per component), for cacheable
+        components:
+        enabled - whether to serve the results of files processed before from the cache (default False),
+        path - the SQLite database file (default ~/.cache/vanpy/result_cache.sqlite, shared by all the runs),
+        max_size_mb - the cache size, above which the least recently used results are evicted (default 1024),
+        key - 'stat' to identify a file by its path, size and modification time (default) or 'content' to
+        identify it by a hash of its content (also hits copies of a file).
+
+        :return: the cache, or None if it is disabled or the component is not cacheable
+        """
+        cache_config = self.config.get('result_cache') or {}
+        if not self.cacheable or not cache_config.get('enabled', False):
+            return None
+        if self._result_cache is None:
+            path = cache_config.get('path', os.path.join(os.path.expanduser('~'), '.cache', 'vanpy',
+                                                         'result_cache.sqlite'))
+            max_size_mb = cache_config.get('max_size_mb', 1024)
+            max_size_bytes = None if max_size_mb is None else int(max_size_mb * 2 ** 20)
+            self._result_cache = ResultCache.open(os.path.expanduser(path), max_size_bytes,
+                                                  cache_config.get('key', 'stat'))
+        return self._result_cache
+
+    def ensure_model_loaded(self) -> None:
+        """
+        Loads the component's model if the component has one and it is not loaded yet.
+        Safe to call concurrently, the model is loaded only once.
+        """
+        if not hasattr(self, 'load_model'):
+            return
+        with self._model_lock:
+            if getattr(self, 'model', None) is None:
+                self.get_model_store()  # switches to offline mode before the model libraries are imported
+                self.load_model()
+
+    def get_model_size(self) -> int:
+        """
+        Returns the estimated memory held by the component's loaded models (see estimate_model_size).
+
+        :return: the size in bytes, 0 if no model is loaded
+        """
+        return sum(estimate_model_size(getattr(self, attribute, None))
+                   for attribute in self.process_worker_reloaded_attributes
+                   if getattr(self, attribute, None) is not None)
+
+    def get_model_store(self) -> ModelStore:
+        """
+        Returns the model store configured by the 'model_store' option (global or per component):
+        path - the store directory (default $VANPY_MODEL_STORE or ~/.cache/vanpy/models),
+        offline - whether to load the models from the store only, without any network access (default False,
+        also enabled by VANPY_OFFLINE=1).
+
+        :return: the store, shared by the components of the process
+        """
+        store_config = self.config.get('model_store') or {}
+        return ModelStore.open(store_config.get('path'), store_config.get('offline', False))
+
+    def get_model_artifacts(self) -> List[ModelArtifact]:
+        """
+        Returns the artifacts (files and repositories) load_model needs with the component's configuration,
+        fetched by `vanpy models prefetch` so the model can be loaded offline.
+        Components downloading models override it.
+
+        :return: the artifacts
+        """
+        return []
+
+    def get_model_file(self, url: str, filename: str, sha256: Optional[str] = None) -> str:
+        """
+        Returns the local path of a model file, fetched through the model store (see cached_download).
+
+        :param url: the URL of the file
+        :param filename: the name of the file in pretrained_models_dir
+        :param sha256: the expected checksum of the file, if known
+        :return: the path of the file
+        """
+        return cached_download(url, os.path.join(self.pretrained_models_dir, filename), sha256, self.get_model_store())
+
+    def configure_audio_cache(self) -> None:
+        """
+        Applies the 'audio_cache' options (enabled, max_size_mb) to the DecodedAudioCache of the process, which
+        serves the waveforms decoded by vanpy.utils.audio.load_audio to all the components. Without the options, the
+        cache keeps its current configuration.
+        """
+        audio_cache_config = self.config.get('audio_cache')
+        if audio_cache_config is None:
+            return
+        enabled = audio_cache_config.get('enabled', True)
+        max_size_mb = audio_cache_config.get('max_size_mb', 256)
+        DecodedAudioCache.get_instance().set_max_size(int(max_size_mb * 2 ** 20) if enabled else 0)
+
+    def acquire_model(self, loader: str, checkpoint: str, load: Callable[[], Any], device: str = 'cpu',
+                      **options) -> Any:
+        """
+        Returns a model shared by all the components of the process (see ModelRegistry), loading it with load
+        only if no other component loaded the same (loader, checkpoint, device, options) yet.
+        The model must be treated as read-only. The reference is released by release_models, or when the component
+        is garbage collected.
+        The registry's memory budget is set by the 'model_registry.memory_budget_mb' option.
+
+        :param loader: the name of the loading function (e.g. 'speechbrain.EncoderClassifier')
+        :param checkpoint: the checkpoint (e.g. 'speechbrain/spkrec-ecapa-voxceleb')
+        :param load: function loading the model
+        :param device: the device the model is loaded to
+        :param options: other loading options which change the loaded model
+        :return: the model
+        """
+        registry = ModelRegistry.get_instance()
+        memory_budget_mb = (self.config.get('model_registry') or {}).get('memory_budget_mb')
+        if memory_budget_mb is not None:
+            registry.set_memory_budget(int(memory_budget_mb * 2 ** 20))
+        key = registry.get_key(loader, checkpoint, device, **options)
+        model = registry.acquire(key, load)
+        reference = weakref.finalize(self, registry.release, key)
+        reference.atexit = False  # the registry goes away with the process
+        self._model_references.append(reference)
+        return model
+
+    def release_models(self) -> None:
+        """
+        Releases the models the component acquired from the ModelRegistry (they are loaded again when needed).
+        Unreferenced models stay loaded for other components until the registry's memory budget is exceeded.
+        """
+        for reference in self._model_references:
+            reference()  # a finalizer runs once, the reference is not released again when the component is collected
+        self._model_references = []
+        for attribute in self.process_worker_reloaded_attributes:
+            if getattr(self, attribute, None) is not None:
+                setattr(self, attribute, None)
 
     def latent_info_log(self, message: str, iteration: int, last_item: bool = False) -> None:
         """
@@ -72,9 +420,10 @@ class PipelineComponent(ABC):
         :return: the imported configuration as a dictionary
         """
         if self.component_type in yaml_config and self.component_name in yaml_config[self.component_type]:
-            config = yaml_config[self.component_type][self.component_name]
+            config = dict(yaml_config[self.component_type][self.component_name] or {})  # the section is not modified
         else:
             config = {}
+        self._section_config_keys = frozenset(config)  # the keys of the component's own section, see get_config_hash
         for item in yaml_config:  # pass through all root level configs
             if isinstance(item, str) and item not in config:
                 config[item] = yaml_config[item]
@@ -107,66 +456,456 @@ class PipelineComponent(ABC):
         """
         raise NotImplementedError
 
+    async def aprocess(self, input_payload: ComponentPayload) -> ComponentPayload:
+        """
+        Asynchronous version of process, for use inside an asyncio event loop (e.g. an async web service).
+        The model is loaded (once, even if several requests arrive concurrently) and the payload is processed
+        in the loop's default executor, so the event loop is not blocked. Components can override it with
+        a native asynchronous implementation.
+
+        :param input_payload: the input payload to process
+        :return: the output payload after processing
+        """
+        loop = asyncio.get_running_loop()
+        self._event_loop = loop
+        await loop.run_in_executor(None, self.ensure_model_loaded)
+        return await loop.run_in_executor(None, self.profiled_process, input_payload)
+
+    def get_serving_event_loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        """
+        Returns the event loop the component is served from (see aprocess), if coroutines can be submitted to it
+        from the current thread (e.g. from process_item running in a worker thread).
+
+        :return: the running event loop, or None if the component is not served from an event loop
+                 or the current thread is the event loop thread
+        """
+        loop = self._event_loop
+        if loop is None or not loop.is_running():
+            return None
+        try:
+            if asyncio.get_running_loop() is loop:
+                return None
+        except RuntimeError:
+            pass
+        return loop
+
     def process_item(self, *args, **kwargs):
         """
         Processes a single item from the input payload.
         To be used in process_with_progress.
+
+        Implementations should return a record (a dict of column name to value), a list of records (e.g. one per
+        segment), or None. One-row DataFrames are still accepted for backward compatibility.
         """
         raise NotImplementedError
 
-    def wrapper_process_item(self, q: Queue, *args, **kwargs):
+    def wrapper_process_item(self, *args, **kwargs) -> Tuple[Any, float, StageTimings]:
         """
         Wrapper function to process a single item from the input payload.
         To be used in process_with_progress.
+
+        :return: tuple of the process_item result, the time it took to produce it and the stage spans recorded
+                 by process_item through timed
         """
-        start_time = time.time()
-        result = self.process_item(*args, **kwargs)
-        end_time = time.time()
-        q.put(end_time - start_time)
-        return result
+        with measure_item() as timings, self.profiler.track() if self.profiler else nullcontext():
+            start_time = time.perf_counter()
+            result = self.process_item(*args, **kwargs)
+            end_time = time.perf_counter()
+        return result, end_time - start_time, timings
 
-    def process_with_progress(self, iterable, metadata,  *args, **kwargs) -> pd.DataFrame:
+    def timed(self, stage: str, record: Optional[Dict] = None):
+        """
+        Context manager measuring a processing stage of the item being processed (e.g. decode, inference,
+        cut_and_write, see vanpy.utils.timing). The measured spans are reported in perf_<component>_<stage>
+        columns, with the rest of the item's time reported as perf_<component>_bookkeeping.
+        Spans of the whole item are divided between the rows it produced, unless a record is given,
+        in which case the span is attributed to that row only (e.g. cutting a single segment).
+        Does nothing if performance_measurement is disabled.
+
+        :param stage: the stage name
+        :param record: optional record (row) the span belongs to
+        """
+        if not self.performance_measurement:
+            return nullcontext()
+        return span(stage, self.get_stage_performance_column_name(stage), record)
+
+    def get_stage_performance_column_name(self, stage: str) -> str:
+        """
+        :param stage: the stage name
+        :return: the name of the column holding the stage duration
+        """
+        return f'perf_{self.get_name()}_{stage}'
+
+    def process_batch(self, items: List, *args, **kwargs) -> List:
+        """
+        Optional hook for processing several items with a single model call. Components implementing it are
+        fed batches of up to batch_size items of similar duration, under the max_batch_seconds budget
+        (see vanpy.utils.batching.make_batches). vanpy.utils.batching.pad_signals can be used to create the padded
+        model input, its lengths and attention mask.
+
+        :param items: the items of the batch (the first argument of process_item)
+        :param args: additional positional arguments, as passed to process_item
+        :param kwargs: additional keyword arguments, as passed to process_item
+        :return: list with a process_item-like result for each item, in the order of the items
+        """
+        raise NotImplementedError
+
+    def is_batching_enabled(self) -> bool:
+        """
+        :return: True if the component implements process_batch and batch_size is larger than 1
+        """
+        return self.batch_size > 1 and type(self).process_batch is not PipelineComponent.process_batch
+
+    def create_batches(self, items: List) -> List[List]:
+        """
+        Groups the items (audio file paths) into batches by their duration.
+
+        :param items: audio file paths
+        :return: list of batches of paths
+        """
+        durations = [get_audio_duration(item) for item in items]
+        return [[items[i] for i in batch] for batch in make_batches(durations, self.batch_size, self.max_batch_seconds)]
+
+    def process_batch_with_retry(self, items: List, *args, **kwargs) -> List:
+        """
+        Calls process_batch. When the batch runs out of memory, the batch size is halved (for the rest of the
+        processing as well) and the batch is retried in smaller parts, down to single items processed by
+        process_item. Batches failing for other reasons are retried item by item, so a single bad file does not
+        drop its whole batch.
+
+        :param items: the items of the batch
+        :return: list with a result for each item
+        """
+        if len(items) > self.batch_size:
+            return [result for start in range(0, len(items), self.batch_size)
+                    for result in self.process_batch_with_retry(items[start:start + self.batch_size], *args, **kwargs)]
+        if len(items) == 1:
+            return [self.process_item(items[0], *args, **kwargs)]
+        try:
+            return self.process_batch(items, *args, **kwargs)
+        except Exception as e:
+            if not is_out_of_memory_error(e):
+                self.logger.warning(f'Batch processing failed ({e}), processing its {len(items)} items one by one')
+                return [self.process_item(item, *args, **kwargs) for item in items]
+            release_cached_memory()
+            self.batch_size = max(min(self.batch_size, len(items) // 2), 1)
+            self.logger.warning(f'Out of memory on a batch of {len(items)} items, reducing batch size to '
+                                f'{self.batch_size}')
+            return self.process_batch_with_retry(items, *args, **kwargs)
+
+    def wrapper_process_batch(self, items: List, *args, **kwargs) -> Tuple[List, float, StageTimings]:
+        """
+        Wrapper function to process a batch of items, the batch counterpart of wrapper_process_item.
+
+        :return: tuple of the list of results, the time it took to produce them and the stage spans of the batch
+        """
+        with measure_item() as timings, self.profiler.track() if self.profiler else nullcontext():
+            start_time = time.perf_counter()
+            results = self.process_batch_with_retry(items, *args, **kwargs)
+            end_time = time.perf_counter()
+        return results, end_time - start_time, timings
+
+    def create_executor(self) -> Optional[Executor]:
+        """
+        Creates the executor configured by the 'executor' option:
+        'sequential' - items are processed in the calling thread (no executor is created),
+        'thread' - a ThreadPoolExecutor with max_workers threads (default),
+        'process' - a ProcessPoolExecutor with max_workers processes. Each worker loads the model once in its
+        initializer. The workers are started with 'forkserver' (or 'spawn' where it is not available) by default,
+        since forking while the model preloading or progress bar threads hold locks can deadlock the workers.
+        'process_start_method: fork' lets the workers inherit the model already loaded by the parent instead,
+        when no other threads are running. Note that CUDA models can not be shared with forked workers.
+
+        :return: the executor, or None for sequential execution
+        """
+        if self.executor_type == 'sequential':
+            return None
+        if self.executor_type == 'process':
+            return ProcessPoolExecutor(max_workers=self.max_workers,
+                                       mp_context=multiprocessing.get_context(self.process_start_method),
+                                       initializer=_init_process_worker, initargs=(self,))
+        return ThreadPoolExecutor(max_workers=self.max_workers)
+
+    def iterate_processed_items(self, iterable, *args, batched: bool = False,
+                                **kwargs) -> Iterator[Tuple[Any, Future]]:
+        """
+        Submits the items of the iterable to process_item (or the batches of the iterable to process_batch, when
+        batched is set) using the configured executor and yields the items together with their completed futures,
+        in order of completion.
+
+        At most max_in_flight items are submitted at any time: a new item is submitted only when a previous one
+        completes, and completed futures are released as soon as they are yielded, so memory usage does not depend
+        on the number of items.
+
+        :param iterable: Items to process.
+        :param args: Additional positional arguments for processing.
+        :param batched: whether the iterable consists of batches of items, to be processed by process_batch
+        :param kwargs: Additional keyword arguments for processing.
+        :return: iterator of (item, future) tuples, the future result is a (result, time_taken, stage_timings) tuple
+        """
+        process_function = self.wrapper_process_batch if batched else self.wrapper_process_item
+        shared_executor = self._stream_executor
+        executor = shared_executor if shared_executor is not None else self.create_executor()
+        if executor is None:
+            for elem in iterable:
+                future = Future()
+                try:
+                    future.set_result(process_function(elem, *args, **kwargs))
+                except Exception as e:
+                    future.set_exception(e)
+                yield elem, future
+            return
+
+        submitted_function = process_function
+        if self.executor_type == 'process':
+            submitted_function = _process_batch_in_worker if batched else _process_item_in_worker
+        items = iter(iterable)
+        with executor if shared_executor is None else nullcontext():  # a stream's executor is shut down at its end
+            in_flight = {executor.submit(submitted_function, elem, *args, **kwargs): elem
+                         for elem in itertools.islice(items, self.max_in_flight)}
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    elem = in_flight.pop(future)
+                    for next_elem in itertools.islice(items, 1):
+                        in_flight[executor.submit(submitted_function, next_elem, *args, **kwargs)] = next_elem
+                    yield elem, future
+
+    def process_with_progress(self, iterable, metadata,  *args, row_ids: Optional[Sequence[int]] = None,
+                              **kwargs) -> pd.DataFrame:
         """
         Process items in parallel with progress tracking.
 
-        Handles parallel processing of items using ThreadPoolExecutor, with
-        progress bar and performance monitoring.
+        Handles parallel processing of items using the configured executor (sequential, thread or process pool),
+        with progress bar and performance monitoring. At most max_in_flight items are submitted at a time.
+        Components implementing process_batch get their items grouped into batches when batch_size is larger than 1,
+        the performance measurement of a batch is divided evenly between its items.
+        Results are accumulated in a ResultCollector and materialized into a single DataFrame at the end
+        (or at each save checkpoint).
 
         :param iterable: Items to process.
         :param metadata: Metadata for processing.
         :param args: Additional positional arguments for processing.
+        :param row_ids: The payload row id of every item (see get_input_rows), added to the item's results
+            in the row_id column, so they can be attached to the payload with attach_results / expand_rows.
         :param kwargs: Additional keyword arguments for processing.
         :return: DataFrame containing processed results.
         """
-        self.logger.debug(f"Executing process_with_progress using {self.max_workers} thread workers")
-        n_df = pd.DataFrame()
-        time_queue = Queue()
-
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = {executor.submit(self.wrapper_process_item, time_queue, elem, *args, **kwargs): elem for elem in
-                       iterable}
+        self.logger.debug(f"Executing process_with_progress using {self.max_workers} {self.executor_type} workers")
+        collector = ResultCollector()
+        item_row_ids = defaultdict(deque)  # items may repeat, each occurrence gets the next row id
+        if row_ids is not None:
+            iterable = list(iterable)
+            for item, row_id in zip(iterable, row_ids):
+                item_row_ids[item].append(int(row_id))
+        ledger = self.get_ledger()
+        if ledger is not None:
+            config_hash = self.get_config_hash()
+            iterable = self.restore_completed_items(ledger, config_hash, list(iterable), collector, item_row_ids)
+        cache = self.get_result_cache()
+        cache_keys, cache_entries = {}, []
+        if cache is not None:
+            iterable, cache_keys = self.restore_cached_items(cache, list(iterable), collector, item_row_ids)
+        total = len(iterable) if hasattr(iterable, '__len__') else None
+        batched = self.is_batching_enabled()
+        if batched:
+            iterable = self.create_batches(list(iterable))
+            self.logger.debug(f'Processing {total} items in {len(iterable)} batches')
 
-            for i, future in enumerate(tqdm(as_completed(futures), total=len(futures))):
-                elem = futures[future]
+        i = 0
+        checkpoint = None
+        if self._stream_progress is not None:  # a chunk of a stream, see streaming
+            progress_bar = nullcontext(self._stream_progress)
+            self._stream_progress.total += total or 0
+            self._stream_progress.refresh()
+        else:
+            progress_bar = tqdm(total=total)
+        with progress_bar as progress:
+            for elem, future in self.iterate_processed_items(iterable, *args, batched=batched, **kwargs):
+                elems = elem if batched else [elem]
                 try:
-                    f_df = future.result()
-                    time_taken = time_queue.get()
-                    self.add_performance_metadata(f_df, time_taken)
-                    n_df = pd.concat([n_df, f_df], ignore_index=True, axis=0)
-                    if self.latent_logger_enabled:
-                        self.latent_info_log(
-                            f'{self.component_name} processed {elem}, {i + 1}/{len(iterable)} in {time_taken} seconds',
-                            iteration=i, last_item=(i == len(iterable) - 1))
-                    self.save_intermediate_payload(i, ComponentPayload(metadata=metadata, df=n_df))
+                    results, time_taken, timings = future.result()
+                    if not batched:
+                        results = [results]
+                    item_time_taken = time_taken / max(len(elems), 1)
+                    item_timings = timings.scaled(1 / len(elems)) if len(elems) > 1 else timings
+                    for item, result in zip(elems, results):
+                        performance = self.get_performance_metadata(item_time_taken, item_timings,
+                                                                    ResultCollector.count_records(result))
+                        collector.add(result, **performance, **self.pop_row_id(item_row_ids, item))
+                        if ledger is not None and result is not None:  # failed items are retried on resume
+                            ledger.record(self.get_name(), config_hash, item, (result, performance))
+                        if item in cache_keys and result is not None:
+                            cache_entries.append((cache_keys[item], self.get_name(), (item, result)))
+                            if len(cache_entries) >= 50:
+                                cache.put_many(cache_entries)
+                                cache_entries = []
+                        if self.latent_logger_enabled:
+                            self.latent_info_log(
+                                f'{self.component_name} processed {item}, {i + 1}/{total} in {item_time_taken} seconds',
+                                iteration=i, last_item=(total is not None and i == total - 1))
+                        if self.is_intermediate_save_due(i):
+                            checkpoint = self.save_checkpoint(checkpoint, metadata, collector)
+                        i += 1
                 except (RuntimeError, AssertionError, ValueError, TypeError) as e:
                     self.logger.error(f'An error occurred in {elem}: {e}')
+                    i += len(elems)
+                progress.update(len(elems))
+
+        if ledger is not None:
+            ledger.flush()
+        if cache is not None:
+            cache.put_many(cache_entries)
+            self.logger.info(f'{self.get_name()} result cache: {cache.get_stats()}')
+        if checkpoint is not None:
+            self.save_checkpoint(checkpoint, metadata, collector).close()
+        self.add_stage_performance_columns_to_metadata(metadata, collector.columns)
+        return collector.to_df()
 
-        return n_df
+    def restore_completed_items(self, ledger: CompletionLedger, config_hash: str, items: List,
+                                collector: ResultCollector, item_row_ids: Optional[Dict] = None) -> List:
+        """
+        Adds the rows of the items completed by a previous run (recorded in the ledger with the same configuration)
+        to the collector.
+
+        :param ledger: the completion ledger
+        :param config_hash: hash of the component's configuration
+        :param items: the items to process
+        :param collector: the collector of the processed results
+        :param item_row_ids: the pending row ids of every item (see process_with_progress)
+        :return: the items which are not completed yet
+        """
+        completed = ledger.get_completed(self.get_name(), config_hash)
+        if not completed:
+            return items
+        remaining = []
+        for item in items:
+            restored = completed.get(str(item))
+            if restored is None:
+                remaining.append(item)
+            else:
+                result, performance = restored
+                collector.add(result, **performance, **self.pop_row_id(item_row_ids or {}, item))
+        if len(remaining) < len(items):
+            self.logger.info(f'Resuming {self.get_name()}: skipping {len(items) - len(remaining)} items completed '
+                             f'by a previous run, {len(remaining)} items left')
+        return remaining
+
+    def restore_cached_items(self, cache: ResultCache, items: List, collector: ResultCollector,
+                             item_row_ids: Optional[Dict] = None) -> Tuple[List, Dict]:
+        """
+        Adds the cached results of the items processed before (by any run, with the same model-relevant configuration:
+        the component's own section without result_cache_ignored_keys, see get_config_hash) to the collector.
+        A result cached for a different path with the same content gets the item's path instead.
+
+        :param cache: the result cache
+        :param items: the items to process
+        :param collector: the collector of the processed results
+        :param item_row_ids: the pending row ids of every item (see process_with_progress)
+        :return: tuple of the items which are not cached and the cache key of every cacheable item
+        """
+        config_hash = self.get_config_hash(self.result_cache_ignored_keys)
+        cache_keys = {}
+        for item in dict.fromkeys(items):
+            audio_key = cache.get_audio_key(item)
+            if audio_key is not None:
+                cache_keys[item] = cache.get_key(self.get_name(), config_hash, audio_key)
+        cached = cache.get_many(cache_keys.values())
+        remaining = []
+        for item in items:
+            entry = cached.get(cache_keys.get(item))
+            if entry is None:
+                remaining.append(item)
+                continue
+            cached_item, result = entry
+            if cached_item != item:
+                result = self.replace_item_in_result(result, cached_item, item)
+            collector.add(result, **self.get_performance_metadata(0.0, None, ResultCollector.count_records(result)),
+                          **self.pop_row_id(item_row_ids or {}, item))
+        if len(remaining) < len(items):
+            self.logger.info(f'{self.get_name()}: {len(items) - len(remaining)} results served from the result cache, '
+                             f'{len(remaining)} items left')
+        return remaining, cache_keys
+
+    @staticmethod
+    def replace_item_in_result(result: Union[Dict, List[Dict], pd.DataFrame], old_item, new_item):
+        """
+        :param result: a result of process_item
+        :param old_item: the item the result was produced for
+        :param new_item: another item
+        :return: the result, with the values equal to old_item (e.g. the input path column) replaced by new_item
+        """
+        if isinstance(result, pd.DataFrame):
+            return result.replace({old_item: new_item})
+        if isinstance(result, dict):
+            return {k: new_item if isinstance(v, str) and v == old_item else v for k, v in result.items()}
+        return [PipelineComponent.replace_item_in_result(record, old_item, new_item) for record in result]
+
+    @staticmethod
+    def pop_row_id(item_row_ids: Dict, item) -> Dict:
+        """
+        :param item_row_ids: the pending row ids of every item
+        :param item: a processed item
+        :return: the row_id column value of the item's results, empty if the item has no row id
+        """
+        pending = item_row_ids.get(item)
+        return {ROW_ID_COLUMN: pending.popleft()} if pending else {}
+
+    def get_input_rows(self, df: pd.DataFrame, input_column: str) -> Tuple[List, List[int]]:
+        """
+        Returns the component's input items (the non-empty values of the input column) and the ids of their
+        payload rows, to be passed to process_with_progress. Rows without an id get one (see ensure_row_ids).
+
+        :param df: the payload DataFrame
+        :param input_column: the input column (e.g. the paths column)
+        :return: tuple of the input items and their row ids
+        """
+        ensure_row_ids(df)
+        rows = df[df[input_column].notna()]
+        return rows[input_column].tolist(), rows[ROW_ID_COLUMN].tolist()
+
+    @staticmethod
+    def get_remaining_row_ids(items: List, row_ids: List[int], remaining_items: List) -> List[int]:
+        """
+        :param items: input items (see get_input_rows)
+        :param row_ids: the row ids of the items
+        :param remaining_items: the items left to process, in their original order (e.g. the files which were not
+            processed by a previous run)
+        :return: the row ids of the remaining items
+        """
+        if len(remaining_items) == len(items):
+            return row_ids
+        remaining = set(remaining_items)
+        return [row_id for item, row_id in zip(items, row_ids) if item in remaining]
+
+    def get_payload_path_prefix(self, kind: str, subscript: str) -> str:
+        """
+        :param kind: 'df' or 'metadata'
+        :param subscript: 'intermediate' or 'final'
+        :return: the path (without extension) of a saved payload file of the component
+        """
+        return f'{self.config["intermediate_payload_path"]}/{self.component_type}_{self.component_name}_{kind}_' \
+               f'{datetime.now().strftime("%Y%m%d%H%M%S")}_{subscript}'
+
+    def save_metadata(self, metadata: Dict, subscript: str) -> None:
+        """
+        Saves the payload metadata as a pickle file.
+
+        :param metadata: the metadata to save
+        :param subscript: 'intermediate' or 'final'
+        """
+        if metadata:
+            metadata = {k: v for k, v in metadata.items() if k != FEATURE_BLOCKS_KEY}  # saved as DataFrame columns
+            with open(f'{self.get_payload_path_prefix("metadata", subscript)}.pickle', 'wb') as handle:
+                pickle.dump(metadata, handle, protocol=pickle.HIGHEST_PROTOCOL)
 
     # @staticmethod
     def save_component_payload(self, input_payload: ComponentPayload, intermediate=False) -> None:
         """
-        Saves the input payload to disk, if specified in the configuration.
+        Saves the input payload to disk, if specified in the configuration, in the configured payload_format:
+        'csv' - the wide DataFrame as a CSV file and the metadata as a pickle file,
+        'parquet' / 'arrow' - a single typed file holding the DataFrame, the feature blocks and the metadata
+        (see vanpy.utils.payload_io.write_payload), which can be loaded back with ComponentPayload.load.
 
         :param input_payload: the input payload to save
         :param intermediate: whether this is an intermediate payload or the final payload
@@ -176,18 +915,44 @@ class PipelineComponent(ABC):
             f'Called Saved payload {self.get_name(), self.config.get("save_payload", False)}, intermediate {intermediate}')
         if self.config.get("save_payload", False):
             create_dirs_if_not_exist(self.config["intermediate_payload_path"])
-            metadata, df = input_payload.unpack()
-            if metadata:
-                with open(
-                        f'{self.config["intermediate_payload_path"]}/{self.component_type}_{self.component_name}_metadata_{datetime.now().strftime("%Y%m%d%H%M%S")}_{subscript}.pickle',
-                        'wb') as handle:
-                    pickle.dump(metadata, handle, protocol=pickle.HIGHEST_PROTOCOL)
-            # input_payload.get_classification_df(all_paths_columns=True, meta_columns=True).to_csv(f'{self.config["intermediate_payload_path"]}/{self.component_type}_{self.component_name}_clf_df_{datetime.now().strftime("%Y%m%d%H%M%S")}_{subscript}.csv')
-            df.to_csv(
-                f'{self.config["intermediate_payload_path"]}/{self.component_type}_{self.component_name}_df_{datetime.now().strftime("%Y%m%d%H%M%S")}_{subscript}.csv',
-                index=False)
+            path = f'{self.get_payload_path_prefix("df", subscript)}.{PAYLOAD_EXTENSIONS[self.payload_format]}'
+            if self.payload_format == 'csv':
+                self.save_metadata(input_payload.metadata, subscript)
+                # input_payload.get_classification_df(all_paths_columns=True, meta_columns=True).to_csv(f'{self.config["intermediate_payload_path"]}/{self.component_type}_{self.component_name}_clf_df_{datetime.now().strftime("%Y%m%d%H%M%S")}_{subscript}.csv')
+                write_df(input_payload.get_wide_df(), path)
+            else:
+                write_payload(path, input_payload.get_serializable_metadata(), input_payload.df,
+                              input_payload.feature_blocks, self.payload_format)
             self.get_logger().info(f'Saved payload in {self.config["intermediate_payload_path"]}')
 
+    def save_checkpoint(self, writer: Optional[AppendOnlyDataFrameWriter], metadata: Dict,
+                        collector: ResultCollector) -> Optional[AppendOnlyDataFrameWriter]:
+        """
+        Saves the rows collected since the previous checkpoint of process_with_progress, if save_payload is enabled.
+        The first checkpoint opens an append-only file in the configured payload_format and saves the metadata
+        (as a pickle file for csv, in the file itself for parquet and arrow), the following checkpoints only append
+        the new rows to it.
+
+        :param writer: the writer returned by the previous checkpoint, None for the first checkpoint
+        :param metadata: the payload metadata
+        :param collector: the collector of the processed results
+        :return: the writer, to be passed to the next checkpoint (and closed at the end), or None if saving is disabled
+        """
+        if not self.config.get("save_payload", False):
+            return None
+        if writer is None:
+            create_dirs_if_not_exist(self.config["intermediate_payload_path"])
+            path_prefix = self.get_payload_path_prefix('df', 'intermediate')
+            if self.payload_format == 'csv':
+                self.save_metadata(metadata, 'intermediate')
+                writer = AppendOnlyDataFrameWriter(path_prefix)
+            else:
+                writer = AppendOnlyDataFrameWriter(path_prefix, self.payload_format,
+                                                   {k: v for k, v in metadata.items() if k != FEATURE_BLOCKS_KEY})
+        appended = writer.append(collector.to_df(start=writer.rows_written))
+        self.get_logger().info(f'Saved {appended} new rows to {writer.path}')
+        return writer
+
     def save_intermediate_payload(self, i: int, input_payload: ComponentPayload):
         """
         Save intermediate payload based on the save_payload_periodicity configuration.
@@ -195,9 +960,19 @@ class PipelineComponent(ABC):
         :param i: current iteration count
         :param input_payload: the payload to be saved
         """
-        if 'save_payload_periodicity' in self.config and i % self.config['save_payload_periodicity'] == 0 and i > 0:
+        if self.is_intermediate_save_due(i):
             self.save_component_payload(input_payload, intermediate=True)
 
+    def is_intermediate_save_due(self, i: int) -> bool:
+        """
+        Checks whether an intermediate payload should be saved at the given iteration, based on the
+        save_payload_periodicity configuration.
+
+        :param i: current iteration count
+        :return: True if an intermediate save is due
+        """
+        return 'save_payload_periodicity' in self.config and i % self.config['save_payload_periodicity'] == 0 and i > 0
+
     def add_performance_column_to_metadata(self, metadata: Dict) -> Dict:
         """
         Adds a performance column to the metadata.
@@ -230,6 +1005,43 @@ class PipelineComponent(ABC):
             self.logger.warning(f'No classification columns were added to metadata for {self.get_name()}')
         return metadata
 
+    def get_performance_metadata(self, time_taken: float, timings: Optional[StageTimings] = None,
+                                 rows_count: int = 1) -> Dict:
+        """
+        Returns the performance columns to be added to every row produced by a processed item.
+        The item's time (and its stage spans) is divided evenly between the rows the item produced,
+        so the per-row values of a file segmented into several rows sum up to the file's processing time.
+
+        :param time_taken: the time it took to process the item
+        :param timings: the stage spans recorded while processing the item (see timed)
+        :param rows_count: the number of rows produced by the item
+        :return: a dictionary with the performance columns, empty if performance measurement is disabled
+        """
+        if not self.performance_measurement:
+            return {}
+        performance = {}
+        if self.file_performance_column_name:
+            performance[self.file_performance_column_name] = time_taken / max(rows_count, 1)
+        if timings is not None and not timings.is_empty():
+            for stage, elapsed in timings.get_row_spans(time_taken, rows_count).items():
+                performance[self.get_stage_performance_column_name(stage)] = elapsed
+        return performance
+
+    def add_stage_performance_columns_to_metadata(self, metadata: Dict, columns: List[str]) -> Dict:
+        """
+        Adds the stage performance columns (perf_<component>_<stage>) found in columns to the metadata meta columns.
+
+        :param metadata: the metadata to add the columns to
+        :param columns: the columns of the processed results
+        :return: the metadata with the stage performance columns added
+        """
+        prefix = self.get_stage_performance_column_name('')
+        for column in columns:
+            if column.startswith(prefix) and column != self.file_performance_column_name and \
+                    column not in metadata['meta_columns']:
+                metadata['meta_columns'].append(column)
+        return metadata
+
     def add_performance_metadata(self, f_d: Union[pd.DataFrame, Dict], t_start: float, t_end: Union[None, float]=None):
         """
         Adds performance metadata for the audio segments.
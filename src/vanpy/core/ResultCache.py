@@ -0,0 +1,208 @@
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from vanpy.utils.audio import make_virtual_segment_path, parse_virtual_segment_path
+from vanpy.utils.utils import create_dirs_if_not_exist
+
+CACHE_KEY_MODES = ('content', 'stat')
+
+
+class ResultCache:
+    """
+    SQLite-backed, content-addressed cache of the results of process_item, shared across runs.
+
+    An entry is keyed by the identity of the input audio (a hash of its content, or its path, size and modification
+    time, see get_audio_key), the component name and the hash of the component's configuration (see
+    PipelineComponent.get_config_hash), so a file is processed once by a component with a given configuration,
+    no matter how many corpora or runs it appears in.
+
+    The cache is bounded by max_size_bytes: when it grows larger, the least recently used entries are evicted.
+    Hits, misses and evictions are counted (see get_stats).
+
+    Caches are shared per database path (see ResultCache.open) and are thread-safe.
+    """
+    _instances: Dict[str, 'ResultCache'] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path: str, max_size_bytes: Optional[int] = None, key_mode: str = 'stat'):
+        """
+        :param path: path of the SQLite database file, created if it does not exist
+        :param max_size_bytes: maximal total size of the cached results, unbounded if None
+        :param key_mode: how an input audio is identified, 'content' (a hash of the file's bytes) or
+            'stat' (its path, size and modification time, cheaper, but a moved file is a new file)
+        """
+        if key_mode not in CACHE_KEY_MODES:
+            raise ValueError(f"Unknown result cache key mode '{key_mode}', choose from {CACHE_KEY_MODES}")
+        directory = os.path.dirname(path)
+        if directory:
+            create_dirs_if_not_exist(directory)
+        self.path = path
+        self.max_size_bytes = max_size_bytes
+        self.key_mode = key_mode
+        self.logger = logging.getLogger('ResultCache')
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS cached_results ('
+                                 'key TEXT PRIMARY KEY, component TEXT NOT NULL, result BLOB, size INTEGER, '
+                                 'last_access REAL)')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS cached_results_last_access '
+                                 'ON cached_results (last_access)')
+        self._connection.commit()
+        self._size = self._connection.execute('SELECT COALESCE(SUM(size), 0) FROM cached_results').fetchone()[0]
+
+    @classmethod
+    def open(cls, path: str, max_size_bytes: Optional[int] = None, key_mode: str = 'stat') -> 'ResultCache':
+        """
+        Returns the cache of the given database path, shared by all the components of the process.
+
+        :param path: path of the SQLite database file
+        :param max_size_bytes: maximal total size of the cached results, used when the cache is first opened
+        :param key_mode: 'content' or 'stat' (see ResultCache), used when the cache is first opened
+        :return: the cache
+        """
+        key = os.path.abspath(path)
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(path, max_size_bytes, key_mode)
+            return cls._instances[key]
+
+    @property
+    def size(self) -> int:
+        """
+        :return: the total size of the cached results in bytes
+        """
+        return self._size
+
+    def get_audio_key(self, path: str) -> Optional[str]:
+        """
+        :param path: an input audio file path
+        :return: the identity of the file's content, None if it is not a readable file (such items are not cached).
+            For a virtual segment, the identity of the source file's content and the segment's offsets.
+        """
+        source, start, stop = parse_virtual_segment_path(path)
+        if stop is not None:
+            source_key = self.get_audio_key(source)
+            return None if source_key is None else make_virtual_segment_path(source_key, start, stop)
+        try:
+            if self.key_mode == 'stat':
+                stat = os.stat(path)
+                return f'{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}'
+            digest = hashlib.sha1()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+            return digest.hexdigest()
+        except (OSError, TypeError):
+            return None
+
+    @staticmethod
+    def get_key(component: str, config_hash: str, audio_key: str) -> str:
+        """
+        :param component: the component name
+        :param config_hash: hash of the component's configuration
+        :param audio_key: the identity of the input audio (see get_audio_key)
+        :return: the cache key
+        """
+        return hashlib.sha1(f'{component}\0{config_hash}\0{audio_key}'.encode()).hexdigest()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Returns the cached results of the given keys, and marks them as recently used.
+
+        :param keys: cache keys
+        :return: dictionary of key to the cached result, for the keys found in the cache
+        """
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):  # keep below SQLite's bound parameters limit
+                chunk = keys[start:start + 500]
+                cursor = self._connection.execute(
+                    f'SELECT key, result FROM cached_results WHERE key IN ({",".join("?" * len(chunk))})', chunk)
+                found.update((key, pickle.loads(result)) for key, result in cursor)
+            now = time.time()
+            self._connection.executemany('UPDATE cached_results SET last_access = ? WHERE key = ?',
+                                         [(now, key) for key in found])
+            self._connection.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, entries: List[Tuple[str, str, Any]]) -> None:
+        """
+        Stores results, evicting the least recently used entries if the cache becomes larger than max_size_bytes.
+
+        :param entries: tuples of (key, component name, result), the result can be any picklable value
+        """
+        if not entries:
+            return
+        now = time.time()
+        rows = []
+        for key, component, result in entries:
+            blob = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+            rows.append((key, component, blob, len(blob), now))
+        with self._lock:
+            replaced = self._get_sizes([row[0] for row in rows])
+            self._connection.executemany('INSERT OR REPLACE INTO cached_results VALUES (?, ?, ?, ?, ?)', rows)
+            self._size += sum(row[3] for row in rows) - sum(replaced.values())
+            self._evict()
+            self._connection.commit()
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        :return: the hit, miss and eviction counts of the process, the number of entries and their total size
+        """
+        with self._lock:
+            entries = self._connection.execute('SELECT COUNT(*) FROM cached_results').fetchone()[0]
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'entries': entries,
+                    'size_bytes': self._size}
+
+    def clear(self, component: str = None) -> None:
+        """
+        Removes the entries of a component, or all the entries.
+
+        :param component: the component name, None for all components
+        """
+        with self._lock:
+            if component is None:
+                self._connection.execute('DELETE FROM cached_results')
+            else:
+                self._connection.execute('DELETE FROM cached_results WHERE component = ?', (component,))
+            self._connection.commit()
+            self._size = self._connection.execute('SELECT COALESCE(SUM(size), 0) FROM cached_results').fetchone()[0]
+
+    def _get_sizes(self, keys: List[str]) -> Dict[str, int]:
+        sizes = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            sizes.update(self._connection.execute(
+                f'SELECT key, size FROM cached_results WHERE key IN ({",".join("?" * len(chunk))})', chunk))
+        return sizes
+
+    def _evict(self) -> None:
+        if self.max_size_bytes is None or self._size <= self.max_size_bytes:
+            return
+        evicted = []
+        excess = self._size - self.max_size_bytes
+        cursor = self._connection.execute('SELECT key, size FROM cached_results ORDER BY last_access, rowid')
+        for key, size in cursor:
+            if excess <= 0:
+                break
+            evicted.append((key,))
+            excess -= size
+            self._size -= size
+        cursor.close()
+        self._connection.executemany('DELETE FROM cached_results WHERE key = ?', evicted)
+        self.evictions += len(evicted)
+        self.logger.debug(f'Evicted {len(evicted)} least recently used results')
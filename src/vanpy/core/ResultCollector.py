@@ -0,0 +1,111 @@
+from typing import Dict, Iterable, List, Union
+
+import pandas as pd
+
+
+class ResultCollector:
+    """
+    Columnar accumulator for the results produced by PipelineComponent.process_item.
+
+    Results are appended column-wise into plain Python lists, so adding a row is O(number of columns)
+    regardless of how many rows were already collected. A DataFrame is only materialized on request
+    (at the end of processing or at a save checkpoint).
+
+    Accepted results are a single record (dict), an iterable of records, or a DataFrame (kept for
+    backward compatibility with process_item implementations that still return one-row DataFrames).
+    Columns missing from a record are filled with None.
+    """
+
+    def __init__(self):
+        self._columns: Dict[str, List] = {}
+        self._rows_count = 0
+
+    def __len__(self) -> int:
+        return self._rows_count
+
+    @property
+    def columns(self) -> List[str]:
+        """
+        Returns the names of the collected columns, in order of first appearance.
+
+        :return: list of column names
+        """
+        return list(self._columns.keys())
+
+    @staticmethod
+    def count_records(result: Union[None, Dict, Iterable[Dict], pd.DataFrame]) -> int:
+        """
+        Returns the number of rows a result adds to the collector.
+
+        :param result: a record, a list of records or a DataFrame
+        :return: number of rows
+        """
+        if result is None:
+            return 0
+        if isinstance(result, dict):
+            return 1
+        return len(result)
+
+    def add(self, result: Union[None, Dict, Iterable[Dict], pd.DataFrame], **extra_columns) -> int:
+        """
+        Appends a result to the collector.
+
+        :param result: a record, an iterable of records or a DataFrame. None is ignored.
+        :param extra_columns: values that are added to every appended row (e.g. performance measurements),
+                              overriding values with the same name in the result.
+        :return: the number of appended rows
+        """
+        if result is None:
+            return 0
+        if isinstance(result, pd.DataFrame):
+            return self._add_frame(result, extra_columns)
+        if isinstance(result, dict):
+            result = [result]
+        added = 0
+        for record in result:
+            if extra_columns:
+                record = {**record, **extra_columns}
+            self._add_record(record)
+            added += 1
+        return added
+
+    def _add_record(self, record: Dict) -> None:
+        for key, value in record.items():
+            column = self._columns.get(key)
+            if column is None:
+                column = self._columns[key] = [None] * self._rows_count
+            column.append(value)
+        self._rows_count += 1
+        if len(record) != len(self._columns):
+            for column in self._columns.values():
+                if len(column) < self._rows_count:
+                    column.append(None)
+
+    def _add_frame(self, df: pd.DataFrame, extra_columns: Dict) -> int:
+        rows_count = len(df)
+        if rows_count == 0:
+            return 0
+        values = {c: df[c].tolist() for c in df.columns}
+        for key, value in extra_columns.items():
+            values[key] = [value] * rows_count
+        for key, column_values in values.items():
+            column = self._columns.get(key)
+            if column is None:
+                column = self._columns[key] = [None] * self._rows_count
+            column.extend(column_values)
+        self._rows_count += rows_count
+        for column in self._columns.values():
+            if len(column) < self._rows_count:
+                column.extend([None] * (self._rows_count - len(column)))
+        return rows_count
+
+    def to_df(self, start: int = 0) -> pd.DataFrame:
+        """
+        Materializes the collected rows into a DataFrame.
+
+        :param start: index of the first row to include, allows materializing only the rows added after a checkpoint
+        :return: DataFrame with the collected rows
+        """
+        if not self._columns:
+            return pd.DataFrame()
+        return pd.DataFrame({key: column[start:] for key, column in self._columns.items()})
@@ -5,6 +5,9 @@ import numpy as np
 import pandas as pd
 from vanpy.core.ComponentPayload import ComponentPayload
 from vanpy.core.PipelineComponent import PipelineComponent
+from vanpy.utils.audio import SAMPLING_RATE_KEY, load_audio
+from vanpy.utils.timing import DECODE, INFERENCE
+from vanpy.utils.row_ids import attach_results
 from typing import List
 import logging
 
@@ -18,6 +21,9 @@ class LibrosaFeaturesExtractor(PipelineComponent):
     """
     features: List[str] = None
     sampling_rate: int
+    cacheable = True
+    reads_column_groups = ('paths_column',)
+    writes_column_groups = ('feature_columns', 'meta_columns')
 
     def __init__(self, yaml_config: YAMLObject):
         """
@@ -37,59 +43,60 @@ class LibrosaFeaturesExtractor(PipelineComponent):
         numba_logger = logging.getLogger('numba')
         numba_logger.setLevel(logging.WARNING)
 
-    def process_item(self, f, input_column):
+    def process_item(self, f, input_column, source_sr=None):
         """
         Process a single audio file to extract librosa features.
 
         :param f: Path to the audio file.
         :param input_column: Name of the column containing file paths.
-        :return: DataFrame containing the extracted features.
+        :param source_sr: The sampling rate of the audio files, if recorded in the payload metadata.
+        :return: Record containing the extracted features.
         """
+        record = {input_column: f}
         try:
-            y, sr = librosa.load(f, sr=self.sampling_rate)
-            f_df = pd.DataFrame()
+            with self.timed(DECODE):
+                y, sr = load_audio(f, sr=self.sampling_rate, source_sr=source_sr)
 
-            if 'mfcc' in self.features:
-                mfcc = librosa.feature.mfcc(y=y, sr=self.sampling_rate, n_mfcc=self.n_mfcc)
-                mean_mfcc = np.mean(mfcc, axis=1)
-                for i, val in enumerate(mean_mfcc):
-                    f_df[f'mfcc_{i}'] = [val]
+            with self.timed(INFERENCE):
+                if 'mfcc' in self.features:
+                    mfcc = librosa.feature.mfcc(y=y, sr=self.sampling_rate, n_mfcc=self.n_mfcc)
+                    mean_mfcc = np.mean(mfcc, axis=1)
+                    for i, val in enumerate(mean_mfcc):
+                        record[f'mfcc_{i}'] = val
 
-                if 'delta_mfcc' in self.features:
-                    mean_delta_mfcc = np.mean(librosa.feature.delta(mfcc, mode='nearest'), axis=1)
-                    for i, val in enumerate(mean_delta_mfcc):
-                        f_df[f'd_mfcc_{i}'] = [val]
+                    if 'delta_mfcc' in self.features:
+                        mean_delta_mfcc = np.mean(librosa.feature.delta(mfcc, mode='nearest'), axis=1)
+                        for i, val in enumerate(mean_delta_mfcc):
+                            record[f'd_mfcc_{i}'] = val
 
-            if 'zero_crossing_rate' in self.features:
-                f_df['zero_crossing_rate'] = [np.count_nonzero(np.array(librosa.zero_crossings(y, pad=False))) / len(y)]
+                if 'zero_crossing_rate' in self.features:
+                    record['zero_crossing_rate'] = np.count_nonzero(np.array(librosa.zero_crossings(y, pad=False))) / len(y)
 
-            if 'spectral_centroid' in self.features:
-                f_df['spectral_centroid'] = [np.mean(librosa.feature.spectral_centroid(y=y, sr=self.sampling_rate))]
+                if 'spectral_centroid' in self.features:
+                    record['spectral_centroid'] = np.mean(librosa.feature.spectral_centroid(y=y, sr=self.sampling_rate))
 
-            if 'spectral_bandwidth' in self.features:
-                f_df['spectral_bandwidth'] = [np.mean(librosa.feature.spectral_bandwidth(y=y, sr=self.sampling_rate))]
+                if 'spectral_bandwidth' in self.features:
+                    record['spectral_bandwidth'] = np.mean(librosa.feature.spectral_bandwidth(y=y, sr=self.sampling_rate))
 
-            if 'spectral_contrast' in self.features:
-                f_df['spectral_contrast'] = [np.mean(librosa.feature.spectral_contrast(y=y, sr=self.sampling_rate))]
+                if 'spectral_contrast' in self.features:
+                    record['spectral_contrast'] = np.mean(librosa.feature.spectral_contrast(y=y, sr=self.sampling_rate))
 
-            if 'spectral_flatness' in self.features:
-                f_df['spectral_flatness'] = [np.mean(librosa.feature.spectral_flatness(y=y))]
+                if 'spectral_flatness' in self.features:
+                    record['spectral_flatness'] = np.mean(librosa.feature.spectral_flatness(y=y))
 
-            if 'f0' in self.features:
-                f0, _voiced_flag, _voiced_probs = librosa.pyin(y=y, sr=self.sampling_rate,
-                                                               fmin=librosa.note_to_hz('C2'),
-                                                               fmax=librosa.note_to_hz('C7'))
-                f_df['f0'] = [np.mean(f0)]
+                if 'f0' in self.features:
+                    f0, _voiced_flag, _voiced_probs = librosa.pyin(y=y, sr=self.sampling_rate,
+                                                                   fmin=librosa.note_to_hz('C2'),
+                                                                   fmax=librosa.note_to_hz('C7'))
+                    record['f0'] = np.mean(f0)
 
-            if 'tonnetz' in self.features:
-                f_df['tonnetz'] = [np.mean(librosa.feature.tonnetz(y=y, sr=self.sampling_rate))]
-
-            f_df[input_column] = f
+                if 'tonnetz' in self.features:
+                    record['tonnetz'] = np.mean(librosa.feature.tonnetz(y=y, sr=self.sampling_rate))
 
         except (FileNotFoundError, RuntimeError, TypeError, ParameterError) as e:
             self.logger.error(f'An error occurred processing {f}: {e}')
 
-        return f_df
+        return record
 
     def process(self, input_payload: ComponentPayload) -> ComponentPayload:
         """
@@ -100,13 +107,14 @@ class LibrosaFeaturesExtractor(PipelineComponent):
         """
         metadata, df = input_payload.unpack()
         input_column = metadata['paths_column']
-        paths_list = df[input_column].dropna().tolist()
+        paths_list, row_ids = self.get_input_rows(df, input_column)
 
         metadata = self.add_performance_column_to_metadata(metadata)
 
-        p_df = self.process_with_progress(paths_list, metadata, input_column)
+        p_df = self.process_with_progress(paths_list, metadata, input_column, row_ids=row_ids,
+                                          source_sr=metadata.get(SAMPLING_RATE_KEY))
 
-        df = pd.merge(left=df, right=p_df, how='left', on=input_column)
+        df = attach_results(df, p_df, input_column)
 
         # Add feature columns to metadata
         feature_columns = self.feature_columns
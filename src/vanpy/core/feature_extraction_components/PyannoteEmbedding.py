@@ -1,22 +1,33 @@
+import os
 import time
+from typing import List
+
 from yaml import YAMLObject
-from pyannote.audio import Inference
-from pyannote.audio import Model
 import numpy as np
 import pandas as pd
-import torch
 from vanpy.core.ComponentPayload import ComponentPayload
+from vanpy.core.ModelStore import ModelArtifact
 from vanpy.core.PipelineComponent import PipelineComponent
+from vanpy.utils.audio import get_pyannote_audio_input
+from vanpy.utils.timing import INFERENCE
 from vanpy.utils.utils import get_null_wav_path
+from vanpy.utils.row_ids import ROW_ID_COLUMN, attach_results
 
 
 class PyannoteEmbedding(PipelineComponent):
     """
     A feature extraction component that uses Pyannote models to generate speaker embeddings.
+    The embeddings are added to the payload as a dense feature block (see ComponentPayload.get_feature_matrix),
+    or as a column per dimension when dense_features is disabled.
 
     :ivar model: The loaded Pyannote inference model instance.
+    :ivar feature_columns: List of column names for the extracted features.
     """
     model = None
+    cacheable = True
+    reads_column_groups = ('paths_column',)
+    writes_column_groups = ('feature_columns', 'meta_columns')
+    feature_columns = None
 
     def __init__(self, yaml_config: YAMLObject):
         """
@@ -31,13 +42,24 @@ class PyannoteEmbedding(PipelineComponent):
         if self.ACCESS_TOKEN is None:
             raise KeyError(f'You need to pass huggingface_ACCESS_TOKEN to use {self.component_name} model')
 
+    def get_model_artifacts(self) -> List[ModelArtifact]:
+        """
+        :return: the (gated) pyannote/embedding repository
+        """
+        return [ModelArtifact('pyannote/embedding', kind='huggingface', token=self.ACCESS_TOKEN)]
+
     def load_model(self):
         """
         Load and initialize the Pyannote embedding model.
         Automatically selects GPU if available, otherwise uses CPU.
         """
-        model = Model.from_pretrained("pyannote/embedding",  # pyannote%2Fembedding
-                                      use_auth_token=self.ACCESS_TOKEN)
+        import torch
+        from pyannote.audio import Inference, Model
+        source = self.get_model_store().get_huggingface_source(self.get_model_artifacts()[0])
+        if os.path.isdir(source):  # the repository prefetched to the model store
+            source = os.path.join(source, 'pytorch_model.bin')
+        model = self.acquire_model('pyannote.Model', 'pyannote/embedding',
+                                   lambda: Model.from_pretrained(source, use_auth_token=self.ACCESS_TOKEN))
         if torch.cuda.is_available():
             self.model = Inference(model,
                                    window="sliding",
@@ -57,13 +79,13 @@ class PyannoteEmbedding(PipelineComponent):
 
         :param f: Path to the audio file.
         :param input_column: Name of the column containing file paths.
-        :return: DataFrame containing the extracted embeddings.
+        :return: Record containing the extracted embeddings.
         """
-        embedding = self.model(f)
-        f_df = pd.DataFrame(np.mean(embedding, axis=0)).T
-        f_df[input_column] = f
-        f_df.rename(columns={i: c for i, c in enumerate(self.get_feature_columns())}, inplace=True)
-        return f_df
+        with self.timed(INFERENCE):
+            embedding = self.model(get_pyannote_audio_input(f))
+        record = dict(zip(self.get_feature_columns(), np.mean(embedding, axis=0)))
+        record[input_column] = f
+        return record
 
     def process(self, input_payload: ComponentPayload) -> ComponentPayload:
         """
@@ -72,30 +94,40 @@ class PyannoteEmbedding(PipelineComponent):
         :param input_payload: Input payload containing audio file paths and metadata.
         :return: Output payload containing the extracted embeddings.
         """
-        if not self.model:
-            self.load_model()
+        self.ensure_model_loaded()
+        feature_columns = self.get_feature_columns()
 
         metadata, df = input_payload.unpack()
         input_column = metadata['paths_column']
-        paths_list = df[input_column].dropna().tolist()
+        paths_list, row_ids = self.get_input_rows(df, input_column)
 
         metadata = self.add_performance_column_to_metadata(metadata)
 
-        p_df = self.process_with_progress(paths_list, metadata, input_column)
+        p_df = self.process_with_progress(paths_list, metadata, input_column, row_ids=row_ids)
 
-        df = pd.merge(left=df, right=p_df, how='left', on=input_column)
-        return ComponentPayload(metadata=metadata, df=df)
+        if not self.config.get('dense_features', True):
+            df = attach_results(df, p_df, input_column)
+            return ComponentPayload(metadata=metadata, df=df)
+        df = attach_results(df, p_df.drop(columns=feature_columns, errors='ignore'), input_column)
+        payload = ComponentPayload(metadata=metadata, df=df)
+        if not p_df.empty:
+            payload.add_feature_block(self.get_name(), p_df, feature_columns, ROW_ID_COLUMN)
+        return payload
 
     def get_feature_columns(self):
         """
-        Generate the list of feature column names.
+        Generate the list of feature column names. The embedding size is found by embedding the null wav once,
+        the names are kept for the next calls (e.g. the next chunks of a stream).
 
         :return: List of column names for the extracted features.
         """
+        if self.feature_columns is not None:
+            return self.feature_columns
         feature_columns = []
-        embedding = self.model(get_null_wav_path())
+        embedding = self.model(get_pyannote_audio_input(get_null_wav_path()))
         f_df = pd.DataFrame(np.mean(embedding, axis=0)).T
         for c in f_df.columns:
             c = f'{c}_{self.get_name()}'
             feature_columns.append(c)
+        self.feature_columns = feature_columns
         return feature_columns
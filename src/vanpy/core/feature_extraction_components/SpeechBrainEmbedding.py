@@ -1,23 +1,31 @@
 import time
+from typing import List
 
 from yaml import YAMLObject
-import torchaudio
-from speechbrain.pretrained import EncoderClassifier
-import torch
 import pandas as pd
 from vanpy.core.ComponentPayload import ComponentPayload
+from vanpy.core.ModelStore import ModelArtifact
 from vanpy.core.PipelineComponent import PipelineComponent
+from vanpy.utils.audio import load_speechbrain_audio
+from vanpy.utils.timing import DECODE, INFERENCE
+from vanpy.utils.batching import pad_signals
 from vanpy.utils.utils import get_null_wav_path
+from vanpy.utils.row_ids import ROW_ID_COLUMN, attach_results
 
 
 class SpeechBrainEmbedding(PipelineComponent):
     """
     A feature extraction component that uses SpeechBrain models to generate embeddings from audio files.
+    The embeddings are added to the payload as a dense feature block (see ComponentPayload.get_feature_matrix),
+    or as a column per dimension when dense_features is disabled.
 
     :ivar model: The loaded SpeechBrain encoder model instance.
     :ivar feature_columns: List of column names for the extracted features.
     """
     model = None
+    cacheable = True
+    reads_column_groups = ('paths_column',)
+    writes_column_groups = ('feature_columns', 'meta_columns')
 
     def __init__(self, yaml_config: YAMLObject):
         """
@@ -29,17 +37,31 @@ class SpeechBrainEmbedding(PipelineComponent):
                          yaml_config=yaml_config)
         self.feature_columns = None
 
+    def get_model_artifacts(self) -> List[ModelArtifact]:
+        """
+        :return: the SpeechBrain repository of the configured model
+        """
+        return [ModelArtifact(f"speechbrain/{self.config.get('model', 'spkrec-ecapa-voxceleb')}", kind='huggingface')]
+
     def load_model(self):
         """
         Load and initialize the SpeechBrain encoder model.
         Automatically selects GPU if available, otherwise uses CPU.
         """
+        import torch
+        from speechbrain.pretrained import EncoderClassifier
         mdl = self.config.get('model', 'spkrec-ecapa-voxceleb')
+        source = self.get_model_store().get_huggingface_source(self.get_model_artifacts()[0])
         if torch.cuda.is_available():
-            self.model = EncoderClassifier.from_hparams(source=f"speechbrain/{mdl}", savedir=f"pretrained_models/{mdl}",
-                                                        run_opts={"device": "cuda"})
+            self.model = self.acquire_model('speechbrain.EncoderClassifier', f'speechbrain/{mdl}',
+                                            lambda: EncoderClassifier.from_hparams(source=source,
+                                                                                   savedir=f"pretrained_models/{mdl}",
+                                                                                   run_opts={"device": "cuda"}),
+                                            device='cuda')
         else:
-            self.model = EncoderClassifier.from_hparams(source=f"speechbrain/{mdl}", savedir=f"pretrained_models/{mdl}")
+            self.model = self.acquire_model('speechbrain.EncoderClassifier', f'speechbrain/{mdl}',
+                                            lambda: EncoderClassifier.from_hparams(source=source,
+                                                                                   savedir=f"pretrained_models/{mdl}"))
         self.logger.info(f'Loaded model to {"GPU" if torch.cuda.is_available() else "CPU"}')
 
     def process_item(self, f, input_column):
@@ -48,14 +70,38 @@ class SpeechBrainEmbedding(PipelineComponent):
 
         :param f: Path to the audio file.
         :param input_column: Name of the column containing file paths.
-        :return: DataFrame containing the extracted embeddings.
+        :return: Record containing the extracted embeddings.
         """
-        signal, fs = torchaudio.load(f)
-        embedding = self.model.encode_batch(signal)
-        f_df = pd.DataFrame(embedding.to('cpu').numpy().ravel()).T
-        f_df.columns = [c for c in self.feature_columns]
-        f_df[input_column] = f
-        return f_df
+        with self.timed(DECODE):
+            signal = load_speechbrain_audio(self.model, f).unsqueeze(0)
+        with self.timed(INFERENCE):
+            embedding = self.model.encode_batch(signal)
+        record = dict(zip(self.get_feature_columns(), embedding.to('cpu').numpy().ravel()))
+        record[input_column] = f
+        return record
+
+    def process_batch(self, paths, input_column):
+        """
+        Process a batch of audio files with a single model call. The signals are padded to the longest one and
+        their relative lengths are passed to the encoder, so the padding does not affect the embeddings.
+
+        :param paths: Paths to the audio files.
+        :param input_column: Name of the column containing file paths.
+        :return: List of records containing the extracted embeddings.
+        """
+        import torch
+        with self.timed(DECODE):
+            signals = [load_speechbrain_audio(self.model, f).numpy() for f in paths]
+            batch = pad_signals(signals)
+        with self.timed(INFERENCE):
+            embeddings = self.model.encode_batch(torch.from_numpy(batch.values),
+                                                 torch.from_numpy(batch.relative_lengths)).to('cpu').numpy()
+        records = []
+        for f, embedding in zip(paths, embeddings):
+            record = dict(zip(self.get_feature_columns(), embedding.ravel()))
+            record[input_column] = f
+            records.append(record)
+        return records
 
     def process(self, input_payload: ComponentPayload) -> ComponentPayload:
         """
@@ -64,34 +110,42 @@ class SpeechBrainEmbedding(PipelineComponent):
         :param input_payload: Input payload containing audio file paths and metadata.
         :return: Output payload containing the extracted embeddings.
         """
-        if not self.model:
-            self.load_model()
-
-        self.feature_columns = self.get_feature_columns()
+        self.ensure_model_loaded()
+        feature_columns = self.get_feature_columns()
 
         metadata, df = input_payload.unpack()
         input_column = metadata['paths_column']
-        paths_list = df[input_column].dropna().tolist()
+        paths_list, row_ids = self.get_input_rows(df, input_column)
 
         metadata = self.add_performance_column_to_metadata(metadata)
 
-        p_df = self.process_with_progress(paths_list, metadata, input_column)
+        p_df = self.process_with_progress(paths_list, metadata, input_column, row_ids=row_ids)
 
-        df = pd.merge(left=df, right=p_df, how='left', on=input_column)
-        return ComponentPayload(metadata=metadata, df=df)
+        if not self.config.get('dense_features', True):
+            df = attach_results(df, p_df, input_column)
+            return ComponentPayload(metadata=metadata, df=df)
+        df = attach_results(df, p_df.drop(columns=feature_columns, errors='ignore'), input_column)
+        payload = ComponentPayload(metadata=metadata, df=df)
+        if not p_df.empty:
+            payload.add_feature_block(self.get_name(), p_df, feature_columns, ROW_ID_COLUMN)
+        return payload
 
     def get_feature_columns(self):
         """
-        Generate the list of feature column names.
+        Generate the list of feature column names. The embedding size is found by encoding the null wav once,
+        the names are kept for the next calls (e.g. the next chunks of a stream).
 
         :return: List of column names for the extracted features.
         """
+        if self.feature_columns is not None:
+            return self.feature_columns
         feature_columns = []
-        signal, fs = torchaudio.load(get_null_wav_path())
+        signal = load_speechbrain_audio(self.model, get_null_wav_path()).unsqueeze(0)
         embedding = self.model.encode_batch(signal)
         f_df = pd.DataFrame(embedding.to('cpu').numpy().ravel()).T
         for c in f_df.columns:
             c = f'{c}_{self.get_name()}'
             feature_columns.append(c)
 
+        self.feature_columns = feature_columns
         return feature_columns
@@ -19,6 +19,9 @@ class AgglomerativeClusterer(BaseClassificationComponent):
     """
     model = None
     classification_column_name: str = ''
+    streamable = False  # clusters are computed over the whole dataset
+    reads_column_groups = ('feature_columns',)
+    writes_column_groups = ('classification_columns', 'meta_columns')
 
     def __init__(self, yaml_config: YAMLObject):
         """
@@ -42,13 +45,13 @@ class AgglomerativeClusterer(BaseClassificationComponent):
         :return: Output payload containing speaker diarization results.
         """
         payload_metadata, payload_df = input_payload.unpack()
-        features_columns = [column for column in payload_df.columns if column in self.requested_feature_list]
-        if len(features_columns) != len(self.requested_feature_list):
+        if not input_payload.has_features(self.requested_feature_list):
             self.logger.warning('Some requested features are not present in the input payload. Skipping diarization.')
             return ComponentPayload(metadata=payload_metadata, df=payload_df)
+        features = input_payload.get_feature_matrix(self.requested_feature_list)
 
         # Create mask for rows with all features present
-        valid_rows_mask = payload_df[features_columns].notna().all(axis=1)
+        valid_rows_mask = ~np.isnan(features).any(axis=1)
 
         # Initialize columns with None
         payload_df[self.classification_column_name] = None
@@ -60,10 +63,10 @@ class AgglomerativeClusterer(BaseClassificationComponent):
             return ComponentPayload(metadata=payload_metadata, df=payload_df)
 
         # Get indices of valid rows
-        valid_indices = valid_rows_mask[valid_rows_mask].index
+        valid_indices = payload_df.index[valid_rows_mask]
 
         # Normalize only valid rows
-        valid_features = payload_df.loc[valid_indices, features_columns].values
+        valid_features = features[valid_rows_mask]
         valid_features_normalized = normalize(valid_features, norm='l2')
 
         # Perform clustering only on valid rows
@@ -1,5 +1,4 @@
 import time
-import torch
 from yaml import YAMLObject
 from vanpy.core.ComponentPayload import ComponentPayload
 from vanpy.core.model_inference_components.BaseClassificationComponent import BaseClassificationComponent
@@ -19,6 +18,9 @@ class CosineDistanceClusterer(BaseClassificationComponent):
     """
     model = None
     classification_column_name: str = ''
+    streamable = False  # clusters are computed over the whole dataset
+    reads_column_groups = ('feature_columns',)
+    writes_column_groups = ('classification_columns', 'meta_columns')
 
     def __init__(self, yaml_config: YAMLObject):
         """
@@ -30,6 +32,7 @@ class CosineDistanceClusterer(BaseClassificationComponent):
                          yaml_config=yaml_config)
         self.classification_column_name = self.config.get('classification_column_name',
                                                           f'{self.component_name}_classification')
+        import torch
         self.similarity = torch.nn.CosineSimilarity(dim=-1, eps=1e-6)
         self.threshold = self.config.get('threshold', 0.25)
         self.requested_feature_list = self.build_requested_feature_list()
@@ -42,13 +45,13 @@ class CosineDistanceClusterer(BaseClassificationComponent):
         :return: Output payload containing speaker diarization results.
         """
         payload_metadata, payload_df = input_payload.unpack()
-        features_columns = [column for column in payload_df.columns if column in self.requested_feature_list]
-        if len(features_columns) != len(self.requested_feature_list):
+        if not input_payload.has_features(self.requested_feature_list):
             self.logger.warning('Some requested features are not present in the input payload. Skipping diarization.')
             return ComponentPayload(metadata=payload_metadata, df=payload_df)
+        features = input_payload.get_feature_matrix(self.requested_feature_list)
 
         # Create mask for rows with all features present
-        valid_rows_mask = payload_df[features_columns].notna().all(axis=1)
+        valid_rows_mask = ~np.isnan(features).any(axis=1)
 
         # Initialize columns with None
         payload_df[self.classification_column_name] = None
@@ -60,28 +63,26 @@ class CosineDistanceClusterer(BaseClassificationComponent):
             return ComponentPayload(metadata=payload_metadata, df=payload_df)
 
         # Get indices of valid rows
-        valid_indices = valid_rows_mask[valid_rows_mask].index
+        valid_indices = payload_df.index[valid_rows_mask]
         records_count = len(valid_indices)
 
         # Normalize only valid rows
-        payload_df_normalized = payload_df.loc[valid_indices, features_columns].apply(
-            lambda x: normalize(x.values.reshape(1, -1), norm='l2').reshape(-1),
-            axis=1
-        )
+        features_normalized = normalize(features[valid_rows_mask], norm='l2')
 
+        import torch
         ds = DisjointSet(records_count)
         performance_metric = []
 
         # Process only valid rows
         for i, idx_i in enumerate(valid_indices):
             t_start_transcribing = time.time()
-            emb1 = payload_df_normalized.iloc[i]
+            emb1 = features_normalized[i]
 
             for j, idx_j in enumerate(valid_indices):
                 if i == j:
                     continue
 
-                emb2 = payload_df_normalized.iloc[j]
+                emb2 = features_normalized[j]
                 if self.similarity(torch.Tensor(emb1), torch.Tensor(emb2)) > self.threshold:
                     ds.union(i, j)
                     break
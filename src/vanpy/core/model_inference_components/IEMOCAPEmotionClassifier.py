@@ -1,9 +1,16 @@
 import os
+from typing import List
+
 import pandas as pd
 from yaml import YAMLObject
 
 from vanpy.core.ComponentPayload import ComponentPayload
+from vanpy.core.ModelStore import ModelArtifact
 from vanpy.core.PipelineComponent import PipelineComponent
+from vanpy.utils.audio import load_speechbrain_audio
+from vanpy.utils.timing import DECODE, INFERENCE
+from vanpy.utils.batching import is_out_of_memory_error, pad_signals
+from vanpy.utils.row_ids import attach_results
 
 
 class IEMOCAPEmotionClassifier(PipelineComponent):
@@ -15,6 +22,9 @@ class IEMOCAPEmotionClassifier(PipelineComponent):
     :ivar verbal_labels: Whether to use text labels (True) or indices (False).
     """
     model = None
+    cacheable = True
+    reads_column_groups = ('paths_column',)
+    writes_column_groups = ('classification_columns',)
     classification_column_name: str = ''
     verbal_labels: bool = True
 
@@ -30,6 +40,13 @@ class IEMOCAPEmotionClassifier(PipelineComponent):
         self.classification_column_name = self.config.get('classification_column_name',
                                                           f'{self.component_name}_classification')
 
+    def get_model_artifacts(self) -> List[ModelArtifact]:
+        """
+        :return: the SpeechBrain repository, and the wav2vec 2.0 encoder its hyperparameters load
+        """
+        return [ModelArtifact('speechbrain/emotion-recognition-wav2vec2-IEMOCAP', kind='huggingface'),
+                ModelArtifact('facebook/wav2vec2-base', kind='huggingface')]
+
     def load_model(self):
         """
         Load the SpeechBrain emotion classification model trained on IEMOCAP.
@@ -37,9 +54,12 @@ class IEMOCAPEmotionClassifier(PipelineComponent):
         from speechbrain.pretrained.interfaces import foreign_class
         self.logger.info("Loading emotion classification model, trained on IEMOCAP "
                          "dataset with Speech Brain")
-        self.model = foreign_class(source="speechbrain/emotion-recognition-wav2vec2-IEMOCAP",
-                                   pymodule_file="custom_interface.py", classname="CustomEncoderWav2vec2Classifier",
-                                   savedir=self.pretrained_models_dir)
+        source = self.get_model_store().get_huggingface_source(self.get_model_artifacts()[0])
+        self.model = self.acquire_model(
+            'speechbrain.foreign_class', 'speechbrain/emotion-recognition-wav2vec2-IEMOCAP',
+            lambda: foreign_class(source=source,
+                                  pymodule_file="custom_interface.py", classname="CustomEncoderWav2vec2Classifier",
+                                  savedir=self.pretrained_models_dir))
 
     def process_item(self, f, input_column, classification_column_name):
         """
@@ -48,17 +68,42 @@ class IEMOCAPEmotionClassifier(PipelineComponent):
         :param f: Path to the audio file.
         :param input_column: Name of the input column.
         :param classification_column_name: Name of the classification output column.
-        :return: DataFrame with emotion classification result.
+        :return: Record with emotion classification result.
         """
         try:
-            out_prob, score, index, text_lab = self.model.classify_file(f)
-            emotion_prediction = text_lab[0] if self.verbal_labels else index
+            with self.timed(INFERENCE):
+                out_prob, score, index, text_lab = self.model.classify_batch(
+                    load_speechbrain_audio(self.model, f).unsqueeze(0))
+            emotion_prediction = text_lab[0] if self.verbal_labels else index.tolist()[0]
         except (FileNotFoundError, RuntimeError, TypeError) as e:
             emotion_prediction = None
             self.logger.error(f"An error occurred in {f}: {e}")
 
-        f_df = pd.DataFrame({input_column: [f], classification_column_name: [emotion_prediction]})
-        return f_df
+        return {input_column: f, classification_column_name: emotion_prediction}
+
+    def process_batch(self, paths, input_column, classification_column_name):
+        """
+        Process a batch of audio files for emotion classification with a single model call.
+
+        :param paths: Paths to the audio files.
+        :param input_column: Name of the input column.
+        :param classification_column_name: Name of the classification output column.
+        :return: List of records with emotion classification results, as returned by process_item.
+        """
+        import torch
+        try:
+            with self.timed(DECODE):
+                batch = pad_signals([load_speechbrain_audio(self.model, f).numpy() for f in paths])
+            with self.timed(INFERENCE):
+                out_prob, score, index, text_lab = self.model.classify_batch(torch.from_numpy(batch.values),
+                                                                             torch.from_numpy(batch.relative_lengths))
+        except (FileNotFoundError, RuntimeError, TypeError) as e:
+            if is_out_of_memory_error(e):
+                raise  # the batch is split by process_batch_with_retry
+            self.logger.error(f"An error occurred in a batch of {len(paths)} files, classifying them one by one: {e}")
+            return [self.process_item(f, input_column, classification_column_name) for f in paths]
+        predictions = text_lab if self.verbal_labels else index.tolist()
+        return [{input_column: f, classification_column_name: prediction} for f, prediction in zip(paths, predictions)]
 
     def process(self, input_payload: ComponentPayload) -> ComponentPayload:
         """
@@ -67,12 +112,11 @@ class IEMOCAPEmotionClassifier(PipelineComponent):
         :param input_payload: Input payload containing audio file paths and metadata.
         :return: Output payload containing emotion classifications.
         """
-        if not self.model:
-            self.load_model()
+        self.ensure_model_loaded()
 
         payload_metadata, payload_df = input_payload.unpack()
         input_column = payload_metadata['paths_column']
-        paths_list = payload_df[input_column].dropna().tolist()
+        paths_list, row_ids = self.get_input_rows(payload_df, input_column)
 
         if not paths_list:
             self.logger.warning('You\'ve supplied an empty list to process')
@@ -84,15 +128,11 @@ class IEMOCAPEmotionClassifier(PipelineComponent):
             paths_list,
             payload_metadata,
             input_column,
-            self.classification_column_name
+            self.classification_column_name,
+            row_ids=row_ids
         )
 
-        payload_df = pd.merge(
-            left=payload_df,
-            right=p_df,
-            how='left',
-            on=input_column
-        )
+        payload_df = attach_results(payload_df, p_df, input_column)
 
         return ComponentPayload(metadata=payload_metadata, df=payload_df)
 
@@ -1,12 +1,12 @@
 import pickle
-import keras
+from typing import List
+
 import numpy as np
-import joblib
 from yaml import YAMLObject
 
 from vanpy.core.ComponentPayload import ComponentPayload
 from vanpy.core.PipelineComponent import PipelineComponent
-from vanpy.utils.utils import cached_download, create_dirs_if_not_exist
+from vanpy.core.ModelStore import ModelArtifact
 
 
 class VanpyAgeRegressor(PipelineComponent):
@@ -18,9 +18,26 @@ class VanpyAgeRegressor(PipelineComponent):
     :ivar classification_column_name: Name of the output estimation column.
     """
     model = None
+    reads_column_groups = ('feature_columns',)
+    writes_column_groups = ('classification_columns',)
     transformer = None
     classification_column_name: str = ''
     verbal_labels: bool = False
+    # model name: the (url, file name) of the model and of its feature transformer
+    model_files = {
+        'svr_ecapa_192_sb_voxceleb': (
+            ('https://drive.google.com/uc?id=1I6z0gjhKlzajbuKNGN5XuNiwrhxNYT8g', 'vc_auto_svr_reg_bal_speechbrain_ecapa_192_age_optuna.pkl'),
+            ('https://drive.google.com/uc?id=1xNgnqcRJWcEhiOcWGBXEPR4pzt33xQIh', 'scaler_auto_vc_reg_bal_speechbrain_ecapa_192_age_optuna.pkl')),
+        'svr_ecapa_192_sb_librosa_31_voxceleb': (
+            ('https://drive.google.com/uc?id=1j02hQry3lflQ-uOmdCTjWADag2BH4zmZ', 'vc_auto_svr_reg_bal_librosa_233_age_optuna.pkl'),
+            ('https://drive.google.com/uc?id=1td-cALVUrYoKWzQU0u-dk-ygx5ClWowC', 'scaler_auto_vc_reg_bal_librosa_233_age_optuna.pkl')),
+        'ann_ecapa_192_sb_timit': (
+            ('https://drive.google.com/uc?id=1rftvTyl223czkKXC2jfxX_rAMhm3LbUe', 'timit_auto_ann_reg_timit_speechbrain_ecapa_192_age_optuna.h5'),
+            ('https://drive.google.com/uc?id=1kRFitAp4EryFFnEF-SbIWTMlv9inKDYg', 'scaler_auto_timit_reg_timit_speechbrain_ecapa_192_age_optuna.pkl')),
+        'ann_ecapa_192_sb_librosa_31_combined': (
+            ('https://drive.google.com/uc?id=1lrex6dAXsp-4AH5QfJzb2dTSqf_UF_vk', 'combined_ann_reg_librosa_233_age_optuna.h5'),
+            ('https://drive.google.com/uc?id=1XcR83B8WAtfI5wClCKxGLatezCumLYnH', 'scaler_combined_reg_librosa_233_age_optuna.pkl')),
+    }
 
     def __init__(self, yaml_config: YAMLObject):
         """
@@ -32,39 +49,42 @@ class VanpyAgeRegressor(PipelineComponent):
                          yaml_config=yaml_config)
         self.classification_column_name = self.config.get('classification_column_name', f'{self.component_name}_estimation')
 
+    def get_model_artifacts(self) -> List[ModelArtifact]:
+        """
+        :return: the model and feature transformer files of the configured model
+        """
+        model_name = self.config.get('model', 'ann_ecapa_192_sb_librosa_31_combined')
+        return [ModelArtifact(url, filename=filename) for url, filename in self.model_files.get(model_name, ())]
+
     def load_model(self):
         """
         Load the age regression model and its feature transformer.
         
         :raises ValueError: If an unknown model name is provided.
         """
+        import joblib
         model_name = self.config.get('model', 'ann_ecapa_192_sb_librosa_31_combined')
         if model_name == 'svr_ecapa_192_sb_voxceleb':
             self.logger.info(
                 "Loading SVR age regression model, trained on Voxceleb2 dataset with speech_brain embedding [192 features]")
-            model_path = cached_download('https://drive.google.com/uc?id=1I6z0gjhKlzajbuKNGN5XuNiwrhxNYT8g',
-                                         f'{self.pretrained_models_dir}/vc_auto_svr_reg_bal_speechbrain_ecapa_192_age_optuna.pkl')
-            transformer_path = cached_download('https://drive.google.com/uc?id=1xNgnqcRJWcEhiOcWGBXEPR4pzt33xQIh',
-                                               f'{self.pretrained_models_dir}/scaler_auto_vc_reg_bal_speechbrain_ecapa_192_age_optuna.pkl')
+            model_path, transformer_path = [self.get_model_file(url, filename)
+                                            for url, filename in self.model_files[model_name]]
             self.model = joblib.load(model_path)
 
         elif model_name == 'svr_ecapa_192_sb_librosa_31_voxceleb':
             self.logger.info(
                 "Loading SVR age regression model, trained on Voxceleb2 dataset with speech_brain embedding [192 features] and 31 Librosa features")
-            model_path = cached_download('https://drive.google.com/uc?id=1j02hQry3lflQ-uOmdCTjWADag2BH4zmZ',
-                                         f'{self.pretrained_models_dir}/vc_auto_svr_reg_bal_librosa_233_age_optuna.pkl')
-            transformer_path = cached_download('https://drive.google.com/uc?id=1td-cALVUrYoKWzQU0u-dk-ygx5ClWowC',
-                                               f'{self.pretrained_models_dir}/scaler_auto_vc_reg_bal_librosa_233_age_optuna.pkl')
+            model_path, transformer_path = [self.get_model_file(url, filename)
+                                            for url, filename in self.model_files[model_name]]
             self.model = joblib.load(model_path)
 
         elif model_name == 'ann_ecapa_192_sb_timit':
             self.logger.info(
                 "Loading ANN age regression model, trained on TIMIT dataset with speech_brain embedding [192 features]")
-            model_path = cached_download('https://drive.google.com/uc?id=1rftvTyl223czkKXC2jfxX_rAMhm3LbUe',
-                                         f'{self.pretrained_models_dir}/timit_auto_ann_reg_timit_speechbrain_ecapa_192_age_optuna.h5')
-            transformer_path = cached_download('https://drive.google.com/uc?id=1kRFitAp4EryFFnEF-SbIWTMlv9inKDYg',
-                                               f'{self.pretrained_models_dir}/scaler_auto_timit_reg_timit_speechbrain_ecapa_192_age_optuna.pkl')
+            model_path, transformer_path = [self.get_model_file(url, filename)
+                                            for url, filename in self.model_files[model_name]]
 
+            import keras
             self.model = keras.models.load_model(model_path, compile=False)
             self.model.compile(loss='mse')
             # self.model.compile(optimizer='adam', loss='mean_absolute_error')
@@ -73,11 +93,10 @@ class VanpyAgeRegressor(PipelineComponent):
         elif model_name == 'ann_ecapa_192_sb_librosa_31_combined':
             self.logger.info(
                 "Loading ANN age regression model, trained on combined Voxceleb2 and TIMIT datasets with speech_brain embedding [192 features] and 31 Librosa features")
-            model_path = cached_download('https://drive.google.com/uc?id=1lrex6dAXsp-4AH5QfJzb2dTSqf_UF_vk',
-                                         f'{self.pretrained_models_dir}/combined_ann_reg_librosa_233_age_optuna.h5')
-            transformer_path = cached_download('https://drive.google.com/uc?id=1XcR83B8WAtfI5wClCKxGLatezCumLYnH',
-                                               f'{self.pretrained_models_dir}/scaler_combined_reg_librosa_233_age_optuna.pkl')
+            model_path, transformer_path = [self.get_model_file(url, filename)
+                                            for url, filename in self.model_files[model_name]]
 
+            import keras
             self.model = keras.models.load_model(model_path, compile=False)
             self.model.compile(loss='mse')
 
@@ -105,21 +124,22 @@ class VanpyAgeRegressor(PipelineComponent):
             self.expected_feature_columns.extend(librosa_columns)
 
     def process(self, input_payload: ComponentPayload) -> ComponentPayload:
-        if not self.model:
-            self.load_model()
+        self.ensure_model_loaded()
 
         payload_metadata = input_payload.metadata
         payload_df = input_payload.df
 
-        if set(self.expected_feature_columns) - set(payload_df.columns):
+        if not input_payload.has_features(self.expected_feature_columns):
             self.logger.error("There are not enough features in the payload")
             return input_payload
         else:
             self.logger.info("Found required features in the payload, continuing with classification")
 
-        X = payload_df[self.expected_feature_columns].convert_dtypes()
-        nan_idxs = X[X.isna().any(axis=1)].index
-        X = X.fillna(0)
+        X = input_payload.get_feature_matrix(self.expected_feature_columns)
+        nan_rows = np.isnan(X).any(axis=1)
+        nan_idxs = payload_df.index[nan_rows]
+        if nan_rows.any():
+            X = np.where(np.isnan(X), np.float32(0), X)
 
         if self.config.get('apply_transform', False):
             X = self.transformer.transform(X)
@@ -1,9 +1,12 @@
 import pickle
+from typing import List
+
+import numpy as np
 from yaml import YAMLObject
 
 from vanpy.core.ComponentPayload import ComponentPayload
 from vanpy.core.PipelineComponent import PipelineComponent
-from vanpy.utils.utils import cached_download, create_dirs_if_not_exist
+from vanpy.core.ModelStore import ModelArtifact
 
 
 class VanpyEmotionClassifier(PipelineComponent):
@@ -18,11 +21,16 @@ class VanpyEmotionClassifier(PipelineComponent):
     :ivar verbal_labels: Whether to use string labels (True) or numeric indices (False).
     """
     model = None
+    reads_column_groups = ('feature_columns',)
+    writes_column_groups = ('classification_columns',)
     transformer = None
     label_conversion_list = ['angry', 'disgust', 'fearful', 'happy', 'neutral/calm', 'sad', 'surprised']
     label_conversion_dict = {v: i for i, v in zip(range(len(label_conversion_list)), label_conversion_list)}
     classification_column_name: str = ''
     verbal_labels: bool = True
+    # the (url, file name) of the model
+    model_file = ('https://drive.google.com/uc?id=1-kQ7eschXQeYiK7wpLTrBnVv6PTSZPfO',
+                  'ravdess_svm_speechbrain_ecapa_voxceleb_no_processor_cv.pkl')
 
     def __init__(self, yaml_config: YAMLObject):
         """
@@ -36,6 +44,12 @@ class VanpyEmotionClassifier(PipelineComponent):
         self.classification_column_name = self.config.get('classification_column_name',
                                                           f'{self.component_name}_classification')
 
+    def get_model_artifacts(self) -> List[ModelArtifact]:
+        """
+        :return: the model file
+        """
+        return [ModelArtifact(self.model_file[0], filename=self.model_file[1])]
+
     def load_model(self):
         """
         Load the emotion classification model from pretrained files.
@@ -44,8 +58,7 @@ class VanpyEmotionClassifier(PipelineComponent):
         embeddings as features.
         """
         self.logger.info("Loading 7-class SVM emotion classification model, trained on RAVDESS dataset with speech_brain embedding [192 features]")
-        model_path = cached_download('https://drive.google.com/uc?id=1-kQ7eschXQeYiK7wpLTrBnVv6PTSZPfO',
-                                     f'{self.pretrained_models_dir}/ravdess_svm_speechbrain_ecapa_voxceleb_no_processor_cv.pkl')
+        model_path = self.get_model_file(*self.model_file)
         self.model = pickle.load(open(model_path, "rb"))
         self.expected_feature_columns = [f'{i}_speechbrain_embedding' for i in range(192)]  # expecting features_columns to be ['0_speechbrain_embedding','1_speechbrain_embedding',...'191_speechbrain_embedding']
 
@@ -56,21 +69,22 @@ class VanpyEmotionClassifier(PipelineComponent):
         :param input_payload: Input payload containing audio features and metadata.
         :return: Output payload containing emotion classifications.
         """
-        if not self.model:
-            self.load_model()
+        self.ensure_model_loaded()
 
         payload_metadata = input_payload.metadata
         payload_df = input_payload.df
 
-        if set(self.expected_feature_columns) - set(payload_df.columns):
+        if not input_payload.has_features(self.expected_feature_columns):
             self.logger.error("There are no speechbrain_embedding columns in the payload, please add 'speechbrain_embedding' component to the Pipeline with 'spkrec-ecapa-voxceleb' model (or without model mentioning)")
             return input_payload
         else:
             self.logger.info("Found SpeechBrainEmbedding features in the payload, continuing with classification")
 
-        X = payload_df[self.expected_feature_columns].convert_dtypes()
-        nan_idxs = X[X.isna().any(axis=1)].index
-        X = X.fillna(0)
+        X = input_payload.get_feature_matrix(self.expected_feature_columns)
+        nan_rows = np.isnan(X).any(axis=1)
+        nan_idxs = payload_df.index[nan_rows]
+        if nan_rows.any():
+            X = np.where(np.isnan(X), np.float32(0), X)
         y_pred = self.model.predict(X)
         if self.verbal_labels:
             payload_df[self.classification_column_name] = y_pred
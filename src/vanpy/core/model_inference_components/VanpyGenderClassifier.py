@@ -1,9 +1,12 @@
 import pickle
+from typing import List
+
+import numpy as np
 from yaml import YAMLObject
 
 from vanpy.core.ComponentPayload import ComponentPayload
 from vanpy.core.PipelineComponent import PipelineComponent
-from vanpy.utils.utils import cached_download, create_dirs_if_not_exist
+from vanpy.core.ModelStore import ModelArtifact
 
 
 class VanpyGenderClassifier(PipelineComponent):
@@ -18,11 +21,22 @@ class VanpyGenderClassifier(PipelineComponent):
     :ivar verbal_labels: Whether to use string labels (True) or numeric indices (False).
     """
     model = None
+    reads_column_groups = ('feature_columns',)
+    writes_column_groups = ('classification_columns',)
     transformer = None
     label_conversion_list = ['female', 'male']
     label_conversion_dict = {i: v for i, v in zip(range(len(label_conversion_list)), label_conversion_list)}
     classification_column_name: str = ''
     verbal_labels: bool = True
+    # model name: the (url, file name) of the model and of its feature processor
+    model_files = {
+        'svm_ecapa_192_sb_voxceleb': (
+            ('https://drive.google.com/uc?id=1ytf7wV1z-oarvjlAgZ1NbVE1VgsKRYBX', 'vc_svm_cls_bal_speechbrain_ecapa_192_gender_optuna.pkl'),
+            ('https://drive.google.com/uc?id=1OEeI0nqECXSiA7B_8otCW0lVYF0bFWmW', 'processor_vc_svm_cls_bal_speechbrain_ecapa_192_gender_optuna.pkl')),
+        'svm_xvect_512_sb_voxceleb': (
+            ('https://drive.google.com/uc?id=1YkGDW-PZSPkuMqX0GNEhNwWKoMjq9C7X', 'vc_svm_cls_bal_speechbrain_xvect_512_gender_optuna.pkl'),
+            ('https://drive.google.com/uc?id=1pww7on1En7sU26-3oWl3HfGfg426g7hX', 'processor_vc_svm_cls_bal_speechbrain_xvect_512_gender_optuna.pkl')),
+    }
 
     def __init__(self, yaml_config: YAMLObject):
         """
@@ -36,6 +50,13 @@ class VanpyGenderClassifier(PipelineComponent):
         self.classification_column_name = self.config.get('classification_column_name',
                                                           f'{self.component_name}_classification')
 
+    def get_model_artifacts(self) -> List[ModelArtifact]:
+        """
+        :return: the model and feature processor files of the configured model
+        """
+        model_name = self.config.get('model', 'svm_ecapa_192_sb_voxceleb')
+        return [ModelArtifact(url, filename=filename) for url, filename in self.model_files.get(model_name, ())]
+
     def load_model(self):
         """
         Load the gender classification model and its feature transformer.
@@ -46,18 +67,14 @@ class VanpyGenderClassifier(PipelineComponent):
         if model_name == 'svm_ecapa_192_sb_voxceleb':
 
             self.logger.info("Loading SVM gender classification model, trained on Voxceleb2 dataset with ECAPA-TDNN speech_brain embedding [192 features]")
-            model_path = cached_download('https://drive.google.com/uc?id=1ytf7wV1z-oarvjlAgZ1NbVE1VgsKRYBX',
-                                         f'{self.pretrained_models_dir}/vc_svm_cls_bal_speechbrain_ecapa_192_gender_optuna.pkl')
-            processor_path = cached_download('https://drive.google.com/uc?id=1OEeI0nqECXSiA7B_8otCW0lVYF0bFWmW',
-                                            f'{self.pretrained_models_dir}/processor_vc_svm_cls_bal_speechbrain_ecapa_192_gender_optuna.pkl')
+            model_path, processor_path = [self.get_model_file(url, filename)
+                                          for url, filename in self.model_files[model_name]]
             self.expected_feature_columns = [f'{i}_speechbrain_embedding' for i in range(192)]  # expecting features_columns to be ['0_speechbrain_embedding','1_speechbrain_embedding',...'191_speechbrain_embedding']
         elif model_name == 'svm_xvect_512_sb_voxceleb':
             self.logger.info(
                 "Loading SVM gender classification model, trained on Voxceleb2 dataset with XVECT speech_brain embedding [512 features]")
-            model_path = cached_download('https://drive.google.com/uc?id=1YkGDW-PZSPkuMqX0GNEhNwWKoMjq9C7X',
-                                         f'{self.pretrained_models_dir}/vc_svm_cls_bal_speechbrain_xvect_512_gender_optuna.pkl')
-            processor_path = cached_download('https://drive.google.com/uc?id=1pww7on1En7sU26-3oWl3HfGfg426g7hX',
-                                             f'{self.pretrained_models_dir}/processor_vc_svm_cls_bal_speechbrain_xvect_512_gender_optuna.pkl')
+            model_path, processor_path = [self.get_model_file(url, filename)
+                                          for url, filename in self.model_files[model_name]]
             self.expected_feature_columns = [f'{i}_speechbrain_embedding' for i in range(
                 512)]  # expecting features_columns to be ['0_speechbrain_embedding','1_speechbrain_embedding',...'191_speechbrain_embedding']
         else:
@@ -73,21 +90,22 @@ class VanpyGenderClassifier(PipelineComponent):
         :param input_payload: Input payload containing audio features and metadata.
         :return: Output payload containing gender classifications.
         """
-        if not self.model:
-            self.load_model()
+        self.ensure_model_loaded()
 
         payload_metadata = input_payload.metadata
         payload_df = input_payload.df
 
-        if set(self.expected_feature_columns) - set(payload_df.columns):
+        if not input_payload.has_features(self.expected_feature_columns):
             self.logger.error("There are no speechbrain_embedding columns in the payload, please add 'speechbrain_embedding' component to the Pipeline with 'spkrec-ecapa-voxceleb' model (or without model mentioning)")
             return input_payload
         else:
             self.logger.info("Found SpeechBrainEmbedding features in the payload, continuing with classification")
 
-        X = payload_df[self.expected_feature_columns].convert_dtypes()
-        nan_idxs = X[X.isna().any(axis=1)].index
-        X = X.fillna(0)
+        X = input_payload.get_feature_matrix(self.expected_feature_columns)
+        nan_rows = np.isnan(X).any(axis=1)
+        nan_idxs = payload_df.index[nan_rows]
+        if nan_rows.any():
+            X = np.where(np.isnan(X), np.float32(0), X)
 
         if self.config.get('apply_transform', False):
             X = self.transformer.transform(X)
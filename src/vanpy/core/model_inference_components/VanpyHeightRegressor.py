@@ -1,11 +1,12 @@
 import pickle
+from typing import List
 
-import joblib
+import numpy as np
 from yaml import YAMLObject
 
 from vanpy.core.ComponentPayload import ComponentPayload
 from vanpy.core.PipelineComponent import PipelineComponent
-from vanpy.utils.utils import cached_download, create_dirs_if_not_exist
+from vanpy.core.ModelStore import ModelArtifact
 
 
 class VanpybHeightRegressor(PipelineComponent):
@@ -17,9 +18,15 @@ class VanpybHeightRegressor(PipelineComponent):
     :ivar classification_column_name: Name of the output estimation column.
     """
     model = None
+    reads_column_groups = ('feature_columns',)
+    writes_column_groups = ('classification_columns',)
     transformer = None
     classification_column_name: str = ''
     verbal_labels: bool = False
+    # the (url, file name) of the model and of its feature transformer
+    model_files = (
+        ('https://drive.google.com/uc?id=1WWK4h-wTlCpuIQi2antiPEg3r8n4Hxot', 'vc_auto_svr_reg_bal_speechbrain_ecapa_192_height_optuna.pkl'),
+        ('https://drive.google.com/uc?id=1OPx4gXPpDhZ_8QSv9m5LWAo1yfr_H4aL', 'scaler_auto_vc_reg_bal_speechbrain_ecapa_192_height_optuna.pkl'))
 
     def __init__(self, yaml_config: YAMLObject):
         """
@@ -31,16 +38,20 @@ class VanpybHeightRegressor(PipelineComponent):
                          yaml_config=yaml_config)
         self.classification_column_name = self.config.get('classification_column_name', f'{self.component_name}_estimation')
 
+    def get_model_artifacts(self) -> List[ModelArtifact]:
+        """
+        :return: the model and feature transformer files
+        """
+        return [ModelArtifact(url, filename=filename) for url, filename in self.model_files]
+
     def load_model(self):
         """
         Load the height regression model and its feature transformer.
         """
+        import joblib
         self.logger.info("Loading SVR height regression model, trained on Voxceleb2 dataset with speech_brain embedding [192 features]")
-        model_path = cached_download('https://drive.google.com/uc?id=1WWK4h-wTlCpuIQi2antiPEg3r8n4Hxot',
-                                     f'{self.pretrained_models_dir}/vc_auto_svr_reg_bal_speechbrain_ecapa_192_height_optuna.pkl')
+        model_path, transformer_path = [self.get_model_file(url, filename) for url, filename in self.model_files]
         self.model = joblib.load(model_path)
-        transformer_path = cached_download('https://drive.google.com/uc?id=1OPx4gXPpDhZ_8QSv9m5LWAo1yfr_H4aL',
-                                     f'{self.pretrained_models_dir}/scaler_auto_vc_reg_bal_speechbrain_ecapa_192_height_optuna.pkl')
         self.transformer = pickle.load(open(transformer_path, "rb"))
         self.expected_feature_columns = [f'{i}_speechbrain_embedding' for i in range(192)]
 
@@ -51,22 +62,23 @@ class VanpybHeightRegressor(PipelineComponent):
         :param input_payload: Input payload containing audio features and metadata.
         :return: Output payload containing height estimations.
         """
-        if not self.model:
-            self.load_model()
+        self.ensure_model_loaded()
 
         payload_metadata = input_payload.metadata
         payload_df = input_payload.df
 
 
-        if set(self.expected_feature_columns) - set(payload_df.columns):
+        if not input_payload.has_features(self.expected_feature_columns):
             self.logger.error("There are no speechbrain_embedding columns in the payload, please add 'speechbrain_embedding' component to the Pipeline with 'spkrec-ecapa-voxceleb' model (or without model mentioning)")
             return input_payload
         else:
             self.logger.info("Found SpeechBrainEmbedding features in the payload, continuing with classification")
 
-        X = payload_df[self.expected_feature_columns].convert_dtypes()
-        nan_idxs = X[X.isna().any(axis=1)].index
-        X = X.fillna(0)
+        X = input_payload.get_feature_matrix(self.expected_feature_columns)
+        nan_rows = np.isnan(X).any(axis=1)
+        nan_idxs = payload_df.index[nan_rows]
+        if nan_rows.any():
+            X = np.where(np.isnan(X), np.float32(0), X)
 
         if self.config.get('apply_transform', False):
             X = self.transformer.transform(X)
@@ -1,89 +1,26 @@
 import os
 import time
+from typing import List
+
 import numpy as np
 import pandas as pd
-import torch
-import torch.nn as nn
-import librosa
 from yaml import YAMLObject
-from transformers import Wav2Vec2Processor
-from transformers.models.wav2vec2.modeling_wav2vec2 import (
-    Wav2Vec2Model,
-    Wav2Vec2PreTrainedModel,
-)
 from vanpy.core.ComponentPayload import ComponentPayload
+from vanpy.core.ModelStore import ModelArtifact
 from vanpy.core.PipelineComponent import PipelineComponent
+from vanpy.utils.audio import SAMPLING_RATE_KEY, load_audio
+from vanpy.utils.timing import DECODE, INFERENCE
+from vanpy.utils.batching import pad_signals
+from vanpy.utils.row_ids import attach_results
 
 
-class RegressionHead(nn.Module):
-    """
-    Neural network head for regression tasks on wav2vec features.
-
-    :ivar dense: Linear layer for feature transformation.
-    :ivar dropout: Dropout layer for regularization.
-    :ivar out_proj: Output projection layer.
-    """
-
-    def __init__(self, config):
-
-        super().__init__()
-
-        self.dense = nn.Linear(config.hidden_size, config.hidden_size)
-        self.dropout = nn.Dropout(config.final_dropout)
-        self.out_proj = nn.Linear(config.hidden_size, config.num_labels)
-
-    def forward(self, features, **kwargs):
-        """
-        Forward pass of the regression head.
-
-        :param features: Input features from wav2vec model.
-        :param kwargs: Additional keyword arguments.
-        :return: Transformed feature representations.
-        """
-
-        x = features
-        x = self.dropout(x)
-        x = self.dense(x)
-        x = torch.tanh(x)
-        x = self.dropout(x)
-        x = self.out_proj(x)
-
-        return x
-
-class EmotionModel(Wav2Vec2PreTrainedModel):
-    """
-    Speech emotion analysis model based on wav2vec2.
-
-    :ivar wav2vec2: Base wav2vec2 model for feature extraction.
-    :ivar classifier: Regression head for emotion prediction.
-    """
+def __getattr__(name: str):
+    # the model classes moved to Wav2Vec2EmotionModel, so importing the component does not import torch
+    if name in ('EmotionModel', 'RegressionHead'):
+        from vanpy.core.model_inference_components import Wav2Vec2EmotionModel
+        return getattr(Wav2Vec2EmotionModel, name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
-    def __init__(self, config):
-
-        super().__init__(config)
-
-        self.config = config
-        self.wav2vec2 = Wav2Vec2Model(config)
-        self.classifier = RegressionHead(config)
-        self.init_weights()
-
-    def forward(
-            self,
-            input_values,
-    ):
-        """
-        Forward pass of the emotion model.
-
-        :param input_values: Input audio features.
-        :return: Tuple of (hidden_states, logits).
-        """
-
-        outputs = self.wav2vec2(input_values)
-        hidden_states = outputs[0]
-        hidden_states = torch.mean(hidden_states, dim=1)
-        logits = self.classifier(hidden_states)
-
-        return hidden_states, logits
 
 class Wav2Vec2ADV(PipelineComponent):
     """
@@ -96,20 +33,38 @@ class Wav2Vec2ADV(PipelineComponent):
     """
     # A prediction model for arousal, dominance and valence
     model = None
+    cacheable = True
+    reads_column_groups = ('paths_column',)
+    writes_column_groups = ('classification_columns', 'meta_columns')
     tokenizer = None
 
     def __init__(self, yaml_config: YAMLObject):
         super().__init__(component_type='segment_classifier', component_name='wav2vec2adv',
                          yaml_config=yaml_config)
-        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        self.device = None  # set by load_model
         self.sampling_rate = self.config.get('sampling_rate', 16000)
 
+    def get_model_artifacts(self) -> List[ModelArtifact]:
+        """
+        :return: the audeering wav2vec 2.0 dimensional emotion repository
+        """
+        return [ModelArtifact('audeering/wav2vec2-large-robust-12-ft-emotion-msp-dim', kind='huggingface')]
+
     def load_model(self):
         import torch
+        from transformers import Wav2Vec2Processor
+        from vanpy.core.model_inference_components.Wav2Vec2EmotionModel import EmotionModel
+        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
         self.logger.info("Loading wav2vec 2.0 arousal, dominance and valence prediction model")
-        self.processor = Wav2Vec2Processor.from_pretrained("audeering/wav2vec2-large-robust-12-ft-emotion-msp-dim", cache_dir=self.pretrained_models_dir)
-        self.model = EmotionModel.from_pretrained("audeering/wav2vec2-large-robust-12-ft-emotion-msp-dim", cache_dir=self.pretrained_models_dir)
-        self.model.to(self.device)
+        checkpoint = "audeering/wav2vec2-large-robust-12-ft-emotion-msp-dim"
+        source = self.get_model_store().get_huggingface_source(self.get_model_artifacts()[0])
+        self.processor = self.acquire_model('transformers.Wav2Vec2Processor', checkpoint,
+                                            lambda: Wav2Vec2Processor.from_pretrained(
+                                                source, cache_dir=self.pretrained_models_dir))
+        self.model = self.acquire_model('vanpy.EmotionModel', checkpoint,
+                                        lambda: EmotionModel.from_pretrained(
+                                            source, cache_dir=self.pretrained_models_dir).to(self.device),
+                                        device=self.device)
         self.logger.info(f'Loaded model to {"GPU" if torch.cuda.is_available() else "CPU"}')
 
     def process_func(self,
@@ -123,6 +78,7 @@ class Wav2Vec2ADV(PipelineComponent):
         :param sampling_rate: Sampling rate of the audio.
         :return: Array of predicted arousal, dominance, and valence values.
         """
+        import torch
 
         # run through processor to normalize signal
         # always returns a batch, so we just get the first entry
@@ -140,37 +96,72 @@ class Wav2Vec2ADV(PipelineComponent):
 
         return y
 
-    def process_item(self, f, input_column):
+    def process_batch_func(self, signals, sampling_rate: int) -> np.ndarray:
+        """
+        Batch counterpart of process_func: normalizes each signal, pads them into a single batch
+        and runs the model once, masking the padding.
+
+        :param signals: List of raw audio signal arrays.
+        :param sampling_rate: Sampling rate of the audio.
+        :return: Array of predicted arousal, dominance, and valence values, one row per signal.
+        """
+        import torch
+        normalized = self.processor(signals, sampling_rate=sampling_rate)['input_values']
+        batch = pad_signals(normalized)
+        with torch.no_grad():
+            y = self.model(torch.from_numpy(batch.values).to(self.device),
+                           attention_mask=torch.from_numpy(batch.attention_mask).to(self.device))[1]
+        return y.detach().cpu().numpy()
+
+    def process_batch(self, paths, input_column, source_sr=None):
+        """
+        Process a batch of audio files for emotion prediction with a single model call.
+
+        :param paths: Paths to the audio files.
+        :param input_column: Name of the input column.
+        :param source_sr: The sampling rate of the audio files, if recorded in the payload metadata.
+        :return: List of records with predicted emotion dimensions.
+        """
+        with self.timed(DECODE):
+            signals = [load_audio(f, sr=self.sampling_rate, source_sr=source_sr)[0] for f in paths]
+        with self.timed(INFERENCE):
+            predictions = self.process_batch_func(signals, self.sampling_rate)
+        return [{input_column: f, 'arousal': arousal, 'dominance': dominance, 'valence': valence}
+                for f, (arousal, dominance, valence) in zip(paths, predictions)]
+
+    def process_item(self, f, input_column, source_sr=None):
         """
         Process a single audio file for emotion prediction.
 
         :param f: Path to the audio file.
         :param input_column: Name of the input column.
-        :return: DataFrame with predicted emotion dimensions.
+        :param source_sr: The sampling rate of the audio files, if recorded in the payload metadata.
+        :return: Record with predicted emotion dimensions.
         """
         try:
             # Loading the audio file
-            audio, rate = librosa.load(f, sr=self.sampling_rate)
-            arousal, dominance, valence = self.process_func(audio, rate)[0]
-
-            # Create a DataFrame to hold the results
-            f_df = pd.DataFrame({
-                input_column: [f],
-                'arousal': [arousal],
-                'dominance': [dominance],
-                'valence': [valence],
-            })
+            with self.timed(DECODE):
+                audio, rate = load_audio(f, sr=self.sampling_rate, source_sr=source_sr)
+            with self.timed(INFERENCE):
+                arousal, dominance, valence = self.process_func(audio, rate)[0]
+
+            record = {
+                input_column: f,
+                'arousal': arousal,
+                'dominance': dominance,
+                'valence': valence,
+            }
 
         except (FileNotFoundError, RuntimeError, TypeError, EOFError) as e:
             self.logger.error(f"An error occurred in {f}: {e}")
-            f_df = pd.DataFrame({
-                input_column: [f],
-                'arousal': [None],
-                'dominance': [None],
-                'valence': [None],
-            })
+            record = {
+                input_column: f,
+                'arousal': None,
+                'dominance': None,
+                'valence': None,
+            }
 
-        return f_df
+        return record
 
     def process(self, input_payload: ComponentPayload) -> ComponentPayload:
         """
@@ -178,12 +169,11 @@ class Wav2Vec2ADV(PipelineComponent):
         :param input_payload: The input payload.
         :return: The output payload.
         """
-        if not self.model:
-            self.load_model()
+        self.ensure_model_loaded()
 
         payload_metadata, payload_df = input_payload.unpack()
         input_column = payload_metadata['paths_column']
-        paths_list = payload_df[input_column].dropna().tolist()
+        paths_list, row_ids = self.get_input_rows(payload_df, input_column)
         records_count = len(paths_list)
 
         if not paths_list:
@@ -195,10 +185,11 @@ class Wav2Vec2ADV(PipelineComponent):
         payload_metadata = self.add_classification_columns_to_metadata(payload_metadata, ['arousal', 'dominance', 'valence'])
 
         # Call process_with_progress
-        p_df = self.process_with_progress(paths_list, payload_metadata, input_column)
+        p_df = self.process_with_progress(paths_list, payload_metadata, input_column, row_ids=row_ids,
+                                          source_sr=payload_metadata.get(SAMPLING_RATE_KEY))
 
         # Merge the processed DataFrame back into the original DataFrame
-        payload_df = pd.merge(left=payload_df, right=p_df, how='left', left_on=input_column, right_on=input_column)
+        payload_df = attach_results(payload_df, p_df, input_column)
 
         Wav2Vec2ADV.cleanup_softlinks()
 
@@ -0,0 +1,85 @@
+import torch
+import torch.nn as nn
+from transformers.models.wav2vec2.modeling_wav2vec2 import (
+    Wav2Vec2Model,
+    Wav2Vec2PreTrainedModel,
+)
+
+
+class RegressionHead(nn.Module):
+    """
+    Neural network head for regression tasks on wav2vec features.
+
+    :ivar dense: Linear layer for feature transformation.
+    :ivar dropout: Dropout layer for regularization.
+    :ivar out_proj: Output projection layer.
+    """
+
+    def __init__(self, config):
+
+        super().__init__()
+
+        self.dense = nn.Linear(config.hidden_size, config.hidden_size)
+        self.dropout = nn.Dropout(config.final_dropout)
+        self.out_proj = nn.Linear(config.hidden_size, config.num_labels)
+
+    def forward(self, features, **kwargs):
+        """
+        Forward pass of the regression head.
+
+        :param features: Input features from wav2vec model.
+        :param kwargs: Additional keyword arguments.
+        :return: Transformed feature representations.
+        """
+
+        x = features
+        x = self.dropout(x)
+        x = self.dense(x)
+        x = torch.tanh(x)
+        x = self.dropout(x)
+        x = self.out_proj(x)
+
+        return x
+
+class EmotionModel(Wav2Vec2PreTrainedModel):
+    """
+    Speech emotion analysis model based on wav2vec2.
+
+    :ivar wav2vec2: Base wav2vec2 model for feature extraction.
+    :ivar classifier: Regression head for emotion prediction.
+    """
+
+    def __init__(self, config):
+
+        super().__init__(config)
+
+        self.config = config
+        self.wav2vec2 = Wav2Vec2Model(config)
+        self.classifier = RegressionHead(config)
+        self.init_weights()
+
+    def forward(
+            self,
+            input_values,
+            attention_mask=None,
+    ):
+        """
+        Forward pass of the emotion model.
+
+        :param input_values: Input audio features.
+        :param attention_mask: Optional mask of the padded input values (1 for signal, 0 for padding).
+                               When given, the hidden states are averaged over the non-padded frames only.
+        :return: Tuple of (hidden_states, logits).
+        """
+
+        outputs = self.wav2vec2(input_values, attention_mask=attention_mask)
+        hidden_states = outputs[0]
+        if attention_mask is None:
+            hidden_states = torch.mean(hidden_states, dim=1)
+        else:
+            frames_mask = self._get_feature_vector_attention_mask(hidden_states.shape[1], attention_mask)
+            frames_mask = frames_mask.unsqueeze(-1).to(hidden_states.dtype)
+            hidden_states = (hidden_states * frames_mask).sum(dim=1) / frames_mask.sum(dim=1).clamp(min=1)
+        logits = self.classifier(hidden_states)
+
+        return hidden_states, logits
@@ -1,11 +1,14 @@
 import os
 import time
-import torch
-import librosa
+from typing import List
+
 from yaml import YAMLObject
-from transformers import Wav2Vec2ForCTC, Wav2Vec2Tokenizer
 from vanpy.core.ComponentPayload import ComponentPayload
+from vanpy.core.ModelStore import ModelArtifact
 from vanpy.core.PipelineComponent import PipelineComponent
+from vanpy.utils.audio import SAMPLING_RATE_KEY, load_audio
+from vanpy.utils.timing import DECODE, INFERENCE
+from vanpy.utils.row_ids import attach_results
 import pandas as pd
 
 
@@ -19,6 +22,9 @@ class Wav2Vec2STT(PipelineComponent):
     :ivar sampling_rate: Audio sampling rate for processing.
     """
     model = None
+    cacheable = True
+    reads_column_groups = ('paths_column',)
+    writes_column_groups = ('classification_columns', 'meta_columns')
     tokenizer = None
     classification_column_name: str = ''
 
@@ -33,49 +39,65 @@ class Wav2Vec2STT(PipelineComponent):
         self.classification_column_name = self.config.get('classification_column_name', f'{self.component_name}_stt')
         self.sampling_rate = self.config.get('sampling_rate', 16000)
 
+    def get_model_artifacts(self) -> List[ModelArtifact]:
+        """
+        :return: the wav2vec 2.0 Speech-To-Text repository
+        """
+        return [ModelArtifact('facebook/wav2vec2-base-960h', kind='huggingface')]
+
     def load_model(self):
         """
         Load the wav2vec2 model and tokenizer.
         """
+        from transformers import Wav2Vec2ForCTC, Wav2Vec2Tokenizer
         self.logger.info("Loading wav2vec 2.0 Speech-To-Text model")
-        self.tokenizer = Wav2Vec2Tokenizer.from_pretrained("facebook/wav2vec2-base-960h", cache_dir=self.pretrained_models_dir)
-        self.model = Wav2Vec2ForCTC.from_pretrained("facebook/wav2vec2-base-960h", cache_dir=self.pretrained_models_dir)
+        checkpoint = "facebook/wav2vec2-base-960h"
+        source = self.get_model_store().get_huggingface_source(self.get_model_artifacts()[0])
+        self.tokenizer = self.acquire_model('transformers.Wav2Vec2Tokenizer', checkpoint,
+                                            lambda: Wav2Vec2Tokenizer.from_pretrained(
+                                                source, cache_dir=self.pretrained_models_dir))
+        self.model = self.acquire_model('transformers.Wav2Vec2ForCTC', checkpoint,
+                                        lambda: Wav2Vec2ForCTC.from_pretrained(
+                                            source, cache_dir=self.pretrained_models_dir))
 
 
-    def process_item(self, f, input_column):
+    def process_item(self, f, input_column, source_sr=None):
         """
         Process a single audio file to extract transcription.
 
         :param f: Path to the audio file.
         :param input_column: Name of the input column.
-        :return: DataFrame with transcription results.
+        :param source_sr: The sampling rate of the audio files, if recorded in the payload metadata.
+        :return: Record with transcription results.
         """
+        import torch
         try:
             # Loading the audio file
-            audio, rate = librosa.load(f, sr=self.sampling_rate)
-            # Taking an input value
-            input_values = self.tokenizer(audio, return_tensors="pt").input_values
-            # Storing logits (non-normalized prediction values)
-            logits = self.model(input_values).logits
-            # Storing predicted ids
-            prediction = torch.argmax(logits, dim=-1)
-            # Passing the prediction to the tokenizer decode to get the transcription
-            transcription = self.tokenizer.batch_decode(prediction)[0]
-
-            # Create a DataFrame to hold the results
-            f_df = pd.DataFrame({
-                input_column: [f],
-                self.classification_column_name: [transcription]
-            })
+            with self.timed(DECODE):
+                audio, rate = load_audio(f, sr=self.sampling_rate, source_sr=source_sr)
+            with self.timed(INFERENCE):
+                # Taking an input value
+                input_values = self.tokenizer(audio, return_tensors="pt").input_values
+                # Storing logits (non-normalized prediction values)
+                logits = self.model(input_values).logits
+                # Storing predicted ids
+                prediction = torch.argmax(logits, dim=-1)
+                # Passing the prediction to the tokenizer decode to get the transcription
+                transcription = self.tokenizer.batch_decode(prediction)[0]
+
+            record = {
+                input_column: f,
+                self.classification_column_name: transcription
+            }
 
         except (FileNotFoundError, RuntimeError, TypeError, EOFError) as e:
             self.logger.error(f"An error occurred in {f}: {e}")
-            f_df = pd.DataFrame({
-                input_column: [f],
-                self.classification_column_name: [None]
-            })
+            record = {
+                input_column: f,
+                self.classification_column_name: None
+            }
 
-        return f_df
+        return record
 
     def process(self, input_payload: ComponentPayload) -> ComponentPayload:
         """
@@ -83,29 +105,27 @@ class Wav2Vec2STT(PipelineComponent):
         :param input_payload: The input payload.
         :return: The output payload.
         """
-        if not self.model:
-            self.load_model()
+        self.ensure_model_loaded()
 
         payload_metadata, payload_df = input_payload.unpack()
         input_column = payload_metadata['paths_column']
-        paths_list = payload_df[input_column].dropna().tolist()
+        paths_list, row_ids = self.get_input_rows(payload_df, input_column)
         records_count = len(paths_list)
 
         if not paths_list:
             self.logger.warning('You\'ve supplied an empty list to process')
             return input_payload
 
-        p_df = pd.DataFrame()
-
         # Define which columns should be in the metadata
         payload_metadata = self.add_performance_column_to_metadata(payload_metadata)
         payload_metadata = self.add_classification_columns_to_metadata(payload_metadata, self.classification_column_name)
 
         # Call process_with_progress
-        p_df = self.process_with_progress(paths_list, payload_metadata, input_column)
+        p_df = self.process_with_progress(paths_list, payload_metadata, input_column, row_ids=row_ids,
+                                          source_sr=payload_metadata.get(SAMPLING_RATE_KEY))
 
         # Merge the processed DataFrame back into the original DataFrame
-        payload_df = pd.merge(left=payload_df, right=p_df, how='left', on=input_column)
+        payload_df = attach_results(payload_df, p_df, input_column)
 
         Wav2Vec2STT.cleanup_softlinks()
 
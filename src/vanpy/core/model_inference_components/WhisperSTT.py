@@ -1,9 +1,15 @@
+import os
 import time
-import whisper
+from typing import List
+
 from yaml import YAMLObject
 from vanpy.core.ComponentPayload import ComponentPayload
+from vanpy.core.ModelStore import ModelArtifact
 from vanpy.core.PipelineComponent import PipelineComponent
+from vanpy.utils.audio import CANONICAL_SAMPLING_RATE, SAMPLING_RATE_KEY, load_audio
+from vanpy.utils.timing import INFERENCE
 from vanpy.utils.utils import create_dirs_if_not_exist
+from vanpy.utils.row_ids import attach_results
 import pandas as pd
 
 class WhisperSTT(PipelineComponent):
@@ -16,6 +22,9 @@ class WhisperSTT(PipelineComponent):
     :ivar model_size: Size of the Whisper model to use.
     """
     model = None
+    cacheable = True
+    reads_column_groups = ('paths_column',)
+    writes_column_groups = ('classification_columns', 'meta_columns')
     classification_column_name: str = ''
 
     def __init__(self, yaml_config: YAMLObject):
@@ -31,18 +40,33 @@ class WhisperSTT(PipelineComponent):
         create_dirs_if_not_exist(self.pretrained_models_dir)
         self.model_size = self.config.get('model_size', 'small')
 
+    def get_model_artifacts(self) -> List[ModelArtifact]:
+        """
+        :return: the checkpoint of the configured model size, its URL holds its sha256 checksum
+        """
+        import whisper
+        url = whisper._MODELS[self.model_size]
+        return [ModelArtifact(url, filename=os.path.basename(url), sha256=url.split('/')[-2])]
+
     def load_model(self):
         """
         Load the Whisper model and move to appropriate device.
+        The checkpoint is fetched through the model store to pretrained_models_dir, where whisper finds it.
         """
         import torch
+        import whisper
         self.logger.info("Loading openai-whisper speech-to-text model")
+        artifact = self.get_model_artifacts()[0]
+        self.get_model_file(artifact.source, artifact.filename, artifact.sha256)
         device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        self.model = whisper.load_model(self.model_size, download_root=self.pretrained_models_dir).to(device)
-        self.model.eval()
+        self.model = self.acquire_model('whisper.load_model', self.model_size,
+                                        lambda: whisper.load_model(self.model_size,
+                                                                   download_root=self.pretrained_models_dir
+                                                                   ).to(device).eval(),
+                                        device=str(device))
         self.logger.info(f'Loaded model to {"GPU" if torch.cuda.is_available() else "CPU"}')
 
-    def process_item(self, f, input_column, stt_column_name, language_column_name):
+    def process_item(self, f, input_column, stt_column_name, language_column_name, source_sr=None):
         """
         Process a single audio file for transcription and language detection.
 
@@ -50,28 +74,30 @@ class WhisperSTT(PipelineComponent):
         :param input_column: Name of the input column.
         :param stt_column_name: Name of the transcription output column.
         :param language_column_name: Name of the language detection column.
-        :return: DataFrame with transcription and language detection results.
+        :param source_sr: The sampling rate of the audio files, if recorded in the payload metadata.
+        :return: Record with transcription and language detection results.
         """
         try:
-            transcription = self.model.transcribe(f)
+            with self.timed(INFERENCE):
+                transcription = self.model.transcribe(load_audio(f, sr=CANONICAL_SAMPLING_RATE,
+                                                                 source_sr=source_sr)[0])
             stt = transcription['text']
             language = transcription['language']
-            return pd.DataFrame({
-                input_column: [f],
-                stt_column_name: [stt],
-                language_column_name: [language]
-            })
+            return {
+                input_column: f,
+                stt_column_name: stt,
+                language_column_name: language
+            }
         except Exception as e:
             self.logger.error(f'Failed to transcribe {f}: {e}')
-            return pd.DataFrame({input_column: [f]})
+            return {input_column: f}
 
     def process(self, input_payload: ComponentPayload) -> ComponentPayload:
-        if not self.model:
-            self.load_model()
+        self.ensure_model_loaded()
 
         payload_metadata, payload_df = input_payload.unpack()
         input_column = payload_metadata['paths_column']
-        paths_list = payload_df[input_column].dropna().tolist()
+        paths_list, row_ids = self.get_input_rows(payload_df, input_column)
 
         if not paths_list:
             self.logger.warning('You\'ve supplied an empty list to process')
@@ -84,16 +110,12 @@ class WhisperSTT(PipelineComponent):
             payload_metadata,
             input_column,
             self.stt_column_name,
-            self.language_classification_column_name
+            self.language_classification_column_name,
+            row_ids=row_ids,
+            source_sr=payload_metadata.get(SAMPLING_RATE_KEY)
         )
 
-        payload_df = pd.merge(
-            left=payload_df,
-            right=p_df,
-            how='left',
-            on=input_column,
-            # validate='1:m'
-        )
+        payload_df = attach_results(payload_df, p_df, input_column)
 
         if self.config.get('performance_measurement', False):
             file_performance_column_name = f'perf_{self.get_name()}_get_transcription'
@@ -1,11 +1,17 @@
+import warnings
+from typing import List
+
 import pandas as pd
 from yaml import YAMLObject
 import numpy as np
-import requests
 import tarfile
 from vanpy.core.ComponentPayload import ComponentPayload
+from vanpy.core.ModelStore import ModelArtifact
 from vanpy.core.PipelineComponent import PipelineComponent
+from vanpy.core.ResultCollector import ResultCollector
+from vanpy.utils.audio import CANONICAL_SAMPLING_RATE, SAMPLING_RATE_KEY, load_audio, resample
 from vanpy.utils.utils import create_dirs_if_not_exist
+from vanpy.utils.row_ids import attach_results
 
 
 class YamnetClassifier(PipelineComponent):
@@ -18,6 +24,8 @@ class YamnetClassifier(PipelineComponent):
     :ivar threshold: Confidence threshold for class prediction.
     """
     model = None
+    reads_column_groups = ('paths_column',)
+    writes_column_groups = ('classification_columns',)
     classification_column_name: str = ''
     class_names = None
     threshold = 0.
@@ -60,26 +68,31 @@ class YamnetClassifier(PipelineComponent):
         """
         Resample audio waveform to the desired sample rate.
 
+        Deprecated: use vanpy.utils.audio.resample, or load_audio with the required sampling rate.
+
         :param original_sample_rate: Current sampling rate of the waveform.
         :param waveform: Audio waveform data.
         :param desired_sample_rate: Target sampling rate (default: 16000).
         :return: Tuple of (new_sample_rate, resampled_waveform).
         """
-        import scipy
-        """Resample waveform if required."""
-        if original_sample_rate != desired_sample_rate:
-            desired_length = int(round(float(len(waveform)) /
-                                       original_sample_rate * desired_sample_rate))
-            waveform = scipy.signal.resample(waveform, desired_length)
-        return desired_sample_rate, waveform
+        warnings.warn('YamnetClassifier.ensure_sample_rate is deprecated, use vanpy.utils.audio.resample instead',
+                      DeprecationWarning, stacklevel=2)
+        return desired_sample_rate, resample(waveform, original_sample_rate, desired_sample_rate)
+
+    def get_model_artifacts(self) -> List[ModelArtifact]:
+        """
+        :return: the archive of the YAMNet TF Hub model
+        """
+        return [ModelArtifact('https://storage.googleapis.com/tfhub-modules/google/yamnet/1.tar.gz',
+                              filename='yamnet_1.tar.gz')]
 
     def load_model(self):
         """
         Load the YAMNet model and class mappings.
         
-        Downloads and extracts the model if not present in the pretrained models directory.
+        Extracts the model archive, fetched through the model store, if the model is not present in the
+        pretrained models directory.
         """
-        import os.path
         from os import path
         import tensorflow_hub as hub
 
@@ -87,12 +100,9 @@ class YamnetClassifier(PipelineComponent):
         model_path = self.pretrained_models_dir
         if not path.exists(model_path):
             create_dirs_if_not_exist(model_path)
-            r = requests.get('https://storage.googleapis.com/tfhub-modules/google/yamnet/1.tar.gz', allow_redirects=True)
-            with open(f'{model_path}/1.tar.gz', 'wb') as f:
-                f.write(r.content)
-            with tarfile.open(f'{model_path}/1.tar.gz') as f:
+            archive_path = self.get_model_store().get_file(self.get_model_artifacts()[0])
+            with tarfile.open(archive_path) as f:
                 f.extractall(model_path)
-            os.remove(f'{model_path}/1.tar.gz')
         self.model = hub.load(model_path)
         class_map_path = self.model.class_map_path().numpy()
         self.class_names = YamnetClassifier.class_names_from_csv(class_map_path)
@@ -104,11 +114,7 @@ class YamnetClassifier(PipelineComponent):
         :param input_payload: Input payload containing audio file paths and metadata.
         :return: Output payload containing sound classifications.
         """
-        import tensorflow as tf
-        from scipy.io import wavfile
-
-        if not self.model:
-            self.load_model()
+        self.ensure_model_loaded()
 
         payload_metadata, payload_df = input_payload.unpack()
         input_column = payload_metadata['paths_column']
@@ -120,11 +126,12 @@ class YamnetClassifier(PipelineComponent):
 
         class_prediction = []
 
-        p_df = pd.DataFrame()
+        collector = ResultCollector()
         for j, f in enumerate(paths_list):
             try:
-                sample_rate, wav_data = wavfile.read(f)
-                waveform = wav_data / tf.int16.max
+                # YAMNet expects 16 kHz mono
+                waveform, sample_rate = load_audio(f, sr=CANONICAL_SAMPLING_RATE,
+                                                   source_sr=payload_metadata.get(SAMPLING_RATE_KEY))
                 scores, embeddings, spectrogram = self.model(waveform)
                 mean_scores = np.mean(scores.numpy(), axis=0)
                 top_class_indices = np.argsort(mean_scores)[::-1][:self.top_k]
@@ -133,14 +140,16 @@ class YamnetClassifier(PipelineComponent):
                     if mean_scores[idx] >= self.threshold:
                         top_class_indices_refined.append(idx)
                 inferred_class = '; '.join([self.class_names[x] for x in top_class_indices_refined])  # self.class_names[scores_np.mean(axis=0).argmax()]
-                f_df = pd.DataFrame({input_column: [f], self.classification_column_name: [inferred_class]})
-                p_df = pd.concat([p_df, f_df], ignore_index=True)
+                collector.add({input_column: f, self.classification_column_name: inferred_class})
                 # class_prediction.append(inferred_class)
             except (FileNotFoundError, RuntimeError, TypeError) as e:
                 # class_prediction.append(None)
                 self.logger.error(f"An error occurred in {f}, {j + 1}/{len(paths_list)}: {e}")
 
-        payload_df = pd.merge(left=payload_df, right=p_df, how='left', on=input_column)
+        p_df = collector.to_df()
+        if p_df.empty:
+            p_df = pd.DataFrame(columns=[input_column, self.classification_column_name])
+        payload_df = attach_results(payload_df, p_df, input_column)
         # payload_df[self.classification_column_name] = class_prediction
         payload_metadata['classification_columns'].extend([self.classification_column_name])
         return ComponentPayload(metadata=payload_metadata, df=payload_df)
@@ -1,9 +1,14 @@
+import asyncio
+import os
 from abc import ABC
-from typing import Dict, List, Tuple, Union
+from typing import Dict, List, Optional, Tuple, Union
 from yaml import YAMLObject
 from vanpy.core.ComponentPayload import ComponentPayload
 from vanpy.core.PipelineComponent import PipelineComponent
-from vanpy.utils.utils import get_audio_files_paths
+from vanpy.utils.audio import SAMPLING_RATE_KEY, get_segment_file_name, is_virtual_segment_path, \
+    make_virtual_segment_path
+from vanpy.utils.utils import SEGMENT_WAV_FORMAT, acut_segment, acut_segments, cut_segment, cut_segments, \
+    get_audio_files_paths
 import pandas as pd
 
 
@@ -18,7 +23,10 @@ class BaseSegmenterComponent(PipelineComponent, ABC):
     :ivar segment_stop_column_name: Column name for segment end times.
     :ivar segment_start_column_name: Column name for segment start times.
     :ivar classification_column_name: Column name for segment classifications.
+    :ivar virtual_segments: Whether to emit virtual segment paths ('<source>#t=<start>,<stop>', see
+        vanpy.utils.audio) instead of cutting a WAV file per segment.
     """
+    supports_virtual_segments = True  # False for components writing processed audio (conversion, enhancement)
 
     def __init__(self, component_type: str, component_name: str, yaml_config: YAMLObject):
         """
@@ -33,10 +41,46 @@ class BaseSegmenterComponent(PipelineComponent, ABC):
         self.segment_stop_column_name = None
         self.segment_start_column_name = None
         self.classification_column_name = None
+        self.virtual_segments = self.supports_virtual_segments and self.config.get('virtual_segments', False)
 
     def get_processed_path(self):
         return f'{self.get_name()}_processed_path'
 
+    def cut_segment(self, input_path: str, output_dir: str, segment: Tuple[float, float], segment_id: int,
+                    separator: str, keep_only_first_segment: bool) -> str:
+        """
+        Cut a segment of audio from a given file (see vanpy.utils.utils.cut_segment). When the component is
+        served through aprocess, ffmpeg runs as an asyncio subprocess on the serving event loop.
+        With virtual_segments, no audio is written: the virtual segment path of the source file is returned, and
+        the downstream components read only the segment's samples from the source.
+
+        :return: path of the segmented audio file
+        """
+        if self.virtual_segments:
+            return make_virtual_segment_path(input_path, *segment)
+        loop = self.get_serving_event_loop()
+        if loop is None:
+            return cut_segment(input_path, output_dir, segment, segment_id, separator, keep_only_first_segment)
+        return asyncio.run_coroutine_threadsafe(
+            acut_segment(input_path, output_dir, segment, segment_id, separator, keep_only_first_segment),
+            loop).result()
+
+    def cut_segments(self, input_path: str, output_dir: str, segments: List[Tuple[float, float]], separator: str,
+                     keep_only_first_segment: bool) -> List[str]:
+        """
+        Cut all the segments of a given file, with a single ffmpeg run decoding the file once
+        (see vanpy.utils.utils.cut_segments). With virtual_segments, their virtual segment paths are returned.
+
+        :return: paths of the segmented audio files, in the order of the segments
+        """
+        if self.virtual_segments:
+            return [make_virtual_segment_path(input_path, *segment) for segment in segments]
+        loop = self.get_serving_event_loop()
+        if loop is None:
+            return cut_segments(input_path, output_dir, segments, separator, keep_only_first_segment)
+        return asyncio.run_coroutine_threadsafe(
+            acut_segments(input_path, output_dir, segments, separator, keep_only_first_segment), loop).result()
+
     def add_segment_columns_to_metadata(self, metadata: Dict) -> Dict:
         """
         Add segment timing columns to component metadata.
@@ -75,11 +119,33 @@ class BaseSegmenterComponent(PipelineComponent, ABC):
         metadata['classification_columns'].extend([self.classification_column_name])
         return metadata
 
+    def get_output_sampling_rate(self) -> Optional[int]:
+        """
+        Get the sampling rate of the audio files the component writes: the cut segments are 16 kHz mono
+        (see vanpy.utils.utils.cut_segments).
+
+        :return: The sampling rate, or None if the files keep the sampling rate of the input (e.g. virtual segments).
+        """
+        return None if self.virtual_segments else SEGMENT_WAV_FORMAT[2]
+
+    def add_sampling_rate_to_metadata(self, metadata: Dict) -> Dict:
+        """
+        Record the sampling rate of the processed files in metadata (see vanpy.utils.audio.SAMPLING_RATE_KEY),
+        so the components loading them know no resampling is needed.
+
+        :param metadata: Current metadata dictionary.
+        :return: Updated metadata with the sampling rate, if the component sets it.
+        """
+        sampling_rate = self.get_output_sampling_rate()
+        if sampling_rate is not None:
+            metadata[SAMPLING_RATE_KEY] = sampling_rate
+        return metadata
+
     def enhance_metadata(self, metadata: Dict) -> Dict:
         """
         Add all required columns to component metadata.
 
-        Adds segment timing, performance metrics, processed paths, and 
+        Adds segment timing, performance metrics, processed paths, the sampling rate of the processed files and
         classification columns if applicable.
 
         :param metadata: Current metadata dictionary.
@@ -88,6 +154,7 @@ class BaseSegmenterComponent(PipelineComponent, ABC):
         metadata = self.add_segment_columns_to_metadata(metadata)
         metadata = self.add_performance_column_to_metadata(metadata)
         metadata = self.add_processed_path_to_metadata(self.get_processed_path(), metadata)
+        metadata = self.add_sampling_rate_to_metadata(metadata)
         if self.classification_column_name is not None:
             metadata = self.add_classification_column_to_metadata(metadata)
         return metadata
@@ -101,8 +168,8 @@ class BaseSegmenterComponent(PipelineComponent, ABC):
         :param b: End time of the segment in seconds.
         """
         if self.config.get('add_segment_metadata', True):
-            f_d[self.segment_start_column_name] = [a]
-            f_d[self.segment_stop_column_name] = [b]
+            f_d[self.segment_start_column_name] = a
+            f_d[self.segment_stop_column_name] = b
 
     def get_file_paths_and_processed_df_if_not_overwriting(self, paths_list: List[str],
                                                            processed_path: str, input_column: str,
@@ -122,40 +189,34 @@ class BaseSegmenterComponent(PipelineComponent, ABC):
         :return: Tuple of (processed_df, unprocessed_paths).
         """
         unprocessed_paths_list = []
-        p_df = pd.DataFrame()
-        if not self.config.get('overwrite', False):
+        processed_records = []
+        if not self.config.get('overwrite', False) and not self.virtual_segments:
             existing_file_list = get_audio_files_paths(output_dir)
-            existing_file_list_names = ['.'.join(f.split("/")[-1].split('.')[0:-1]) for f in existing_file_list]
+            existing_file_by_name = {}
             existing_file_set = {}
             for p in existing_file_list:
-                short_name = f'{self.segment_name_separator}'.join('.'.join(p.split("/")[-1].split(".")[0:-1])
-                                                                   .split(f'{self.segment_name_separator}')[:-1])
+                name = '.'.join(p.split("/")[-1].split('.')[0:-1])
+                existing_file_by_name.setdefault(name, p)
+                short_name = f'{self.segment_name_separator}'.join(name.split(f'{self.segment_name_separator}')[:-1])
                 if short_name in existing_file_set:
                     existing_file_set[short_name].append(p)
                 else:
                     existing_file_set[short_name] = [p]
 
             for f in paths_list:
-                file_name_without_extension = f.split("/")[-1].split(".")[0]
+                file_name_without_extension = f.split("/")[-1].split(".")[0] if not is_virtual_segment_path(f) \
+                    else os.path.splitext(get_segment_file_name(f))[0]
                 if use_dir_prefix:
                     file_name_without_extension = f.split("/")[-2] + '_' + file_name_without_extension
                 if file_name_without_extension in existing_file_set:
-                    f_df = pd.DataFrame.from_dict(
-                        {processed_path: [existing_file_set[file_name_without_extension]], input_column: [f]})
-                    p_df = pd.concat([p_df, f_df], ignore_index=True)
-                elif file_name_without_extension in existing_file_list_names:
-                    f_df = pd.DataFrame.from_dict(
-                        {processed_path: [
-                            existing_file_list[existing_file_list_names.index(file_name_without_extension)]],
-                         input_column: [f]})
-                    p_df = pd.concat([p_df, f_df], ignore_index=True)
+                    processed_records.extend({processed_path: p, input_column: f}
+                                             for p in existing_file_set[file_name_without_extension])
+                elif file_name_without_extension in existing_file_by_name:
+                    processed_records.append({processed_path: existing_file_by_name[file_name_without_extension],
+                                              input_column: f})
                 else:
                     unprocessed_paths_list.append(f)
-            if processed_path in p_df:
-                p_df = p_df.explode(processed_path).reset_index().drop(['index'], axis=1)
         else:
             unprocessed_paths_list = paths_list
-        for col in [processed_path, input_column]:  # add required columns to pass merge
-            if col not in p_df:
-                p_df[col] = None
+        p_df = pd.DataFrame(processed_records, columns=[processed_path, input_column])
         return p_df, unprocessed_paths_list
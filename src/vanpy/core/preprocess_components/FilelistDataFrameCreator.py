@@ -2,6 +2,8 @@ import pandas as pd
 
 from vanpy.core.ComponentPayload import ComponentPayload
 from vanpy.core.PipelineComponent import PipelineComponent
+from vanpy.utils.payload_io import get_payload_format
+from vanpy.utils.row_ids import ensure_row_ids
 from vanpy.utils.utils import get_audio_files_paths
 from yaml import YAMLObject
 import pickle
@@ -14,9 +16,12 @@ class FilelistDataFrameCreator(PipelineComponent):
     Creates a DataFrame containing paths to audio files from either:
     - A directory specified in the input path
     - An existing CSV file specified in configuration
+    - An existing Parquet / Arrow (Feather) payload file specified in configuration, which also holds the metadata
+      and is memory-mapped (see ComponentPayload.load)
 
     :ivar config: Configuration dictionary containing load/save paths.
     """
+    streamable = False  # creates the dataset that is streamed through the following components
     def __init__(self, yaml_config: YAMLObject):
         """
         Initializes the FilelistDataFrameCreator class
@@ -29,7 +34,7 @@ class FilelistDataFrameCreator(PipelineComponent):
         """
         Create a DataFrame of audio file paths.
 
-        Either loads paths from an existing CSV or scans a directory for audio files.
+        Either loads an existing payload (CSV, Parquet or Arrow) or scans a directory for audio files.
         Updates metadata with path column information.
 
         :param input_payload: Input payload containing path information.
@@ -38,6 +43,14 @@ class FilelistDataFrameCreator(PipelineComponent):
         """
         metadata, df = input_payload.unpack()
 
+        if self.config.get('load_payload', False) and \
+                get_payload_format(self.config['load_df_path']) != 'csv':
+            payload = ComponentPayload.load(self.config['load_df_path'], columns=self.config.get('load_columns'),
+                                            memory_map=self.config.get('memory_map', True))
+            if 'load_meta_path' in self.config:
+                with open(self.config['load_meta_path'], 'rb') as pickle_file:
+                    payload.metadata.update(pickle.load(pickle_file))
+            return payload
         if self.config.get('load_payload', False):
             p_df = pd.read_csv(self.config['load_df_path'])
             if 'load_meta_path' in self.config:
@@ -52,5 +65,5 @@ class FilelistDataFrameCreator(PipelineComponent):
             processed_path = f'{self.component_name}_paths'
             metadata['paths_column'] = processed_path
             metadata['all_paths_columns'].append(processed_path)
-            p_df = pd.DataFrame(paths_list, columns=[processed_path])
+            p_df = ensure_row_ids(pd.DataFrame(paths_list, columns=[processed_path]))
         return ComponentPayload(metadata=metadata, df=p_df)
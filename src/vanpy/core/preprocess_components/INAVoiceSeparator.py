@@ -2,10 +2,11 @@ from yaml import YAMLObject
 
 from vanpy.core.ComponentPayload import ComponentPayload
 from vanpy.core.preprocess_components.BaseSegmenterComponent import BaseSegmenterComponent
-from vanpy.utils.utils import create_dirs_if_not_exist, cut_segment
-from inaSpeechSegmenter import Segmenter
+from vanpy.utils.audio import parse_virtual_segment_path
+from vanpy.utils.timing import CUT_AND_WRITE, INFERENCE
+from vanpy.utils.utils import create_dirs_if_not_exist
+from vanpy.utils.row_ids import expand_rows
 import pandas as pd
-import time
 
 
 class INAVoiceSeparator(BaseSegmenterComponent):
@@ -27,6 +28,7 @@ class INAVoiceSeparator(BaseSegmenterComponent):
         """
         Load the INA Speech Segmenter model with configured VAD engine.
         """
+        from inaSpeechSegmenter import Segmenter
         self.model = Segmenter(vad_engine=self.config['vad_engine'])
 
     @staticmethod
@@ -55,29 +57,30 @@ class INAVoiceSeparator(BaseSegmenterComponent):
         :param processed_path: Column name for output file paths.
         :param input_column: Column name for input file paths.
         :param output_dir: Directory to save processed segments.
-        :return: DataFrame containing processed segment information.
+        :return: List of records containing processed segment information.
         """
-        t_start_segmentation = time.time()
-        segmentation = self.model(f)
-        v_segments, f_segments = INAVoiceSeparator.get_voice_segments(segmentation)
-        t_end_segmentation = time.time()
+        source, start, stop = parse_virtual_segment_path(f)
+        with self.timed(INFERENCE):
+            if stop is None:
+                segmentation = self.model(f)
+            else:  # only the virtual segment's range is decoded, the returned times are relative to the source
+                segmentation = [(kind, a - start, b - start)
+                                for kind, a, b in self.model(source, start_sec=start, stop_sec=stop)]
+            v_segments, f_segments = INAVoiceSeparator.get_voice_segments(segmentation)
 
         if not v_segments:
-            return pd.DataFrame({
-                processed_path: [None],
-                input_column: [f]
-            })
-
-        f_df = pd.DataFrame()
-        for i, segment in enumerate(v_segments):
-            output_path = cut_segment(f, output_dir=output_dir, segment=segment, segment_id=i,
-                                      separator=self.segment_name_separator, keep_only_first_segment=True)
-            s_d = {processed_path: [output_path], input_column: [f]}
+            return [{processed_path: None, input_column: f}]
+
+        with self.timed(CUT_AND_WRITE):
+            output_paths = self.cut_segments(f, output_dir=output_dir, segments=v_segments,
+                                             separator=self.segment_name_separator, keep_only_first_segment=True)
+
+        records = []
+        for segment, output_path in zip(v_segments, output_paths):
+            s_d = {input_column: f, processed_path: output_path}
             self.add_segment_metadata(s_d, segment[0], segment[1])
-            self.add_performance_metadata(s_d, t_start_segmentation, t_end_segmentation)
-            s_df = pd.DataFrame.from_dict(s_d)
-            f_df = pd.concat([f_df, s_df], ignore_index=True)
-        return f_df
+            records.append(s_d)
+        return records
 
     def process(self, input_payload: ComponentPayload) -> ComponentPayload:
         """
@@ -86,25 +89,27 @@ class INAVoiceSeparator(BaseSegmenterComponent):
         :param input_payload: Input payload containing audio files and metadata.
         :return: Output payload containing voice segment information.
         """
-        if not self.model:
-            self.load_model()
+        self.ensure_model_loaded()
 
         metadata, df = input_payload.unpack()
         input_column = metadata['paths_column']
-        paths_list = df[input_column].dropna().tolist()
+        paths_list, row_ids = self.get_input_rows(df, input_column)
         output_dir = self.config['output_dir']
         create_dirs_if_not_exist(output_dir)
 
         processed_path = self.get_processed_path()
         metadata = self.enhance_metadata(metadata)
 
-        p_df, paths_list = self.get_file_paths_and_processed_df_if_not_overwriting(paths_list, processed_path,
-                                                                                   input_column, output_dir)
+        p_df, remaining_paths = self.get_file_paths_and_processed_df_if_not_overwriting(paths_list, processed_path,
+                                                                                        input_column, output_dir)
+        row_ids = self.get_remaining_row_ids(paths_list, row_ids, remaining_paths)
+        paths_list = remaining_paths
         if not paths_list:
             self.logger.warning('You\'ve supplied an empty list to process')
         else:
-            fp_df = self.process_with_progress(paths_list, metadata, processed_path, input_column, output_dir)
+            fp_df = self.process_with_progress(paths_list, metadata, processed_path, input_column, output_dir,
+                                               row_ids=row_ids)
             p_df = pd.concat([p_df, fp_df], ignore_index=True)
 
-        df = pd.merge(left=df, right=p_df, how='outer', on=input_column)
+        df = expand_rows(df, p_df, input_column)
         return ComponentPayload(metadata=metadata, df=df)
@@ -1,12 +1,14 @@
 import os
+from typing import List, Optional
 
-import pandas as pd
 from yaml import YAMLObject
 from vanpy.core.ComponentPayload import ComponentPayload
+from vanpy.core.ModelStore import ModelArtifact
 from vanpy.core.preprocess_components.BaseSegmenterComponent import BaseSegmenterComponent
+from vanpy.utils.audio import get_segment_file_name, load_speechbrain_audio
+from vanpy.utils.timing import CUT_AND_WRITE, DECODE, INFERENCE
 from vanpy.utils.utils import create_dirs_if_not_exist, cut_segment, get_audio_files_paths
-import time
-import torch
+from vanpy.utils.row_ids import attach_results
 
 
 class MetricGANSE(BaseSegmenterComponent):
@@ -18,24 +20,42 @@ class MetricGANSE(BaseSegmenterComponent):
 
     :ivar model: Loaded MetricGAN enhancement model instance.
     """
+    supports_virtual_segments = False
     model = None
 
     def __init__(self, yaml_config: YAMLObject):
         super().__init__(component_type='preprocessing', component_name='metricgan_se',
                          yaml_config=yaml_config)
 
+    def get_output_sampling_rate(self) -> Optional[int]:
+        """
+        :return: The sampling rate the enhanced files are written at.
+        """
+        return int(self.config['sampling_rate'])
+
+    def get_model_artifacts(self) -> List[ModelArtifact]:
+        """
+        :return: the SpeechBrain repository of the model
+        """
+        return [ModelArtifact('speechbrain/metricgan-plus-voicebank', kind='huggingface')]
+
     def load_model(self):
         """
         Load the MetricGAN enhancement model.
         """
+        import torch
         from speechbrain.pretrained import SpectralMaskEnhancement
+        artifact = self.get_model_artifacts()[0]
+        source = self.get_model_store().get_huggingface_source(artifact)
+        savedir = "pretrained_models/metricgan-plus-voicebank"
         if torch.cuda.is_available():
-            self.model = SpectralMaskEnhancement.from_hparams(source="speechbrain/metricgan-plus-voicebank",
-                                                          savedir="pretrained_models/metricgan-plus-voicebank",
-                                                          run_opts={"device": "cuda"})
+            self.model = self.acquire_model('speechbrain.SpectralMaskEnhancement', artifact.source,
+                                            lambda: SpectralMaskEnhancement.from_hparams(source=source, savedir=savedir,
+                                                                                         run_opts={"device": "cuda"}),
+                                            device='cuda')
         else:
-            self.model = SpectralMaskEnhancement.from_hparams(source="speechbrain/metricgan-plus-voicebank",
-                                                              savedir="pretrained_models/metricgan-plus-voicebank",)
+            self.model = self.acquire_model('speechbrain.SpectralMaskEnhancement', artifact.source,
+                                            lambda: SpectralMaskEnhancement.from_hparams(source=source, savedir=savedir))
         self.logger.info(f'Loaded model to {"GPU" if torch.cuda.is_available() else "CPU"}')
 
     def process_item(self, f, processed_path, input_column, output_dir):
@@ -46,28 +66,26 @@ class MetricGANSE(BaseSegmenterComponent):
         :param processed_path: Column name for output file paths.
         :param input_column: Column name for input file paths.
         :param output_dir: Directory to save enhanced audio.
-        :return: DataFrame containing enhanced audio information.
+        :return: Record containing enhanced audio information.
         """
         import torch
         import torchaudio
 
-        output_file = f'{output_dir}/{f.split("/")[-1]}'
-        t_start_segmentation = time.time()
+        output_file = f'{output_dir}/{get_segment_file_name(f)}'
 
         # Load and add fake batch dimension
-        noisy = self.model.load_audio(f).unsqueeze(0)
+        with self.timed(DECODE):
+            noisy = load_speechbrain_audio(self.model, f).unsqueeze(0)
 
         # Add relative length tensor
-        enhanced = self.model.enhance_batch(noisy, lengths=torch.tensor([1.]))
+        with self.timed(INFERENCE):
+            enhanced = self.model.enhance_batch(noisy, lengths=torch.tensor([1.]))
 
         # Saving enhanced signal on disk
-        torchaudio.save(output_file, enhanced.cpu(), self.config['sampling_rate'])
-        t_end_segmentation = time.time()
+        with self.timed(CUT_AND_WRITE):
+            torchaudio.save(output_file, enhanced.cpu(), self.config['sampling_rate'])
 
-        f_d = {processed_path: [output_file], input_column: [f]}
-        self.add_performance_metadata(f_d, t_start_segmentation, t_end_segmentation)
-        f_df = pd.DataFrame.from_dict(f_d)
-        return f_df
+        return {processed_path: output_file, input_column: f}
 
     def process(self, input_payload: ComponentPayload) -> ComponentPayload: 
         """
@@ -76,31 +94,32 @@ class MetricGANSE(BaseSegmenterComponent):
         :param input_payload: Input payload containing audio files and metadata.
         :return: Output payload containing enhanced audio information.
         """
-        if not self.model:
-            self.load_model()
+        self.ensure_model_loaded()
 
         metadata, df = input_payload.unpack()
         input_column = metadata['paths_column']
-        paths_list = df[input_column].dropna().tolist()
+        paths_list, row_ids = self.get_input_rows(df, input_column)
         output_dir = self.config['output_dir']
         create_dirs_if_not_exist(output_dir)
 
         processed_path = self.get_processed_path()
-        np_df, paths_list = self.get_file_paths_and_processed_df_if_not_overwriting(paths_list, processed_path,
-                                                                                   input_column, output_dir)
+        np_df, remaining_paths = self.get_file_paths_and_processed_df_if_not_overwriting(paths_list, processed_path,
+                                                                                         input_column, output_dir)
+        row_ids = self.get_remaining_row_ids(paths_list, row_ids, remaining_paths)
+        paths_list = remaining_paths
         metadata = self.add_processed_path_to_metadata(self.get_processed_path(), metadata)
         metadata = self.add_performance_column_to_metadata(metadata)
 
         if not paths_list:
             self.logger.warning('You\'ve supplied an empty list to process')
-            df = pd.merge(left=df, right=p_df, how='left', on=input_column)
+            df = attach_results(df, np_df, input_column)
             return ComponentPayload(metadata=metadata, df=df)
 
         p_df = self.process_with_progress(paths_list, metadata, processed_path,
-                                          input_column, output_dir)
+                                          input_column, output_dir, row_ids=row_ids)
 
         MetricGANSE.cleanup_softlinks()
-        df = pd.merge(left=df, right=p_df, how='left', on=input_column)
+        df = attach_results(df, p_df, input_column)
         return ComponentPayload(metadata=metadata, df=df)
 
     @staticmethod
@@ -1,11 +1,14 @@
 import os
-import time
 from typing import List, Dict, Any
 import pandas as pd
 from yaml import YAMLObject
 from vanpy.core.ComponentPayload import ComponentPayload
+from vanpy.core.ModelStore import ModelArtifact
 from vanpy.core.preprocess_components.BaseSegmenterComponent import BaseSegmenterComponent
-from vanpy.utils.utils import create_dirs_if_not_exist, cut_segment
+from vanpy.utils.audio import get_pyannote_audio_input
+from vanpy.utils.timing import CUT_AND_WRITE, INFERENCE
+from vanpy.utils.utils import create_dirs_if_not_exist
+from vanpy.utils.row_ids import expand_rows
 
 
 class PyannoteSD(BaseSegmenterComponent):
@@ -33,6 +36,16 @@ class PyannoteSD(BaseSegmenterComponent):
                                                           f'{self.component_name}_classification')
         self.keep_only_first_segment = self.config.get('keep_only_first_segment', False)
 
+    def get_model_artifacts(self) -> List[ModelArtifact]:
+        """
+        :return: the (gated) pyannote/speaker-diarization@2.1 repository, and the segmentation and embedding models
+            its configuration loads
+        """
+        return [ModelArtifact('pyannote/speaker-diarization', kind='huggingface', revision='2.1',
+                              token=self.ACCESS_TOKEN),
+                ModelArtifact('pyannote/segmentation', kind='huggingface', revision='2022.07', token=self.ACCESS_TOKEN),
+                ModelArtifact('speechbrain/spkrec-ecapa-voxceleb', kind='huggingface')]
+
     def load_model(self):
         """
         Load and configure the Pyannote speaker diarization pipeline.
@@ -50,7 +63,11 @@ class PyannoteSD(BaseSegmenterComponent):
         if 'hparams' in self.config:
             yaml.dump(self.config['hparams'], open('pyannote_sd.yaml', 'w'), default_flow_style=False)
 
-        model_path = "pyannote/speaker-diarization@2.1"
+        model_path = self.get_model_store().get_huggingface_source(self.get_model_artifacts()[0])
+        if os.path.isdir(model_path):  # the repository prefetched to the model store
+            model_path = os.path.join(model_path, 'config.yaml')
+        else:
+            model_path = "pyannote/speaker-diarization@2.1"
         cache_dir = 'pretrained_models/pyannote_sd'
 
         if os.path.exists('pyannote_sd.yaml'):
@@ -69,7 +86,7 @@ class PyannoteSD(BaseSegmenterComponent):
         Processes the audio file through the diarization pipeline to identify
         different speakers and their speaking segments.
 
-        :param audio_file: Path to the audio file to process.
+        :param audio_file: Path to the audio file (or virtual segment) to process.
         :return: List of dictionaries containing segment information:
                 - "start": Start time in seconds
                 - "stop": End time in seconds
@@ -77,7 +94,7 @@ class PyannoteSD(BaseSegmenterComponent):
         :raises ValueError: If audio file processing fails.
         """
         try:
-            annotation = self.model(audio_file)
+            annotation = self.model(get_pyannote_audio_input(audio_file))
             segments = []
             for segment, _, label in annotation.itertracks(yield_label=True):
                 segments.append({
@@ -91,7 +108,7 @@ class PyannoteSD(BaseSegmenterComponent):
             return []
 
     def process_item(self, audio_file: str, processed_path: str, input_column: str,
-                     output_dir: str) -> pd.DataFrame:
+                     output_dir: str) -> List[Dict]:
         """
         Process a single audio file for speaker diarization.
 
@@ -102,38 +119,34 @@ class PyannoteSD(BaseSegmenterComponent):
         :param processed_path: Column name for processed file paths.
         :param input_column: Column name for input file paths.
         :param output_dir: Directory to save processed segments.
-        :return: DataFrame containing segment information and file paths.
+        :return: List of records (row dicts, one per segment) containing segment information and file paths,
+            a single record without a processed path if no speech was found.
         """
-        t_start_segmentation = time.time()
-        segments = self.get_voice_segments(audio_file)
-        t_end_segmentation = time.time()
+        with self.timed(INFERENCE):
+            segments = self.get_voice_segments(audio_file)
 
         if not segments:
-            return pd.DataFrame({
-                processed_path: [None],
-                input_column: [audio_file]
-            })
-
-        f_df = pd.DataFrame()
-        for i, segment in enumerate(segments):
-            output_path = cut_segment(audio_file, output_dir=output_dir, segment=(segment["start"], segment["stop"]),
-                                      segment_id=i, separator=self.segment_name_separator,
-                                      keep_only_first_segment=self.keep_only_first_segment)
-
+            return [{processed_path: None, input_column: audio_file}]
+
+        if self.keep_only_first_segment:
+            segments = segments[:1]
+        with self.timed(CUT_AND_WRITE):
+            output_paths = self.cut_segments(audio_file, output_dir=output_dir,
+                                             segments=[(segment["start"], segment["stop"]) for segment in segments],
+                                             separator=self.segment_name_separator,
+                                             keep_only_first_segment=self.keep_only_first_segment)
+
+        records = []
+        for segment, output_path in zip(segments, output_paths):
             s_d = {
-                processed_path: [output_path],
-                input_column: [audio_file],
-                self.classification_column_name: [segment["label"]]
+                input_column: audio_file,
+                processed_path: output_path,
+                self.classification_column_name: segment["label"]
             }
             self.add_segment_metadata(s_d, segment["start"], segment["stop"])
-            self.add_performance_metadata(s_d, t_start_segmentation, t_end_segmentation)
-
-            s_df = pd.DataFrame.from_dict(s_d)
-            f_df = pd.concat([f_df, s_df], ignore_index=True)
 
-            if self.keep_only_first_segment:
-                break
-        return f_df
+            records.append(s_d)
+        return records
 
     def process(self, input_payload: ComponentPayload) -> ComponentPayload:
         """
@@ -146,25 +159,27 @@ class PyannoteSD(BaseSegmenterComponent):
         :param input_payload: Input payload containing audio files and metadata.
         :return: Output payload containing diarization results and segment files.
         """
-        if not hasattr(self, 'model'):
-            self.load_model()
+        self.ensure_model_loaded()
 
         metadata, df = input_payload.unpack()
         input_column = metadata['paths_column']
-        paths_list = df[input_column].dropna().tolist()
+        paths_list, row_ids = self.get_input_rows(df, input_column)
         output_dir = self.config['output_dir']
         create_dirs_if_not_exist(output_dir)
 
         processed_path = self.get_processed_path()
         metadata = self.enhance_metadata(metadata)
 
-        p_df, paths_list = self.get_file_paths_and_processed_df_if_not_overwriting(paths_list, processed_path,
-                                                                                   input_column, output_dir)
+        p_df, remaining_paths = self.get_file_paths_and_processed_df_if_not_overwriting(paths_list, processed_path,
+                                                                                        input_column, output_dir)
+        row_ids = self.get_remaining_row_ids(paths_list, row_ids, remaining_paths)
+        paths_list = remaining_paths
         if not paths_list:
             self.logger.warning('You\'ve supplied an empty list to process')
         else:
-            fp_df = self.process_with_progress(paths_list, metadata, processed_path, input_column, output_dir)
+            fp_df = self.process_with_progress(paths_list, metadata, processed_path, input_column, output_dir,
+                                               row_ids=row_ids)
             p_df = pd.concat([p_df, fp_df], ignore_index=True)
 
-        df = pd.merge(left=df, right=p_df, how='outer', on=input_column)
+        df = expand_rows(df, p_df, input_column)
         return ComponentPayload(metadata=metadata, df=df)
\ No newline at end of file
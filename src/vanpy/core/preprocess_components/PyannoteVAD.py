@@ -1,10 +1,15 @@
+import os
 from typing import List, Tuple
+
 from yaml import YAMLObject
 from vanpy.core.ComponentPayload import ComponentPayload
+from vanpy.core.ModelStore import ModelArtifact
 from vanpy.core.preprocess_components.BaseSegmenterComponent import BaseSegmenterComponent
-from vanpy.utils.utils import create_dirs_if_not_exist, cut_segment
+from vanpy.utils.audio import get_pyannote_audio_input
+from vanpy.utils.timing import CUT_AND_WRITE, INFERENCE
+from vanpy.utils.utils import create_dirs_if_not_exist
+from vanpy.utils.row_ids import expand_rows
 import pandas as pd
-import time
 
 
 class PyannoteVAD(BaseSegmenterComponent):
@@ -33,6 +38,12 @@ class PyannoteVAD(BaseSegmenterComponent):
             raise KeyError(f'You need to pass huggingface_ACCESS_TOKEN to use {self.component_name} model')
         self.keep_only_first_segment = self.config.get('keep_only_first_segment', False)
 
+    def get_model_artifacts(self) -> List[ModelArtifact]:
+        """
+        :return: the (gated) pyannote/segmentation repository
+        """
+        return [ModelArtifact('pyannote/segmentation', kind='huggingface', token=self.ACCESS_TOKEN)]
+
     def load_model(self):
         """
         Load Pyannote VAD model and initialize with configuration parameters.
@@ -43,7 +54,10 @@ class PyannoteVAD(BaseSegmenterComponent):
         from pyannote.audio import Model
         from pyannote.audio.pipelines import VoiceActivityDetection
         import torch
-        model = Model.from_pretrained("pyannote/segmentation",
+        source = self.get_model_store().get_huggingface_source(self.get_model_artifacts()[0])
+        if os.path.isdir(source):  # the repository prefetched to the model store
+            source = os.path.join(source, 'pytorch_model.bin')
+        model = Model.from_pretrained(source,
                                       use_auth_token=self.ACCESS_TOKEN,
                                       cache_dir='pretrained_models/pyannote_vad')
         self.model = VoiceActivityDetection(segmentation=model)
@@ -54,10 +68,10 @@ class PyannoteVAD(BaseSegmenterComponent):
         """
         Extract voice segments from an audio file.
 
-        :param f: Path to the audio file.
+        :param f: Path to the audio file (or virtual segment).
         :return: List of (start_time, end_time) tuples in seconds.
         """
-        annotation = self.model(f)
+        annotation = self.model(get_pyannote_audio_input(f))
         segments = []
         for i, v in enumerate(annotation.itersegments()):
             start, stop = v
@@ -72,34 +86,27 @@ class PyannoteVAD(BaseSegmenterComponent):
         :param processed_path: Column name for processed file paths.
         :param input_column: Column name for input file paths.
         :param output_dir: Directory to save processed segments.
-        :return: DataFrame containing segment information.
+        :return: List of records containing segment information.
         """
-        t_start_segmentation = time.time()
-        v_segments = self.get_voice_segments(f)
-        t_end_segmentation = time.time()
+        with self.timed(INFERENCE):
+            v_segments = self.get_voice_segments(f)
 
         if not v_segments:
-            return pd.DataFrame({
-                processed_path: [None],
-                input_column: [f]
-            })
-
-        f_df = pd.DataFrame()
-
-        for i, segment in enumerate(v_segments):
-            output_path = cut_segment(f, output_dir=output_dir, segment=segment, segment_id=i,
-                                      separator=self.segment_name_separator,
-                                      keep_only_first_segment=self.keep_only_first_segment)
-            s_d = {processed_path: [output_path], input_column: [f]}
+            return [{processed_path: None, input_column: f}]
+
+        if self.keep_only_first_segment:
+            v_segments = v_segments[:1]
+        with self.timed(CUT_AND_WRITE):
+            output_paths = self.cut_segments(f, output_dir=output_dir, segments=v_segments,
+                                             separator=self.segment_name_separator,
+                                             keep_only_first_segment=self.keep_only_first_segment)
+
+        records = []
+        for segment, output_path in zip(v_segments, output_paths):
+            s_d = {input_column: f, processed_path: output_path}
             self.add_segment_metadata(s_d, segment[0], segment[1])
-            self.add_performance_metadata(s_d, t_start_segmentation, t_end_segmentation)
-
-            s_df = pd.DataFrame.from_dict(s_d)
-            f_df = pd.concat([f_df, s_df], ignore_index=True)
-
-            if self.keep_only_first_segment:
-                break
-        return f_df
+            records.append(s_d)
+        return records
 
 
     def process(self, input_payload: ComponentPayload) -> ComponentPayload: 
@@ -109,26 +116,28 @@ class PyannoteVAD(BaseSegmenterComponent):
         :param input_payload: Input payload containing audio files and metadata.
         :return: Output payload containing voice activity detection results.
         """
-        if not self.model:
-            self.load_model()
+        self.ensure_model_loaded()
 
         metadata, df = input_payload.unpack()
         input_column = metadata['paths_column']
-        paths_list = df[input_column].dropna().tolist()
+        paths_list, row_ids = self.get_input_rows(df, input_column)
         output_dir = self.config['output_dir']
         create_dirs_if_not_exist(output_dir)
 
         processed_path = self.get_processed_path()
         metadata = self.enhance_metadata(metadata)
 
-        p_df, paths_list = self.get_file_paths_and_processed_df_if_not_overwriting(paths_list, processed_path,
-                                                                                   input_column, output_dir)
+        p_df, remaining_paths = self.get_file_paths_and_processed_df_if_not_overwriting(paths_list, processed_path,
+                                                                                        input_column, output_dir)
+        row_ids = self.get_remaining_row_ids(paths_list, row_ids, remaining_paths)
+        paths_list = remaining_paths
         if not paths_list:
             self.logger.warning('You\'ve supplied an empty list to process')
         else:
-            fp_df = self.process_with_progress(paths_list, metadata, processed_path, input_column, output_dir)
+            fp_df = self.process_with_progress(paths_list, metadata, processed_path, input_column, output_dir,
+                                               row_ids=row_ids)
             p_df = pd.concat([p_df, fp_df], ignore_index=True)
 
-        df = pd.merge(left=df, right=p_df, how='outer', on=input_column)
+        df = expand_rows(df, p_df, input_column)
         return ComponentPayload(metadata=metadata, df=df)
 
@@ -1,11 +1,14 @@
 import os
+from typing import List
 
-import pandas as pd
 from yaml import YAMLObject
 from vanpy.core.preprocess_components.BaseSegmenterComponent import BaseSegmenterComponent
 from vanpy.core.ComponentPayload import ComponentPayload
+from vanpy.core.ModelStore import ModelArtifact
+from vanpy.utils.audio import get_segment_file_name, load_speechbrain_audio
+from vanpy.utils.timing import CUT_AND_WRITE, INFERENCE
 from vanpy.utils.utils import create_dirs_if_not_exist, cut_segment, get_audio_files_paths
-import time
+from vanpy.utils.row_ids import attach_results
 
 
 class SepFormerSE(BaseSegmenterComponent):
@@ -17,6 +20,7 @@ class SepFormerSE(BaseSegmenterComponent):
 
     :ivar model: Loaded SepFormer enhancement model instance.
     """
+    supports_virtual_segments = False
     model = None
 
     def __init__(self, yaml_config: YAMLObject):
@@ -28,6 +32,12 @@ class SepFormerSE(BaseSegmenterComponent):
         super().__init__(component_type='preprocessing', component_name='sepformer_se',
                          yaml_config=yaml_config)
 
+    def get_model_artifacts(self) -> List[ModelArtifact]:
+        """
+        :return: the SpeechBrain repository of the model
+        """
+        return [ModelArtifact('speechbrain/sepformer-wham16k-enhancement', kind='huggingface')]
+
     def load_model(self):
         """
         Load SepFormer model from SpeechBrain.
@@ -37,13 +47,17 @@ class SepFormerSE(BaseSegmenterComponent):
         """
         import torch
         from speechbrain.pretrained import SepformerSeparation
+        artifact = self.get_model_artifacts()[0]
+        source = self.get_model_store().get_huggingface_source(artifact)
+        savedir = "pretrained_models/sepformer-wham16k-enhancement"
         if torch.cuda.is_available():
-            self.model = SepformerSeparation.from_hparams(source="speechbrain/sepformer-wham16k-enhancement",
-                                                          savedir="pretrained_models/sepformer-wham16k-enhancement",
-                                                          run_opts={"device": "cuda"})
+            self.model = self.acquire_model('speechbrain.SepformerSeparation', artifact.source,
+                                            lambda: SepformerSeparation.from_hparams(source=source, savedir=savedir,
+                                                                                     run_opts={"device": "cuda"}),
+                                            device='cuda')
         else:
-            self.model = SepformerSeparation.from_hparams(source="speechbrain/sepformer-wham16k-enhancement",
-                                                              savedir="pretrained_models/sepformer-wham16k-enhancement",)
+            self.model = self.acquire_model('speechbrain.SepformerSeparation', artifact.source,
+                                            lambda: SepformerSeparation.from_hparams(source=source, savedir=savedir))
         self.logger.info(f'Loaded model to {"GPU" if torch.cuda.is_available() else "CPU"}')
 
     def process_item(self, f, processed_path, input_column, output_dir):
@@ -54,18 +68,15 @@ class SepFormerSE(BaseSegmenterComponent):
         :param processed_path: Column name for processed file paths.
         :param input_column: Column name for input file paths.
         :param output_dir: Directory to save enhanced audio.
-        :return: DataFrame containing enhanced audio information.
+        :return: Record containing enhanced audio information.
         """
         import torchaudio
-        output_file = f'{output_dir}/{f.split("/")[-1]}'
-        t_start_segmentation = time.time()
-        enhanced = self.model.separate_file(path=f)
-        torchaudio.save(output_file, enhanced[:, :, 0].detach().cpu(), 16000)
-        t_end_segmentation = time.time()
-        f_d = {processed_path: [output_file], input_column: [f]}
-        self.add_performance_metadata(f_d, t_start_segmentation, t_end_segmentation)
-        f_df = pd.DataFrame.from_dict(f_d)
-        return f_df
+        output_file = f'{output_dir}/{get_segment_file_name(f)}'
+        with self.timed(INFERENCE):
+            enhanced = self.model.separate_batch(load_speechbrain_audio(self.model, f).unsqueeze(0))
+        with self.timed(CUT_AND_WRITE):
+            torchaudio.save(output_file, enhanced[:, :, 0].detach().cpu(), 16000)
+        return {processed_path: output_file, input_column: f}
 
     def process(self, input_payload: ComponentPayload) -> ComponentPayload:
         """
@@ -74,31 +85,32 @@ class SepFormerSE(BaseSegmenterComponent):
         :param input_payload: The input payload containing the paths to the audio files to be enhanced.
         :return: The output payload containing the paths to the enhanced audio files.
         """
-        if not self.model:
-            self.load_model()
+        self.ensure_model_loaded()
 
         metadata, df = input_payload.unpack()
         input_column = metadata['paths_column']
-        paths_list = df[input_column].dropna().tolist()
+        paths_list, row_ids = self.get_input_rows(df, input_column)
         output_dir = self.config['output_dir']
         create_dirs_if_not_exist(output_dir)
 
         processed_path = self.get_processed_path()
-        p_df, paths_list = self.get_file_paths_and_processed_df_if_not_overwriting(paths_list, processed_path,
-                                                                                   input_column, output_dir)
+        p_df, remaining_paths = self.get_file_paths_and_processed_df_if_not_overwriting(paths_list, processed_path,
+                                                                                        input_column, output_dir)
+        row_ids = self.get_remaining_row_ids(paths_list, row_ids, remaining_paths)
+        paths_list = remaining_paths
         metadata = self.add_processed_path_to_metadata(self.get_processed_path(), metadata)
         metadata = self.add_performance_column_to_metadata(metadata)
 
         if not paths_list:
             self.logger.warning('You\'ve supplied an empty list to process')
-            df = pd.merge(left=df, right=p_df, how='left', on=input_column)
+            df = attach_results(df, p_df, input_column)
             return ComponentPayload(metadata=metadata, df=df)
 
         p_df = self.process_with_progress(paths_list, metadata, processed_path,
-                                          input_column, output_dir)
+                                          input_column, output_dir, row_ids=row_ids)
 
         SepFormerSE.cleanup_softlinks()
-        df = pd.merge(left=df, right=p_df, how='left', on=input_column)
+        df = attach_results(df, p_df, input_column)
         return ComponentPayload(metadata=metadata, df=df)
 
     @staticmethod
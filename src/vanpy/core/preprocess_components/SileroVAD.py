@@ -1,11 +1,14 @@
-import time
-from typing import Union
+from typing import Dict, List, Union
 
 from yaml import YAMLObject
 import pandas as pd
 from vanpy.core.ComponentPayload import ComponentPayload
+from vanpy.core.ModelStore import ModelArtifact
 from vanpy.core.preprocess_components.BaseSegmenterComponent import BaseSegmenterComponent
-from vanpy.utils.utils import cut_segment, create_dirs_if_not_exist
+from vanpy.utils.audio import SAMPLING_RATE_KEY, load_audio
+from vanpy.utils.timing import CUT_AND_WRITE, DECODE, INFERENCE
+from vanpy.utils.utils import create_dirs_if_not_exist
+from vanpy.utils.row_ids import expand_rows
 
 
 class SileroVAD(BaseSegmenterComponent):
@@ -36,19 +39,30 @@ class SileroVAD(BaseSegmenterComponent):
         self.sampling_rate = self.config.get('sampling_rate', 16000)
         self.keep_only_first_segment = self.config.get('keep_only_first_segment', False)
 
+    def get_model_artifacts(self) -> List[ModelArtifact]:
+        """
+        :return: the silero-vad torch hub repository
+        """
+        return [ModelArtifact('snakers4/silero-vad', kind='torch_hub')]
+
     def load_model(self):
         """
         Load Silero VAD model and utility functions.
         
-        Downloads model from torch hub and configures for GPU if available.
+        Loads the repository prefetched to the model store, or downloads it from torch hub,
+        and configures for GPU if available.
         """
         import torch
-        torch.hub.set_dir('pretrained_models/')
-        self.model, self.utils = torch.hub.load(repo_or_dir='snakers4/silero-vad', model='silero_vad',
-                                                force_reload=False)
+        repository_dir = self.get_model_store().get_torch_hub_dir(self.get_model_artifacts()[0])
+        if repository_dir is not None:
+            load = lambda: torch.hub.load(repo_or_dir=repository_dir, model='silero_vad', source='local')
+        else:
+            torch.hub.set_dir('pretrained_models/')
+            load = lambda: torch.hub.load(repo_or_dir='snakers4/silero-vad', model='silero_vad', force_reload=False)
+        self.model, self.utils = self.acquire_model('torch.hub.load', 'snakers4/silero-vad', load)
         self.logger.info(f'Loaded model to {"GPU" if torch.cuda.is_available() else "CPU"}')
 
-    def process_item(self, f, processed_path, input_column, output_dir) -> pd.DataFrame:
+    def process_item(self, f, processed_path, input_column, output_dir, source_sr=None) -> List[Dict]:
         """
         Process a single audio file for voice activity detection.
 
@@ -56,40 +70,40 @@ class SileroVAD(BaseSegmenterComponent):
         :param processed_path: Column name for processed file paths.
         :param input_column: Column name for input file paths.
         :param output_dir: Directory to save processed segments.
-        :return: DataFrame containing segment information.
+        :param source_sr: The sampling rate of the audio files, if recorded in the payload metadata.
+        :return: List of records containing segment information.
         """
+        import torch
         (get_speech_timestamps,
          save_audio,
          read_audio,
          VADIterator,
          collect_chunks) = self.utils
 
-        t_start_segmentation = time.time()
-        wav = read_audio(f, sampling_rate=self.sampling_rate)
-        v_segments = [(x['start'] / self.sampling_rate, x['end'] / self.sampling_rate)
-                      for x in get_speech_timestamps(wav, self.model, sampling_rate=self.sampling_rate, **self.params)]
-        t_end_segmentation = time.time()
+        with self.timed(DECODE):
+            wav = torch.from_numpy(load_audio(f, sr=self.sampling_rate, source_sr=source_sr)[0])
+        with self.timed(INFERENCE):
+            v_segments = [(x['start'] / self.sampling_rate, x['end'] / self.sampling_rate)
+                          for x in get_speech_timestamps(wav, self.model, sampling_rate=self.sampling_rate,
+                                                         **self.params)]
 
         if not v_segments:
-            return pd.DataFrame({
-                processed_path: [None],
-                input_column: [f]
-            })
-
-        f_df = pd.DataFrame()  # Initialize a new DataFrame for each file
-        for i, segment in enumerate(v_segments):
-            output_path = cut_segment(f, output_dir=output_dir, segment=segment, segment_id=i,
-                                      separator=self.segment_name_separator,
-                                      keep_only_first_segment=self.keep_only_first_segment)
-            s_d = {processed_path: [output_path], input_column: [f]}
+            return [{processed_path: None, input_column: f}]
+
+        if self.keep_only_first_segment:
+            v_segments = v_segments[:1]
+        with self.timed(CUT_AND_WRITE):
+            output_paths = self.cut_segments(f, output_dir=output_dir, segments=v_segments,
+                                             separator=self.segment_name_separator,
+                                             keep_only_first_segment=self.keep_only_first_segment)
+
+        records = []
+        for segment, output_path in zip(v_segments, output_paths):
+            s_d = {input_column: f, processed_path: output_path}
             self.add_segment_metadata(s_d, segment[0], segment[1])
-            self.add_performance_metadata(s_d, t_start_segmentation, t_end_segmentation)
-            s_df = pd.DataFrame.from_dict(s_d)
-            f_df = pd.concat([f_df, s_df], ignore_index=True)
-            if self.keep_only_first_segment:
-                break
+            records.append(s_d)
 
-        return f_df
+        return records
 
     def process(self, input_payload: ComponentPayload) -> ComponentPayload:
         """
@@ -100,25 +114,28 @@ class SileroVAD(BaseSegmenterComponent):
         :param input_payload: The input payload to process.
         :return: The processed payload.
         """
-        if not self.model:
-            self.load_model()
+        self.ensure_model_loaded()
 
         metadata, df = input_payload.unpack()
+        source_sr = metadata.get(SAMPLING_RATE_KEY)  # of the input files, enhance_metadata records the output's
         input_column = metadata['paths_column']
-        paths_list = df[input_column].dropna().tolist()
+        paths_list, row_ids = self.get_input_rows(df, input_column)
         output_dir = self.config['output_dir']
         create_dirs_if_not_exist(output_dir)
 
         processed_path = self.get_processed_path()
         metadata = self.enhance_metadata(metadata)
 
-        p_df, paths_list = self.get_file_paths_and_processed_df_if_not_overwriting(paths_list, processed_path,
-                                                                                   input_column, output_dir)
+        p_df, remaining_paths = self.get_file_paths_and_processed_df_if_not_overwriting(paths_list, processed_path,
+                                                                                        input_column, output_dir)
+        row_ids = self.get_remaining_row_ids(paths_list, row_ids, remaining_paths)
+        paths_list = remaining_paths
         if not paths_list:
             self.logger.warning('You\'ve supplied an empty list to process')
         else:
-            fp_df = self.process_with_progress(paths_list, metadata, processed_path, input_column, output_dir)
+            fp_df = self.process_with_progress(paths_list, metadata, processed_path, input_column, output_dir,
+                                               row_ids=row_ids, source_sr=source_sr)
             p_df = pd.concat([p_df, fp_df], ignore_index=True)
 
-        df = pd.merge(left=df, right=p_df, how='outer', on=input_column)
+        df = expand_rows(df, p_df, input_column)
         return ComponentPayload(metadata=metadata, df=df)
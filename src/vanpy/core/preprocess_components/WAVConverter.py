@@ -1,10 +1,12 @@
 import subprocess
+from typing import Optional
 
 from vanpy.core.ComponentPayload import ComponentPayload
+from vanpy.core.ResultCollector import ResultCollector
 from vanpy.core.preprocess_components.BaseSegmenterComponent import BaseSegmenterComponent
 from vanpy.utils.utils import create_dirs_if_not_exist
+from vanpy.utils.row_ids import attach_results
 from yaml import YAMLObject
-import pandas as pd
 from pydub import AudioSegment
 from tqdm.auto import tqdm
 
@@ -18,6 +20,7 @@ class WAVConverter(BaseSegmenterComponent):
 
     :ivar params_list: List of FFMPEG parameters from configuration.
     """
+    supports_virtual_segments = False
     def __init__(self, yaml_config: YAMLObject):
         """
         Initializes the WAVConverter class and creates initial ffmpeg configuration parameters
@@ -46,6 +49,13 @@ class WAVConverter(BaseSegmenterComponent):
                 params_list.append(available_parameters[ap])
         return params_list
 
+    def get_output_sampling_rate(self) -> Optional[int]:
+        """
+        :return: The sampling rate of the converted files, from the 'ar' parameter (e.g. 16000 or '16k').
+        """
+        ar = str(self.config.get('ar', 16000)).lower()
+        return int(float(ar[:-1]) * 1000) if ar.endswith('k') else int(float(ar))
+
     def process(self, input_payload: ComponentPayload) -> ComponentPayload:
         """
         Convert audio files to WAV format using FFMPEG.
@@ -68,9 +78,11 @@ class WAVConverter(BaseSegmenterComponent):
 
         if not paths_list:
             self.logger.warning('You\'ve supplied an empty list to process')
-            df = pd.merge(left=df, right=p_df, how='left', on=input_column)
+            df = attach_results(df, p_df, input_column)
             return ComponentPayload(metadata=metadata, df=df)
 
+        collector = ResultCollector()
+        collector.add(p_df)
         for j, f in enumerate(tqdm(paths_list)):
             filename = ''.join(f.split("/")[-1].split(".")[:-1])
             dir_prefix = ''
@@ -86,10 +98,9 @@ class WAVConverter(BaseSegmenterComponent):
                 self.logger.error(f'Error converting {f}: {e}')
                 continue
 
-            f_df = pd.DataFrame.from_dict({processed_path: [f'{output_dir}/{output_filename}'],
-                                           input_column: [f]})
-            p_df = pd.concat([p_df, f_df], ignore_index=True)
+            collector.add({processed_path: f'{output_dir}/{output_filename}', input_column: f})
             self.latent_info_log(f'Converted {f}, {j + 1}/{len(paths_list)}', iteration=j)
-        df = pd.merge(left=df, right=p_df, how='left', on=input_column)
+        p_df = collector.to_df()
+        df = attach_results(df, p_df, input_column)
         metadata = self.enhance_metadata(metadata)
         return ComponentPayload(metadata=metadata, df=df)
@@ -1,10 +1,12 @@
 import os
-import pandas as pd
+from typing import Optional
 from pydub import AudioSegment
 from tqdm.auto import tqdm
 from vanpy.core.ComponentPayload import ComponentPayload
+from vanpy.core.ResultCollector import ResultCollector
 from vanpy.core.preprocess_components.BaseSegmenterComponent import BaseSegmenterComponent
 from vanpy.utils.utils import create_dirs_if_not_exist
+from vanpy.utils.row_ids import attach_results, expand_rows
 from yaml import YAMLObject
 
 class WAVSplitter(BaseSegmenterComponent):
@@ -17,6 +19,7 @@ class WAVSplitter(BaseSegmenterComponent):
     :ivar max_audio_length: Maximum length of each segment in seconds.
     :ivar max_wav_file_size: Maximum size of each segment in bytes.
     """
+    supports_virtual_segments = False
     def __init__(self, yaml_config: YAMLObject):
         """
         Initializes the WAVSplitter class and creates initial splitting configuration parameters
@@ -27,6 +30,12 @@ class WAVSplitter(BaseSegmenterComponent):
         self.max_audio_length = self.config.get('max_audio_length', None)  # in seconds
         self.max_wav_file_size = self.config.get('max_wav_file_size', None)  # in bytes
 
+    def get_output_sampling_rate(self) -> Optional[int]:
+        """
+        :return: None, the split files keep the sampling rate of their source.
+        """
+        return None
+
     def process(self, input_payload: ComponentPayload) -> ComponentPayload:
         """
         Split WAV audio files by maximum length or file size.
@@ -48,9 +57,11 @@ class WAVSplitter(BaseSegmenterComponent):
                                                                                    use_dir_prefix=self.config.get('use_dir_name_as_prefix', False))
         if not paths_list:
             self.logger.warning('You\'ve supplied an empty list to process')
-            df = pd.merge(left=df, right=p_df, how='left', on=input_column)
+            df = attach_results(df, p_df, input_column)
             return ComponentPayload(metadata=metadata, df=df)
 
+        collector = ResultCollector()
+        collector.add(p_df)
         for j, f in enumerate(tqdm(paths_list)):
             try:
                 audio = AudioSegment.from_file(f)
@@ -58,29 +69,30 @@ class WAVSplitter(BaseSegmenterComponent):
 
                 # Determine the appropriate splitting method
                 if self.max_audio_length and total_duration > self.max_audio_length:
-                    self.split_audio_by_length(audio, f, output_dir, p_df, input_column, j)
+                    self.split_audio_by_length(audio, f, output_dir, collector, input_column, j)
                 elif self.max_wav_file_size and os.path.getsize(f) > self.max_wav_file_size:
-                    self.split_audio_by_size(audio, f, output_dir, p_df, input_column, j)
+                    self.split_audio_by_size(audio, f, output_dir, collector, input_column, j)
                 else:
                     # No splitting needed, just copy the original file path
-                    f_df = pd.DataFrame.from_dict({processed_path: [f], input_column: [f]})
-                    p_df = pd.concat([p_df, f_df], ignore_index=True)
+                    collector.add({processed_path: f, input_column: f})
             except Exception as e:
                 self.logger.error(f'Error processing {f}: {e}')
                 continue
 
-        df = pd.merge(left=df, right=p_df, how='outer', on=input_column)
+        p_df = collector.to_df()
+        df = expand_rows(df, p_df, input_column)
         metadata = self.enhance_metadata(metadata)
         return ComponentPayload(metadata=metadata, df=df)
 
-    def split_audio_by_length(self, audio, original_path, output_dir, p_df, input_column, file_index):
+    def split_audio_by_length(self, audio, original_path, output_dir, collector: ResultCollector, input_column,
+                              file_index):
         """
         Split audio file based on maximum duration.
 
         :param audio: AudioSegment object to split.
         :param original_path: Path to original audio file.
         :param output_dir: Directory to save split segments.
-        :param p_df: DataFrame to store processing results.
+        :param collector: ResultCollector to store processing results.
         :param input_column: Column name for input file paths.
         :param file_index: Index for progress tracking.
         """
@@ -99,9 +111,7 @@ class WAVSplitter(BaseSegmenterComponent):
             segment_filepath = os.path.join(output_dir, segment_filename)
             segment.export(segment_filepath, format='wav')
 
-            f_df = pd.DataFrame.from_dict({self.get_processed_path(): [segment_filepath],
-                                           input_column: [original_path]})
-            p_df = pd.concat([p_df, f_df], ignore_index=True)
+            collector.add({self.get_processed_path(): segment_filepath, input_column: original_path})
             self.latent_info_log(f'Split {original_path} into {segment_filename}', iteration=file_index)
 
         # Handle the remaining segment if it exists
@@ -112,19 +122,18 @@ class WAVSplitter(BaseSegmenterComponent):
             segment_filepath = os.path.join(output_dir, segment_filename)
             segment.export(segment_filepath, format='wav')
 
-            f_df = pd.DataFrame.from_dict({self.get_processed_path(): [segment_filepath],
-                                           input_column: [original_path]})
-            p_df = pd.concat([p_df, f_df], ignore_index=True)
+            collector.add({self.get_processed_path(): segment_filepath, input_column: original_path})
             self.latent_info_log(f'Split {original_path} into {segment_filename}', iteration=file_index)
 
-    def split_audio_by_size(self, audio, original_path, output_dir, p_df, input_column, file_index):
+    def split_audio_by_size(self, audio, original_path, output_dir, collector: ResultCollector, input_column,
+                            file_index):
         """
         Split audio file based on maximum file size.
 
         :param audio: AudioSegment object to split.
         :param original_path: Path to original audio file.
         :param output_dir: Directory to save split segments.
-        :param p_df: DataFrame to store processing results.
+        :param collector: ResultCollector to store processing results.
         :param input_column: Column name for input file paths.
         :param file_index: Index for progress tracking.
         """
@@ -154,9 +163,7 @@ class WAVSplitter(BaseSegmenterComponent):
             segment_filepath = os.path.join(output_dir, segment_filename)
             segment.export(segment_filepath, format='wav')
 
-            f_df = pd.DataFrame.from_dict({self.get_processed_path(): [segment_filepath],
-                                           input_column: [original_path]})
-            p_df = pd.concat([p_df, f_df], ignore_index=True)
+            collector.add({self.get_processed_path(): segment_filepath, input_column: original_path})
             self.latent_info_log(f'Split {original_path} into {segment_filename}', iteration=file_index)
 
         # Handle the remaining segment if it exists
@@ -167,7 +174,5 @@ class WAVSplitter(BaseSegmenterComponent):
             segment_filepath = os.path.join(output_dir, segment_filename)
             segment.export(segment_filepath, format='wav')
 
-            f_df = pd.DataFrame.from_dict({self.get_processed_path(): [segment_filepath],
-                                           input_column: [original_path]})
-            p_df = pd.concat([p_df, f_df], ignore_index=True)
+            collector.add({self.get_processed_path(): segment_filepath, input_column: original_path})
             self.latent_info_log(f'Split {original_path} into {segment_filename}', iteration=file_index)
@@ -0,0 +1,308 @@
+import os
+import threading
+import wave
+from collections import OrderedDict
+from math import gcd
+from typing import Hashable, Optional, Tuple
+
+import numpy as np
+
+VIRTUAL_SEGMENT_MARKER = '#t='  # a virtual segment path is '<source path>#t=<start>,<stop>' (a media fragment URI)
+CANONICAL_SAMPLING_RATE = 16000  # the sampling rate the components' models expect
+SAMPLING_RATE_KEY = 'sampling_rate'  # payload metadata key of the sampling rate of the files in the paths column
+_PCM_DTYPES = {1: 'u1', 2: '<i2', 4: '<i4'}  # numpy dtypes of the integer PCM WAV sample widths
+
+
+def _format_seconds(seconds: float) -> str:
+    return f'{seconds:.6f}'.rstrip('0').rstrip('.')
+
+
+def is_virtual_segment_path(path) -> bool:
+    """
+    Check if a path refers to a virtual segment, a sample range of a source audio file which was not cut to a file.
+    :param path: an audio path
+    :return: True if the path is a virtual segment path
+    """
+    return isinstance(path, str) and VIRTUAL_SEGMENT_MARKER in path
+
+
+def parse_virtual_segment_path(path: str) -> Tuple[str, float, Optional[float]]:
+    """
+    Split a virtual segment path into the source file path and the segment's offsets.
+    :param path: a virtual segment path, or a regular file path
+    :return: tuple of the source path, the start (0 for a regular path) and the stop (None for a regular path),
+        in seconds
+    """
+    if not is_virtual_segment_path(path):
+        return path, 0.0, None
+    source, fragment = path.rsplit(VIRTUAL_SEGMENT_MARKER, 1)
+    start, stop = fragment.split(',')
+    return source, float(start), float(stop)
+
+
+def make_virtual_segment_path(path: str, start: float, stop: float) -> str:
+    """
+    Build the path of a virtual segment of an audio file, no audio is written. The offsets of a segment of a virtual
+    segment are relative to the source file, so the path always refers to the original file.
+    :param path: path of the audio file (or of a virtual segment)
+    :param start: start time of the segment in seconds, relative to the path
+    :param stop: end time of the segment in seconds, relative to the path
+    :return: the virtual segment path
+    """
+    source, offset, _ = parse_virtual_segment_path(path)
+    return f'{source}{VIRTUAL_SEGMENT_MARKER}{_format_seconds(offset + start)},{_format_seconds(offset + stop)}'
+
+
+def get_segment_file_name(path: str, extension: Optional[str] = None) -> str:
+    """
+    Get a file name for audio written from a path (e.g. an enhanced file): the file name of a regular path,
+    '<source name>_<start>-<stop><extension>' for a virtual segment.
+    :param path: an audio path
+    :param extension: the extension of the file name, the extension of the source if None
+    :return: the file name
+    """
+    source, start, stop = parse_virtual_segment_path(path)
+    name, source_extension = os.path.splitext(os.path.basename(source))
+    extension = source_extension if extension is None else extension
+    if stop is None:
+        return f'{name}{extension}'
+    return f'{name}_{_format_seconds(start)}-{_format_seconds(stop)}{extension}'
+
+
+def resample(y: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+    """
+    Resample a signal along its last axis, with soxr if it is installed (pip install vanpy[audio]), otherwise with
+    scipy's polyphase filter. A signal already at target_sr is returned as is.
+    :param y: the signal
+    :param orig_sr: the sampling rate of the signal
+    :param target_sr: the required sampling rate
+    :return: the resampled signal
+    """
+    if orig_sr == target_sr:
+        return y
+    try:
+        import soxr
+        return soxr.resample(np.ascontiguousarray(y.T), orig_sr, target_sr).T.astype(y.dtype, copy=False)
+    except ImportError:
+        from scipy.signal import resample_poly
+        factor = gcd(int(orig_sr), int(target_sr))
+        return resample_poly(y, int(target_sr) // factor, int(orig_sr) // factor, axis=-1).astype(y.dtype)
+
+
+class DecodedAudioCache:
+    """
+    Process-wide LRU cache of decoded waveforms, shared by all the components of the process, so a file read by
+    several components (e.g. an embedding extractor, wav2vec2 and whisper) is decoded and resampled once.
+
+    A waveform is keyed by its path, the size and modification time of its source file (a rewritten file is decoded
+    again), its sampling rate and whether it was downmixed. The least recently used waveforms are evicted when their
+    total size exceeds max_size_bytes, and the cache is disabled when it is 0.
+    """
+    _instance: Optional['DecodedAudioCache'] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, max_size_bytes: int = 256 * 2 ** 20):
+        """
+        :param max_size_bytes: the maximal total size of the cached waveforms, 0 to disable the cache
+        """
+        self.max_size_bytes = max_size_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Hashable, Tuple[np.ndarray, int]]' = OrderedDict()
+        self._size_bytes = 0
+
+    @classmethod
+    def get_instance(cls) -> 'DecodedAudioCache':
+        """
+        :return: the cache of the process
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    @property
+    def size_bytes(self) -> int:
+        """
+        :return: the total size of the cached waveforms
+        """
+        return self._size_bytes
+
+    def get_key(self, path: str, sr: Optional[int], mono: bool) -> Optional[Tuple]:
+        """
+        :param path: an audio path or a virtual segment path
+        :param sr: the sampling rate of the waveform, the native sampling rate if None
+        :param mono: whether the waveform is downmixed
+        :return: the cache key, None if the cache is disabled or the source file can not be read
+        """
+        if self.max_size_bytes <= 0:
+            return None
+        try:
+            stat = os.stat(parse_virtual_segment_path(str(path))[0])
+        except OSError:
+            return None
+        return str(path), stat.st_size, stat.st_mtime_ns, sr, mono
+
+    def get(self, key: Hashable) -> Optional[Tuple[np.ndarray, int]]:
+        """
+        :param key: the cache key (see get_key)
+        :return: a copy of the cached waveform and its sampling rate, None if it is not cached
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return entry[0].copy(), entry[1]  # the caller may modify its waveform
+
+    def put(self, key: Hashable, y: np.ndarray, sr: int) -> None:
+        """
+        Caches a copy of a waveform, evicting the least recently used ones above max_size_bytes. A waveform larger
+        than max_size_bytes is not cached.
+
+        :param key: the cache key (see get_key)
+        :param y: the waveform
+        :param sr: its sampling rate
+        """
+        if y.nbytes > self.max_size_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size_bytes -= previous[0].nbytes
+            self._entries[key] = (y.copy(), sr)
+            self._size_bytes += y.nbytes
+            self._evict()
+
+    def set_max_size(self, max_size_bytes: int) -> None:
+        """
+        :param max_size_bytes: the maximal total size of the cached waveforms, 0 to disable the cache
+        """
+        with self._lock:
+            self.max_size_bytes = max_size_bytes
+            self._evict()
+
+    def clear(self) -> None:
+        """
+        Evicts all the cached waveforms.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._size_bytes = 0
+
+    def _evict(self) -> None:
+        while self._entries and self._size_bytes > self.max_size_bytes:
+            _, (y, _) = self._entries.popitem(last=False)
+            self._size_bytes -= y.nbytes
+
+
+def load_audio(path: str, sr: Optional[int] = None, mono: bool = True,
+               source_sr: Optional[int] = None) -> Tuple[np.ndarray, int]:
+    """
+    Load an audio file or a virtual segment (see make_virtual_segment_path) as a float32 signal in [-1, 1], like
+    librosa.load: only the segment's sample range is read from the source, with the wave module for PCM WAV files
+    (no decoding library involved), otherwise with soundfile (falling back to librosa for formats libsndfile does not
+    support). The signal is downmixed by averaging the channels and resampled only if the source is not at sr.
+    The waveform is served from the DecodedAudioCache if another component already loaded it.
+    :param path: an audio path or a virtual segment path
+    :param sr: the required sampling rate, the native sampling rate if None
+    :param mono: whether to downmix to mono
+    :param source_sr: the sampling rate of the source if known, the payload metadata's SAMPLING_RATE_KEY recorded by
+        the segmenters. When it is sr, the signal is loaded at its native rate (no resampling), sharing the cache
+        entry of the components loading it at the native rate.
+    :return: tuple of the float32 signal (shape (samples,) if mono, otherwise (channels, samples)) and its sampling rate
+    """
+    if sr is not None and sr == source_sr:
+        y, native_sr = load_audio(path, None, mono)
+        return (y, native_sr) if native_sr == sr else (resample(y, native_sr, sr), sr)  # the metadata is stale
+    cache = DecodedAudioCache.get_instance()
+    key = cache.get_key(path, sr, mono)
+    cached = cache.get(key) if key is not None else None
+    if cached is not None:
+        return cached
+    y, sr = _decode_audio(path, sr, mono)
+    if key is not None:
+        cache.put(key, y, sr)
+    return y, sr
+
+
+def _read_pcm_wav(source: str, start: float, stop: Optional[float]) -> Optional[Tuple[np.ndarray, int]]:
+    """
+    :return: the float32 signal (channels, samples) of a sample range of an integer PCM WAV file and its sampling
+        rate, None if the file is not one the wave module reads (e.g. a float or 24-bit WAV, or another format)
+    """
+    try:
+        with wave.open(source, 'rb') as w:
+            n_channels, sample_width, native_sr, n_frames = (w.getnchannels(), w.getsampwidth(), w.getframerate(),
+                                                             w.getnframes())
+            if sample_width not in _PCM_DTYPES:
+                return None
+            first = min(int(round(start * native_sr)), n_frames)
+            last = n_frames if stop is None else min(max(int(round(stop * native_sr)), first), n_frames)
+            w.setpos(first)
+            data = w.readframes(last - first)
+    except (wave.Error, EOFError):
+        return None
+    y = np.frombuffer(data, dtype=_PCM_DTYPES[sample_width]).astype(np.float32)
+    if sample_width == 1:  # 8-bit WAV samples are unsigned
+        y -= 128
+    y /= 2 ** (8 * sample_width - 1)
+    return y.reshape(-1, n_channels).T, native_sr
+
+
+def _decode_audio(path: str, sr: Optional[int], mono: bool) -> Tuple[np.ndarray, int]:
+    source, start, stop = parse_virtual_segment_path(path)
+    pcm = _read_pcm_wav(source, start, stop)
+    if pcm is not None:
+        y, native_sr = pcm
+    else:
+        y, native_sr = _read_audio(source, start, stop)
+    if mono:
+        y = y.mean(axis=0)
+    if sr is not None:
+        y = resample(y, native_sr, sr)
+        native_sr = sr
+    return np.ascontiguousarray(y, dtype=np.float32), native_sr
+
+
+def _read_audio(source: str, start: float, stop: Optional[float]) -> Tuple[np.ndarray, int]:
+    try:
+        import soundfile as sf
+        with sf.SoundFile(source) as audio_file:
+            native_sr = audio_file.samplerate
+            audio_file.seek(min(int(round(start * native_sr)), audio_file.frames))
+            frames = -1 if stop is None else max(int(round(stop * native_sr)) - int(round(start * native_sr)), 0)
+            y = audio_file.read(frames, dtype='float32', always_2d=True).T
+    except (ImportError, RuntimeError):  # soundfile is not installed, or libsndfile does not support the format
+        import librosa
+        y, native_sr = librosa.load(source, sr=None, mono=False, offset=start,
+                                    duration=None if stop is None else stop - start)
+        y = np.atleast_2d(y)
+    return y, native_sr
+
+
+def get_pyannote_audio_input(path: str):
+    """
+    Get the input of a pyannote model or pipeline for an audio path: the in-memory waveform, so the file is decoded
+    by load_audio (once for all the components, and only the sample range of a virtual segment).
+    :param path: an audio path or a virtual segment path
+    :return: a dict of the waveform tensor (channel, time) and its sampling rate
+    """
+    import torch
+    y, sr = load_audio(path, sr=CANONICAL_SAMPLING_RATE)
+    return {'waveform': torch.from_numpy(y).unsqueeze(0), 'sample_rate': sr}
+
+
+def load_speechbrain_audio(model, path: str):
+    """
+    Load an audio path for a SpeechBrain pretrained interface, like its load_audio (mono, at the model's sampling
+    rate), through load_audio.
+    :param model: the SpeechBrain pretrained interface
+    :param path: an audio path or a virtual segment path
+    :return: the signal tensor (time,)
+    """
+    import torch
+    return torch.from_numpy(load_audio(path, sr=model.audio_normalizer.sample_rate)[0])
@@ -0,0 +1,114 @@
+import sys
+import wave
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from vanpy.utils.audio import is_virtual_segment_path, parse_virtual_segment_path
+
+
+@dataclass
+class PaddedBatch:
+    """
+    A batch of variable-length signals, right-padded with zeros to the length of the longest one.
+
+    :ivar values: padded signals, shape (batch, max_length)
+    :ivar lengths: length (in samples) of each signal
+    :ivar relative_lengths: length of each signal relative to max_length (the `wav_lens` format of SpeechBrain)
+    :ivar attention_mask: 1 for the samples of the signal, 0 for padding, shape (batch, max_length)
+    """
+    values: np.ndarray
+    lengths: np.ndarray
+    relative_lengths: np.ndarray
+    attention_mask: np.ndarray
+
+
+def pad_signals(signals: Sequence[np.ndarray], padding_value: float = 0.0, dtype=np.float32) -> PaddedBatch:
+    """
+    Pads 1-D signals of different lengths into a single batch.
+
+    :param signals: list of 1-D signals
+    :param padding_value: the value used for padding
+    :param dtype: dtype of the padded values
+    :return: PaddedBatch of the signals
+    """
+    lengths = np.array([len(s) for s in signals], dtype=np.int64)
+    max_length = max(int(lengths.max()) if len(lengths) else 0, 1)
+    values = np.full((len(signals), max_length), padding_value, dtype=dtype)
+    attention_mask = np.zeros((len(signals), max_length), dtype=np.int64)
+    for i, signal in enumerate(signals):
+        values[i, :lengths[i]] = signal
+        attention_mask[i, :lengths[i]] = 1
+    return PaddedBatch(values=values, lengths=lengths, relative_lengths=(lengths / max_length).astype(np.float32),
+                       attention_mask=attention_mask)
+
+
+def get_audio_duration(path: str) -> Optional[float]:
+    """
+    Reads the duration of a WAV file from its header, without decoding the audio.
+    The duration of a virtual segment (see vanpy.utils.audio) is read from its path.
+
+    :param path: path to the audio file
+    :return: duration in seconds, or None if it can not be read from the header (e.g. not a WAV file)
+    """
+    if is_virtual_segment_path(path):
+        _, start, stop = parse_virtual_segment_path(path)
+        return stop - start
+    try:
+        with wave.open(str(path), 'rb') as w:
+            return w.getnframes() / w.getframerate()
+    except (wave.Error, EOFError, OSError, ZeroDivisionError):
+        return None
+
+
+def make_batches(durations: Sequence[Optional[float]], max_batch_size: int,
+                 max_batch_seconds: Optional[float] = None) -> List[List[int]]:
+    """
+    Groups items into batches of similar duration, so little computation is wasted on padding.
+    Items are sorted by duration and batches are filled greedily while both limits hold:
+    the number of items is at most max_batch_size and the padded audio length
+    (batch size * longest duration in the batch) is at most max_batch_seconds.
+    An item longer than max_batch_seconds forms a batch of its own.
+    Items with an unknown duration are placed in the last batches, limited by max_batch_size only.
+
+    :param durations: duration (in seconds) of each item, or None if unknown
+    :param max_batch_size: maximal number of items in a batch
+    :param max_batch_seconds: maximal padded audio length of a batch in seconds, the batch memory budget
+    :return: list of batches, each a list of item indexes
+    """
+    max_batch_size = max(max_batch_size, 1)
+    order = sorted(range(len(durations)), key=lambda i: (durations[i] is None, durations[i] or 0.0))
+    batches, batch, batch_max_duration = [], [], 0.0
+    for i in order:
+        duration = durations[i] or 0.0
+        new_max_duration = max(batch_max_duration, duration)
+        if batch and (len(batch) >= max_batch_size or
+                      (max_batch_seconds and new_max_duration * (len(batch) + 1) > max_batch_seconds)):
+            batches.append(batch)
+            batch, new_max_duration = [], duration
+        batch.append(i)
+        batch_max_duration = new_max_duration
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def is_out_of_memory_error(e: BaseException) -> bool:
+    """
+    Checks whether an exception was raised because a (CPU or GPU) memory allocation failed.
+
+    :param e: the exception
+    :return: True for out of memory errors
+    """
+    return isinstance(e, MemoryError) or type(e).__name__ == 'OutOfMemoryError' or \
+        (isinstance(e, RuntimeError) and 'out of memory' in str(e).lower())
+
+
+def release_cached_memory() -> None:
+    """
+    Releases memory cached by the CUDA allocator, if torch is in use.
+    """
+    torch = sys.modules.get('torch')
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
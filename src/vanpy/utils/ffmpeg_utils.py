@@ -1,12 +1,10 @@
-import subprocess
 import pandas as pd
-from vanpy.utils.utils import create_dirs_if_not_exist
-from tqdm import tqdm
+from vanpy.utils.utils import cut_segments as cut_audio_segments
 
 
 def cut_segments(input_file_path: str, df: pd.DataFrame, output_dir: str, offset: float = 0.0, play_speed_multiplier: float = 1.0, start_tt_column_name: str = 'start_tt', end_tt_column_name: str = 'end_tt', path_column_name: str = 'input_path') -> pd.DataFrame:
     """
-    Cut segments from an audio file using FFMPEG.
+    Cut segments from an audio file using FFMPEG. The segments keep the sampling rate and channels of the file.
 
     :param input_file_path: The path of the input audio file.
     :param df: A DataFrame containing the start and end timestamps of the segments to be cut.
@@ -18,33 +16,28 @@ def cut_segments(input_file_path: str, df: pd.DataFrame, output_dir: str, offset
     :param path_column_name: The name of the column containing the input audio file path.
     :return: An extended DataFrame containing the paths of the cut segments.
     """
-    create_dirs_if_not_exist(output_dir)
-    ffmpeg_config = ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error", "-i",
-                     "input_file", "-ss", "start_tt", "-to", "end_tt", "-vn", "output_file", '-dn', '-ignore_unknown', '-sn']
-    input_file_idx = ffmpeg_config.index("input_file")
-    output_file_idx = ffmpeg_config.index("output_file")
-    start_tt_idx = ffmpeg_config.index("start_tt")
-    end_tt_idx = ffmpeg_config.index("end_tt")
-
-    ffmpeg_config[input_file_idx] = f"{input_file_path}"
-
-    for index, row in tqdm(df.iterrows()):
+    segments, output_paths = [], []
+    for index, row in df.iterrows():
         output_filename: str = input_file_path.split('/')[-1].split('\\')[-1].split('.')[0] + f'_{index}.wav'
-        start_tt = row[start_tt_column_name]
-        end_tt = row[end_tt_column_name]
-        if type(start_tt) == str:
-            start_tt = start_tt.replace(',', '.')
-        else:
-            start_tt *= play_speed_multiplier
-            start_tt -= offset
-        if type(end_tt) == str:
-            end_tt = end_tt.replace(',', '.')
-        else:
-            end_tt *= play_speed_multiplier
-            end_tt -= offset
-        ffmpeg_config[output_file_idx] = f'{output_dir}/{output_filename}'
-        ffmpeg_config[start_tt_idx] = f"{start_tt}"
-        ffmpeg_config[end_tt_idx] = f"{end_tt}"
-        subprocess.run(ffmpeg_config)
-        df.loc[index, path_column_name] = f'{output_dir}/{output_filename}'
+        segments.append((_to_seconds(row[start_tt_column_name], offset, play_speed_multiplier),
+                         _to_seconds(row[end_tt_column_name], offset, play_speed_multiplier)))
+        output_paths.append(f'{output_dir}/{output_filename}')
+    # all the segments are written by a single ffmpeg run decoding the file once, with no resampling or downmixing
+    cut_audio_segments(input_file_path, output_dir, segments, '_', False, output_paths=output_paths, output_options=[])
+    for index, output_path in zip(df.index, output_paths):
+        df.loc[index, path_column_name] = output_path
     return df
+
+
+def _to_seconds(tt, offset: float, play_speed_multiplier: float) -> float:
+    """
+    Convert a segment timestamp to seconds of the audio file.
+
+    :param tt: a timestamp in seconds, or an 'HH:MM:SS,mmm' string (the offset and multiplier are not applied to it)
+    :param offset: The offset to be subtracted from a timestamp in seconds.
+    :param play_speed_multiplier: The play speed multiplier of a timestamp in seconds.
+    :return: the timestamp in seconds
+    """
+    if type(tt) == str:
+        return sum(float(part) * 60 ** i for i, part in enumerate(reversed(tt.replace(',', '.').split(':'))))
+    return tt * play_speed_multiplier - offset
@@ -0,0 +1,288 @@
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from vanpy.core.FeatureBlock import FeatureBlock
+from vanpy.utils.utils import create_dirs_if_not_exist
+
+PAYLOAD_FORMATS = ('csv', 'parquet', 'arrow')
+PAYLOAD_EXTENSIONS = {'csv': 'csv', 'parquet': 'parquet', 'arrow': 'arrow'}
+FORMATS_BY_EXTENSION = {'.csv': 'csv', '.parquet': 'parquet', '.arrow': 'arrow', '.feather': 'arrow', '.ipc': 'arrow'}
+PAYLOAD_METADATA_KEY = b'vanpy.payload'  # schema metadata key of the payload metadata in parquet and arrow files
+FEATURE_BLOCK_COLUMN_PREFIX = '__feature_block__'
+
+logger = logging.getLogger('vanpy payload io')
+
+
+def import_pyarrow():
+    """
+    Imports pyarrow, which is required by the parquet and arrow payload formats.
+
+    :return: the pyarrow module
+    """
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError("The 'parquet' and 'arrow' payload formats require pyarrow, "
+                          "install it with `pip install vanpy[arrow]` or use payload_format: 'csv'") from e
+    return pyarrow
+
+
+def validate_payload_format(payload_format: str) -> str:
+    """
+    :param payload_format: one of PAYLOAD_FORMATS
+    :return: the payload format
+    """
+    if payload_format not in PAYLOAD_FORMATS:
+        raise ValueError(f"Unknown payload format '{payload_format}', choose from {PAYLOAD_FORMATS}")
+    return payload_format
+
+
+def get_payload_format(path: str) -> str:
+    """
+    :param path: a payload file path
+    :return: the payload format, by the file extension ('.feather' and '.ipc' files are Arrow IPC files)
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS_BY_EXTENSION:
+        raise ValueError(f"Unknown payload file extension '{extension}', choose from {tuple(FORMATS_BY_EXTENSION)}")
+    return FORMATS_BY_EXTENSION[extension]
+
+
+def encode_payload_metadata(metadata: Dict, feature_blocks: Optional[Dict[str, FeatureBlock]] = None) -> bytes:
+    """
+    Encodes the payload metadata (and the layout of its feature blocks) for the schema metadata of a file.
+
+    :param metadata: the payload metadata, without the feature blocks
+    :param feature_blocks: the feature blocks written as columns of the file
+    :return: JSON encoded metadata
+    """
+    blocks = {name: {'columns': block.columns, 'key_column': block.key_column,
+                     'column': f'{FEATURE_BLOCK_COLUMN_PREFIX}{name}'} for name, block in (feature_blocks or {}).items()}
+    return json.dumps({'metadata': metadata, 'feature_blocks': blocks}, default=str).encode()
+
+
+def write_payload(path: str, metadata: Dict, df: pd.DataFrame, feature_blocks: Optional[Dict[str, FeatureBlock]] = None,
+                  payload_format: Optional[str] = None) -> str:
+    """
+    Writes a payload into a single typed, columnar file: a Parquet file or an uncompressed Arrow IPC (Feather v2)
+    file, which can be memory-mapped when read. The metadata is kept in the file's schema metadata and each
+    feature block is kept as a single fixed-size-list float32 column (a row per DataFrame row).
+
+    :param path: the output path
+    :param metadata: the payload metadata, without the feature blocks
+    :param df: the payload DataFrame
+    :param feature_blocks: the payload feature blocks
+    :param payload_format: 'parquet' or 'arrow', by the path extension if None
+    :return: the path
+    """
+    payload_format = validate_payload_format(payload_format or get_payload_format(path))
+    if payload_format == 'csv':
+        raise ValueError('Payloads with metadata can be written to parquet or arrow files only')
+    pa = import_pyarrow()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    feature_blocks = feature_blocks or {}
+    keys = {}
+    for name, block in feature_blocks.items():
+        if block.key_column not in keys:
+            keys[block.key_column] = df[block.key_column].to_numpy(dtype=object)
+        values = block.align(keys[block.key_column])
+        table = table.append_column(f'{FEATURE_BLOCK_COLUMN_PREFIX}{name}', pa.FixedSizeListArray.from_arrays(
+            pa.array(np.ascontiguousarray(values).reshape(-1)), len(block.columns)))
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                           PAYLOAD_METADATA_KEY: encode_payload_metadata(metadata, feature_blocks)})
+    if payload_format == 'parquet':
+        import pyarrow.parquet as pq
+        pq.write_table(table, path)
+    else:
+        import pyarrow.ipc
+        with pa.ipc.new_file(path, table.schema) as writer:
+            writer.write_table(table)
+    return path
+
+
+def read_payload(path: str, columns: Optional[List[str]] = None,
+                 memory_map: bool = True) -> Tuple[Dict, pd.DataFrame, Dict[str, FeatureBlock]]:
+    """
+    Reads a payload written by write_payload (or any Parquet / Arrow IPC file, whose metadata is then empty).
+
+    Arrow IPC files are memory-mapped: only the DataFrame columns are converted to pandas, the feature blocks
+    remain views of the mapped file, so their pages are read from disk only when they are used.
+    Parquet files have to be decoded, but only the requested columns are read.
+
+    :param path: the payload file path
+    :param columns: the DataFrame columns to read, all of them if None (the feature blocks are always read)
+    :param memory_map: whether to memory-map the file
+    :return: tuple of the metadata, the DataFrame and the feature blocks
+    """
+    payload_format = get_payload_format(path)
+    if payload_format == 'csv':
+        raise ValueError('Payloads with metadata can be read from parquet or arrow files only')
+    pa = import_pyarrow()
+    if payload_format == 'parquet':
+        import pyarrow.parquet as pq
+        schema = pq.read_schema(path)
+    else:
+        import pyarrow.ipc
+        source = pa.memory_map(path, 'r') if memory_map else pa.OSFile(path, 'rb')
+        reader = pa.ipc.open_file(source)
+        schema = reader.schema
+    encoded = (schema.metadata or {}).get(PAYLOAD_METADATA_KEY)
+    decoded = json.loads(encoded) if encoded else {'metadata': {}, 'feature_blocks': {}}
+    block_columns = {spec['column'] for spec in decoded['feature_blocks'].values()}
+    if columns is None:
+        columns = [name for name in schema.names if name not in block_columns]
+    key_columns = {spec['key_column'] for spec in decoded['feature_blocks'].values()} - set(columns)
+    selected = list(columns) + [c for c in schema.names if c in block_columns or c in key_columns]
+    if payload_format == 'parquet':
+        table = pq.read_table(path, columns=selected, memory_map=memory_map)
+    else:
+        table = reader.read_all().select(selected)
+
+    df = table.select(list(columns)).to_pandas()
+    feature_blocks = {}
+    for name, spec in decoded['feature_blocks'].items():
+        flat = table.column(spec['column']).combine_chunks().flatten()
+        values = flat.to_numpy(zero_copy_only=False).reshape(-1, len(spec['columns']))
+        keys = df[spec['key_column']].to_numpy(dtype=object) if spec['key_column'] in df.columns \
+            else table.column(spec['key_column']).to_numpy(zero_copy_only=False)
+        feature_blocks[name] = FeatureBlock(spec['columns'], values, spec['key_column'], keys)
+    return decoded['metadata'], df, feature_blocks
+
+
+def write_df(df: pd.DataFrame, path: str, payload_format: str = 'csv') -> str:
+    """
+    Writes a DataFrame (without its index) in the given format.
+
+    :param df: the DataFrame to write
+    :param path: the output path
+    :param payload_format: 'csv', 'parquet' or 'arrow' (Arrow IPC file)
+    :return: the path
+    """
+    validate_payload_format(payload_format)
+    if payload_format == 'csv':
+        df.to_csv(path, index=False)
+    else:
+        pa = import_pyarrow()
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if payload_format == 'parquet':
+            import pyarrow.parquet as pq
+            pq.write_table(table, path)
+        else:
+            import pyarrow.ipc
+            with pa.ipc.new_file(path, table.schema) as writer:
+                writer.write_table(table)
+    return path
+
+
+class AppendOnlyDataFrameWriter:
+    """
+    Writes a DataFrame incrementally: every call to append adds only the given rows to the output file
+    (a CSV file opened in append mode, a Parquet row group or an Arrow IPC record batch), so the bytes written over
+    a run grow linearly with the number of rows, instead of re-writing the whole DataFrame at every checkpoint.
+
+    When the appended rows do not fit the file's columns or types (e.g. a column which was empty so far receives
+    strings), the writer continues in a new part file (<path_prefix>_part<n>.<extension>).
+    The file is readable once the writer is closed (Parquet and Arrow write their footer on close).
+    """
+
+    def __init__(self, path_prefix: str, payload_format: str = 'csv', metadata: Optional[Dict] = None):
+        """
+        :param path_prefix: path of the output file, without extension
+        :param payload_format: 'csv', 'parquet' or 'arrow'
+        :param metadata: payload metadata kept in the schema metadata of parquet and arrow files (see read_payload)
+        """
+        self.path_prefix = path_prefix
+        self.metadata = metadata
+        self.payload_format = validate_payload_format(payload_format)
+        if payload_format != 'csv':
+            import_pyarrow()
+        directory = os.path.dirname(path_prefix)
+        if directory:
+            create_dirs_if_not_exist(directory)
+        self.rows_written = 0
+        self.paths = []
+        self._writer = None
+        self._schema = None
+        self._columns: Optional[list] = None
+
+    @property
+    def path(self) -> Optional[str]:
+        """
+        :return: the path of the current part file, None if nothing was written yet
+        """
+        return self.paths[-1] if self.paths else None
+
+    def append(self, df: pd.DataFrame) -> int:
+        """
+        Appends rows to the output file.
+
+        :param df: the rows to append
+        :return: the number of appended rows
+        """
+        if df.empty:
+            return 0
+        if self.payload_format == 'csv':
+            self._append_csv(df)
+        else:
+            self._append_arrow(df)
+        self.rows_written += len(df)
+        return len(df)
+
+    def close(self) -> None:
+        """
+        Closes the output file.
+        """
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self) -> 'AppendOnlyDataFrameWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def _new_part_path(self) -> str:
+        part = f'_part{len(self.paths)}' if self.paths else ''
+        path = f'{self.path_prefix}{part}.{PAYLOAD_EXTENSIONS[self.payload_format]}'
+        self.paths.append(path)
+        if len(self.paths) > 1:
+            logger.debug(f'Columns changed, continuing in {path}')
+        return path
+
+    def _append_csv(self, df: pd.DataFrame) -> None:
+        if self._columns is not None and set(df.columns) <= set(self._columns):
+            df.reindex(columns=self._columns).to_csv(self.path, mode='a', header=False, index=False)
+            return
+        self._columns = list(df.columns)
+        df.to_csv(self._new_part_path(), index=False)
+
+    def _append_arrow(self, df: pd.DataFrame) -> None:
+        pa = import_pyarrow()
+        table = None
+        if self._writer is not None and set(df.columns) <= set(self._schema.names):
+            try:
+                table = pa.Table.from_pandas(df.reindex(columns=self._schema.names), schema=self._schema,
+                                             preserve_index=False)
+            except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+                table = None
+        if table is None:
+            self.close()
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self.metadata is not None:
+                table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                                       PAYLOAD_METADATA_KEY: encode_payload_metadata(self.metadata)})
+            self._schema = table.schema
+            path = self._new_part_path()
+            if self.payload_format == 'parquet':
+                import pyarrow.parquet as pq
+                self._writer = pq.ParquetWriter(path, self._schema)
+            else:
+                import pyarrow.ipc
+                self._writer = pa.ipc.new_file(path, self._schema)
+        self._writer.write_table(table)
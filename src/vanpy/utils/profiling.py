@@ -0,0 +1,206 @@
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from vanpy.utils.utils import create_dirs_if_not_exist
+
+PROFILING_MODES = ('sampling', 'deterministic')
+
+logger = logging.getLogger('vanpy profiling')
+
+
+def format_frame(frame) -> str:
+    """
+    Formats a stack frame as a collapsed-stack frame label.
+
+    :param frame: a Python frame object
+    :return: label of the form 'function (file.py:line)'
+    """
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class ComponentProfiler:
+    """
+    Profiles the work of a single pipeline component.
+
+    Two modes are supported:
+
+    - 'sampling' (default): a background thread samples the stacks of the threads working for the component
+      (the thread running process and the workers while they run process_item) every sampling_interval seconds.
+      Its overhead does not depend on the executed code, so it is safe to keep enabled in production.
+      Writes a flamegraph-ready collapsed-stack file (.collapsed, for flamegraph.pl / speedscope) and a text
+      summary of the most sampled functions (_profile.txt).
+    - 'deterministic': cProfile of the process thread and of every processed item, merged into a single pstats
+      file (.prof, for pstats / snakeviz). Accurate call counts, but a significant overhead. The stacks are sampled
+      as well, so the collapsed-stack file is written in this mode too.
+
+    Profiling sessions are reentrant and may overlap (e.g. concurrent aprocess calls), the files are written when
+    the last session ends.
+    """
+
+    def __init__(self, output_prefix: str, mode: str = 'sampling', sampling_interval: float = 0.01,
+                 top_functions: int = 50):
+        """
+        :param output_prefix: path prefix of the written profile files (a timestamp and extension are appended)
+        :param mode: 'sampling' or 'deterministic'
+        :param sampling_interval: seconds between stack samples
+        :param top_functions: number of functions listed in the text summary
+        """
+        if mode not in PROFILING_MODES:
+            raise ValueError(f"Unknown profiling mode '{mode}', choose from {PROFILING_MODES}")
+        self.output_prefix = output_prefix
+        self.mode = mode
+        self.sampling_interval = sampling_interval
+        self.top_functions = top_functions
+        self._lock = threading.Lock()
+        self._sessions = 0
+        self._tracked_threads: Counter = Counter()
+        self._stacks: Counter = Counter()
+        self._samples = 0
+        self._profiles: List[cProfile.Profile] = []
+        self._stop_event: Optional[threading.Event] = None
+        self._sampler: Optional[threading.Thread] = None
+
+    @contextmanager
+    def session(self) -> Iterator[None]:
+        """
+        Profiles the current thread for the duration of the with block (e.g. a call to process).
+        The profile files are written when the outermost session ends.
+        """
+        with self._lock:
+            self._sessions += 1
+            if self._sessions == 1:
+                self._start()
+        try:
+            with self.track():
+                yield
+        finally:
+            with self._lock:
+                self._sessions -= 1
+                last_session = self._sessions == 0
+                if last_session:
+                    stop_event, sampler = self._stop_event, self._sampler
+            if last_session:
+                stop_event.set()
+                sampler.join()
+                self.write()
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        """
+        Profiles the current thread for the duration of the with block (e.g. a worker running process_item),
+        if a session is active.
+        """
+        if not self._sessions:
+            yield
+            return
+        thread_id = threading.get_ident()
+        with self._lock:
+            nested = self._tracked_threads[thread_id] > 0
+            self._tracked_threads[thread_id] += 1
+        profile = None
+        if self.mode == 'deterministic' and not nested:
+            profile = self._enable_deterministic_profile()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                with self._lock:
+                    self._profiles.append(profile)
+            with self._lock:
+                self._tracked_threads[thread_id] -= 1
+                if not self._tracked_threads[thread_id]:
+                    del self._tracked_threads[thread_id]
+
+    @staticmethod
+    def _enable_deterministic_profile() -> Optional[cProfile.Profile]:
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # a profiler is already active in this thread (or process-wide, since Python 3.12 where
+            # the enclosing session's profile already covers all the threads)
+            return None
+        return profile
+
+    def _start(self) -> None:
+        self._stacks = Counter()
+        self._samples = 0
+        self._profiles = []
+        self._stop_event = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, args=(self._stop_event,), name='vanpy-profiler',
+                                         daemon=True)
+        self._sampler.start()
+
+    def _sample(self, stop_event: threading.Event) -> None:
+        while not stop_event.wait(self.sampling_interval):
+            with self._lock:
+                thread_ids = list(self._tracked_threads)
+            frames = sys._current_frames()
+            for thread_id in thread_ids:
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    stack.append(format_frame(frame))
+                    frame = frame.f_back
+                if stack:
+                    self._stacks[';'.join(reversed(stack))] += 1
+            self._samples += 1
+            del frames
+
+    def get_collapsed_stacks(self) -> Dict[str, int]:
+        """
+        :return: the sampled stacks (root first, ';'-separated frames) and the number of times each was sampled
+        """
+        return dict(self._stacks)
+
+    def write(self) -> List[str]:
+        """
+        Writes the profile files of the last session.
+
+        :return: the paths of the written files
+        """
+        directory = os.path.dirname(self.output_prefix)
+        if directory:
+            create_dirs_if_not_exist(directory)
+        prefix = f'{self.output_prefix}_{datetime.now().strftime("%Y%m%d%H%M%S")}'
+        written = []
+
+        with open(f'{prefix}.collapsed', 'w') as f:
+            for stack, count in sorted(self._stacks.items()):
+                f.write(f'{stack} {count}\n')
+        written.append(f'{prefix}.collapsed')
+
+        if self.mode == 'deterministic' and self._profiles:
+            stats = pstats.Stats(self._profiles[0])
+            for profile in self._profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(f'{prefix}.prof')
+            written.append(f'{prefix}.prof')
+
+        self_samples, total_samples = Counter(), Counter()
+        for stack, count in self._stacks.items():
+            frames = stack.split(';')
+            self_samples[frames[-1]] += count
+            for frame in set(frames):
+                total_samples[frame] += count
+        samples = max(sum(self._stacks.values()), 1)
+        with open(f'{prefix}_profile.txt', 'w') as f:
+            f.write(f'{self._samples} samples taken every {self.sampling_interval}s, '
+                    f'{sum(self._stacks.values())} thread stacks\n\n')
+            f.write(f'{"self %":>8} {"total %":>8}  function\n')
+            for frame, count in self_samples.most_common(self.top_functions):
+                f.write(f'{100 * count / samples:8.2f} {100 * total_samples[frame] / samples:8.2f}  {frame}\n')
+        written.append(f'{prefix}_profile.txt')
+
+        logger.info(f'Saved profile to {", ".join(written)}')
+        return written
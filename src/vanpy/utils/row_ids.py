@@ -0,0 +1,152 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+ROW_ID_COLUMN = 'row_id'  # stable integer id of a payload row
+PARENT_ROW_ID_COLUMN = 'parent_row_id'  # id of the row a segment row was cut from
+
+_next_row_id = 0
+_row_ids_lock = threading.Lock()
+
+
+def allocate_row_ids(count: int, minimum: int = 0) -> np.ndarray:
+    """
+    Allocates new row ids, unique within the process (e.g. across the chunks of a streamed payload).
+
+    :param count: number of ids to allocate
+    :param minimum: the smallest id that may be allocated (e.g. larger than the ids of a loaded payload)
+    :return: int64 array of the allocated ids
+    """
+    global _next_row_id
+    with _row_ids_lock:
+        start = max(_next_row_id, int(minimum))
+        _next_row_id = start + count
+    return np.arange(start, start + count, dtype=np.int64)
+
+
+def ensure_row_ids(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Makes sure every row of the DataFrame has a row id, adding the row_id column (as the last column) or filling
+    its missing values with newly allocated ids. Existing ids are kept, and are never allocated again.
+
+    :param df: a payload DataFrame, modified in place
+    :return: the DataFrame
+    """
+    if ROW_ID_COLUMN not in df.columns:
+        df[ROW_ID_COLUMN] = allocate_row_ids(len(df))
+        return df
+    row_ids = df[ROW_ID_COLUMN]
+    missing = row_ids.isna().to_numpy()
+    minimum = row_ids.max() + 1 if len(row_ids) and not missing.all() else 0
+    new_ids = allocate_row_ids(int(missing.sum()), minimum)
+    if missing.any():
+        values = row_ids.to_numpy(dtype=np.float64, na_value=np.nan)
+        values[missing] = new_ids
+        df[ROW_ID_COLUMN] = values.astype(np.int64)
+    elif row_ids.dtype != np.int64:
+        df[ROW_ID_COLUMN] = row_ids.astype(np.int64)
+    return df
+
+
+def assign_result_row_ids(df: pd.DataFrame, results: pd.DataFrame, key_column: str) -> pd.DataFrame:
+    """
+    Sets the row id each result belongs to. Results keep their row_id (see PipelineComponent.process_with_progress),
+    results without one (e.g. records of files processed by a previous run) are matched by the key column, and
+    are repeated for every row of df with the same key, like a merge on the key column would.
+    Results without a matching row of df are dropped.
+
+    :param df: the payload DataFrame, with row ids
+    :param results: the component's results
+    :param key_column: the column identifying the rows of results without a row id
+    :return: the results, with an int64 row_id column
+    """
+    if ROW_ID_COLUMN in results.columns:
+        row_ids = results[ROW_ID_COLUMN].to_numpy(dtype=np.float64, na_value=np.nan)
+    else:
+        row_ids = np.full(len(results), np.nan)
+    has_id = ~np.isnan(row_ids)
+    result_rows = [np.flatnonzero(has_id)]
+    matched_ids = [row_ids[has_id].astype(np.int64)]
+    missing = np.flatnonzero(~has_id)
+    if missing.size and key_column in results.columns:
+        positions_by_key = df.groupby(key_column, sort=False).indices
+        df_row_ids = df[ROW_ID_COLUMN].to_numpy()
+        keys = results[key_column].to_numpy(dtype=object)
+        for row in missing:
+            positions = positions_by_key.get(keys[row])
+            if positions is not None:
+                result_rows.append(np.full(len(positions), row))
+                matched_ids.append(df_row_ids[positions])
+    result_rows, matched_ids = np.concatenate(result_rows), np.concatenate(matched_ids)
+    order = np.argsort(result_rows, kind='stable')
+    results = results.iloc[result_rows[order]].reset_index(drop=True)
+    results[ROW_ID_COLUMN] = matched_ids[order].astype(np.int64)
+    return results
+
+
+def attach_results(df: pd.DataFrame, results: pd.DataFrame, key_column: str) -> pd.DataFrame:
+    """
+    Adds the columns of results holding (at most) one row per payload row, by row id: the counterpart of a left
+    merge on the key column, with an integer lookup instead of a join on strings. Result columns already present
+    in df are replaced.
+
+    :param df: the payload DataFrame
+    :param results: the component's results, with a row_id column or a key_column
+    :param key_column: the column identifying the rows of results without a row id (e.g. the input path)
+    :return: the DataFrame with the result columns, in the order of df
+    """
+    df = ensure_row_ids(df)
+    if results.empty:
+        return df
+    results = assign_result_row_ids(df, results, key_column)
+    positions = pd.Index(df[ROW_ID_COLUMN]).get_indexer(results[ROW_ID_COLUMN].to_numpy())
+    results = results.drop(columns=[ROW_ID_COLUMN, key_column], errors='ignore')
+    matched = np.flatnonzero(positions >= 0)
+    positions = positions[matched]
+    positions, first = np.unique(positions, return_index=True)  # a single result per row
+    aligned = results.iloc[matched[first]]
+    aligned.index = positions
+    aligned = aligned.reindex(np.arange(len(df)))
+    aligned.index = df.index
+    return pd.concat([df.drop(columns=[c for c in results.columns if c in df.columns]), aligned], axis=1)
+
+
+def expand_rows(df: pd.DataFrame, results: pd.DataFrame, key_column: str) -> pd.DataFrame:
+    """
+    Replaces every payload row by the result rows produced from it (e.g. the segments cut from a file), the
+    counterpart of an outer merge on the key column. Result rows copy the columns of their parent row, get new
+    row ids and the parent's id in the parent_row_id column. Rows without results are kept as they are.
+    The rows stay in the order of df (the results of a row in their order).
+
+    :param df: the payload DataFrame
+    :param results: the component's results, with a row_id column (the parent row) or a key_column
+    :param key_column: the column identifying the parent rows of results without a row id (e.g. the input path)
+    :return: the expanded DataFrame
+    """
+    df = ensure_row_ids(df)
+    if results.empty:
+        return df
+    results = assign_result_row_ids(df, results, key_column)
+    parent_positions = pd.Index(df[ROW_ID_COLUMN]).get_indexer(results[ROW_ID_COLUMN].to_numpy())
+    order = np.argsort(parent_positions, kind='stable')
+    order = order[parent_positions[order] >= 0]
+    parent_positions = parent_positions[order]
+    results = results.iloc[order].drop(columns=[ROW_ID_COLUMN, key_column], errors='ignore').reset_index(drop=True)
+
+    children = df.iloc[parent_positions].reset_index(drop=True)
+    children = pd.concat([children.drop(columns=[c for c in results.columns if c in children.columns]), results],
+                         axis=1)
+    children[PARENT_ROW_ID_COLUMN] = pd.array(df[ROW_ID_COLUMN].to_numpy()[parent_positions], dtype='Int64')
+    children[ROW_ID_COLUMN] = allocate_row_ids(len(children), df[ROW_ID_COLUMN].max() + 1)
+
+    childless_positions = np.setdiff1d(np.arange(len(df)), parent_positions)
+    childless = df.iloc[childless_positions].reset_index(drop=True)
+    if PARENT_ROW_ID_COLUMN in childless.columns:
+        childless[PARENT_ROW_ID_COLUMN] = childless[PARENT_ROW_ID_COLUMN].astype('Int64')
+    else:
+        childless[PARENT_ROW_ID_COLUMN] = pd.array([pd.NA] * len(childless), dtype='Int64')
+
+    expanded = pd.concat([children, childless], ignore_index=True)
+    order = np.argsort(np.concatenate([parent_positions, childless_positions]), kind='stable')
+    return expanded.iloc[order].reset_index(drop=True)
@@ -0,0 +1,117 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+DECODE = 'decode'
+INFERENCE = 'inference'
+CUT_AND_WRITE = 'cut_and_write'
+BOOKKEEPING = 'bookkeeping'  # the part of the item's processing time which is not covered by the other stages
+
+
+class StageTimings:
+    """
+    Accumulates the time spent in each processing stage (decode, inference, cut_and_write, ...) of a single item.
+
+    Spans can be attributed to the whole item (e.g. decoding and segmenting a file), in which case they are
+    later divided between the rows the item produced, or to a specific row (e.g. cutting a single segment),
+    in which case they are written directly into the row's record.
+    """
+
+    def __init__(self):
+        self.item_spans: Dict[str, float] = {}
+        self.row_stages = set()
+        self.row_spans_total = 0.0
+
+    def add(self, stage: str, elapsed: float) -> None:
+        """
+        Adds an item-level span.
+
+        :param stage: the stage name
+        :param elapsed: the span duration in seconds
+        """
+        self.item_spans[stage] = self.item_spans.get(stage, 0.0) + elapsed
+
+    def add_to_record(self, stage: str, column: str, record: Dict, elapsed: float) -> None:
+        """
+        Adds a row-level span to the given record.
+
+        :param stage: the stage name
+        :param column: the record column holding the stage duration
+        :param record: the record (row) the span is attributed to
+        :param elapsed: the span duration in seconds
+        """
+        record[column] = record.get(column, 0.0) + elapsed
+        self.row_stages.add(stage)
+        self.row_spans_total += elapsed
+
+    def is_empty(self) -> bool:
+        return not self.item_spans and not self.row_stages
+
+    def get_row_spans(self, total_time: float, rows_count: int) -> Dict[str, float]:
+        """
+        Returns the item-level spans divided between the rows produced by the item, including the bookkeeping
+        span (the item's time not covered by any stage).
+
+        :param total_time: the total processing time of the item
+        :param rows_count: number of rows produced by the item
+        :return: dictionary of stage name to the span of a single row
+        """
+        rows_count = max(rows_count, 1)
+        spans = {stage: elapsed / rows_count for stage, elapsed in self.item_spans.items()
+                 if stage not in self.row_stages}
+        covered = sum(self.item_spans.values()) + self.row_spans_total
+        spans[BOOKKEEPING] = max(total_time - covered, 0.0) / rows_count
+        return spans
+
+    def scaled(self, factor: float) -> 'StageTimings':
+        """
+        Returns a copy with the item-level spans multiplied by factor (e.g. to split a batch between its items).
+        """
+        scaled = StageTimings()
+        scaled.item_spans = {stage: elapsed * factor for stage, elapsed in self.item_spans.items()}
+        scaled.row_stages = set(self.row_stages)
+        scaled.row_spans_total = self.row_spans_total * factor
+        return scaled
+
+
+_current_timings: ContextVar[Optional[StageTimings]] = ContextVar('vanpy_current_timings', default=None)
+
+
+@contextmanager
+def measure_item() -> Iterator[StageTimings]:
+    """
+    Makes a new StageTimings the target of the spans recorded by `span` in the current thread/context,
+    for the duration of the with block (i.e. the processing of a single item).
+
+    :return: the StageTimings collecting the item's spans
+    """
+    timings = StageTimings()
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+@contextmanager
+def span(stage: str, column: Optional[str] = None, record: Optional[Dict] = None) -> Iterator[None]:
+    """
+    Measures the duration of the with block and adds it to the item currently measured (see measure_item).
+    Outside of measure_item the duration is not recorded.
+
+    :param stage: the stage name
+    :param column: the column holding the stage duration, used with record
+    :param record: when given, the span is attributed to this record only (written to record[column])
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        timings = _current_timings.get()
+        if timings is not None:
+            if record is not None:
+                timings.add_to_record(stage, column, record, elapsed)
+            else:
+                timings.add(stage, elapsed)
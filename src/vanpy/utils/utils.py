@@ -1,12 +1,20 @@
+import asyncio
 import os
+import shutil
 import subprocess
-from typing import List, Tuple, Dict
-import gdown
+import wave
+from typing import List, Optional, Tuple, Dict
 import logging
 import yaml
 
+from vanpy.utils.audio import get_segment_file_name, load_audio, parse_virtual_segment_path
+
 logger = logging.getLogger(f'vanpy utils')
 
+MAX_SEGMENTS_PER_COMMAND = 64  # outputs of a single ffmpeg run, bounding its command line and open files
+SEGMENT_WAV_FORMAT = (1, 2, 16000, 'NONE')  # channels, sample width, sampling rate and compression of cut segments
+SEGMENT_OUTPUT_OPTIONS = ["-ab", "256k", "-ac", "1", "-ar", "16k"]  # ffmpeg options producing SEGMENT_WAV_FORMAT
+
 
 def create_dirs_if_not_exist(*args: str) -> None:
     """
@@ -18,10 +26,166 @@ def create_dirs_if_not_exist(*args: str) -> None:
         # logger.info(f'Created dir {arg}')
 
 
+def is_segment_wav_format(path: str) -> bool:
+    """
+    Check if a file is a WAV file in the format of the cut segments (16 kHz mono 16-bit PCM, as written by
+    wav_converter), reading its header only.
+    :param path: path to audio file
+    :return: True if segments can be copied from the file without transcoding
+    """
+    try:
+        with wave.open(str(path), 'rb') as w:
+            return (w.getnchannels(), w.getsampwidth(), w.getframerate(), w.getcomptype()) == SEGMENT_WAV_FORMAT
+    except (wave.Error, EOFError, OSError):
+        return False
+
+
+def copy_wav_segments(input_path: str, segments: List[Tuple[float, float]], output_paths: List[str]) -> bool:
+    """
+    Write segments of a WAV file already in the format of the cut segments (see is_segment_wav_format) by copying
+    their sample ranges under a new header: no subprocess and no decoding.
+    :param input_path: path to audio file, or a virtual segment path (the segments are copied from its source file)
+    :param segments: start and end times of the segments in seconds
+    :param output_paths: the paths of the segmented audio files
+    :return: False if the file is not in the format of the cut segments (nothing is written)
+    """
+    source, offset, _ = parse_virtual_segment_path(str(input_path))
+    if not is_segment_wav_format(source):
+        return False
+    with wave.open(source, 'rb') as w:
+        params, rate, n_frames = w.getparams(), w.getframerate(), w.getnframes()
+        for (start, stop), output_path in zip(segments, output_paths):
+            first = min(max(int(round((start + offset) * rate)), 0), n_frames)
+            last = min(max(int(round((stop + offset) * rate)), first), n_frames)
+            w.setpos(first)
+            data = w.readframes(last - first)
+            with wave.open(output_path, 'wb') as output:
+                output.setparams(params)
+                output.writeframes(data)
+    return True
+
+
+def get_cut_segment_command(input_path: str, output_dir: str, segment: Tuple[float, float], segment_id: int,
+                            separator: str, keep_only_first_segment: bool) -> Tuple[List[str], str]:
+    """
+    Build the ffmpeg command cutting a segment of audio from a given file.
+    :param input_path: path to audio file, or a virtual segment path (the segment is cut from its source file)
+    :param output_dir: directory where the segmented audio file should be stored
+    :param segment: start and end time of the segment in seconds
+    :param segment_id: id of the segment
+    :param separator: separator to use in the output file name
+    :param keep_only_first_segment: indicates if there is a single segment cut
+    :return: tuple of the ffmpeg command and the path of the segmented audio file
+    """
+    source, offset, _ = parse_virtual_segment_path(str(input_path))
+    start, stop = segment[0] + offset, segment[1] + offset
+    f = ''.join(get_segment_file_name(str(input_path)).split(".")[:-1])
+    segment_suffix = f'{separator}{segment_id}' if not keep_only_first_segment else ""
+    output_path = f'{output_dir}/{f}{segment_suffix}.wav'
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-ss", f"{start}", "-to", f"{stop}", "-y", "-i",
+               f"{source}", "-ab", "256k", "-ac", "1", "-ar", "16k", '-dn',
+               '-ignore_unknown', '-sn',  output_path]
+    return command, output_path
+
+
+def get_cut_segments_commands(input_path: str, output_dir: str, segments: List[Tuple[float, float]],
+                              separator: str, keep_only_first_segment: bool, first_segment_id: int = 0,
+                              output_paths: Optional[List[str]] = None,
+                              output_options: Optional[List[str]] = None) -> Tuple[List[List[str]], List[str]]:
+    """
+    Build the ffmpeg commands cutting several segments of audio from a given file. Each command decodes the source
+    once and writes up to MAX_SEGMENTS_PER_COMMAND segments as its outputs (an output's -ss/-to select its range from
+    the decoded stream), instead of decoding the source up to the segment's start for every segment.
+    :param input_path: path to audio file, or a virtual segment path (the segments are cut from its source file)
+    :param output_dir: directory where the segmented audio files should be stored
+    :param segments: start and end times of the segments in seconds
+    :param separator: separator to use in the output file names
+    :param keep_only_first_segment: indicates if there is a single segment cut
+    :param first_segment_id: id of the first segment, the ids of the next ones follow it
+    :param output_paths: the paths of the segmented audio files, named as in get_cut_segment_command if None
+    :param output_options: ffmpeg options of each output, SEGMENT_OUTPUT_OPTIONS (16 kHz mono) if None, an empty list
+        keeps the sampling rate and channels of the source
+    :return: tuple of the ffmpeg commands and the paths of the segmented audio files
+    """
+    if output_options is None:
+        output_options = SEGMENT_OUTPUT_OPTIONS
+    source, offset, _ = parse_virtual_segment_path(str(input_path))
+    if output_paths is None:
+        output_paths = [get_cut_segment_command(input_path, output_dir, segment, first_segment_id + i, separator,
+                                                keep_only_first_segment)[1] for i, segment in enumerate(segments)]
+    # a path written twice keeps its last segment, as when the segments are cut one after another
+    last_occurrence = {output_path: i for i, output_path in enumerate(output_paths)}
+    outputs = []
+    for i, ((start, stop), output_path) in enumerate(zip(segments, output_paths)):
+        if last_occurrence[output_path] == i:
+            outputs.append(["-ss", f"{start + offset}", "-to", f"{stop + offset}", *output_options, '-vn', '-dn', '-sn',
+                            output_path])
+    commands = [["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-ignore_unknown", "-i", f"{source}"] +
+                [argument for output in outputs[i:i + MAX_SEGMENTS_PER_COMMAND] for argument in output]
+                for i in range(0, len(outputs), MAX_SEGMENTS_PER_COMMAND)]
+    return commands, output_paths
+
+
+def cut_segments(input_path: str, output_dir: str, segments: List[Tuple[float, float]], separator: str,
+                 keep_only_first_segment: bool, first_segment_id: int = 0,
+                 output_paths: Optional[List[str]] = None, output_options: Optional[List[str]] = None) -> List[str]:
+    """
+    Cut several segments of audio from a given file, decoding it once (see get_cut_segments_commands). The segments
+    of a file already in the format of the cut segments are copied without ffmpeg (see copy_wav_segments), unless
+    other output options are given.
+    :param input_path: path to audio file
+    :param output_dir: directory where the segmented audio files should be stored
+    :param segments: start and end times of the segments in seconds
+    :param separator: separator to use in the output file names
+    :param keep_only_first_segment: indicates if there is a single segment cut
+    :param first_segment_id: id of the first segment, the ids of the next ones follow it
+    :param output_paths: the paths of the segmented audio files, named as in cut_segment if None
+    :param output_options: ffmpeg options of each output, see get_cut_segments_commands
+    :return: paths of the segmented audio files
+    """
+    create_dirs_if_not_exist(output_dir)
+    commands, output_paths = get_cut_segments_commands(input_path, output_dir, segments, separator,
+                                                       keep_only_first_segment, first_segment_id, output_paths,
+                                                       output_options)
+    if output_options is not None or not copy_wav_segments(input_path, segments, output_paths):
+        for command in commands:
+            subprocess.run(command)
+    return output_paths
+
+
+async def acut_segments(input_path: str, output_dir: str, segments: List[Tuple[float, float]], separator: str,
+                        keep_only_first_segment: bool, first_segment_id: int = 0,
+                        output_paths: Optional[List[str]] = None,
+                        output_options: Optional[List[str]] = None) -> List[str]:
+    """
+    Asynchronous version of cut_segments, running ffmpeg through asyncio.create_subprocess_exec.
+    :param input_path: path to audio file
+    :param output_dir: directory where the segmented audio files should be stored
+    :param segments: start and end times of the segments in seconds
+    :param separator: separator to use in the output file names
+    :param keep_only_first_segment: indicates if there is a single segment cut
+    :param first_segment_id: id of the first segment, the ids of the next ones follow it
+    :param output_paths: the paths of the segmented audio files, named as in cut_segment if None
+    :param output_options: ffmpeg options of each output, see get_cut_segments_commands
+    :return: paths of the segmented audio files
+    """
+    create_dirs_if_not_exist(output_dir)
+    commands, output_paths = get_cut_segments_commands(input_path, output_dir, segments, separator,
+                                                       keep_only_first_segment, first_segment_id, output_paths,
+                                                       output_options)
+    if output_options is not None or not await asyncio.get_running_loop().run_in_executor(
+            None, copy_wav_segments, input_path, segments, output_paths):
+        for command in commands:
+            process = await asyncio.create_subprocess_exec(*command)
+            await process.wait()
+    return output_paths
+
+
 def cut_segment(input_path: str, output_dir: str, segment: Tuple[float, float], segment_id: int, separator: str,
                 keep_only_first_segment: bool) -> str:
     """
-    Cut a segment of audio from a given file.
+    Cut a segment of audio from a given file. The segment of a file already in the format of the cut segments is
+    copied without ffmpeg (see copy_wav_segments).
     :param input_path: path to audio file
     :param output_dir: directory where the segmented audio file should be stored
     :param segment: start and end time of the segment in seconds
@@ -31,13 +195,33 @@ def cut_segment(input_path: str, output_dir: str, segment: Tuple[float, float],
     :return: path of the segmented audio file
     """
     create_dirs_if_not_exist(output_dir)
-    start, stop = segment
-    f = ''.join(str(input_path).split("/")[-1].split(".")[:-1])
-    segment_suffix = f'{separator}{segment_id}' if not keep_only_first_segment else ""
-    output_path = f'{output_dir}/{f}{segment_suffix}.wav'
-    subprocess.run(["ffmpeg", "-hide_banner", "-loglevel", "error", "-ss", f"{start}", "-to", f"{stop}", "-y", "-i",
-                    f"{input_path}", "-ab", "256k", "-ac", "1", "-ar", "16k", '-dn',
-                    '-ignore_unknown', '-sn',  output_path])
+    command, output_path = get_cut_segment_command(input_path, output_dir, segment, segment_id, separator,
+                                                   keep_only_first_segment)
+    if not copy_wav_segments(input_path, [segment], [output_path]):
+        subprocess.run(command)
+    return output_path
+
+
+async def acut_segment(input_path: str, output_dir: str, segment: Tuple[float, float], segment_id: int,
+                       separator: str, keep_only_first_segment: bool) -> str:
+    """
+    Asynchronous version of cut_segment, running ffmpeg through asyncio.create_subprocess_exec,
+    so the event loop is not blocked while the segment is cut.
+    :param input_path: path to audio file
+    :param output_dir: directory where the segmented audio file should be stored
+    :param segment: start and end time of the segment in seconds
+    :param segment_id: id of the segment
+    :param separator: separator to use in the output file name
+    :param keep_only_first_segment: indicates if there is a single segment cut
+    :return: path of the segmented audio file
+    """
+    create_dirs_if_not_exist(output_dir)
+    command, output_path = get_cut_segment_command(input_path, output_dir, segment, segment_id, separator,
+                                                   keep_only_first_segment)
+    if not await asyncio.get_running_loop().run_in_executor(None, copy_wav_segments, input_path, [segment],
+                                                            [output_path]):
+        process = await asyncio.create_subprocess_exec(*command)
+        await process.wait()
     return output_path
 
 
@@ -53,21 +237,31 @@ def get_audio_files_paths(folder: str, extension: str = '') -> List[str]:
     return [f'{folder}/{f}' for f in folder_files if f.endswith(extension) and os.path.isfile(f'{folder}/{f}')]
 
 
-def cached_download(url, path) -> str:
+def cached_download(url, path, sha256: str = None, store=None) -> str:
     """
     Download a file from a given URL and save it to a specified path. If the file already exists, skip the download.
+    The file is fetched through the model store (see vanpy.core.ModelStore), so a prefetched file is copied from the
+    store without any network access, and an offline store never downloads it.
     :param url: URL of the file
     :param path: path to save the file
+    :param sha256: the expected checksum of the file, if known
+    :param store: the ModelStore to fetch the file from, the default store if None
     :return: path of the downloaded file
     """
     separator = "/"  # os.sep
     if os.path.exists(path):
         pass
     else:
+        from vanpy.core.ModelStore import ModelArtifact, ModelStore
         folder_name = separator.join(path.split(separator)[:-1])
         if folder_name != '':
             create_dirs_if_not_exist(folder_name)
-        gdown.download(url, path, quiet=True)
+        store = store or ModelStore.open()
+        stored_path = store.get_file(ModelArtifact(url, filename=os.path.basename(path), sha256=sha256))
+        try:
+            os.link(stored_path, path)
+        except OSError:  # another file system
+            shutil.copyfile(stored_path, path)
     return path
 
 
@@ -115,13 +309,14 @@ def load_config(config_yaml_path: str = 'pipeline.yaml') -> Dict:
 
 def get_null_wav_path() -> str:
     """
-    Get the path of a null wav file.
+    Get the path of a null wav file. The file is shipped with the package, it is fetched through the model store
+    (see cached_download) only if it is missing.
     :return: path of the null wav file
     """
     path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "empty.wav")
     if not os.path.isfile(path):
-        gdown.download('https://drive.google.com/uc?export=download&confirm=9iBg&id=1URDocYaa0tKe3KLiFJd5ct7tsczA3mX4',
-                       path, quiet=True)
+        cached_download('https://drive.google.com/uc?export=download&confirm=9iBg&id=1URDocYaa0tKe3KLiFJd5ct7tsczA3mX4',
+                        path)
     return path
 
 def concat_audio_files_in_dir(input_dir, output_path, extension='.wav', sr=16000, required_substring=''):
@@ -134,7 +329,6 @@ def concat_audio_files_in_dir(input_dir, output_path, extension='.wav', sr=16000
     :param required_substring: The required substring in the audio file names to be concatenated. Defaults to ''.
     """
     import os
-    import librosa
     import numpy as np
     import soundfile as sf
 
@@ -143,7 +337,7 @@ def concat_audio_files_in_dir(input_dir, output_path, extension='.wav', sr=16000
     files = [os.path.join(input_dir, f) for f in files]
     audio = []
     for f in files:
-        y, sr = librosa.load(f, sr=sr)
+        y, sr = load_audio(f, sr=sr)
         audio.append(y)
     audio = np.concatenate(audio)
     sf.write(output_path, audio, samplerate=sr)
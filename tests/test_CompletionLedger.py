@@ -0,0 +1,44 @@
+import os
+import tempfile
+import unittest
+from unittest import TestCase
+
+from vanpy.core.CompletionLedger import CompletionLedger
+
+
+class TestCompletionLedger(TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'ledger', 'ledger.sqlite')
+
+    def test_record_and_get_completed(self):
+        ledger = CompletionLedger(self.path, commit_every=2)
+        ledger.record('comp', 'hash', 'a.wav', ({'path': 'a.wav', 'value': 1}, {}))
+        ledger.record('comp', 'hash', 'b.wav', [{'path': 'b.wav', 'value': 2}])
+        ledger.record('comp', 'other_hash', 'c.wav', None)
+        completed = ledger.get_completed('comp', 'hash')
+        self.assertEqual(set(completed), {'a.wav', 'b.wav'})
+        self.assertEqual(completed['a.wav'], ({'path': 'a.wav', 'value': 1}, {}))
+        self.assertEqual(ledger.get_completed('other_comp', 'hash'), {})
+
+    def test_records_survive_reopening(self):
+        ledger = CompletionLedger(self.path, commit_every=100)
+        ledger.record('comp', 'hash', 'a.wav', 1)
+        ledger.flush()
+        ledger.record('comp', 'hash', 'b.wav', 2)  # not committed, lost on a crash
+        reopened = CompletionLedger(self.path)
+        self.assertEqual(reopened.get_completed('comp', 'hash'), {'a.wav': 1})
+
+    def test_clear(self):
+        ledger = CompletionLedger(self.path)
+        ledger.record('comp', 'hash', 'a.wav', 1)
+        ledger.record('other_comp', 'hash', 'a.wav', 1)
+        ledger.clear('comp')
+        self.assertEqual(ledger.get_completed('comp', 'hash'), {})
+        self.assertEqual(ledger.get_completed('other_comp', 'hash'), {'a.wav': 1})
+
+    def test_open_shares_instances(self):
+        self.assertIs(CompletionLedger.open(self.path), CompletionLedger.open(self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
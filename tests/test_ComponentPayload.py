@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 import pandas as pd
 
 from vanpy.core.ComponentPayload import ComponentPayload
@@ -31,3 +32,38 @@ class TestComponentPayload(unittest.TestCase):
         self.assertTrue(self.payload.get_declared_columns(['feature_columns']).equals(self.df[['path', 'MFCC0', 'embedding_feature1']]))
         self.assertTrue(self.payload.get_declared_columns(['classification_columns']).equals(self.df[['path', 'gender']]))
         self.assertTrue(self.payload.get_declared_columns(['feature_columns', 'classification_columns']).equals(self.df[['path', 'MFCC0', 'embedding_feature1', 'gender']]))
+
+    def test_feature_blocks(self):
+        results = pd.DataFrame({'path': ['c', 'a'], '0_emb': [3.0, 1.0], '1_emb': [30.0, 10.0]})
+        block = self.payload.add_feature_block('emb', results, ['0_emb', '1_emb'], 'path')
+        self.assertEqual(block.values.dtype, np.float32)
+        self.assertTrue(self.payload.has_features(['0_emb', 'MFCC0']))
+        self.assertFalse(self.payload.has_features(['2_emb']))
+
+        matrix = self.payload.get_feature_matrix(['0_emb', '1_emb'])
+        self.assertIs(matrix, block.values)  # aligned to the DataFrame rows, no copy
+        np.testing.assert_array_equal(matrix, [[1, 10], [np.nan, np.nan], [3, 30]])
+        np.testing.assert_array_equal(self.payload.get_feature_matrix(['1_emb', 'MFCC0'])[:, 0], [10, np.nan, 30])
+
+        self.payload.df = self.payload.df.iloc[::-1].reset_index(drop=True)
+        np.testing.assert_array_equal(self.payload.get_feature_matrix(['0_emb'])[:, 0], [3, np.nan, 1])
+        wide = self.payload.get_wide_df()
+        self.assertEqual(wide.columns.tolist()[-2:], ['0_emb', '1_emb'])
+        self.assertEqual(wide['1_emb'].tolist()[0], 30)
+        self.assertNotIn('feature_blocks', self.payload.get_serializable_metadata())
+
+    def test_split_and_concat_feature_blocks(self):
+        self.payload.add_feature_block('emb', pd.DataFrame({'path': ['a', 'b', 'c'], '0_emb': [1.0, 2.0, 3.0]}),
+                                       ['0_emb'], 'path')
+        chunks = self.payload.split(2)
+        self.assertIs(chunks[0].feature_blocks['emb'], self.payload.feature_blocks['emb'])
+        np.testing.assert_array_equal(chunks[1].get_feature_matrix(['0_emb'])[:, 0], [3])
+        chunks[1].add_feature_block('other', pd.DataFrame({'path': ['c'], 'x': [5.0]}), ['x'], 'path')
+        chunks[0].add_feature_block('other', pd.DataFrame({'path': ['a'], 'x': [4.0]}), ['x'], 'path')
+        first_blocks = dict(chunks[0].feature_blocks)
+        payload = ComponentPayload.concat(chunks)
+        np.testing.assert_array_equal(payload.get_feature_matrix(['0_emb', 'x']), [[1, 4], [2, np.nan], [3, 5]])
+        self.assertEqual(chunks[0].feature_blocks, first_blocks)  # the inputs are not modified
+        self.assertEqual(len(chunks[0].df), 2)
+        payload.metadata['feature_columns'].append('y')
+        self.assertNotIn('y', chunks[0].metadata['feature_columns'])
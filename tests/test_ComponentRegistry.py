@@ -0,0 +1,63 @@
+import subprocess
+import sys
+import time
+import unittest
+from unittest import TestCase
+
+from vanpy.core.ComponentRegistry import ComponentRegistry
+from vanpy.core.ModelInferencePipeline import ModelInferencePipeline
+from vanpy.core.PreprocessPipeline import PreprocessPipeline
+
+
+class TestComponentRegistry(TestCase):
+    IMPORT_TIME_BUDGET_SECONDS = 3.0
+
+    def test_lazy_resolution(self):
+        registry = ComponentRegistry('vanpy.test_components', 'collections', {'ordered': '.abc:Mapping',
+                                                                              'missing': 'no_such_module:Missing'})
+        self.assertEqual(registry.names(), ['ordered', 'missing'])  # listing does not import the missing module
+        self.assertIn('missing', registry)
+        from collections.abc import Mapping
+        self.assertIs(registry['ordered'], Mapping)
+        with self.assertRaises(ModuleNotFoundError):
+            registry.get('missing')
+        with self.assertRaises(KeyError):
+            registry.get('unknown')
+
+    def test_register(self):
+        class MyComponent:
+            pass
+
+        registry = ComponentRegistry('vanpy.test_components', 'collections', {'ordered': '.abc:Mapping'})
+        registry.register('ordered', MyComponent)
+        registry.register('my_component', 'collections:OrderedDict')
+        self.assertIs(registry['ordered'], MyComponent)
+        from collections import OrderedDict
+        self.assertIs(registry['my_component'], OrderedDict)
+
+    def test_builtin_components(self):
+        self.assertIn('file_mapper', PreprocessPipeline.components_mapper)
+        self.assertIn('vanpy_height', ModelInferencePipeline.components_mapper)
+        self.assertEqual(PreprocessPipeline.components_mapper['file_mapper'].__name__, 'FilelistDataFrameCreator')
+
+    def test_import_time_budget(self):
+        code = ('import sys, time\n'
+                'start = time.perf_counter()\n'
+                'from vanpy.core.Pipeline import Pipeline\n'
+                'from vanpy.core.ModelInferencePipeline import ModelInferencePipeline\n'
+                'names = ModelInferencePipeline.components_mapper.names()\n'
+                'print(time.perf_counter() - start)\n'
+                'heavy = ("torch", "torchaudio", "speechbrain", "pyannote", "tensorflow", "keras", "whisper",\n'
+                '         "transformers", "librosa", "gdown")\n'
+                'print(",".join(m for m in heavy if m in sys.modules))\n')
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+        elapsed = time.perf_counter() - start
+        import_time, heavy_modules = output.splitlines()
+        self.assertEqual(heavy_modules, '')
+        self.assertLess(float(import_time), self.IMPORT_TIME_BUDGET_SECONDS)
+        self.assertLess(elapsed, self.IMPORT_TIME_BUDGET_SECONDS + 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import threading
+import unittest
+from unittest import TestCase
+
+import pandas as pd
+
+from vanpy.core.ComponentPayload import ComponentPayload
+from vanpy.core.ComponentScheduler import ComponentScheduler
+from vanpy.core.PipelineComponent import PipelineComponent
+
+
+class TestComponentScheduler(TestCase):
+    class ColumnComponent(PipelineComponent):
+        """
+        Adds a column computed from the column of another component (or from the path), waiting at the barrier until
+        all the components of its level are running.
+        """
+        def __init__(self, name: str, config, reads='paths_column', writes='classification_columns',
+                     source='path', barrier=None):
+            super().__init__('segment_classifier', name, config)
+            self.reads_column_groups = None if reads is None else (reads,)
+            self.writes_column_groups = None if writes is None else (writes,)
+            self.source = source
+            self.barrier = barrier
+
+        def process(self, input_payload: ComponentPayload) -> ComponentPayload:
+            if self.barrier is not None:
+                self.barrier.wait(5)
+            metadata, df = input_payload.unpack()
+            df[self.get_name()] = df[self.source] * 10
+            group = self.writes_column_groups[0] if self.writes_column_groups else 'classification_columns'
+            metadata[group].append(self.get_name())
+            return ComponentPayload(metadata=metadata, df=df)
+
+    def setUp(self):
+        self.config = {'performance_measurement': False}
+        self.payload = ComponentPayload(input_path='', metadata={'paths_column': 'path'},
+                                        df=pd.DataFrame({'path': [1, 2, 3]}))
+
+    def test_levels(self):
+        embedding = self.ColumnComponent('embedding', self.config, writes='feature_columns')
+        stt = self.ColumnComponent('stt', self.config)
+        gender = self.ColumnComponent('gender', self.config, reads='feature_columns', source='embedding')
+        age = self.ColumnComponent('age', self.config, reads='feature_columns', source='embedding')
+        undeclared = self.ColumnComponent('undeclared', self.config, reads=None, writes=None)
+        scheduler = ComponentScheduler([embedding, stt, gender, age, undeclared])
+        self.assertEqual([[c.get_name() for c in level] for level in scheduler.get_levels()],
+                         [['embedding', 'stt'], ['gender', 'age'], ['undeclared']])
+
+    def test_concurrent_process(self):
+        barrier = threading.Barrier(3)
+        embedding = self.ColumnComponent('embedding', self.config, writes='feature_columns')
+        components = [embedding] + [self.ColumnComponent(name, self.config, reads='feature_columns',
+                                                         source='embedding', barrier=barrier)
+                                    for name in ('gender', 'age', 'height')]
+        result = ComponentScheduler(components).process(self.payload)  # the barrier breaks unless they run together
+        self.assertEqual(result.df['height'].tolist(), [100, 200, 300])
+        self.assertEqual(result.metadata['classification_columns'], ['gender', 'age', 'height'])
+        self.assertEqual(result.metadata['feature_columns'], ['embedding'])
+        self.assertEqual(list(result.df.columns), ['path', 'embedding', 'row_id', 'gender', 'age', 'height'])
+
+    def test_same_result_as_sequential(self):
+        components = [self.ColumnComponent('embedding', self.config, writes='feature_columns'),
+                      self.ColumnComponent('stt', self.config),
+                      self.ColumnComponent('gender', self.config, reads='feature_columns', source='embedding')]
+        concurrent = ComponentScheduler(components).process(self.payload)
+        self.payload.df = self.payload.df.drop(columns=['row_id'])
+        sequential = ComponentScheduler(components, max_parallel_components=1).process(self.payload)
+        self.assertEqual(concurrent.metadata, sequential.metadata)
+        pd.testing.assert_frame_equal(concurrent.df[sequential.df.columns], sequential.df)
+
+    def test_changed_rows(self):
+        class DroppingComponent(self.ColumnComponent):
+            def process(self, input_payload: ComponentPayload) -> ComponentPayload:
+                return ComponentPayload(metadata=input_payload.metadata, df=input_payload.df.iloc[1:])
+
+        components = [self.ColumnComponent('stt', self.config), DroppingComponent('dropping', self.config)]
+        with self.assertRaises(RuntimeError):
+            ComponentScheduler(components).process(self.payload)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,4 @@
+import importlib.util
 import os
 import shutil
 import tempfile
@@ -71,6 +72,19 @@ class FilelistDataFrameCreatorTest(unittest.TestCase):
             pd.testing.assert_frame_equal(output_df, df)
             self.assertEqual(output_meta, metadata)
 
+    @unittest.skipIf(importlib.util.find_spec('pyarrow') is None, 'pyarrow is not installed')
+    def test_process_loads_arrow_payload(self):
+        metadata = {'input_path': self.input_path, 'paths_column': 'sample_path', 'all_paths_columns': ['sample_path'],
+                    'meta_columns': [], 'feature_columns': [], 'classification_columns': []}
+        payload = ComponentPayload(metadata=metadata, df=pd.DataFrame({'sample_path': [self.test_file_1, self.test_file_2],
+                                                                       'col1': [1, 2]}))
+        payload.save(self.temp_dir, payload_format='arrow')
+        config = {'preprocessing': {'file_mapper': {'load_payload': True,
+                                                    'load_df_path': f'{self.temp_dir}/payload.arrow'}}}
+        output_payload = FilelistDataFrameCreator(config).process(ComponentPayload(metadata={'input_path': 'unused'}))
+        pd.testing.assert_frame_equal(output_payload.df, payload.df)
+        self.assertEqual(output_payload.metadata, metadata)
+
     def test_process_missing_input_path_metadata(self):
         input_payload = ComponentPayload(metadata={'load_payload': False, 'paths_column': 'tmp'})
         file_mapper = FilelistDataFrameCreator(self.config)
@@ -0,0 +1,112 @@
+import logging
+import threading
+import unittest
+from typing import List
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from vanpy.core.BasePipeline import BasePipeline
+from vanpy.core.ComponentPayload import ComponentPayload
+from vanpy.core.ModelPreloader import ModelPreloader
+from vanpy.core.Pipeline import Pipeline
+from vanpy.core.PipelineComponent import PipelineComponent
+
+
+class TestModelPreloader(TestCase):
+    class ImpPipeline(BasePipeline):
+        components_mapper = {}
+
+        def __init__(self, components: List[PipelineComponent]):
+            self.components = components
+            self.logger = logging.getLogger('ImpPipeline')
+
+    class ModelComponent(PipelineComponent):
+        model = None
+
+        def __init__(self, name: str, config, model_bytes: int = 8, fail: bool = False):
+            super().__init__('segment_classifier', name, config)
+            self.model_bytes = model_bytes
+            self.fail = fail
+            self.loaded = threading.Event()
+            self.load_threads = []
+
+        def load_model(self):
+            self.load_threads.append(threading.current_thread().name)
+            if self.fail:
+                self.fail = False
+                raise OSError('download failed')
+            self.model = np.zeros(self.model_bytes, dtype=np.uint8)
+            self.loaded.set()
+
+        def process(self, input_payload: ComponentPayload) -> ComponentPayload:
+            self.ensure_model_loaded()
+            return input_payload
+
+    class WaitingComponent(PipelineComponent):
+        def __init__(self, config, event: threading.Event):
+            super().__init__('preprocessing', 'waiting', config)
+            self.event = event
+
+        def process(self, input_payload: ComponentPayload) -> ComponentPayload:
+            self.event.wait(5)  # the next component's model is loaded meanwhile
+            return input_payload
+
+    def setUp(self):
+        self.config = {'input_dir': None}
+        self.payload = ComponentPayload(input_path='', metadata={'paths_column': 'path'},
+                                        df=pd.DataFrame({'path': range(2)}))
+
+    def test_preload_during_earlier_stage(self):
+        config = dict(self.config, model_preloading={'enabled': True})
+        model_component = self.ModelComponent('model', config)
+        pipeline = Pipeline(pipelines=[self.ImpPipeline([self.WaitingComponent(config, model_component.loaded)]),
+                                       self.ImpPipeline([model_component])], config=config)
+        pipeline.process(self.payload)
+        self.assertEqual(model_component.load_threads, ['model-preload-0'])
+
+    def test_disabled(self):
+        for config in [self.config, dict(self.config, model_preloading={'enabled': False})]:  # disabled by default
+            model_component = self.ModelComponent('model', config)
+            Pipeline(pipelines=[self.ImpPipeline([model_component])], config=config).process(self.payload)
+            self.assertEqual(model_component.load_threads, [threading.current_thread().name])
+
+    def test_memory_budget_from_config(self):
+        first = self.ModelComponent('first', self.config, model_bytes=100)
+        second = self.ModelComponent('second', self.config, model_bytes=100)
+        preloader = ModelPreloader.from_config([first, second], {'model_preloading': {'enabled': True}})
+        self.assertEqual(preloader.memory_budget_bytes, ModelPreloader.DEFAULT_MEMORY_BUDGET_MB * 2 ** 20)
+        preloader = ModelPreloader.from_config([first, second], {'model_preloading': {'enabled': True,
+                                                                                      'memory_budget_mb': 0.00005}})
+        with preloader:
+            self.assertTrue(first.loaded.wait(5))
+            self.assertFalse(second.loaded.wait(0.2))  # deferred until the first model's stage starts
+            preloader.start_stage(first)
+            self.assertTrue(second.loaded.wait(5))
+
+    def test_memory_budget(self):
+        first = self.ModelComponent('first', self.config, model_bytes=100)
+        second = self.ModelComponent('second', self.config, model_bytes=100)
+        with ModelPreloader([first, second], memory_budget_bytes=50) as preloader:
+            self.assertTrue(first.loaded.wait(5))
+            self.assertFalse(second.loaded.wait(0.2))  # the first preloaded model fills the budget
+            self.assertEqual(preloader.waiting_bytes, 100)
+            preloader.start_stage(first)
+            self.assertTrue(second.loaded.wait(5))
+            preloader.start_stage(second)
+            self.assertEqual(preloader.waiting_bytes, 0)
+
+    def test_failed_preload(self):
+        component = self.ModelComponent('model', self.config, fail=True)
+        with ModelPreloader([component]) as preloader:
+            pass
+        preloader.start_stage(component)
+        self.assertIsNone(component.model)
+        component.process(self.payload)  # loaded again when the stage starts
+        self.assertEqual(len(component.load_threads), 2)
+        self.assertIsNotNone(component.model)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import gc
+import threading
+import time
+import unittest
+from unittest import TestCase
+
+import numpy as np
+
+from vanpy.core.ModelRegistry import ModelRegistry, estimate_model_size
+from vanpy.core.PipelineComponent import PipelineComponent
+from vanpy.core.ComponentPayload import ComponentPayload
+
+
+class TestModelRegistry(TestCase):
+    def setUp(self):
+        self.registry = ModelRegistry()
+        self.loads = []
+
+    def loader(self, name: str, size: int = 1000):
+        def load():
+            self.loads.append(name)
+            return np.zeros(size, dtype=np.uint8)
+        return load
+
+    def test_shared_models(self):
+        key = ModelRegistry.get_key('loader', 'checkpoint', 'cpu', window=3)
+        first = self.registry.acquire(key, self.loader('a'))
+        second = self.registry.acquire(ModelRegistry.get_key('loader', 'checkpoint', 'cpu', window=3),
+                                       self.loader('a'))
+        self.assertIs(first, second)
+        self.assertEqual(self.loads, ['a'])
+        self.assertEqual(self.registry.get_references(key), 2)
+        self.registry.acquire(ModelRegistry.get_key('loader', 'checkpoint', 'cuda', window=3), self.loader('b'))
+        self.assertEqual(self.loads, ['a', 'b'])
+
+    def test_concurrent_acquire_loads_once(self):
+        def slow_load():
+            time.sleep(0.05)
+            self.loads.append('slow')
+            return object()
+
+        models = []
+        threads = [threading.Thread(target=lambda: models.append(self.registry.acquire('key', slow_load)))
+                   for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.loads, ['slow'])
+        self.assertEqual(len({id(m) for m in models}), 1)
+
+    def test_eviction_under_memory_budget(self):
+        self.registry.set_memory_budget(2500)
+        self.registry.acquire('a', self.loader('a'))
+        self.registry.acquire('b', self.loader('b'))
+        self.registry.release('a')
+        self.registry.release('b')
+        self.assertTrue(self.registry.is_loaded('a'))  # unreferenced models stay loaded within the budget
+
+        self.registry.acquire('c', self.loader('c'))
+        self.assertFalse(self.registry.is_loaded('a'))  # the least recently released model is evicted
+        self.assertTrue(self.registry.is_loaded('b'))
+        self.registry.acquire('d', self.loader('d'))  # b is evicted, c is in use
+        self.assertFalse(self.registry.is_loaded('b'))
+        self.assertTrue(self.registry.is_loaded('c'))
+        self.assertEqual(self.registry.size_bytes, 2000)
+
+        self.registry.acquire('a', self.loader('a'))
+        self.assertEqual(self.loads, ['a', 'b', 'c', 'd', 'a'])
+
+    def test_clear(self):
+        self.registry.acquire('a', self.loader('a'))
+        self.registry.acquire('b', self.loader('b'))
+        self.registry.release('a')
+        self.registry.clear()
+        self.assertFalse(self.registry.is_loaded('a'))
+        self.assertTrue(self.registry.is_loaded('b'))
+
+    def test_estimate_model_size(self):
+        self.assertEqual(estimate_model_size((np.zeros(10, dtype=np.float32), np.zeros(3))), 64)
+        self.assertEqual(estimate_model_size(object()), 0)
+
+    def test_components_share_models(self):
+        class ModelComponent(PipelineComponent):
+            model = None
+            loads = 0
+
+            def load_model(self):
+                def load():
+                    ModelComponent.loads += 1
+                    return np.zeros(10)
+                self.model = self.acquire_model('test.loader', 'test_checkpoint', load)
+
+            def process(self, input_payload: ComponentPayload) -> ComponentPayload:
+                pass
+
+        first = ModelComponent('test_type', 'first', {})
+        second = ModelComponent('test_type', 'second', {})
+        first.ensure_model_loaded()
+        second.ensure_model_loaded()
+        self.assertIs(first.model, second.model)
+        self.assertEqual(ModelComponent.loads, 1)
+
+        key = ModelRegistry.get_key('test.loader', 'test_checkpoint')
+        self.assertEqual(ModelRegistry.get_instance().get_references(key), 2)
+        first.release_models()
+        second.release_models()
+        self.assertIsNone(first.model)
+        self.assertEqual(ModelRegistry.get_instance().get_references(key), 0)
+
+        second.ensure_model_loaded()
+        self.assertEqual(ModelRegistry.get_instance().get_references(key), 1)
+        del second
+        gc.collect()
+        self.assertEqual(ModelRegistry.get_instance().get_references(key), 0)  # released when collected
+        first.ensure_model_loaded()
+        first.release_models()
+        third = ModelComponent('test_type', 'third', {})
+        third.ensure_model_loaded()
+        del first
+        gc.collect()
+        self.assertEqual(ModelRegistry.get_instance().get_references(key), 1)  # first's reference is not released twice
+        ModelRegistry.get_instance().clear()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import functools
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase
+
+from vanpy.core.ModelStore import ModelArtifact, ModelStore, get_sha256
+from vanpy.core.model_inference_components.VanpyAgeRegressor import VanpyAgeRegressor
+from vanpy.utils.utils import cached_download
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class TestModelStore(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.served_dir = tempfile.mkdtemp()
+        with open(os.path.join(cls.served_dir, 'model.bin'), 'wb') as f:
+            f.write(b'weights')
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0),
+                                         functools.partial(QuietHandler, directory=cls.served_dir))
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_address[1]}/model.bin'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        self.store = ModelStore(tempfile.mkdtemp())
+
+    def test_get_file(self):
+        artifact = ModelArtifact(self.url, filename='model.bin')
+        self.assertIsNone(self.store.find_file(artifact))
+        path = self.store.get_file(artifact)
+        self.assertEqual(os.path.basename(path), 'model.bin')
+        self.assertEqual(os.path.basename(os.path.dirname(path)), get_sha256(path))
+        self.assertEqual(self.store.find_file(artifact), path)
+        self.assertEqual(ModelStore(self.store.path).find_file(artifact), path)  # the index is persisted
+
+    def test_checksum_mismatch(self):
+        with self.assertRaises(OSError):
+            self.store.get_file(ModelArtifact(self.url, sha256='0' * 64))
+        self.assertIsNone(self.store.find_file(ModelArtifact(self.url)))
+
+    def test_prefetch(self):
+        results = self.store.prefetch([ModelArtifact(self.url), ModelArtifact(self.url + '.missing')])
+        ok, path = results[ModelArtifact(self.url)]
+        self.assertTrue(ok)
+        self.assertTrue(os.path.isfile(path))
+        self.assertFalse(results[ModelArtifact(self.url + '.missing')][0])
+
+    def test_cached_download_through_store(self):
+        target = os.path.join(tempfile.mkdtemp(), 'models', 'model.bin')
+        self.assertEqual(cached_download(self.url, target, store=self.store), target)
+        with open(target, 'rb') as f:
+            self.assertEqual(f.read(), b'weights')
+        self.assertIsNotNone(self.store.find_file(ModelArtifact(self.url)))
+
+    def test_huggingface_snapshot(self):
+        artifact = ModelArtifact('org/model', kind='huggingface')
+        self.assertIsNone(self.store.find_huggingface_snapshot(artifact))
+        self.assertEqual(self.store.get_huggingface_source(artifact), 'org/model')
+        repository_dir = os.path.join(self.store.huggingface_dir, 'models--org--model')
+        os.makedirs(os.path.join(repository_dir, 'refs'))
+        os.makedirs(os.path.join(repository_dir, 'snapshots', 'abc123'))
+        with open(os.path.join(repository_dir, 'refs', 'main'), 'w') as f:
+            f.write('abc123')
+        self.assertEqual(self.store.get_huggingface_source(artifact),
+                         os.path.join(repository_dir, 'snapshots', 'abc123'))
+
+    def test_component_artifacts(self):
+        artifacts = VanpyAgeRegressor({'segment_classifier': {'vanpy_age': {'model': 'svr_ecapa_192_sb_voxceleb'}}}
+                                      ).get_model_artifacts()
+        self.assertEqual([a.filename for a in artifacts], ['vc_auto_svr_reg_bal_speechbrain_ecapa_192_age_optuna.pkl',
+                                                           'scaler_auto_vc_reg_bal_speechbrain_ecapa_192_age_optuna.pkl'])
+
+    def test_offline_mode(self):
+        # the network is blocked for the whole process, so offline mode is checked in a subprocess
+        code = ('import socket, sys\n'
+                'from vanpy.core.ModelStore import ModelArtifact, ModelStore\n'
+                f'store = ModelStore.open({self.store.path!r})\n'
+                'assert store.offline\n'
+                'try:\n'
+                f'    store.get_file(ModelArtifact({self.url!r}))\n'
+                '    sys.exit("missing file resolved")\n'
+                'except FileNotFoundError:\n'
+                '    pass\n'
+                'try:\n'
+                '    socket.create_connection(("192.0.2.1", 80), timeout=1)\n'
+                '    sys.exit("connected")\n'
+                'except ConnectionRefusedError as e:\n'
+                '    assert "offline" in str(e)\n'
+                f'socket.create_connection(("127.0.0.1", {self.server.server_address[1]}), timeout=1).close()\n')
+        env = dict(os.environ, VANPY_OFFLINE='1')
+        result = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
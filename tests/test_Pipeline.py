@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import threading
+import unittest
+from typing import List
+
+import pandas as pd
+
+from vanpy.core.BasePipeline import BasePipeline
+from vanpy.core.ComponentPayload import ComponentPayload
+from vanpy.core.Pipeline import Pipeline
+from vanpy.core.PipelineComponent import PipelineComponent
+from vanpy.utils.row_ids import attach_results
+
+
+class TestPipeline(unittest.TestCase):
+    class ImpPipeline(BasePipeline):
+        components_mapper = {}
+
+        def __init__(self, components: List[PipelineComponent]):
+            self.components = components
+            self.logger = logging.getLogger('ImpPipeline')
+
+    class AddColumnComponent(PipelineComponent):
+        def __init__(self, name: str, config):
+            super().__init__('feature_extraction', name, config)
+            self.threads = set()
+
+        def process(self, input_payload: ComponentPayload) -> ComponentPayload:
+            self.threads.add(threading.current_thread().name)
+            metadata, df = input_payload.unpack()
+            df[self.get_name()] = df['path'] + 1
+            metadata['feature_columns'].append(self.get_name())
+            return ComponentPayload(metadata=metadata, df=df)
+
+    class CountRowsComponent(PipelineComponent):
+        streamable = False
+
+        def __init__(self, config):
+            super().__init__('segment_classifier', 'count_rows', config)
+
+        def process(self, input_payload: ComponentPayload) -> ComponentPayload:
+            metadata, df = input_payload.unpack()
+            df['rows_count'] = len(df)
+            return ComponentPayload(metadata=metadata, df=df)
+
+    class ItemComponent(PipelineComponent):
+        def __init__(self, config):
+            super().__init__('feature_extraction', 'item', config)
+            self.executors = 0
+            self.model_calls = 0
+
+        def create_executor(self):
+            self.executors += 1
+            return super().create_executor()
+
+        def process_item(self, f, input_column):
+            self.model_calls += 1
+            return {input_column: f, 'item': f * 2}
+
+        def process(self, input_payload: ComponentPayload) -> ComponentPayload:
+            metadata, df = input_payload.unpack()
+            paths_list, row_ids = self.get_input_rows(df, 'path')
+            p_df = self.process_with_progress(paths_list, metadata, 'path', row_ids=row_ids)
+            return ComponentPayload(metadata=metadata, df=attach_results(df, p_df, 'path'))
+
+    class ModelComponent(AddColumnComponent):
+        model = None
+        load_count = 0
+
+        def load_model(self):
+            self.load_count += 1
+            self.model = 'model'
+
+    class FailingComponent(PipelineComponent):
+        def process(self, input_payload: ComponentPayload) -> ComponentPayload:
+            raise RuntimeError('failed')
+
+    def setUp(self):
+        self.config = {'input_dir': None, 'stream_chunk_size': 2, 'stream_queue_size': 1}
+        self.payload = ComponentPayload(input_path='', metadata={'paths_column': 'path'},
+                                        df=pd.DataFrame({'path': range(5)}))
+
+    def test_process_stream(self):
+        first = self.AddColumnComponent('first', self.config)
+        second = self.AddColumnComponent('second', self.config)
+        pipeline = Pipeline(pipelines=[self.ImpPipeline([first]), self.ImpPipeline([second])], config=self.config)
+        chunks = list(pipeline.process_stream(self.payload))
+        self.assertEqual([len(c.df) for c in chunks], [2, 2, 1])
+        result = ComponentPayload.concat(chunks)
+        self.assertEqual(result.df['path'].tolist(), list(range(5)))
+        self.assertEqual(result.df['second'].tolist(), list(range(1, 6)))
+        self.assertEqual(result.metadata['feature_columns'], ['first', 'second'])
+        self.assertEqual(first.threads, {'stream-first'})
+        self.assertEqual(second.threads, {'stream-second'})
+
+    def test_process_stream_shares_executor(self):
+        for chunk_size in (5, 1):
+            component = self.ItemComponent(self.config)
+            config = dict(self.config, stream_chunk_size=chunk_size)
+            chunks = list(Pipeline(pipelines=[self.ImpPipeline([component])], config=config)
+                          .process_stream(self.payload))
+            self.assertEqual(len(chunks), 5 // chunk_size)
+            self.assertEqual(ComponentPayload.concat(chunks).df['item'].tolist(), [0, 2, 4, 6, 8])
+            self.assertEqual(component.executors, 1)  # one executor (and progress bar) for all the chunks
+            self.assertEqual(component.model_calls, 5)  # a call per item, whatever the number of chunks
+
+    def test_process_stream_barrier(self):
+        pipeline = Pipeline(pipelines=[self.ImpPipeline([self.AddColumnComponent('first', self.config),
+                                                         self.CountRowsComponent(self.config)])],
+                            config=self.config)
+        payloads = list(pipeline.process_stream(self.payload))
+        self.assertEqual(len(payloads), 4)
+        self.assertNotIn('rows_count', payloads[0].df.columns)
+        self.assertEqual(payloads[-1].df['rows_count'].tolist(), [5] * 5)
+        self.assertEqual(payloads[-1].df['first'].tolist(), list(range(1, 6)))
+
+    def test_process_stream_error(self):
+        pipeline = Pipeline(pipelines=[self.ImpPipeline([self.AddColumnComponent('first', self.config),
+                                                         self.FailingComponent('feature_extraction', 'failing',
+                                                                               self.config)])],
+                            config=self.config)
+        with self.assertRaises(RuntimeError):
+            list(pipeline.process_stream(self.payload))
+
+    def test_process_stream_early_stop(self):
+        pipeline = Pipeline(pipelines=[self.ImpPipeline([self.AddColumnComponent('first', self.config)])],
+                            config=self.config)
+        stream = pipeline.process_stream(self.payload)
+        self.assertEqual(len(next(stream).df), 2)
+        stream.close()
+        self.assertFalse(any(t.name.startswith('stream-') for t in threading.enumerate()))
+
+    def test_process_delegates_to_pipelines(self):
+        class RecordingPipeline(self.ImpPipeline):
+            processed = []
+
+            def process(self, input_payload, model_preloader=None):
+                self.processed.append(self)
+                return super().process(input_payload, model_preloader)
+
+        first = RecordingPipeline([self.AddColumnComponent('first', self.config)])
+        second = RecordingPipeline([self.AddColumnComponent('second', self.config)])
+        result = Pipeline(pipelines=[first, second], config=self.config).process(self.payload)
+        self.assertEqual(RecordingPipeline.processed, [first, second])
+        self.assertEqual(result.df['second'].tolist(), list(range(1, 6)))
+
+        RecordingPipeline.processed = []
+        config = dict(self.config, max_parallel_components=2)
+        Pipeline(pipelines=[first, second], config=config).process(self.payload)
+        self.assertEqual(RecordingPipeline.processed, [])  # scheduled across the sub-pipelines
+
+    def test_aprocess(self):
+        component = self.ModelComponent('model', self.config)
+        pipeline = Pipeline(pipelines=[self.ImpPipeline([component])], config=self.config)
+
+        async def process_concurrently():
+            payloads = [ComponentPayload(input_path='', metadata={'paths_column': 'path'},
+                                         df=pd.DataFrame({'path': range(i)})) for i in range(1, 4)]
+            return await asyncio.gather(*[pipeline.aprocess(p) for p in payloads])
+
+        results = asyncio.run(process_concurrently())
+        self.assertEqual([r.df['model'].tolist() for r in results], [[1], [1, 2], [1, 2, 3]])
+        self.assertEqual(component.load_count, 1)
+        self.assertNotIn(threading.main_thread().name, component.threads)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,17 +1,36 @@
+import glob
+import os
+import time
 import tempfile
 from unittest import TestCase
 import unittest
 import unittest.mock
 import io
 import pandas as pd
+import yaml
 from vanpy.core.PipelineComponent import PipelineComponent
 from vanpy.core.ComponentPayload import ComponentPayload
+from vanpy.utils.row_ids import ROW_ID_COLUMN, attach_results
 
 class TestPipelineComponent(TestCase):
     class ImpPipelineComponent(PipelineComponent):
         def process(self, input_payload: ComponentPayload) -> ComponentPayload:
             pass
 
+    class ItemComponent(PipelineComponent):
+        model = None
+        load_count = 0
+
+        def load_model(self):
+            self.load_count += 1
+            self.model = 'model'
+
+        def process(self, input_payload: ComponentPayload) -> ComponentPayload:
+            pass
+
+        def process_item(self, f, input_column):
+            return {input_column: f, 'pid': os.getpid()}
+
     def setUp(self):
         self.component_type = "example_component"
         self.component_name = "example"
@@ -42,6 +61,282 @@ class TestPipelineComponent(TestCase):
         pipeline_component = self.ImpPipelineComponent("test_type", "test_name", {})
         self.assertEqual(pipeline_component.get_name(), 'test_name')
 
+    def test_process_with_progress_collects_results(self):
+        class ItemComponent(PipelineComponent):
+            def process(self, input_payload: ComponentPayload) -> ComponentPayload:
+                pass
+
+            def process_item(self, f, input_column):
+                if f == 'multi':
+                    return [{input_column: f, 'value': 1}, {input_column: f, 'value': 2}]
+                return {input_column: f, 'value': 0}
+
+        component = ItemComponent("test_type", "test_name", {})
+        df = component.process_with_progress(['a', 'multi', 'b'], self.input_payload.metadata, 'path')
+        self.assertEqual(len(df), 4)
+        self.assertEqual(sorted(df['path'].tolist()), ['a', 'b', 'multi', 'multi'])
+        self.assertEqual(sorted(df.loc[df['path'] == 'multi', 'value'].tolist()), [1, 2])
+
+    def test_process_with_progress_row_ids(self):
+        component = self.ItemComponent("test_type", "test_name", {'max_workers': 2})
+        df = pd.DataFrame({'path': ['a', None, 'b', 'a']})
+        paths, row_ids = component.get_input_rows(df, 'path')
+        self.assertEqual(paths, ['a', 'b', 'a'])
+        self.assertEqual(row_ids, df[ROW_ID_COLUMN].iloc[[0, 2, 3]].tolist())
+
+        p_df = component.process_with_progress(paths, self.input_payload.metadata, 'path', row_ids=row_ids)
+        self.assertEqual(sorted(p_df[ROW_ID_COLUMN].tolist()), sorted(row_ids))
+        df = attach_results(df, p_df, 'path')
+        self.assertEqual(df['pid'].notna().tolist(), [True, False, True, True])
+
+    def test_default_process_start_method(self):
+        component = self.ImpPipelineComponent("test_type", "test_name", {'executor': 'process'})
+        self.assertIn(component.process_start_method, ('forkserver', 'spawn'))  # forking with running threads is unsafe
+        forked = self.ImpPipelineComponent("test_type", "test_name", {'process_start_method': 'fork'})
+        self.assertEqual(forked.process_start_method, 'fork')
+
+    def test_process_with_progress_executors(self):
+        for executor in ['sequential', 'thread', 'process']:
+            component = self.ItemComponent("test_type", "test_name", {'executor': executor, 'max_workers': 2})
+            df = component.process_with_progress(['a', 'b', 'c'], self.input_payload.metadata, 'path')
+            self.assertEqual(sorted(df['path'].tolist()), ['a', 'b', 'c'])
+            self.assertEqual(set(df['pid'].tolist()) == {os.getpid()}, executor != 'process')
+
+    def test_bounded_in_flight(self):
+        component = self.ItemComponent("test_type", "test_name", {'max_workers': 2, 'max_in_flight': 3})
+        pulled = []
+
+        def items():
+            for i in range(20):
+                pulled.append(i)
+                yield str(i)
+
+        yielded = 0
+        for elem, future in component.iterate_processed_items(items(), 'path'):
+            yielded += 1
+            self.assertLessEqual(len(pulled) - yielded, 3)
+            self.assertEqual(future.result()[0]['path'], elem)
+        self.assertEqual(yielded, 20)
+
+    def test_unknown_executor(self):
+        with self.assertRaises(ValueError):
+            self.ItemComponent("test_type", "test_name", {'executor': 'gpu'})
+
+    def test_ensure_model_loaded(self):
+        component = self.ItemComponent("test_type", "test_name", {})
+        component.ensure_model_loaded()
+        component.ensure_model_loaded()
+        self.assertEqual(component.model, 'model')
+        self.assertEqual(component.load_count, 1)
+
+    def test_process_with_progress_batches(self):
+        class BatchComponent(PipelineComponent):
+            batch_sizes = []
+
+            def process(self, input_payload: ComponentPayload) -> ComponentPayload:
+                pass
+
+            def process_item(self, f, input_column):
+                return {input_column: f, 'batched': False}
+
+            def process_batch(self, items, input_column):
+                self.batch_sizes.append(len(items))
+                if len(items) > 2:
+                    raise RuntimeError('CUDA out of memory')
+                return [{input_column: f, 'batched': True} for f in items]
+
+        component = BatchComponent("test_type", "test_name", {'executor': 'sequential', 'batch_size': 4})
+        self.assertTrue(component.is_batching_enabled())
+        items = [str(i) for i in range(9)]
+        df = component.process_with_progress(items, self.input_payload.metadata, 'path')
+        self.assertEqual(sorted(df['path'].tolist()), items)
+        self.assertEqual(component.batch_size, 2)
+        self.assertEqual(component.batch_sizes, [4, 2, 2, 2, 2])
+        self.assertEqual(df['batched'].tolist(), [True] * 8 + [False])
+
+    def test_stage_timings(self):
+        class SegmentingComponent(PipelineComponent):
+            def process(self, input_payload: ComponentPayload) -> ComponentPayload:
+                pass
+
+            def process_item(self, f, input_column):
+                with self.timed('inference'):
+                    time.sleep(0.02)
+                records = []
+                for i in range(2):
+                    record = {input_column: f}
+                    with self.timed('cut_and_write', record=record):
+                        time.sleep(0.01 * (i + 1))
+                    records.append(record)
+                return records
+
+        component = SegmentingComponent("test_type", "test_name", {'performance_measurement': True,
+                                                                   'max_workers': 2})
+        metadata = {'meta_columns': []}
+        component.add_performance_column_to_metadata(metadata)
+        df = component.process_with_progress(['a', 'b', 'c'], metadata, 'path')
+        self.assertEqual(len(df), 6)
+        self.assertEqual(sorted(metadata['meta_columns']), ['perf_test_name', 'perf_test_name_bookkeeping',
+                                                            'perf_test_name_cut_and_write', 'perf_test_name_inference'])
+        for f, rows in df.groupby('path'):
+            self.assertAlmostEqual(rows['perf_test_name_inference'].sum(), 0.02, delta=0.015)
+            self.assertEqual(sorted(rows['perf_test_name_cut_and_write'].round(2).tolist()), [0.01, 0.02])
+            stages = rows[['perf_test_name_inference', 'perf_test_name_cut_and_write',
+                           'perf_test_name_bookkeeping']].sum().sum()
+            self.assertAlmostEqual(stages, rows['perf_test_name'].sum(), places=6)
+
+    def test_resume_from_ledger(self):
+        class FailingComponent(PipelineComponent):
+            calls = []
+            failing = {'c'}
+
+            def process(self, input_payload: ComponentPayload) -> ComponentPayload:
+                pass
+
+            def process_item(self, f, input_column):
+                self.calls.append(f)
+                if f in self.failing:
+                    raise RuntimeError('crash')
+                return {input_column: f, 'value': f.upper()}
+
+        ledger_path = os.path.join(tempfile.mkdtemp(), 'ledger.sqlite')
+        config = {'max_workers': 2, 'ledger': {'enabled': True, 'path': ledger_path}, 'test_type': {'test_name': {}}}
+        component = FailingComponent("test_type", "test_name", config)
+        df = component.process_with_progress(['a', 'b', 'c'], self.input_payload.metadata, 'path')
+        self.assertEqual(sorted(df['path'].tolist()), ['a', 'b'])
+
+        restarted = FailingComponent("test_type", "test_name", config)
+        restarted.calls, restarted.failing = [], set()
+        df = restarted.process_with_progress(['a', 'b', 'c'], self.input_payload.metadata, 'path')
+        self.assertEqual(restarted.calls, ['c'])
+        self.assertEqual(sorted(df['value'].tolist()), ['A', 'B', 'C'])
+
+        reconfigured = FailingComponent("test_type", "test_name",
+                                        dict(config, test_type={'test_name': {'model_param': 1}}))
+        reconfigured.calls, reconfigured.failing = [], set()
+        reconfigured.process_with_progress(['a', 'b', 'c'], self.input_payload.metadata, 'path')
+        self.assertEqual(sorted(reconfigured.calls), ['a', 'b', 'c'])
+
+    def test_resume_retries_items_without_result(self):
+        class NoneComponent(PipelineComponent):
+            calls = []
+            failing = {'b'}
+
+            def process(self, input_payload: ComponentPayload) -> ComponentPayload:
+                pass
+
+            def process_item(self, f, input_column):
+                self.calls.append(f)
+                return None if f in self.failing else {input_column: f}
+
+        ledger_path = os.path.join(tempfile.mkdtemp(), 'ledger.sqlite')
+        config = {'ledger': {'enabled': True, 'path': ledger_path}, 'test_type': {'test_name': {}}}
+        NoneComponent("test_type", "test_name", config).process_with_progress(['a', 'b'], {}, 'path')
+
+        restarted = NoneComponent("test_type", "test_name", config)
+        restarted.calls, restarted.failing = [], set()
+        df = restarted.process_with_progress(['a', 'b'], {}, 'path')
+        self.assertEqual(restarted.calls, ['b'])
+        self.assertEqual(sorted(df['path'].tolist()), ['a', 'b'])
+
+    def test_result_cache(self):
+        class CachedComponent(PipelineComponent):
+            cacheable = True
+            calls = []
+
+            def process(self, input_payload: ComponentPayload) -> ComponentPayload:
+                pass
+
+            def process_item(self, f, input_column):
+                self.calls.append(f)
+                return {input_column: f, 'size': os.path.getsize(f)}
+
+        temp_dir = tempfile.mkdtemp()
+        paths = []
+        for name, content in [('a.wav', b'aa'), ('b.wav', b'bbb'), ('copy.wav', b'aa')]:
+            paths.append(os.path.join(temp_dir, name))
+            with open(paths[-1], 'wb') as f:
+                f.write(content)
+        config = {'result_cache': {'enabled': True, 'path': os.path.join(temp_dir, 'cache.sqlite'), 'key': 'content'}}
+        CachedComponent("test_type", "test_name", config).process_with_progress(paths[:2], {}, 'path')
+
+        component = CachedComponent("test_type", "test_name", config)
+        component.calls = []
+        df = component.process_with_progress(paths, {}, 'path')
+        self.assertEqual(component.calls, [])
+        self.assertEqual(sorted(zip(df['path'], df['size'])), [(paths[0], 2), (paths[1], 3), (paths[2], 2)])
+
+        component = CachedComponent("test_type", "test_name", dict(config, test_type={'test_name': {'model_param': 1}}))
+        component.calls = []
+        component.process_with_progress(paths, {}, 'path')
+        self.assertEqual(sorted(component.calls), sorted(paths))
+
+    def test_result_cache_ignores_unrelated_config(self):
+        class CachedComponent(PipelineComponent):
+            cacheable = True
+            calls = []
+
+            def process(self, input_payload: ComponentPayload) -> ComponentPayload:
+                pass
+
+            def process_item(self, f, input_column):
+                self.calls.append(f)
+                return {input_column: f}
+
+        temp_dir = tempfile.mkdtemp()
+        path = os.path.join(temp_dir, 'a.wav')
+        with open(path, 'wb') as f:
+            f.write(b'aa')
+        config = {'result_cache': {'enabled': True, 'path': os.path.join(temp_dir, 'cache.sqlite'), 'key': 'content'},
+                  'input_dir': temp_dir, 'test_type': {'test_name': {'model_param': 1, 'output_dir': temp_dir}},
+                  'other_type': {'other_name': {'param': 1}}}
+        CachedComponent("test_type", "test_name", config).process_with_progress([path], {}, 'path')
+
+        for changed in [dict(config, input_dir=tempfile.mkdtemp()),
+                        dict(config, other_type={'other_name': {'param': 2}}),
+                        dict(config, test_type={'test_name': {'model_param': 1, 'output_dir': tempfile.mkdtemp()}}),
+                        dict(config, huggingface_ACCESS_TOKEN='token')]:
+            component = CachedComponent("test_type", "test_name", changed)
+            component.calls = []
+            component.process_with_progress([path], {}, 'path')
+            self.assertEqual(component.calls, [])
+
+    def test_config_hash_ignores_execution_options(self):
+        component = self.ImpPipelineComponent("test_type", "test_name",
+                                              {'test_type': {'test_name': {'param': 1, 'max_workers': 2}}})
+        same = self.ImpPipelineComponent("test_type", "test_name", {'test_type': {'test_name': {'param': 1}},
+                                                                    'max_workers': 8, 'executor': 'sequential'})
+        other = self.ImpPipelineComponent("test_type", "test_name", {'test_type': {'test_name': {'param': 2}}})
+        self.assertEqual(component.get_config_hash(), same.get_config_hash())
+        self.assertNotEqual(component.get_config_hash(), other.get_config_hash())
+
+    def test_config_hash_of_pipeline_config(self):
+        with open(os.path.join(os.path.dirname(__file__), '..', 'src', 'pipeline.yaml')) as f:
+            yaml_config = yaml.safe_load(f)
+        yaml_config['ledger'] = {'enabled': True, 'path': os.path.join(tempfile.mkdtemp(), 'ledger.sqlite')}
+        component = self.ItemComponent('feature_extraction', 'speechbrain_embedding', yaml_config)
+        # the root-level sections passed through to the component hold its own section
+        df = component.process_with_progress(['a', 'b'], {'meta_columns': []}, 'path')
+        self.assertEqual(df['path'].tolist(), ['a', 'b'])
+        self.assertNotIn('preprocessing', yaml_config['feature_extraction']['speechbrain_embedding'])
+        other_input = self.ItemComponent('feature_extraction', 'speechbrain_embedding',
+                                         dict(yaml_config, input_dir='other', sampling_rate=16000))
+        self.assertEqual(component.get_config_hash(), other_input.get_config_hash())
+        resampled = self.ItemComponent('feature_extraction', 'speechbrain_embedding',
+                                       dict(yaml_config, sampling_rate=8000))
+        self.assertNotEqual(component.get_config_hash(), resampled.get_config_hash())
+
+    def test_checkpoints_append_new_rows(self):
+        temp_dir = tempfile.mkdtemp()
+        component = self.ItemComponent("test_type", "test_name", {'executor': 'sequential', 'save_payload': True,
+                                                                  'save_payload_periodicity': 2,
+                                                                  'intermediate_payload_path': temp_dir})
+        df = component.process_with_progress(['a', 'b', 'c', 'd', 'e'], {'meta_columns': []}, 'path')
+        checkpoints = glob.glob(f'{temp_dir}/test_type_test_name_df_*_intermediate.csv')
+        self.assertEqual(len(checkpoints), 1)
+        self.assertEqual(pd.read_csv(checkpoints[0])['path'].tolist(), df['path'].tolist())
+        self.assertEqual(len(glob.glob(f'{temp_dir}/test_type_test_name_metadata_*_intermediate.pickle')), 1)
+
     # def test_save_intermediate_payload(self):
     #     pipeline_component = self.ImpPipelineComponent("test_type", "test_name", {"save_payload_periodicity": 2})
     #     input_payload = ComponentPayload(df=pd.DataFrame({"col1": [1, 2, 3, 4, 5]}))
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+from unittest import TestCase
+
+from vanpy.core.ResultCache import ResultCache
+
+
+class TestResultCache(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'cache', 'results.sqlite')
+
+    def write_file(self, name: str, content: bytes) -> str:
+        path = os.path.join(self.dir, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_put_and_get(self):
+        cache = ResultCache(self.path)
+        cache.put_many([('k1', 'comp', {'value': 1}), ('k2', 'comp', [1, 2])])
+        self.assertEqual(cache.get_many(['k1', 'k2', 'k3']), {'k1': {'value': 1}, 'k2': [1, 2]})
+        stats = cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (2, 1, 2))
+
+        reopened = ResultCache(self.path)
+        self.assertEqual(reopened.get_many(['k1']), {'k1': {'value': 1}})
+        self.assertEqual(reopened.size, cache.size)
+
+    def test_lru_eviction(self):
+        cache = ResultCache(self.path, max_size_bytes=10_000)
+        cache.put_many([('old', 'comp', b'0' * 4_000), ('recent', 'comp', b'1' * 4_000)])
+        cache.get_many(['old'])  # old becomes the most recently used entry
+        cache.put_many([('new', 'comp', b'2' * 4_000)])
+        self.assertEqual(set(cache.get_many(['old', 'recent', 'new'])), {'old', 'new'})
+        self.assertEqual(cache.get_stats()['evictions'], 1)
+        self.assertLessEqual(cache.size, 10_000)
+
+    def test_audio_keys(self):
+        a = self.write_file('a.wav', b'audio')
+        copy = self.write_file('copy.wav', b'audio')
+        content_cache = ResultCache(self.path, key_mode='content')
+        self.assertEqual(content_cache.get_audio_key(a), content_cache.get_audio_key(copy))
+        stat_cache = ResultCache(self.path, key_mode='stat')
+        self.assertNotEqual(stat_cache.get_audio_key(a), stat_cache.get_audio_key(copy))
+        self.assertEqual(content_cache.get_audio_key(f'{a}#t=1,2'), f'{content_cache.get_audio_key(copy)}#t=1,2')
+        self.assertIsNone(stat_cache.get_audio_key(os.path.join(self.dir, 'missing.wav')))
+        self.assertNotEqual(ResultCache.get_key('comp', 'hash', 'audio'), ResultCache.get_key('comp', 'other', 'audio'))
+
+    def test_clear(self):
+        cache = ResultCache(self.path)
+        cache.put_many([('k1', 'comp', 1), ('k2', 'other_comp', 2)])
+        cache.clear('comp')
+        self.assertEqual(cache.get_many(['k1', 'k2']), {'k2': 2})
+
+    def test_unknown_key_mode(self):
+        with self.assertRaises(ValueError):
+            ResultCache(self.path, key_mode='name')
+
+
+if __name__ == '__main__':
+    unittest.main()
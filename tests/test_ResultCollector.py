@@ -0,0 +1,41 @@
+import unittest
+
+import pandas as pd
+
+from vanpy.core.ResultCollector import ResultCollector
+
+
+class TestResultCollector(unittest.TestCase):
+    def setUp(self):
+        self.collector = ResultCollector()
+
+    def test_empty(self):
+        self.assertEqual(len(self.collector), 0)
+        self.assertTrue(self.collector.to_df().empty)
+
+    def test_add_records(self):
+        self.assertEqual(self.collector.add({'path': 'a', 'x': 1}), 1)
+        self.assertEqual(self.collector.add([{'path': 'b', 'x': 2}, {'path': 'c', 'y': 'z'}]), 2)
+        self.assertEqual(self.collector.add(None), 0)
+        df = self.collector.to_df()
+        self.assertEqual(list(df.columns), ['path', 'x', 'y'])
+        self.assertEqual(df['path'].tolist(), ['a', 'b', 'c'])
+        self.assertTrue(pd.isna(df.loc[2, 'x']))
+        self.assertTrue(pd.isna(df.loc[0, 'y']))
+
+    def test_add_frame_and_extra_columns(self):
+        self.collector.add({'path': 'a'})
+        self.collector.add(pd.DataFrame({'path': ['b', 'c'], 'x': [1, 2]}), perf=0.5)
+        df = self.collector.to_df()
+        self.assertEqual(len(df), 3)
+        self.assertEqual(df['perf'].tolist()[1:], [0.5, 0.5])
+        self.assertTrue(pd.isna(df.loc[0, 'perf']))
+
+    def test_to_df_from_checkpoint(self):
+        for i in range(5):
+            self.collector.add({'i': i})
+        self.assertEqual(self.collector.to_df(start=3)['i'].tolist(), [3, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
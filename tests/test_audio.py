@@ -0,0 +1,134 @@
+import os
+import tempfile
+import unittest
+import wave
+from unittest import TestCase
+
+import numpy as np
+
+from vanpy.core.ComponentPayload import ComponentPayload
+from vanpy.core.preprocess_components.BaseSegmenterComponent import BaseSegmenterComponent
+from vanpy.utils.audio import SAMPLING_RATE_KEY, DecodedAudioCache, get_segment_file_name, is_virtual_segment_path, \
+    load_audio, make_virtual_segment_path, parse_virtual_segment_path, resample
+
+
+class TestAudio(TestCase):
+    class ImpSegmenter(BaseSegmenterComponent):
+        def process(self, input_payload: ComponentPayload) -> ComponentPayload:
+            return input_payload
+
+    def test_virtual_segment_paths(self):
+        path = make_virtual_segment_path('/data/a.wav', 1.5, 3.25)
+        self.assertEqual(path, '/data/a.wav#t=1.5,3.25')
+        self.assertTrue(is_virtual_segment_path(path))
+        self.assertFalse(is_virtual_segment_path('/data/a.wav'))
+        self.assertEqual(parse_virtual_segment_path(path), ('/data/a.wav', 1.5, 3.25))
+        self.assertEqual(parse_virtual_segment_path('/data/a.wav'), ('/data/a.wav', 0.0, None))
+        # a segment of a virtual segment refers to the source file
+        self.assertEqual(make_virtual_segment_path(path, 0.5, 1), '/data/a.wav#t=2,2.5')
+        self.assertEqual(get_segment_file_name(path), 'a_1.5-3.25.wav')
+        self.assertEqual(get_segment_file_name('/data/a.mp3', '.wav'), 'a.wav')
+
+    def test_virtual_cut_segment(self):
+        output_dir = tempfile.mkdtemp()
+        segmenter = self.ImpSegmenter('preprocessing', 'segmenter', {'virtual_segments': True})
+        path = segmenter.cut_segment('/data/a.wav', output_dir, (1.0, 2.0), 0, '_', False)
+        self.assertEqual(path, '/data/a.wav#t=1,2')
+        self.assertEqual(os.listdir(output_dir), [])
+
+    def test_decoded_audio_cache(self):
+        path = os.path.join(tempfile.mkdtemp(), 'a.wav')
+        with open(path, 'wb') as f:
+            f.write(b'audio')
+        cache = DecodedAudioCache(max_size_bytes=100)
+        key = cache.get_key(path, 16000, True)
+        cache.put(key, np.ones(10, dtype=np.float32), 16000)
+        y, sr = cache.get(key)
+        y[:] = 0  # the cached waveform is not modified
+        self.assertEqual(cache.get(key)[0].sum(), 10)
+        other_key = cache.get_key(path, 8000, True)
+        cache.put(other_key, np.ones(20, dtype=np.float32), 8000)
+        self.assertIsNone(cache.get(key))  # evicted above max_size_bytes
+        self.assertEqual((cache.size_bytes, cache.hits, cache.misses), (80, 2, 1))
+        self.assertIsNone(cache.get_key(os.path.join(os.path.dirname(path), 'missing.wav'), 16000, True))
+        cache.set_max_size(0)
+        self.assertIsNone(cache.get_key(path, 16000, True))
+
+    def test_load_audio_from_cache(self):
+        path = os.path.join(tempfile.mkdtemp(), 'a.wav')
+        with open(path, 'wb') as f:
+            f.write(b'not decodable')
+        cache = DecodedAudioCache.get_instance()
+        cache.put(cache.get_key(path, 16000, True), np.arange(4, dtype=np.float32), 16000)
+        y, sr = load_audio(path, sr=16000)  # served from the cache, the file is not decoded
+        np.testing.assert_array_equal(y, np.arange(4))
+        cache.clear()
+
+    def test_load_audio(self):
+        path = os.path.join(tempfile.mkdtemp(), 'a.wav')
+        with wave.open(path, 'wb') as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(16000)
+            w.writeframes((np.arange(16000) % 100).astype(np.int16).tobytes())
+        y, sr = load_audio(make_virtual_segment_path(path, 0.25, 0.5))
+        self.assertEqual((len(y), sr), (4000, 16000))
+        np.testing.assert_allclose(y * 32768, np.arange(4000, 8000) % 100)
+        y, sr = load_audio(make_virtual_segment_path(path, 0.25, 0.5), sr=8000)
+        self.assertEqual((len(y), sr), (2000, 8000))
+
+    def test_load_stereo_pcm_wav(self):
+        path = os.path.join(tempfile.mkdtemp(), 'stereo.wav')
+        samples = np.array([[-32768, 0], [16384, 16384]], dtype=np.int16)  # frames of (left, right)
+        with wave.open(path, 'wb') as w:
+            w.setnchannels(2)
+            w.setsampwidth(2)
+            w.setframerate(8000)
+            w.writeframes(samples.tobytes())
+        y, sr = load_audio(path, mono=False)
+        np.testing.assert_array_equal(y, [[-1, 0.5], [0, 0.5]])
+        self.assertEqual((y.dtype, sr), (np.float32, 8000))
+        np.testing.assert_array_equal(load_audio(path)[0], [-0.5, 0.5])
+
+    def test_resample(self):
+        y = np.ones(100, dtype=np.float32)
+        self.assertIs(resample(y, 16000, 16000), y)  # the contract holds, no resampling
+        self.assertEqual(resample(y, 16000, 8000).shape, (50,))
+        self.assertEqual(resample(np.ones((2, 100), dtype=np.float32), 8000, 16000).shape, (2, 200))
+
+    def test_load_audio_with_source_sr(self):
+        path = os.path.join(tempfile.mkdtemp(), 'a.wav')
+        with wave.open(path, 'wb') as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(16000)
+            w.writeframes(np.zeros(1600, dtype=np.int16).tobytes())
+        cache = DecodedAudioCache.get_instance()
+        cache.put(cache.get_key(path, None, True), np.arange(4, dtype=np.float32), 16000)
+        y, sr = load_audio(path, sr=16000, source_sr=16000)  # the native-rate entry, no resampling
+        np.testing.assert_array_equal(y, np.arange(4))
+        self.assertEqual(sr, 16000)
+        cache.clear()
+        y, sr = load_audio(path, sr=8000, source_sr=16000)
+        self.assertEqual((len(y), sr), (800, 8000))
+        y, sr = load_audio(path, sr=8000, source_sr=8000)  # stale metadata, the source is still resampled
+        self.assertEqual((len(y), sr), (800, 8000))
+        cache.clear()
+
+    def test_ensure_sample_rate_is_deprecated(self):
+        from vanpy.core.model_inference_components.YamnetClassifier import YamnetClassifier
+        with self.assertWarns(DeprecationWarning):
+            sr, y = YamnetClassifier.ensure_sample_rate(8000, np.ones(100, dtype=np.float32))
+        self.assertEqual((sr, y.shape), (16000, (200,)))
+
+    def test_sampling_rate_metadata(self):
+        metadata = ComponentPayload(input_path='/data').metadata
+        metadata[SAMPLING_RATE_KEY] = 44100
+        virtual = self.ImpSegmenter('preprocessing', 'virtual', {'virtual_segments': True}).enhance_metadata(metadata)
+        self.assertEqual(virtual[SAMPLING_RATE_KEY], 44100)  # virtual segments keep the rate of their source
+        cut = self.ImpSegmenter('preprocessing', 'cut', {}).enhance_metadata(metadata)
+        self.assertEqual(cut[SAMPLING_RATE_KEY], 16000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+import wave
+
+import numpy as np
+
+from vanpy.utils.batching import get_audio_duration, is_out_of_memory_error, make_batches, pad_signals
+
+
+class BatchingTest(unittest.TestCase):
+    def test_pad_signals(self):
+        batch = pad_signals([np.ones(2), np.ones(4), np.ones(1)])
+        self.assertEqual(batch.values.shape, (3, 4))
+        self.assertEqual(batch.values.dtype, np.float32)
+        self.assertEqual(batch.lengths.tolist(), [2, 4, 1])
+        self.assertEqual(batch.relative_lengths.tolist(), [0.5, 1.0, 0.25])
+        self.assertEqual(batch.attention_mask.tolist(), [[1, 1, 0, 0], [1, 1, 1, 1], [1, 0, 0, 0]])
+        self.assertEqual(batch.values.sum(), 7)
+
+    def test_make_batches(self):
+        durations = [5.0, 1.0, 2.0, None, 1.5, 30.0]
+        self.assertEqual(make_batches(durations, max_batch_size=2), [[1, 4], [2, 0], [5, 3]])
+        self.assertEqual(make_batches(durations, max_batch_size=10, max_batch_seconds=10),
+                         [[1, 4, 2], [0], [5], [3]])
+        self.assertEqual(make_batches([], max_batch_size=4), [])
+
+    def test_get_audio_duration(self):
+        path = os.path.join(tempfile.mkdtemp(), 'a.wav')
+        with wave.open(path, 'wb') as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(16000)
+            w.writeframes(b'\0\0' * 8000)
+        self.assertEqual(get_audio_duration(path), 0.5)
+        self.assertAlmostEqual(get_audio_duration(f'{path}#t=0.1,0.35'), 0.25)
+        self.assertIsNone(get_audio_duration(os.path.join(tempfile.mkdtemp(), 'missing.wav')))
+
+    def test_is_out_of_memory_error(self):
+        self.assertTrue(is_out_of_memory_error(MemoryError()))
+        self.assertTrue(is_out_of_memory_error(RuntimeError('CUDA out of memory. Tried to allocate 2 GiB')))
+        self.assertFalse(is_out_of_memory_error(RuntimeError('shape mismatch')))
+
+
+if __name__ == '__main__':
+    unittest.main()
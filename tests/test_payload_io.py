@@ -0,0 +1,87 @@
+import glob
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+import numpy as np
+
+from vanpy.core.ComponentPayload import ComponentPayload
+from vanpy.utils.payload_io import AppendOnlyDataFrameWriter, read_payload, write_df
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+class PayloadIOTest(unittest.TestCase):
+    def setUp(self):
+        self.prefix = os.path.join(tempfile.mkdtemp(), 'payload', 'df')
+
+    def test_csv_append(self):
+        with AppendOnlyDataFrameWriter(self.prefix, 'csv') as writer:
+            writer.append(pd.DataFrame({'path': ['a', 'b'], 'value': [1.5, 2.5]}))
+            writer.append(pd.DataFrame({'value': [3.5], 'path': ['c']}))
+            writer.append(pd.DataFrame())
+        self.assertEqual(writer.rows_written, 3)
+        self.assertEqual(writer.paths, [f'{self.prefix}.csv'])
+        df = pd.read_csv(writer.path)
+        self.assertEqual(df['path'].tolist(), ['a', 'b', 'c'])
+        self.assertEqual(df['value'].tolist(), [1.5, 2.5, 3.5])
+
+    def test_csv_new_columns_continue_in_new_part(self):
+        with AppendOnlyDataFrameWriter(self.prefix, 'csv') as writer:
+            writer.append(pd.DataFrame({'path': ['a']}))
+            writer.append(pd.DataFrame({'path': ['b'], 'value': [1]}))
+        self.assertEqual(writer.paths, [f'{self.prefix}.csv', f'{self.prefix}_part1.csv'])
+        self.assertEqual(len(glob.glob(f'{self.prefix}*')), 2)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            AppendOnlyDataFrameWriter(self.prefix, 'xlsx')
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_parquet_and_arrow_append(self):
+        for payload_format in ['parquet', 'arrow']:
+            prefix = f'{self.prefix}_{payload_format}'
+            with AppendOnlyDataFrameWriter(prefix, payload_format) as writer:
+                writer.append(pd.DataFrame({'path': ['a', 'b'], 'value': [1.0, 2.0]}))
+                writer.append(pd.DataFrame({'path': ['c'], 'value': [3.0]}))
+            self.assertEqual(len(writer.paths), 1)
+            if payload_format == 'parquet':
+                df = pd.read_parquet(writer.path)
+            else:
+                df = pyarrow.ipc.open_file(writer.path).read_pandas()
+            self.assertEqual(df['path'].tolist(), ['a', 'b', 'c'])
+            write_df(df, f'{prefix}_final.{payload_format}', payload_format)
+
+    @unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+    def test_payload_round_trip(self):
+        metadata = {'input_path': 'corpus', 'paths_column': 'path', 'all_paths_columns': ['path'],
+                    'meta_columns': [], 'feature_columns': [], 'classification_columns': ['label']}
+        df = pd.DataFrame({'path': ['a', 'b', 'c'], 'label': ['x', 'y', None]})
+        payload = ComponentPayload(metadata=metadata, df=df)
+        payload.add_feature_block('emb', pd.DataFrame({'path': ['b', 'a'], '0_emb': [2.0, 1.0], '1_emb': [20.0, 10.0]}),
+                                  ['0_emb', '1_emb'], 'path')
+        directory = os.path.dirname(self.prefix)
+        os.makedirs(directory)
+        for payload_format in ['parquet', 'arrow']:
+            payload.save(directory, payload_format=payload_format)
+            loaded = ComponentPayload.load(f'{directory}/payload.{payload_format}')
+            self.assertEqual(loaded.get_serializable_metadata(), payload.get_serializable_metadata())
+            self.assertEqual(loaded.df['label'].tolist(), ['x', 'y', None])
+            self.assertNotIn('0_emb', loaded.df.columns)
+            np.testing.assert_array_equal(loaded.get_feature_matrix(['0_emb', '1_emb']),
+                                          [[1, 10], [2, 20], [np.nan, np.nan]])
+            self.assertEqual(loaded.feature_blocks['emb'].values.dtype, np.float32)
+
+        _, df, blocks = read_payload(f'{directory}/payload.arrow', columns=['label'])
+        self.assertEqual(df.columns.tolist(), ['label'])
+        self.assertEqual(blocks['emb'].keys.tolist(), ['a', 'b', 'c'])
+        self.assertFalse(blocks['emb'].values.flags.owndata)  # a view of the memory-mapped file
+
+
+if __name__ == '__main__':
+    unittest.main()
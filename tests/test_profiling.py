@@ -0,0 +1,69 @@
+import glob
+import os
+import pstats
+import tempfile
+import time
+import unittest
+
+from vanpy.core.ComponentPayload import ComponentPayload
+from vanpy.core.PipelineComponent import PipelineComponent
+from vanpy.utils.profiling import ComponentProfiler
+
+
+class ProfilingTest(unittest.TestCase):
+    class SlowComponent(PipelineComponent):
+        def process(self, input_payload: ComponentPayload) -> ComponentPayload:
+            metadata, df = input_payload.unpack()
+            self.process_with_progress(['a', 'b', 'c'], metadata, 'path')
+            return input_payload
+
+        def process_item(self, f, input_column):
+            self.slow_function()
+            return {input_column: f}
+
+        @staticmethod
+        def slow_function():
+            time.sleep(0.05)
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.payload = ComponentPayload(input_path='path')
+
+    def get_component(self, mode: str) -> PipelineComponent:
+        return self.SlowComponent('feature_extraction', 'slow', {
+            'intermediate_payload_path': self.output_dir, 'max_workers': 2,
+            'profiling': {'enabled': True, 'mode': mode, 'sampling_interval': 0.002}})
+
+    def test_disabled_by_default(self):
+        component = self.SlowComponent('feature_extraction', 'slow', {'intermediate_payload_path': self.output_dir})
+        self.assertIsNone(component.profiler)
+        component.profiled_process(self.payload)
+        self.assertEqual(os.listdir(self.output_dir), [])
+
+    def test_sampling(self):
+        self.get_component('sampling').profiled_process(self.payload)
+        collapsed = glob.glob(f'{self.output_dir}/feature_extraction_slow_profile_*.collapsed')
+        self.assertEqual(len(collapsed), 1)
+        self.assertEqual(len(glob.glob(f'{self.output_dir}/feature_extraction_slow_profile_*_profile.txt')), 1)
+        self.assertEqual(glob.glob(f'{self.output_dir}/*.prof'), [])
+        with open(collapsed[0]) as f:
+            lines = f.read().splitlines()
+        self.assertTrue(any('process_item' in line and 'slow_function' in line for line in lines))
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            self.assertGreater(int(count), 0)
+
+    def test_deterministic(self):
+        self.get_component('deterministic').profiled_process(self.payload)
+        profiles = glob.glob(f'{self.output_dir}/*.prof')
+        self.assertEqual(len(profiles), 1)
+        functions = {function for _, _, function in pstats.Stats(profiles[0]).stats}
+        self.assertIn('slow_function', functions)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            ComponentProfiler('prefix', mode='magic')
+
+
+if __name__ == '__main__':
+    unittest.main()
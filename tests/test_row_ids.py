@@ -0,0 +1,78 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from vanpy.core.ComponentPayload import ComponentPayload
+from vanpy.utils.row_ids import PARENT_ROW_ID_COLUMN, ROW_ID_COLUMN, attach_results, ensure_row_ids, expand_rows
+
+
+class TestRowIds(unittest.TestCase):
+    def setUp(self):
+        self.df = ensure_row_ids(pd.DataFrame({'path': ['a', 'b', 'a', 'c']}))
+        self.row_ids = self.df[ROW_ID_COLUMN].tolist()
+
+    def test_ensure_row_ids(self):
+        self.assertEqual(self.df.columns[-1], ROW_ID_COLUMN)
+        self.assertEqual(self.df[ROW_ID_COLUMN].dtype, np.int64)
+        self.assertEqual(len(set(self.row_ids)), 4)
+
+        df = pd.DataFrame({'path': ['d', 'e'], ROW_ID_COLUMN: [self.row_ids[0], None]})
+        ensure_row_ids(df)
+        self.assertEqual(df[ROW_ID_COLUMN].iloc[0], self.row_ids[0])
+        self.assertNotIn(df[ROW_ID_COLUMN].iloc[1], self.row_ids)
+
+    def test_attach_results_by_row_id(self):
+        results = pd.DataFrame({'path': ['a', 'c'], 'score': [1.0, 3.0],
+                                ROW_ID_COLUMN: [self.row_ids[2], self.row_ids[3]]})
+        df = attach_results(self.df.copy(), results, 'path')
+        self.assertEqual(df['path'].tolist(), ['a', 'b', 'a', 'c'])
+        np.testing.assert_array_equal(df['score'].to_numpy(), [np.nan, np.nan, 1.0, 3.0])
+        self.assertEqual(df[ROW_ID_COLUMN].tolist(), self.row_ids)
+
+    def test_attach_results_by_key(self):
+        results = pd.DataFrame({'path': ['a', 'b'], 'score': [1.0, 2.0]})
+        df = attach_results(self.df.copy(), results, 'path')
+        np.testing.assert_array_equal(df['score'].to_numpy(), [1.0, 2.0, 1.0, np.nan])
+
+    def test_attach_results_replaces_columns(self):
+        df = self.df.copy()
+        df['score'] = 0.0
+        results = pd.DataFrame({'score': [5.0], ROW_ID_COLUMN: [self.row_ids[1]]})
+        df = attach_results(df, results, 'path')
+        self.assertEqual(list(df.columns).count('score'), 1)
+        np.testing.assert_array_equal(df['score'].to_numpy(), [np.nan, 5.0, np.nan, np.nan])
+
+    def test_expand_rows(self):
+        results = pd.DataFrame({'path': ['a', 'a', 'c'], 'segment': ['a0', 'a1', 'c0'],
+                                ROW_ID_COLUMN: [self.row_ids[0], self.row_ids[0], self.row_ids[3]]})
+        df = expand_rows(self.df.copy(), results, 'path')
+        self.assertEqual(df['path'].tolist(), ['a', 'a', 'b', 'a', 'c'])
+        self.assertEqual(df['segment'].fillna('').tolist(), ['a0', 'a1', '', '', 'c0'])
+        parents = df[PARENT_ROW_ID_COLUMN]
+        self.assertEqual(parents.dtype, 'Int64')
+        self.assertEqual(parents.iloc[0], self.row_ids[0])
+        self.assertEqual(parents.iloc[4], self.row_ids[3])
+        self.assertTrue(parents.iloc[2:4].isna().all())
+        self.assertEqual(df[ROW_ID_COLUMN].iloc[2:4].tolist(), self.row_ids[1:3])
+        self.assertEqual(df[ROW_ID_COLUMN].nunique(), 5)
+        self.assertFalse(set(df[ROW_ID_COLUMN].iloc[[0, 1, 4]]) & set(self.row_ids))
+
+    def test_expand_rows_by_key(self):
+        results = pd.DataFrame({'path': ['a'], 'segment': ['a0']})
+        df = expand_rows(self.df.copy(), results, 'path')
+        self.assertEqual(df['segment'].fillna('').tolist(), ['a0', '', 'a0', ''])
+        self.assertEqual(df[PARENT_ROW_ID_COLUMN].iloc[2], self.row_ids[2])
+
+    def test_feature_block_keyed_by_row_id(self):
+        metadata = {'paths_column': 'path', 'all_paths_columns': ['path'], 'meta_columns': [],
+                    'feature_columns': ['f0', 'f1'], 'classification_columns': []}
+        results = pd.DataFrame({'f0': [1.0, 3.0], 'f1': [2.0, 4.0], ROW_ID_COLUMN: [self.row_ids[3], self.row_ids[0]]})
+        payload = ComponentPayload(metadata=metadata, df=self.df.copy())
+        payload.add_feature_block('embedding', results, ['f0', 'f1'], ROW_ID_COLUMN)
+        np.testing.assert_array_equal(payload.get_feature_matrix(['f0', 'f1']),
+                                      [[3.0, 4.0], [np.nan, np.nan], [np.nan, np.nan], [1.0, 2.0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,10 +4,15 @@ import tempfile
 import subprocess
 import gdown
 import unittest
+import wave
+
+import numpy as np
+import pandas as pd
 
 from yaml import YAMLError
 
 from vanpy.utils.utils import *
+from vanpy.utils import ffmpeg_utils
 
 
 class UtilsTest(unittest.TestCase):
@@ -38,6 +43,66 @@ class UtilsTest(unittest.TestCase):
         self.assertNotEqual(output_path, output_path2)
         shutil.rmtree(temp_dir)
 
+    def test_get_cut_segments_commands(self):
+        segments = [(i, i + 0.5) for i in range(MAX_SEGMENTS_PER_COMMAND + 1)]
+        commands, output_paths = get_cut_segments_commands('/data/a.wav#t=10,100', '/out', segments, '_', False)
+        self.assertEqual(len(commands), 2)  # one decode of the source per MAX_SEGMENTS_PER_COMMAND segments
+        self.assertEqual(commands[0].count('-i'), 1)
+        self.assertEqual(commands[0][commands[0].index('-i') + 1], '/data/a.wav')
+        self.assertEqual(sum(command.count('-ss') for command in commands), len(segments))
+        self.assertEqual(output_paths[1], '/out/a_10-100_1.wav')
+        self.assertEqual(commands[0][commands[0].index(output_paths[0]) + 1:][:4], ['-ss', '11.0', '-to', '11.5'])
+        self.assertEqual(output_paths[0], get_cut_segment_command('/data/a.wav#t=10,100', '/out', segments[0], 0, '_',
+                                                                  False)[1])
+
+    def test_get_cut_segments_commands_output_options(self):
+        commands, _ = get_cut_segments_commands('/data/a.mp3', '/out', [(0, 1)], '_', False)
+        self.assertEqual(commands[0][-10:-4], SEGMENT_OUTPUT_OPTIONS)
+        commands, _ = get_cut_segments_commands('/data/a.mp3', '/out', [(0, 1)], '_', False, output_options=[])
+        self.assertEqual(commands[0][-8:], ['-ss', '0.0', '-to', '1.0', '-vn', '-dn', '-sn', '/out/a_0.wav'])
+
+    @unittest.skipIf(shutil.which('ffmpeg') is None, 'ffmpeg is not installed')
+    def test_ffmpeg_cut_segments(self):
+        temp_dir = tempfile.mkdtemp()
+        input_path = f'{temp_dir}/stereo.wav'
+        with wave.open(input_path, 'wb') as w:
+            w.setnchannels(2)
+            w.setsampwidth(2)
+            w.setframerate(8000)
+            w.writeframes(np.zeros(2 * 8000 * 3, dtype=np.int16).tobytes())
+        df = pd.DataFrame({'start_tt': [0.0, 0.5, 1.0], 'end_tt': [0.5, 1.5, 3.0]})
+        df = ffmpeg_utils.cut_segments(input_path, df, temp_dir)
+        for path, duration in zip(df['input_path'], [0.5, 1.0, 2.0]):
+            with wave.open(path, 'rb') as w:
+                self.assertEqual((w.getframerate(), w.getnchannels()), (8000, 2))  # the source format is kept
+                self.assertAlmostEqual(w.getnframes() / w.getframerate(), duration, delta=0.01)
+        output_paths = cut_segments(input_path, f'{temp_dir}/out', [(0, 0.5), (1, 3)], '_', False)
+        for path, duration in zip(output_paths, [0.5, 2.0]):
+            with wave.open(path, 'rb') as w:
+                self.assertEqual((w.getframerate(), w.getnchannels()), (16000, 1))
+                self.assertAlmostEqual(w.getnframes() / w.getframerate(), duration, delta=0.01)
+        shutil.rmtree(temp_dir)
+
+    def test_copy_wav_segments(self):
+        temp_dir = tempfile.mkdtemp()
+        samples = np.arange(16000, dtype=np.int16)
+        for rate in (16000, 8000):
+            with wave.open(f'{temp_dir}/{rate}.wav', 'wb') as w:
+                w.setnchannels(1)
+                w.setsampwidth(2)
+                w.setframerate(rate)
+                w.writeframes(samples.tobytes())
+        output_paths = cut_segments(f'{temp_dir}/16000.wav#t=0.25,1', f'{temp_dir}/out', [(0, 0.25), (0.5, 2)], '_',
+                                    False)
+        for path, (first, last) in zip(output_paths, [(4000, 8000), (12000, 16000)]):
+            with wave.open(path, 'rb') as w:
+                self.assertEqual((w.getframerate(), w.getnchannels()), (16000, 1))
+                np.testing.assert_array_equal(np.frombuffer(w.readframes(w.getnframes()), np.int16),
+                                              samples[first:last])
+        self.assertFalse(copy_wav_segments(f'{temp_dir}/8000.wav', [(0, 0.25)], [f'{temp_dir}/out/8000_0.wav']))
+        self.assertFalse(os.path.exists(f'{temp_dir}/out/8000_0.wav'))
+        shutil.rmtree(temp_dir)
+
     def test_get_audio_files_paths(self):
         temp_dir = tempfile.mkdtemp()
         input_path = gdown.download(